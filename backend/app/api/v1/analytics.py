@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, or_
 from typing import List, Optional
 from datetime import datetime, timedelta
-from app.core.deps import get_db, get_current_user, require_role
+from app.core.activity import activity_tracker
+from app.core.config import settings
+from app.core.deps import get_read_db, get_current_user_sync, require_role_sync
 from app.models.models import (
     User, Quiz, QuizAttempt, Question, QuestionBank, Subject, Answer
 )
@@ -15,8 +17,8 @@ router = APIRouter()
 
 @router.get("/dashboard", response_model=DashboardStats)
 def get_dashboard_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(["admin"]))
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_role_sync(["admin"]))
 ):
     """
     Comprehensive dashboard statistics for admin
@@ -57,7 +59,20 @@ def get_dashboard_stats(
     ).count()
     
     # Total attempts
-    total_attempts = db.query(QuizAttempt).count()
+    total_attempts = db.query(QuizAttempt).filter(QuizAttempt.is_started).count()
+
+    # Active now: last_active in the database, plus timestamps not flushed yet
+    online_since = datetime.utcnow() - timedelta(seconds=settings.ACTIVE_NOW_SECONDS)
+    online_filter = User.last_active >= online_since
+    buffered_ids = activity_tracker.recently_seen(online_since)
+    if buffered_ids:
+        online_filter = or_(online_filter, User.id.in_(buffered_ids))
+    online_by_role = dict(
+        db.query(User.role, func.count(User.id))
+        .filter(online_filter, User.role.in_(["student", "teacher"]))
+        .group_by(User.role)
+        .all()
+    )
     
     return {
         "total_quizzes": total_quizzes,
@@ -69,15 +84,17 @@ def get_dashboard_stats(
         "total_subjects": total_subjects,
         "total_questions_bank": total_questions_bank,
         "yesterday_assessments": yesterday_assessments,
-        "total_attempts": total_attempts
+        "total_attempts": total_attempts,
+        "online_students": online_by_role.get("student", 0),
+        "online_teachers": online_by_role.get("teacher", 0),
     }
 
 
 @router.get("/teacher/{teacher_id}/stats", response_model=TeacherStats)
 def get_teacher_statistics(
     teacher_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_sync)
 ):
     """
     Get detailed statistics for a teacher
@@ -121,7 +138,7 @@ def get_teacher_statistics(
     # Students who attempted their quizzes
     students_attempted = db.query(func.count(func.distinct(QuizAttempt.student_id))).join(
         Quiz, Quiz.id == QuizAttempt.quiz_id
-    ).filter(Quiz.creator_id == teacher_id).scalar() or 0
+    ).filter(Quiz.creator_id == teacher_id, QuizAttempt.is_started).scalar() or 0
     
     # Average quiz score
     avg_score = db.query(func.avg(QuizAttempt.percentage)).join(
@@ -156,8 +173,8 @@ def get_teacher_statistics(
 @router.get("/student/{student_id}/stats", response_model=StudentStats)
 def get_student_statistics(
     student_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_sync)
 ):
     """
     Get detailed statistics for a student
@@ -182,7 +199,8 @@ def get_student_statistics(
     
     # Total attempts
     total_attempts = db.query(QuizAttempt).filter(
-        QuizAttempt.student_id == student_id
+        QuizAttempt.student_id == student_id,
+        QuizAttempt.is_started
     ).count()
     
     completed_attempts = db.query(QuizAttempt).filter(
@@ -215,12 +233,14 @@ def get_student_statistics(
     
     # Last attempt
     last_attempt = db.query(QuizAttempt).filter(
-        QuizAttempt.student_id == student_id
+        QuizAttempt.student_id == student_id,
+        QuizAttempt.is_started
     ).order_by(QuizAttempt.started_at.desc()).first()
     
     # Pending quizzes (active quizzes not attempted)
     attempted_quiz_ids = db.query(QuizAttempt.quiz_id).filter(
-        QuizAttempt.student_id == student_id
+        QuizAttempt.student_id == student_id,
+        QuizAttempt.is_started
     ).subquery()
     
     pending_quizzes = db.query(Quiz).filter(
@@ -243,32 +263,36 @@ def get_student_statistics(
 @router.get("/activity/recent")
 def get_recent_activity(
     limit: int = 20,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(["admin"]))
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_role_sync(["admin"]))
 ):
     """
     Get recent activity across the system
     """
     activities = []
     
-    # Recent quiz attempts
-    recent_attempts = db.query(QuizAttempt).order_by(
+    # Recent quiz attempts, joined with student and quiz in one query
+    recent_attempts = db.query(
+        QuizAttempt, User.first_name, User.last_name, Quiz.title
+    ).join(
+        User, User.id == QuizAttempt.student_id
+    ).join(
+        Quiz, Quiz.id == QuizAttempt.quiz_id
+    ).filter(
+        QuizAttempt.is_started
+    ).order_by(
         QuizAttempt.started_at.desc()
     ).limit(limit).all()
     
-    for attempt in recent_attempts:
-        student = db.query(User).filter(User.id == attempt.student_id).first()
-        quiz = db.query(Quiz).filter(Quiz.id == attempt.quiz_id).first()
-        
-        if student and quiz:
-            activities.append({
-                "id": attempt.id,
-                "user_name": f"{student.first_name} {student.last_name}",
-                "user_role": "student",
-                "action": f"Attempted quiz: {quiz.title}",
-                "timestamp": attempt.started_at,
-                "details": f"Score: {attempt.score}/{attempt.total_marks}" if attempt.is_completed else "In progress"
-            })
+    for attempt, first_name, last_name, quiz_title in recent_attempts:
+        activities.append({
+            "id": attempt.id,
+            "user_name": f"{first_name} {last_name}",
+            "user_role": "student",
+            "action": f"Attempted quiz: {quiz_title}",
+            "timestamp": attempt.started_at,
+            "details": f"Score: {attempt.score}/{attempt.total_marks}" if attempt.is_completed else "In progress"
+        })
     
     return activities
 
@@ -278,8 +302,8 @@ def get_user_activity(
     role: Optional[str] = None,
     department: Optional[str] = None,
     limit: int = 50,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(["admin"]))
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_role_sync(["admin"]))
 ):
     """
     Get user activity list with filters
@@ -303,7 +327,7 @@ def get_user_activity(
             "department": user.department,
             "class_year": user.class_year,
             "student_id": user.student_id,
-            "last_active": user.last_active,
+            "last_active": activity_tracker.last_seen(user.id, user.last_active),
             "is_active": user.is_active
         }
         for user in users
@@ -313,8 +337,8 @@ def get_user_activity(
 @router.get("/performance/subject/{subject_id}")
 def get_subject_performance(
     subject_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_sync)
 ):
     """
     Get performance analytics for a subject
@@ -341,7 +365,8 @@ def get_subject_performance(
     
     # Total attempts
     total_attempts = db.query(QuizAttempt).filter(
-        QuizAttempt.quiz_id.in_(quiz_ids)
+        QuizAttempt.quiz_id.in_(quiz_ids),
+        QuizAttempt.is_started
     ).count()
     
     # Average performance
@@ -363,8 +388,8 @@ def get_subject_performance(
 @router.get("/performance/department/{department}")
 def get_department_performance(
     department: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(["admin", "teacher"]))
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_role_sync(["admin", "teacher"]))
 ):
     """
     Get performance analytics for a department
@@ -387,7 +412,8 @@ def get_department_performance(
     
     # Attempts by students in this department
     total_attempts = db.query(QuizAttempt).filter(
-        QuizAttempt.student_id.in_(student_ids)
+        QuizAttempt.student_id.in_(student_ids),
+        QuizAttempt.is_started
     ).count()
     
     completed_attempts = db.query(QuizAttempt).filter(
@@ -1,37 +1,66 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, case
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func, case, select, insert, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
-from typing import List, Optional
-from app.db.database import get_db
-from app.models.models import User, Quiz, QuizAttempt, Answer, Question
+from typing import List, Optional, Tuple
+from app.db.database import get_async_db, get_async_read_db, get_async_read_session_factory, get_write_queue
+from app.db.sqlite_writer import WriteQueue
+from app.models.models import User, Quiz, QuizAttempt, Answer, Question, QuizAssignment, AttemptSubmission
 from app.schemas.schemas import (
-    QuizAttemptStart, QuizAttemptSubmit, QuizAttemptResponse,
+    QuizAttemptStart, QuizAttemptSubmit, QuizAttemptResponse, SubmissionStatusResponse,
     DashboardStats, ActivityItem
 )
-from app.core.deps import get_current_active_user, require_role
+from app.core.answer_keys import answers_match
+from app.core.deps import get_current_active_user, get_read_your_writes_db, require_role
+from app.core.config import settings
+from app.core.export import ENCODERS, EXPORT_MEDIA_TYPES
+from app.core.item_stats import record_answers
+from app.core.live_sessions import LIVE_JOIN_GRACE_MINUTES, insert_active_attempts
+from app.core.previews import is_preview_id, preview_store
+from app.core.sanity_flags import FLAG_BITS, flag_names, sanity_flags_expression
+from app.core.submissions import GradingWorkers, SubmissionRejected
 
 router = APIRouter()
 
 # Allow a small clock-skew tolerance so students are not blocked at countdown zero.
 START_TIME_TOLERANCE_SECONDS = 90
 
+# Where clients poll a queued submission (router is mounted at /api/v1/attempts)
+SUBMISSION_STATUS_URL = "/api/v1/attempts/{attempt_id}/submission"
 
-def _finalize_expired_attempt(db: Session, attempt: QuizAttempt, quiz: Quiz, now: datetime) -> None:
-    """Finalize an expired, incomplete attempt using currently saved answers."""
-    existing_answers = db.query(Answer).filter(Answer.attempt_id == attempt.id).all()
+# Rows fetched per round trip from the server-side cursor when exporting
+EXPORT_BATCH_SIZE = 500
+EXPORT_COLUMNS = [
+    "attempt_id", "quiz_id", "quiz_title", "student_id", "student_name", "student_email", "roll_number",
+    "score", "total_marks", "percentage", "correct_answers", "answered_count", "total_questions",
+    "time_taken_minutes", "started_at", "submitted_at", "status",
+]
+
+
+async def _finalize_expired_attempt(db: AsyncSession, attempt: QuizAttempt, quiz: Quiz, now: datetime) -> bool:
+    """Finalize an expired, incomplete attempt using currently saved answers.
+
+    Skipped (returns False) while a queued submission is waiting to be graded:
+    it was received before the deadline and grades the attempt with its intake time.
+    """
+    if await db.scalar(select(AttemptSubmission.id).where(
+        AttemptSubmission.attempt_id == attempt.id, AttemptSubmission.status == "queued"
+    )) is not None:
+        return False
+    existing_answers = (await db.scalars(select(Answer).where(Answer.attempt_id == attempt.id))).all()
     answer_map = {ans.question_id: ans for ans in existing_answers}
-    questions = db.query(Question).filter(Question.quiz_id == attempt.quiz_id).all()
+    questions = (await db.scalars(select(Question).where(Question.quiz_id == attempt.quiz_id))).all()
 
     total_score = 0.0
+    correct_count = 0
     for question in questions:
         answer = answer_map.get(question.id)
         if not answer:
             continue
 
-        student_answer = (answer.answer_text or "").strip().lower()
-        correct_answer = (question.correct_answer or "").strip().lower()
-        is_correct = student_answer == correct_answer
+        is_correct = answers_match(answer.answer_text, question.correct_answer)
 
         if is_correct:
             marks_awarded = float(question.marks or 0)
@@ -41,6 +70,7 @@ def _finalize_expired_attempt(db: Session, attempt: QuizAttempt, quiz: Quiz, now
         answer.is_correct = is_correct
         answer.marks_awarded = marks_awarded
         total_score += marks_awarded
+        correct_count += int(is_correct)
 
     time_taken = (now - attempt.started_at).total_seconds() / 60 if attempt.started_at else 0
     if quiz.duration_minutes and time_taken > quiz.duration_minutes:
@@ -48,15 +78,57 @@ def _finalize_expired_attempt(db: Session, attempt: QuizAttempt, quiz: Quiz, now
 
     attempt.score = max(0.0, total_score)
     attempt.percentage = (attempt.score / attempt.total_marks * 100) if attempt.total_marks > 0 else 0
+    attempt.answered_count = len(existing_answers)
+    attempt.correct_count = correct_count
     attempt.submitted_at = now
     attempt.time_taken_minutes = round(time_taken, 2)
     attempt.is_completed = True
     attempt.is_graded = True
 
-    db.commit()
+    await db.flush()
+    await _record_grading(db, attempt)
+    await db.refresh(attempt, ["sanity_flags"])
+    return True
+
+
+async def _record_grading(db: AsyncSession, attempt: QuizAttempt) -> None:
+    """Store the sanity flags of a just-graded (flushed) attempt and add its answers to the question stats.
+
+    The ORM copy's ``sanity_flags`` is stale until refreshed.
+    """
+    await db.execute(
+        update(QuizAttempt)
+        .where(QuizAttempt.id == attempt.id)
+        .values(sanity_flags=sanity_flags_expression())
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(record_answers(Answer.attempt_id == attempt.id))
+
+
+async def _preview_call(method: str, *args):
+    """``preview_store.<method>(*args)``, in the threadpool when the store does I/O (database, Redis)."""
+    call = getattr(preview_store, method)
+    return await run_in_threadpool(call, *args) if preview_store.blocking else call(*args)
+
+
+async def _get_attempt(db: AsyncSession, attempt_id: int) -> Optional[QuizAttempt]:
+    """The attempt row, or the preview attempt for preview ids."""
+    if is_preview_id(attempt_id):
+        preview = await _preview_call("get", attempt_id)
+        return preview.attempt if preview else None
+    return await db.get(QuizAttempt, attempt_id)
+
+
+async def _attempt_answers(db: AsyncSession, attempt: QuizAttempt) -> List[Answer]:
+    if is_preview_id(attempt.id):
+        preview = await _preview_call("get", attempt.id)
+        return list(preview.answers.values()) if preview else []
+    return list((await db.scalars(select(Answer).where(Answer.attempt_id == attempt.id))).all())
 
 
 def _is_attempt_expired(attempt: QuizAttempt, quiz: Quiz, now: datetime) -> bool:
+    if not attempt.is_started:
+        return False  # pending: the student never joined
     if quiz.is_live_session and quiz.live_end_time:
         return now > quiz.live_end_time
     if quiz.duration_minutes and attempt.started_at:
@@ -65,92 +137,76 @@ def _is_attempt_expired(attempt: QuizAttempt, quiz: Quiz, now: datetime) -> bool
     return False
 
 
-def _normalize_student_attempts_for_quiz(
-    db: Session,
-    quiz: Quiz,
-    student_id: int,
-    now: datetime,
-):
-    student_attempts = db.query(QuizAttempt).filter(
-        QuizAttempt.quiz_id == quiz.id,
-        QuizAttempt.student_id == student_id,
-    ).order_by(QuizAttempt.started_at.desc(), QuizAttempt.id.desc()).all()
-
-    active_incomplete_attempts = []
-    has_completed_attempt = False
-
-    for existing_attempt in student_attempts:
-        if existing_attempt.is_completed:
-            has_completed_attempt = True
-            continue
-
-        if _is_attempt_expired(existing_attempt, quiz, now):
-            _finalize_expired_attempt(db, existing_attempt, quiz, now)
-            has_completed_attempt = True
-            continue
-
-        active_incomplete_attempts.append(existing_attempt)
-
-    # Keep only the latest active attempt; remove stale duplicates.
-    if len(active_incomplete_attempts) > 1:
-        stale_attempt_ids = [attempt.id for attempt in active_incomplete_attempts[1:]]
-        db.query(Answer).filter(Answer.attempt_id.in_(stale_attempt_ids)).delete(synchronize_session=False)
-        db.query(QuizAttempt).filter(QuizAttempt.id.in_(stale_attempt_ids)).delete(synchronize_session=False)
-        db.commit()
-        active_incomplete_attempts = active_incomplete_attempts[:1]
+async def _load_quizzes_with_question_counts(db: AsyncSession, quiz_ids):
+    """Load quizzes and their question counts in a single statement."""
+    question_count = (
+        select(func.count(Question.id))
+        .where(Question.quiz_id == Quiz.id)
+        .correlate(Quiz)
+        .scalar_subquery()
+    )
+    rows = (await db.execute(
+        select(Quiz, question_count.label("total_questions")).where(Quiz.id.in_(quiz_ids))
+    )).all()
+    quiz_map = {quiz.id: quiz for quiz, _ in rows}
+    question_count_map = {quiz.id: int(total_questions or 0) for quiz, total_questions in rows}
+    return quiz_map, question_count_map
 
-    active_attempt = active_incomplete_attempts[0] if active_incomplete_attempts else None
-    return active_attempt, has_completed_attempt
 
+def _filter_student_attempts(query, current_user: User, quiz_id, student_id, completed_only: bool):
+    """Apply the Student Results filters shared by all-attempts and export.
 
-def _build_attempt_sanity_flags(
-    quiz: Quiz,
-    attempt: QuizAttempt,
-    total_questions: int,
-    correct_answers: int,
-    answered_count: int,
-):
-    flags = []
-
-    score = float(attempt.score or 0)
-    total_marks = float(attempt.total_marks or 0)
-    percentage = float(attempt.percentage) if attempt.percentage is not None else None
+    ``query`` must select from QuizAttempt; User is joined here.
+    """
+    # Teacher/admin previews are never stored (app.core.previews), so every
+    # started attempt here is a real student attempt.
+    query = query.join(User, User.id == QuizAttempt.student_id)
+    query = query.where(QuizAttempt.is_started)
 
-    if score < 0:
-        flags.append("negative_score")
+    # Teachers can only see attempts for their own quizzes
+    if current_user.role == "teacher":
+        query = query.where(QuizAttempt.quiz_id.in_(select(Quiz.id).where(Quiz.creator_id == current_user.id)))
 
-    if total_marks >= 0 and score > (total_marks + 1e-6):
-        flags.append("score_exceeds_total")
+    # Apply filters
+    if completed_only:
+        query = query.where(QuizAttempt.is_completed == True)
 
-    if percentage is not None and (percentage < -0.1 or percentage > 100.1):
-        flags.append("percentage_out_of_range")
+    if quiz_id:
+        query = query.where(QuizAttempt.quiz_id == quiz_id)
 
-    if correct_answers > answered_count:
-        flags.append("correct_exceeds_answered")
+    if student_id:
+        query = query.where(QuizAttempt.student_id == student_id)
 
-    if total_questions > 0 and answered_count > total_questions:
-        flags.append("answered_exceeds_total")
+    return query
 
-    if attempt.is_completed and total_questions > 0:
-        correct_ratio = correct_answers / total_questions
-        marks_per_correct = float(quiz.marks_per_correct or 1) if quiz else 1.0
-        negative_marking = float(quiz.negative_marking or 0) if quiz else 0.0
 
-        # Suspicious: many correct answers but net score clamped to zero, even though
-        # negative marking isn't aggressive enough to typically offset that level of correctness.
-        if score <= 0 and correct_ratio >= 0.5 and negative_marking <= marks_per_correct:
-            flags.append("high_correct_zero_score")
+async def _run_write(db: AsyncSession, write_queue: Optional[WriteQueue], work):
+    """Run ``work(session)`` and commit it, through the SQLite single writer when enabled.
 
-        # Suspiciously fast completion for larger quizzes.
-        if attempt.time_taken_minutes is not None and total_questions >= 20 and float(attempt.time_taken_minutes) < 0.5:
-            flags.append("very_fast_completion")
+    HTTPExceptions count as results: writes made before the rejection (e.g. an
+    expired attempt finalized on the way to "already completed") are committed.
+    """
+    async def guarded(session: AsyncSession):
+        try:
+            return await work(session), None
+        except HTTPException as error:
+            return None, error
+
+    if write_queue is not None:
+        result, error = await write_queue.submit(guarded)
+    else:
+        result, error = await guarded(db)
+        await db.commit()
+    if error is not None:
+        raise error
+    return result
 
-    return flags
 
 @router.post("/start", response_model=QuizAttemptResponse)
 async def start_quiz_attempt(
     attempt_data: QuizAttemptStart,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    write_queue: Optional[WriteQueue] = Depends(get_write_queue),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -159,71 +215,107 @@ async def start_quiz_attempt(
     - Checks schedule and grace period
     - Prevents duplicate attempts
     """
+    return await _run_write(db, write_queue, lambda session: _start_attempt(session, attempt_data, current_user))
+
+
+async def _start_attempt(db: AsyncSession, attempt_data: QuizAttemptStart, current_user: User) -> QuizAttempt:
     # Verify quiz exists
-    quiz = db.query(Quiz).filter(Quiz.id == attempt_data.quiz_id).first()
+    quiz = await db.get(Quiz, attempt_data.quiz_id)
     if not quiz:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Quiz not found"
         )
 
-    # Students can only start attempts for quizzes assigned to them
-    if current_user.role == "student":
-        from app.models.models import QuizAssignment
-        assignment = db.query(QuizAssignment).filter(
+    now = datetime.now()
+
+    # Teachers and admins can preview anytime (bypass restrictions). Previews are
+    # kept in the preview store and never written to quiz_attempts/answers.
+    if current_user.role in ["teacher", "admin"]:
+        return await _preview_call("start", quiz.id, current_user.id, quiz.total_marks, now)
+
+    return await _start_student_attempt(db, quiz, current_user, now)
+
+
+async def _start_student_attempt(db: AsyncSession, quiz: Quiz, current_user: User, now: datetime) -> QuizAttempt:
+    """Return the student's active attempt for ``quiz``, claiming or creating it if needed.
+
+    ``uq_quiz_attempts_active`` allows one incomplete attempt per (quiz, student),
+    so this never has to clean up after a double start.
+    """
+    # Incomplete (at most one) before completed
+    attempt = await db.scalar(select(QuizAttempt).where(
+        QuizAttempt.quiz_id == quiz.id,
+        QuizAttempt.student_id == current_user.id,
+    ).order_by(QuizAttempt.is_completed, QuizAttempt.id.desc()).limit(1))
+
+    # Students can only start attempts for quizzes assigned to them (an existing
+    # attempt, including a pending one from an opened live session, proves it)
+    if attempt is None:
+        assignment = await db.scalar(select(QuizAssignment.id).where(
             QuizAssignment.quiz_id == quiz.id,
             QuizAssignment.student_id == current_user.id,
-        ).first()
+        ))
         if not assignment:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Quiz not assigned to you"
             )
-    
-    # Teachers and admins can preview anytime (bypass restrictions)
-    is_teacher_or_admin = current_user.role in ["teacher", "admin"]
-    
-    if not quiz.is_active and not is_teacher_or_admin:
+
+    if not quiz.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Quiz is not active"
         )
-    
-    now = datetime.now()
 
-    # For teachers/admins previewing: delete any existing incomplete attempts to start fresh
-    if is_teacher_or_admin:
-        existing_incomplete = db.query(QuizAttempt).filter(
-            QuizAttempt.quiz_id == quiz.id,
-            QuizAttempt.student_id == current_user.id,
-            QuizAttempt.is_completed == False
-        ).all()
-        if existing_incomplete:
-            existing_ids = [attempt.id for attempt in existing_incomplete]
-            db.query(Answer).filter(Answer.attempt_id.in_(existing_ids)).delete(synchronize_session=False)
-            db.query(QuizAttempt).filter(QuizAttempt.id.in_(existing_ids)).delete(synchronize_session=False)
-            db.commit()
-    else:
-        # For students: normalize historical data and enforce a single active/completed attempt state.
-        active_attempt, has_completed_attempt = _normalize_student_attempts_for_quiz(
-            db=db,
-            quiz=quiz,
-            student_id=current_user.id,
-            now=now,
-        )
+    if attempt is not None and not attempt.is_completed:
+        if not attempt.is_started:
+            # Pending row from an opened live session: claim it
+            _check_start_window(quiz, now)
+            attempt.started_at = now
+            attempt.total_marks = quiz.total_marks
+            await db.flush()
+            return attempt
 
         # Return existing active attempt to allow reconnection.
-        if active_attempt:
-            return active_attempt
+        if not _is_attempt_expired(attempt, quiz, now):
+            return attempt
+        await _finalize_expired_attempt(db, attempt, quiz, now)
 
-        if has_completed_attempt:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="You have already completed this quiz. Reattempt is not allowed."
-            )
-    
-    # Check live session timing (only for students)
-    if quiz.is_live_session and not is_teacher_or_admin:
+    if attempt is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You have already completed this quiz. Reattempt is not allowed."
+        )
+
+    # Check live session / schedule timing
+    _check_start_window(quiz, now)
+
+    # Insert-or-return: a concurrent start for the same student makes the insert
+    # a no-op and both requests read back the same row.
+    await db.execute(_insert_active_attempt(db, {
+        "quiz_id": quiz.id,
+        "student_id": current_user.id,
+        "total_marks": quiz.total_marks,
+        "started_at": now,
+        "is_completed": False,
+        "is_graded": False,
+    }))
+    return await db.scalar(select(QuizAttempt).where(
+        QuizAttempt.quiz_id == quiz.id,
+        QuizAttempt.student_id == current_user.id,
+        QuizAttempt.is_completed == False,
+    ))
+
+
+def _insert_active_attempt(db: AsyncSession, values: dict):
+    """INSERT of a new active attempt that skips it when ``uq_quiz_attempts_active`` already has one."""
+    return insert_active_attempts(db, lambda statement: statement.values(**values))
+
+
+def _check_start_window(quiz: Quiz, now: datetime) -> None:
+    """Raise unless a student may start ``quiz`` at ``now`` (live join window or schedule grace)."""
+    if quiz.is_live_session:
         if not quiz.live_start_time or not quiz.live_end_time:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -239,7 +331,7 @@ async def start_quiz_attempt(
             )
         
         # Check if within grace period (5 minutes after start)
-        grace_end = quiz.live_start_time + timedelta(minutes=5)
+        grace_end = quiz.live_start_time + timedelta(minutes=LIVE_JOIN_GRACE_MINUTES)
         if now > grace_end:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -252,11 +344,8 @@ async def start_quiz_attempt(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Live session has ended"
             )
-        
-        # Student is joining during the live session - ALWAYS ALLOWED
-        # This allows reconnection at any time during the session
-    # Check schedule and grace period (for non-live quizzes, only for students)
-    elif quiz.scheduled_at and not is_teacher_or_admin:
+    # Check schedule and grace period (for non-live quizzes)
+    elif quiz.scheduled_at:
         grace_end = quiz.scheduled_at + timedelta(minutes=quiz.grace_period_minutes)
         
         scheduled_open_time = quiz.scheduled_at - timedelta(seconds=START_TIME_TOLERANCE_SECONDS)
@@ -271,27 +360,13 @@ async def start_quiz_attempt(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Grace period for starting this quiz has expired"
             )
-    
-    # Create attempt
-    db_attempt = QuizAttempt(
-        quiz_id=quiz.id,
-        student_id=current_user.id,
-        total_marks=quiz.total_marks,
-        is_completed=False,
-        is_graded=False
-    )
-    
-    db.add(db_attempt)
-    db.commit()
-    db.refresh(db_attempt)
-    
-    return db_attempt
 
 @router.post("/submit", response_model=QuizAttemptResponse)
 async def submit_quiz_attempt(
     attempt_id: int,
     submission: QuizAttemptSubmit,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    write_queue: Optional[WriteQueue] = Depends(get_write_queue),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -301,8 +376,17 @@ async def submit_quiz_attempt(
     - Validates deadline if quiz has duration
     - Calculates time taken
     """
+    return await _run_write(
+        db, write_queue, lambda session: _submit_attempt(session, attempt_id, submission, current_user)
+    )
+
+
+async def _submittable_attempt(
+    db: AsyncSession, attempt_id: int, current_user: User, submitted_at: datetime
+) -> Tuple[QuizAttempt, Quiz]:
+    """Load an attempt the user may still submit at ``submitted_at``, else raise."""
     # Get attempt
-    attempt = db.query(QuizAttempt).filter(QuizAttempt.id == attempt_id).first()
+    attempt = await _get_attempt(db, attempt_id)
     if not attempt:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -321,15 +405,21 @@ async def submit_quiz_attempt(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Quiz already submitted"
         )
+
+    if not attempt.is_started:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Quiz attempt has not been started"
+        )
     
     # Get quiz
-    quiz = db.query(Quiz).filter(Quiz.id == attempt.quiz_id).first()
+    quiz = await db.get(Quiz, attempt.quiz_id)
     
     # Teachers/admins previewing should not be blocked by student live-session deadlines.
     is_teacher_or_admin = current_user.role in ["teacher", "admin"]
 
     # Validate deadline
-    now = datetime.now()
+    now = submitted_at
     if quiz.is_live_session and not is_teacher_or_admin:
         # For live sessions, deadline is the live_end_time regardless of when student started
         if now > quiz.live_end_time:
@@ -345,56 +435,87 @@ async def submit_quiz_attempt(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Submission deadline has passed"
             )
-    
-    # Calculate score with custom marking scheme
-    total_score = 0
-    correct_count = 0
-    incorrect_count = 0
+    return attempt, quiz
 
-    # Remove any previously autosaved answers for this attempt to avoid duplicates
-    db.query(Answer).filter(Answer.attempt_id == attempt.id).delete(synchronize_session=False)
-    
-    # If no answers provided, still mark as completed with 0 score
-    if not submission.answers or len(submission.answers) == 0:
-        attempt.score = 0
-        attempt.percentage = 0
-        attempt.submitted_at = datetime.now()
-        time_taken = (datetime.now() - attempt.started_at).total_seconds() / 60
-        attempt.time_taken_minutes = round(time_taken, 2)
-        attempt.is_completed = True
-        attempt.is_graded = True
-        db.commit()
-        db.refresh(attempt)
+
+async def _submit_attempt(
+    db: AsyncSession,
+    attempt_id: int,
+    submission: QuizAttemptSubmit,
+    current_user: User,
+    submitted_at: Optional[datetime] = None,
+) -> QuizAttempt:
+    """Grade and complete an attempt; ``submitted_at`` defaults to now (queued submissions pass their intake time)."""
+    now = submitted_at or datetime.now()
+    attempt, quiz = await _submittable_attempt(db, attempt_id, current_user, now)
+
+    question_map = {}
+    if submission.answers:
+        submitted_question_ids = {answer_data.question_id for answer_data in submission.answers}
+        question_map = {
+            question.id: question
+            for question in (await db.scalars(select(Question).where(
+                Question.quiz_id == attempt.quiz_id,
+                Question.id.in_(submitted_question_ids),
+            ))).all()
+        }
+    answer_rows, total_score = _grade_answers(attempt, quiz, question_map, submission.answers)
+
+    if is_preview_id(attempt.id):
+        preview = await _preview_call("get", attempt.id)
+        preview.attempt = attempt  # shared stores hand out copies: save the one just checked
+        preview.answers = {row["question_id"]: Answer(**row) for row in answer_rows}
+        _complete_attempt(attempt, quiz, answer_rows, total_score, now)
+        await _preview_call("save", preview)
         return attempt
+
+    # Remove any previously autosaved answers for this attempt to avoid duplicates
+    await db.execute(delete(Answer).where(Answer.attempt_id == attempt.id).execution_options(synchronize_session=False))
+
+    # Save all answers with a single executemany insert
+    if answer_rows:
+        await db.execute(insert(Answer), answer_rows)
+
+    _complete_attempt(attempt, quiz, answer_rows, total_score, now)
+    await db.flush()
+    await _record_grading(db, attempt)
+    await db.refresh(attempt)
     
-    for answer_data in submission.answers:
-        question = db.query(Question).filter(Question.id == answer_data.question_id).first()
+    return attempt
+
+
+def _grade_answers(attempt: QuizAttempt, quiz: Quiz, question_map: dict, answers) -> Tuple[list, float]:
+    """Mark ``answers`` with the quiz's marking scheme; returns the answer rows and the raw total."""
+    total_score = 0
+    answer_rows = []
+    for answer_data in answers:
+        question = question_map.get(answer_data.question_id)
         if question:
             # Check answer correctness
-            is_correct = answer_data.answer_text.strip().lower() == question.correct_answer.strip().lower()
+            is_correct = answers_match(answer_data.answer_text, question.correct_answer)
             
             # Apply marking scheme
             if is_correct:
                 marks_awarded = question.marks  # Award full question marks for correct answer
-                correct_count += 1
             else:
                 marks_awarded = -quiz.negative_marking if quiz.negative_marking > 0 else 0
-                incorrect_count += 1
             
             total_score += marks_awarded
             
-            # Save answer
-            db_answer = Answer(
-                attempt_id=attempt.id,
-                question_id=question.id,
-                answer_text=answer_data.answer_text,
-                is_correct=is_correct,
-                marks_awarded=marks_awarded
-            )
-            db.add(db_answer)
-    
+            answer_rows.append({
+                "attempt_id": attempt.id,
+                "question_id": question.id,
+                "answer_text": answer_data.answer_text,
+                "is_correct": is_correct,
+                "marks_awarded": marks_awarded,
+            })
+    return answer_rows, total_score
+
+
+def _complete_attempt(
+    attempt: QuizAttempt, quiz: Quiz, answer_rows: list, total_score: float, submission_time: datetime
+) -> None:
     # Calculate time taken
-    submission_time = datetime.now()
     time_taken = (submission_time - attempt.started_at).total_seconds() / 60  # in minutes
     
     # Cap time taken at quiz duration (if quiz has duration)
@@ -405,28 +526,140 @@ async def submit_quiz_attempt(
     # Update attempt
     attempt.score = max(0, total_score)  # Don't allow negative total scores
     attempt.percentage = (attempt.score / attempt.total_marks * 100) if attempt.total_marks > 0 else 0
+    attempt.answered_count = len(answer_rows)
+    attempt.correct_count = sum(1 for row in answer_rows if row["is_correct"])
+    if answer_rows:
+        attempt.last_answer_at = submission_time
     attempt.submitted_at = submission_time
     attempt.time_taken_minutes = round(time_taken, 2)
     attempt.is_completed = True
     attempt.is_graded = True
-    
-    db.commit()
-    db.refresh(attempt)
-    
-    return attempt
+
+@router.post("/{attempt_id}/submissions", response_model=SubmissionStatusResponse,
+             status_code=status.HTTP_202_ACCEPTED)
+async def queue_quiz_submission(
+    attempt_id: int,
+    submission: QuizAttemptSubmit,
+    db: AsyncSession = Depends(get_async_db),
+    write_queue: Optional[WriteQueue] = Depends(get_write_queue),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Accept a submission for asynchronous grading (202 + status URL)
+    - Validates ownership and the deadline at intake time
+    - Stores the answer sheet durably; grading workers drain the queue
+    - The intake time is the submission time, however long grading waits
+    - Resubmitting while queued returns the existing submission
+    """
+    received_at = datetime.now()
+    if is_preview_id(attempt_id):
+        # Previews are graded inline; nothing is queued or stored
+        attempt = await _submit_attempt(db, attempt_id, submission, current_user, submitted_at=received_at)
+        return {
+            "submission_id": attempt.id,
+            "attempt_id": attempt.id,
+            "status": "graded",
+            "received_at": received_at,
+            "graded_at": received_at,
+            "status_url": SUBMISSION_STATUS_URL.format(attempt_id=attempt.id),
+            "attempt": QuizAttemptResponse.model_validate(attempt),
+        }
+    queued = await _run_write(
+        db, write_queue,
+        lambda session: _store_submission(session, attempt_id, submission, current_user, received_at),
+    )
+    submission_workers.notify(queued.id)
+    return _submission_status(queued)
+
+
+async def _store_submission(
+    db: AsyncSession, attempt_id: int, submission: QuizAttemptSubmit, current_user: User, received_at: datetime
+) -> AttemptSubmission:
+    existing = await db.scalar(select(AttemptSubmission).where(AttemptSubmission.attempt_id == attempt_id))
+    if existing is not None and existing.student_id == current_user.id:
+        return existing
+    await _submittable_attempt(db, attempt_id, current_user, received_at)
+
+    queued = AttemptSubmission(
+        attempt_id=attempt_id,
+        student_id=current_user.id,
+        payload=submission.model_dump(),
+        received_at=received_at,
+        status="queued",
+    )
+    db.add(queued)
+    await db.flush()
+    return queued
+
+
+@router.get("/{attempt_id}/submission", response_model=SubmissionStatusResponse)
+async def get_submission_status(
+    attempt_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Status of a queued submission; includes the graded attempt once done."""
+    queued = await db.scalar(select(AttemptSubmission).where(AttemptSubmission.attempt_id == attempt_id))
+    if queued is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Submission not found")
+    if queued.student_id != current_user.id and current_user.role not in ["teacher", "admin"]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your attempt")
+
+    attempt = await db.get(QuizAttempt, attempt_id) if queued.status == "graded" else None
+    return _submission_status(queued, attempt)
+
+
+def _submission_status(queued: AttemptSubmission, attempt: Optional[QuizAttempt] = None) -> dict:
+    return {
+        "submission_id": queued.id,
+        "attempt_id": queued.attempt_id,
+        "status": queued.status,
+        "received_at": queued.received_at,
+        "graded_at": queued.graded_at,
+        "detail": queued.detail,
+        "status_url": SUBMISSION_STATUS_URL.format(attempt_id=queued.attempt_id),
+        "attempt": QuizAttemptResponse.model_validate(attempt) if attempt is not None else None,
+    }
+
+
+async def _grade_submission(db: AsyncSession, queued: AttemptSubmission) -> None:
+    """Grade a queued submission as if it had been submitted at its intake time."""
+    student = await db.get(User, queued.student_id)
+    try:
+        await _submit_attempt(
+            db, queued.attempt_id, QuizAttemptSubmit(**queued.payload), student, submitted_at=queued.received_at
+        )
+    except HTTPException as error:
+        raise SubmissionRejected(str(error.detail))
+
+
+submission_workers = GradingWorkers(
+    _grade_submission,
+    workers=settings.GRADING_WORKERS,
+    poll_seconds=settings.GRADING_POLL_SECONDS,
+    max_tries=settings.GRADING_MAX_TRIES,
+)
+
 
 @router.post("/{attempt_id}/save-answer")
 async def save_answer_progress(
     attempt_id: int,
     answer_data: dict,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    write_queue: Optional[WriteQueue] = Depends(get_write_queue),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Save a single answer during quiz (for auto-save on refresh)
     Expected answer_data: {"question_id": int, "answer_text": str}
     """
-    attempt = db.query(QuizAttempt).filter(QuizAttempt.id == attempt_id).first()
+    return await _run_write(
+        db, write_queue, lambda session: _save_answer(session, attempt_id, answer_data, current_user)
+    )
+
+
+async def _save_answer(db: AsyncSession, attempt_id: int, answer_data: dict, current_user: User) -> dict:
+    attempt = await _get_attempt(db, attempt_id)
     
     if not attempt:
         raise HTTPException(
@@ -445,6 +678,12 @@ async def save_answer_progress(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot save answers for completed quiz"
         )
+
+    if not attempt.is_started:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Quiz attempt has not been started"
+        )
     
     question_id = answer_data.get("question_id")
     answer_text = answer_data.get("answer_text")
@@ -455,11 +694,24 @@ async def save_answer_progress(
             detail="question_id and answer_text are required"
         )
     
+    now = datetime.now()
+    if is_preview_id(attempt.id):
+        preview = await _preview_call("get", attempt.id)
+        preview.attempt = attempt
+        if question_id not in preview.answers:
+            attempt.answered_count += 1
+        preview.answers[question_id] = Answer(
+            attempt_id=attempt.id, question_id=question_id, answer_text=answer_text, is_correct=False
+        )
+        attempt.last_answer_at = now
+        await _preview_call("save", preview)
+        return {"status": "saved", "question_id": question_id}
+
     # Check if answer already exists, update it
-    existing_answer = db.query(Answer).filter(
+    existing_answer = await db.scalar(select(Answer).where(
         Answer.attempt_id == attempt_id,
         Answer.question_id == question_id
-    ).first()
+    ))
     
     if existing_answer:
         existing_answer.answer_text = answer_text
@@ -472,21 +724,24 @@ async def save_answer_progress(
             is_correct=False  # Will be graded on final submission
         )
         db.add(new_answer)
+        # SQL-side increment, so concurrent autosaves can't lose a count
+        attempt.answered_count = QuizAttempt.answered_count + 1
+    attempt.last_answer_at = now
     
-    db.commit()
+    await db.flush()
     
     return {"status": "saved", "question_id": question_id}
 
 @router.get("/{attempt_id}/answers")
 async def get_saved_answers(
     attempt_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Get all saved answers for an in-progress attempt (for restore after refresh)
     """
-    attempt = db.query(QuizAttempt).filter(QuizAttempt.id == attempt_id).first()
+    attempt = await _get_attempt(db, attempt_id)
     
     if not attempt:
         raise HTTPException(
@@ -501,7 +756,7 @@ async def get_saved_answers(
         )
     
     # Get all saved answers
-    answers = db.query(Answer).filter(Answer.attempt_id == attempt_id).all()
+    answers = await _attempt_answers(db, attempt)
     
     return {
         "attempt_id": attempt_id,
@@ -517,7 +772,7 @@ async def get_saved_answers(
 @router.get("/{attempt_id}/remaining-time")
 async def get_remaining_time(
     attempt_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -525,7 +780,7 @@ async def get_remaining_time(
     For live sessions: calculates based on live_end_time
     For regular quizzes: calculates based on started_at + duration
     """
-    attempt = db.query(QuizAttempt).filter(QuizAttempt.id == attempt_id).first()
+    attempt = await _get_attempt(db, attempt_id)
     
     if not attempt:
         raise HTTPException(
@@ -547,7 +802,7 @@ async def get_remaining_time(
             "message": "Quiz already submitted"
         }
     
-    quiz = db.query(Quiz).filter(Quiz.id == attempt.quiz_id).first()
+    quiz = await db.get(Quiz, attempt.quiz_id)
     now = datetime.now()
     is_teacher_or_admin = current_user.role in ["teacher", "admin"]
     
@@ -558,7 +813,7 @@ async def get_remaining_time(
     else:
         # Teacher/admin previews use per-attempt duration even for live quizzes.
         # Regular quizzes also use per-attempt duration.
-        if quiz.duration_minutes:
+        if quiz.duration_minutes and attempt.started_at:
             deadline = attempt.started_at + timedelta(minutes=quiz.duration_minutes)
             remaining = (deadline - now).total_seconds()
             is_expired = now > deadline
@@ -580,54 +835,31 @@ async def get_my_attempts(
     include_incomplete: bool = False,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=300),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_your_writes_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get all quiz attempts for the current student with enhanced details"""
-    query = db.query(QuizAttempt).filter(QuizAttempt.student_id == current_user.id)
+    query = select(QuizAttempt).where(QuizAttempt.student_id == current_user.id, QuizAttempt.is_started)
     
     # By default, only show completed attempts
     if not include_incomplete:
-        query = query.filter(QuizAttempt.is_completed == True)
+        query = query.where(QuizAttempt.is_completed == True)
     
-    attempts = query.order_by(QuizAttempt.started_at.desc()).offset(skip).limit(limit).all()
+    attempts = (await db.scalars(query.order_by(QuizAttempt.started_at.desc()).offset(skip).limit(limit))).all()
 
     if not attempts:
         return []
 
     quiz_ids = list({attempt.quiz_id for attempt in attempts})
-    attempt_ids = [attempt.id for attempt in attempts]
-
-    quizzes = db.query(Quiz.id, Quiz.title, Quiz.total_marks).filter(Quiz.id.in_(quiz_ids)).all()
-    quiz_map = {quiz.id: quiz for quiz in quizzes}
-
-    question_count_rows = db.query(
-        Question.quiz_id,
-        func.count(Question.id).label("total_questions"),
-    ).filter(
-        Question.quiz_id.in_(quiz_ids)
-    ).group_by(
-        Question.quiz_id
-    ).all()
-    question_count_map = {row.quiz_id: int(row.total_questions or 0) for row in question_count_rows}
-
-    correct_answer_rows = db.query(
-        Answer.attempt_id,
-        func.count(Answer.id).label("correct_answers"),
-    ).filter(
-        Answer.attempt_id.in_(attempt_ids),
-        Answer.is_correct == True
-    ).group_by(
-        Answer.attempt_id
-    ).all()
-    correct_answer_map = {row.attempt_id: int(row.correct_answers or 0) for row in correct_answer_rows}
+
+    quiz_map, question_count_map = await _load_quizzes_with_question_counts(db, quiz_ids)
     
     # Enhance each attempt with calculated fields
     result = []
     for attempt in attempts:
         quiz = quiz_map.get(attempt.quiz_id)
         total_questions = question_count_map.get(attempt.quiz_id, 0)
-        correct_answers = correct_answer_map.get(attempt.id, 0) if attempt.is_completed else None
+        correct_answers = attempt.correct_count if attempt.is_completed else None
         
         # Format time taken - handle None case
         time_taken_str = None
@@ -666,74 +898,30 @@ async def get_all_attempts(
     completed_only: bool = True,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=300),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
+    write_db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get all quiz attempts with enhanced details for teachers/admins"""
     now = datetime.now()
-    query = db.query(QuizAttempt)
-
-    # Student Results/Live Monitor should include only real student attempts.
-    # This excludes teacher/admin preview attempts from dashboard counts.
-    query = query.join(User, User.id == QuizAttempt.student_id)
-    query = query.filter(User.role == "student")
-
-    # Teachers can only see attempts for their own quizzes
-    if current_user.role == "teacher":
-        query = query.join(Quiz, Quiz.id == QuizAttempt.quiz_id)
-        query = query.filter(Quiz.creator_id == current_user.id)
-    
-    # Apply filters
-    if completed_only:
-        query = query.filter(QuizAttempt.is_completed == True)
-    
-    if quiz_id:
-        query = query.filter(QuizAttempt.quiz_id == quiz_id)
-    
-    if student_id:
-        query = query.filter(QuizAttempt.student_id == student_id)
+    query = _filter_student_attempts(
+        select(QuizAttempt, User.first_name, User.last_name, User.email),
+        current_user, quiz_id, student_id, completed_only,
+    )
     
-    attempts = query.order_by(QuizAttempt.submitted_at.desc(), QuizAttempt.started_at.desc()).offset(skip).limit(limit).all()
+    rows = (await db.execute(
+        query.order_by(QuizAttempt.submitted_at.desc(), QuizAttempt.started_at.desc()).offset(skip).limit(limit)
+    )).all()
 
-    if not attempts:
+    if not rows:
         return []
 
+    # Student name/email come from the same joined query.
+    attempts = [row[0] for row in rows]
+    student_map = {row[0].student_id: row for row in rows}
     quiz_ids = list({attempt.quiz_id for attempt in attempts})
-    student_ids = list({attempt.student_id for attempt in attempts})
-    attempt_ids = [attempt.id for attempt in attempts]
-
-    quizzes = db.query(Quiz).filter(Quiz.id.in_(quiz_ids)).all()
-    quiz_map = {quiz.id: quiz for quiz in quizzes}
-
-    students = db.query(User.id, User.first_name, User.last_name, User.email).filter(User.id.in_(student_ids)).all()
-    student_map = {student.id: student for student in students}
-
-    question_count_rows = db.query(
-        Question.quiz_id,
-        func.count(Question.id).label("total_questions"),
-    ).filter(
-        Question.quiz_id.in_(quiz_ids)
-    ).group_by(
-        Question.quiz_id
-    ).all()
-    question_count_map = {row.quiz_id: int(row.total_questions or 0) for row in question_count_rows}
-
-    answer_stats_rows = db.query(
-        Answer.attempt_id,
-        func.count(Answer.id).label("answered_count"),
-        func.sum(case((Answer.is_correct == True, 1), else_=0)).label("correct_answers"),
-    ).filter(
-        Answer.attempt_id.in_(attempt_ids)
-    ).group_by(
-        Answer.attempt_id
-    ).all()
-    answer_stats_map = {
-        row.attempt_id: {
-            "answered_count": int(row.answered_count or 0),
-            "correct_answers": int(row.correct_answers or 0),
-        }
-        for row in answer_stats_rows
-    }
+
+    quiz_map, question_count_map = await _load_quizzes_with_question_counts(db, quiz_ids)
     
     # Enhance each attempt with calculated fields
     result = []
@@ -751,13 +939,18 @@ async def get_all_attempts(
                     is_expired = True
 
             if is_expired:
-                _finalize_expired_attempt(db, attempt, quiz, now)
+                # Reads may come from a replica; finalizing is a write, so it goes to the primary.
+                primary_attempt = await write_db.get(QuizAttempt, attempt.id)
+                if primary_attempt is not None:
+                    if not primary_attempt.is_completed:
+                        await _finalize_expired_attempt(write_db, primary_attempt, quiz, now)
+                        await write_db.commit()
+                    attempt = primary_attempt
 
         student = student_map.get(attempt.student_id)
         total_questions = question_count_map.get(attempt.quiz_id, 0)
-        answer_stats = answer_stats_map.get(attempt.id, {"answered_count": 0, "correct_answers": 0})
-        correct_answers = answer_stats["correct_answers"]
-        answered_count = answer_stats["answered_count"]
+        correct_answers = attempt.correct_count
+        answered_count = attempt.answered_count
 
         remaining_seconds = None
         if not attempt.is_completed and quiz:
@@ -786,14 +979,6 @@ async def get_all_attempts(
             time_taken_str = f"{minutes}m {seconds}s"
         
         # Create response dict
-        sanity_flags = _build_attempt_sanity_flags(
-            quiz=quiz,
-            attempt=attempt,
-            total_questions=total_questions,
-            correct_answers=correct_answers,
-            answered_count=answered_count,
-        )
-
         attempt_dict = {
             "id": attempt.id,
             "quiz_id": attempt.quiz_id,
@@ -817,61 +1002,177 @@ async def get_all_attempts(
             "time_taken": time_taken_str,
             "remaining_seconds": remaining_seconds,
             "status": status_value,
-            "needs_review": len(sanity_flags) > 0,
-            "sanity_flags": sanity_flags,
+            "needs_review": attempt.sanity_flags != 0,
+            "sanity_flags": flag_names(attempt.sanity_flags),
         }
         result.append(attempt_dict)
     
     return result
 
+@router.get("/review-queue", dependencies=[Depends(require_role(["admin", "teacher"]))])
+async def get_review_queue(
+    quiz_id: int = None,
+    flag: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=300),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Completed attempts with sanity flags, newest first; ``flag`` narrows to one flag."""
+    if flag is not None and flag not in FLAG_BITS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown sanity flag: {flag}"
+        )
+    query = _filter_student_attempts(
+        select(QuizAttempt, User.first_name, User.last_name, User.email, Quiz.title),
+        current_user, quiz_id, None, completed_only=True,
+    ).join(Quiz, Quiz.id == QuizAttempt.quiz_id)
+    # Flags are stored at grading time; ix_quiz_attempts_sanity_flags covers the range
+    query = query.where(QuizAttempt.sanity_flags > 0)
+    if flag is not None:
+        query = query.where(QuizAttempt.sanity_flags.op("&")(FLAG_BITS[flag]) != 0)
+
+    rows = (await db.execute(
+        query.order_by(QuizAttempt.submitted_at.desc(), QuizAttempt.id.desc()).offset(skip).limit(limit)
+    )).all()
+
+    return [
+        {
+            "id": attempt.id,
+            "quiz_id": attempt.quiz_id,
+            "quiz_title": quiz_title,
+            "student_id": attempt.student_id,
+            "student_name": f"{first_name} {last_name}",
+            "student_email": email,
+            "score": float(attempt.score) if attempt.score is not None else None,
+            "total_marks": float(attempt.total_marks),
+            "percentage": float(attempt.percentage) if attempt.percentage is not None else None,
+            "correct_answers": attempt.correct_count,
+            "answered_count": attempt.answered_count,
+            "time_taken_minutes": float(attempt.time_taken_minutes) if attempt.time_taken_minutes is not None else None,
+            "submitted_at": attempt.submitted_at.isoformat() if attempt.submitted_at else None,
+            "sanity_flags": flag_names(attempt.sanity_flags),
+        }
+        for attempt, first_name, last_name, email, quiz_title in rows
+    ]
+
+@router.get("/export", dependencies=[Depends(require_role(["admin", "teacher"]))])
+async def export_attempts(
+    format: str = Query("csv", pattern="^(csv|xlsx|ndjson)$"),
+    quiz_id: int = None,
+    student_id: int = None,
+    completed_only: bool = True,
+    session_factory=Depends(get_async_read_session_factory),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Stream Student Results as CSV, XLSX or NDJSON (same filters as all-attempts, no row cap)
+    Rows come from a server-side cursor; answer statistics are the attempt's counters.
+    """
+    question_count = (
+        select(func.count(Question.id))
+        .where(Question.quiz_id == QuizAttempt.quiz_id)
+        .correlate(QuizAttempt)
+        .scalar_subquery()
+    )
+    statement = _filter_student_attempts(
+        select(
+            QuizAttempt.id, QuizAttempt.quiz_id, Quiz.title, QuizAttempt.student_id,
+            User.first_name, User.last_name, User.email, User.student_id.label("roll_number"),
+            QuizAttempt.score, QuizAttempt.total_marks, QuizAttempt.percentage,
+            QuizAttempt.correct_count.label("correct_answers"), QuizAttempt.answered_count,
+            question_count.label("total_questions"),
+            QuizAttempt.time_taken_minutes, QuizAttempt.started_at, QuizAttempt.submitted_at,
+            QuizAttempt.is_completed, Quiz.is_live_session, Quiz.live_end_time, Quiz.duration_minutes,
+        ).select_from(QuizAttempt).join(Quiz, Quiz.id == QuizAttempt.quiz_id),
+        current_user, quiz_id, student_id, completed_only,
+    ).order_by(QuizAttempt.submitted_at.desc(), QuizAttempt.started_at.desc())
+
+    async def export_rows():
+        now = datetime.now()
+        async with session_factory() as session:
+            result = await session.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for row in result:
+                if row.is_completed:
+                    status_value = "completed"
+                elif row.is_live_session and row.live_end_time:
+                    status_value = "expired" if now > row.live_end_time else "in_progress"
+                elif row.duration_minutes and row.started_at:
+                    deadline = row.started_at + timedelta(minutes=row.duration_minutes)
+                    status_value = "expired" if now > deadline else "in_progress"
+                else:
+                    status_value = "in_progress"
+
+                yield [
+                    row.id, row.quiz_id, row.title, row.student_id,
+                    f"{row.first_name} {row.last_name}", row.email, row.roll_number,
+                    row.score, row.total_marks, row.percentage,
+                    int(row.correct_answers or 0), int(row.answered_count or 0), int(row.total_questions or 0),
+                    row.time_taken_minutes, row.started_at, row.submitted_at, status_value,
+                ]
+
+    filename = f"student-results-{datetime.now().strftime('%Y-%m-%d')}.{format}"
+    return StreamingResponse(
+        ENCODERS[format](EXPORT_COLUMNS, export_rows()),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 @router.get("/quiz/{quiz_id}/attempts", response_model=List[QuizAttemptResponse], dependencies=[Depends(require_role(["admin", "teacher"]))])
 async def get_quiz_attempts(
     quiz_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     # Teachers can only view attempts for quizzes they created
     if current_user.role == "teacher":
-        quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+        quiz = await db.get(Quiz, quiz_id)
         if not quiz or quiz.creator_id != current_user.id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized to view attempts for this quiz"
             )
 
-    attempts = db.query(QuizAttempt).filter(QuizAttempt.quiz_id == quiz_id).all()
+    attempts = (await db.scalars(
+        select(QuizAttempt).where(QuizAttempt.quiz_id == quiz_id, QuizAttempt.is_started)
+    )).all()
     return attempts
 
 @router.get("/stats/dashboard", response_model=DashboardStats, dependencies=[Depends(require_role(["admin"]))])
 async def get_dashboard_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     # Total quizzes
-    total_quizzes = db.query(Quiz).count()
+    total_quizzes = await db.scalar(select(func.count(Quiz.id)))
     
     # Students stats
-    total_students = db.query(User).filter(User.role == "student").count()
+    total_students = await db.scalar(select(func.count(User.id)).where(User.role == "student"))
     
     # Active students (students who attempted a quiz in last 30 days)
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    active_students = db.query(func.count(func.distinct(QuizAttempt.student_id)))\
-        .filter(QuizAttempt.started_at >= thirty_days_ago).scalar() or 0
+    active_students = await db.scalar(
+        select(func.count(func.distinct(QuizAttempt.student_id)))
+        .where(QuizAttempt.started_at >= thirty_days_ago)
+    ) or 0
     
     # Yesterday's assessments
     yesterday_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
     yesterday_end = yesterday_start + timedelta(days=1)
-    yesterday_assessments = db.query(QuizAttempt)\
-        .filter(QuizAttempt.started_at >= yesterday_start, QuizAttempt.started_at < yesterday_end)\
-        .count()
+    yesterday_assessments = await db.scalar(
+        select(func.count(QuizAttempt.id))
+        .where(QuizAttempt.started_at >= yesterday_start, QuizAttempt.started_at < yesterday_end)
+    )
     
-    yesterday_attendance = db.query(func.count(func.distinct(QuizAttempt.student_id)))\
-        .filter(QuizAttempt.started_at >= yesterday_start, QuizAttempt.started_at < yesterday_end)\
-        .scalar() or 0
+    yesterday_attendance = await db.scalar(
+        select(func.count(func.distinct(QuizAttempt.student_id)))
+        .where(QuizAttempt.started_at >= yesterday_start, QuizAttempt.started_at < yesterday_end)
+    ) or 0
     
     # Active teachers today (teachers who created quiz or whose quiz was attempted today)
     today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    total_teachers = db.query(User).filter(User.role == "teacher").count()
+    total_teachers = await db.scalar(select(func.count(User.id)).where(User.role == "teacher"))
     active_teachers_today = 0  # Placeholder
     
     return {
@@ -887,32 +1188,30 @@ async def get_dashboard_stats(
 @router.get("/stats/activity", response_model=List[ActivityItem], dependencies=[Depends(require_role(["admin"]))])
 async def get_recent_activity(
     limit: int = 10,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    # Get recent quiz attempts
-    recent_attempts = db.query(QuizAttempt).order_by(QuizAttempt.started_at.desc()).limit(limit).all()
+    # Get recent quiz attempts with student and quiz in one query
+    recent_attempts = (await db.execute(
+        select(
+            QuizAttempt, User.first_name, User.last_name, User.role, Quiz.title
+        ).join(
+            User, User.id == QuizAttempt.student_id
+        ).join(
+            Quiz, Quiz.id == QuizAttempt.quiz_id
+        ).where(QuizAttempt.is_started).order_by(QuizAttempt.started_at.desc()).limit(limit)
+    )).all()
     
     activities = []
-    for attempt in recent_attempts:
-        user = db.query(User).filter(User.id == attempt.student_id).first()
-        quiz = db.query(Quiz).filter(Quiz.id == attempt.quiz_id).first()
-        
-        if user and quiz:
-            time_diff = datetime.now() - attempt.started_at
-            if time_diff.seconds < 3600:
-                time_str = f"{time_diff.seconds // 60} mins ago"
-            elif time_diff.seconds < 86400:
-                time_str = f"{time_diff.seconds // 3600} hours ago"
-            else:
-                time_str = f"{time_diff.days} days ago"
-            
-            activities.append({
-                "user": f"{user.first_name} {user.last_name}",
-                "action": f"Attempted quiz: {quiz.title}",
-                "time": time_str,
-                "status": "success" if attempt.submitted_at else "in_progress"
-            })
+    for attempt, first_name, last_name, role, quiz_title in recent_attempts:
+        activities.append({
+            "id": attempt.id,
+            "user_name": f"{first_name} {last_name}",
+            "user_role": role,
+            "action": f"Attempted quiz: {quiz_title}",
+            "timestamp": attempt.started_at,
+            "details": "Submitted" if attempt.submitted_at else "In progress"
+        })
     
     return activities
 
@@ -920,11 +1219,11 @@ async def get_recent_activity(
 @router.get("/{attempt_id}", response_model=QuizAttemptResponse)
 async def get_attempt(
     attempt_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get a specific quiz attempt by ID with detailed results"""
-    attempt = db.query(QuizAttempt).filter(QuizAttempt.id == attempt_id).first()
+    attempt = await _get_attempt(db, attempt_id)
 
     if not attempt:
         raise HTTPException(
@@ -940,12 +1239,9 @@ async def get_attempt(
         )
 
     # Get quiz and calculate additional fields
-    quiz = db.query(Quiz).filter(Quiz.id == attempt.quiz_id).first()
-    total_questions = db.query(Question).filter(Question.quiz_id == attempt.quiz_id).count()
-    correct_answers = db.query(Answer).filter(
-        Answer.attempt_id == attempt.id,
-        Answer.is_correct == True
-    ).count()
+    quiz = await db.get(Quiz, attempt.quiz_id)
+    total_questions = await db.scalar(select(func.count(Question.id)).where(Question.quiz_id == attempt.quiz_id))
+    correct_answers = attempt.correct_count
 
     # Format time taken
     time_taken_str = None
@@ -980,14 +1276,14 @@ async def get_attempt(
 @router.get("/{attempt_id}/review")
 async def get_attempt_review(
     attempt_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_your_writes_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get per-question review for a submitted attempt.
 
     Returns question text, student answer, correct answer, correctness and marks.
     """
-    attempt = db.query(QuizAttempt).filter(QuizAttempt.id == attempt_id).first()
+    attempt = await _get_attempt(db, attempt_id)
 
     if not attempt:
         raise HTTPException(
@@ -1008,15 +1304,15 @@ async def get_attempt_review(
             detail="Attempt not submitted yet"
         )
 
-    quiz = db.query(Quiz).filter(Quiz.id == attempt.quiz_id).first()
+    quiz = await db.get(Quiz, attempt.quiz_id)
     if not quiz:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Quiz not found"
         )
 
-    questions = db.query(Question).filter(Question.quiz_id == quiz.id).order_by(Question.order.asc()).all()
-    answers = db.query(Answer).filter(Answer.attempt_id == attempt.id).all()
+    questions = (await db.scalars(select(Question).where(Question.quiz_id == quiz.id).order_by(Question.order.asc()))).all()
+    answers = await _attempt_answers(db, attempt)
     answer_map = {ans.question_id: ans for ans in answers}
 
     items = []
@@ -1060,7 +1356,7 @@ async def get_attempt_review(
 @router.get("/review/{attempt_id}")
 async def get_attempt_review_alias(
     attempt_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_your_writes_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Alias route for attempt review download to avoid path conflicts."""
@@ -1,38 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta, datetime
-from app.db.database import get_db
+from app.db.database import get_async_db
 from app.models.models import User
 from app.models.models import RevokedToken, UserTokenBlock
 from app.schemas.schemas import Token, LoginRequest, UserResponse, ChangePasswordRequest
-from app.core.security import verify_password, create_access_token, get_password_hash
+from app.core.security import create_access_token
 from app.core.config import settings
 from app.core.deps import get_current_active_user, oauth2_scheme
-from app.core.rate_limit import check_rate_limit
+from app.core.activity import activity_tracker
+from app.core.hashing import PasswordPoolBusy, password_pool
 
 router = APIRouter()
 
+
+async def _run_bcrypt(method, *args):
+    """Await a password_pool call; a full queue becomes 503 instead of a stalled event loop."""
+    try:
+        return await method(*args)
+    except PasswordPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins in progress. Please try again in a moment.",
+            headers={"Retry-After": "1"},
+        )
+
+
+def _record_login(user: User) -> None:
+    # Shown in the response now, written to the database by the next activity flush
+    user.last_active = datetime.utcnow()
+    activity_tracker.record(user.id, user.last_active)
+
+
 @router.post("/login", response_model=Token)
 async def login(
-    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     OAuth2 compatible login with form data (for Swagger UI)
     """
-    client_ip = request.client.host if request.client else "unknown"
-    rl = check_rate_limit(f"login:{client_ip}", limit=10, window_seconds=300)
-    if not rl.allowed:
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="Too many login attempts. Please try again later.",
-            headers={"Retry-After": str(rl.retry_after_seconds or 60)},
-        )
-
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await db.scalar(select(User).where(User.email == form_data.username))
+    if not user or not await _run_bcrypt(password_pool.verify_password, form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -45,9 +56,7 @@ async def login(
             detail="Inactive user"
         )
     
-    # Update last active
-    user.last_active = datetime.utcnow()
-    db.commit()
+    _record_login(user)
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -62,24 +71,14 @@ async def login(
 
 @router.post("/login-json", response_model=Token)
 async def login_json(
-    request: Request,
     login_data: LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     JSON-based login (for frontend)
     """
-    client_ip = request.client.host if request.client else "unknown"
-    rl = check_rate_limit(f"login:{client_ip}", limit=10, window_seconds=300)
-    if not rl.allowed:
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="Too many login attempts. Please try again later.",
-            headers={"Retry-After": str(rl.retry_after_seconds or 60)},
-        )
-
-    user = db.query(User).filter(User.email == login_data.username).first()
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    user = await db.scalar(select(User).where(User.email == login_data.username))
+    if not user or not await _run_bcrypt(password_pool.verify_password, login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -91,9 +90,7 @@ async def login_json(
             detail="Inactive user"
         )
     
-    # Update last active
-    user.last_active = datetime.utcnow()
-    db.commit()
+    _record_login(user)
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -119,27 +116,27 @@ async def get_current_user(
 @router.post("/change-password")
 async def change_password(
     payload: ChangePasswordRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Allow the current user to change their password."""
-    if not verify_password(payload.current_password, current_user.hashed_password):
+    if not await _run_bcrypt(password_pool.verify_password, payload.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect",
         )
 
-    current_user.hashed_password = get_password_hash(payload.new_password)
+    current_user.hashed_password = await _run_bcrypt(password_pool.get_password_hash, payload.new_password)
     current_user.last_active = datetime.utcnow()
-    db.commit()
+    await db.commit()
 
     # Invalidate all previous sessions for this user and mint a new token
-    block = db.query(UserTokenBlock).filter(UserTokenBlock.user_id == current_user.id).first()
+    block = await db.scalar(select(UserTokenBlock).where(UserTokenBlock.user_id == current_user.id))
     if block:
         block.revoked_before = datetime.utcnow()
     else:
         db.add(UserTokenBlock(user_id=current_user.id, revoked_before=datetime.utcnow()))
-    db.commit()
+    await db.commit()
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     new_token = create_access_token(
@@ -154,7 +151,7 @@ async def change_password(
 @router.post("/logout")
 async def logout(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Revoke the current access token (single-session logout)."""
@@ -166,7 +163,7 @@ async def logout(
 
     if jti:
         # best-effort insert; ignore duplicates
-        exists = db.query(RevokedToken).filter(RevokedToken.jti == jti).first()
+        exists = await db.scalar(select(RevokedToken).where(RevokedToken.jti == jti))
         if not exists:
             expires_at = None
             try:
@@ -177,23 +174,23 @@ async def logout(
                 expires_at = None
 
             db.add(RevokedToken(jti=jti, subject=current_user.email, expires_at=expires_at))
-            db.commit()
+            await db.commit()
 
     return {"success": True}
 
 
 @router.post("/logout-all")
 async def logout_all(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """Invalidate all tokens issued before now for this user."""
     now = datetime.utcnow()
-    block = db.query(UserTokenBlock).filter(UserTokenBlock.user_id == current_user.id).first()
+    block = await db.scalar(select(UserTokenBlock).where(UserTokenBlock.user_id == current_user.id))
     if block:
         block.revoked_before = now
     else:
         db.add(UserTokenBlock(user_id=current_user.id, revoked_before=now))
-    db.commit()
+    await db.commit()
 
     return {"success": True}
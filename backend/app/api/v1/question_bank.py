@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.core.deps import get_db, get_current_user, require_role
+from app.core.deps import get_db, get_current_user_sync, require_role_sync
 from app.models.models import QuestionBank, User, Subject
 from app.schemas.schemas import (
     QuestionBankCreate, QuestionBankUpdate, QuestionBankResponse, QuestionFilter
@@ -13,7 +13,7 @@ router = APIRouter()
 def create_question(
     question: QuestionBankCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(["admin", "teacher"]))
+    current_user: User = Depends(require_role_sync(["admin", "teacher"]))
 ):
     """
     Add a question to the question bank (Admin and Teacher only)
@@ -46,7 +46,7 @@ def get_questions(
     question_type: Optional[str] = Query(None, regex="^(mcq|true_false|short_answer)$"),
     active_only: bool = True,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_sync)
 ):
     """
     Get questions from question bank with filtering
@@ -76,7 +76,7 @@ def get_questions(
 def get_question(
     question_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_sync)
 ):
     """
     Get a specific question from the bank
@@ -95,7 +95,7 @@ def update_question(
     question_id: int,
     question_update: QuestionBankUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(["admin", "teacher"]))
+    current_user: User = Depends(require_role_sync(["admin", "teacher"]))
 ):
     """
     Update a question in the bank (Admin and Teacher only)
@@ -131,7 +131,7 @@ def update_question(
 def delete_question(
     question_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(["admin", "teacher"]))
+    current_user: User = Depends(require_role_sync(["admin", "teacher"]))
 ):
     """
     Delete a question from the bank (Admin and Teacher only)
@@ -160,7 +160,7 @@ def delete_question(
 def get_topics_by_subject(
     subject_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_sync)
 ):
     """
     Get all unique topics for a subject
@@ -180,7 +180,7 @@ def get_topics_by_subject(
 def get_subject_question_statistics(
     subject_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_sync)
 ):
     """
     Get statistics about questions for a subject
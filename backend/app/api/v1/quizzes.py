@@ -1,25 +1,120 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status, UploadFile, File
+from sqlalchemy import func, select, delete, insert, update, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
 from datetime import datetime, timedelta, timezone
+from collections import Counter
+from pydantic import ValidationError
+import csv
+import io
 import math
-from app.db.database import get_db
-from app.models.models import User, Quiz, Question, QuestionBank, Subject
+from app.db.database import get_async_db
+from app.models.models import (
+    User, Quiz, Question, QuestionBank, QuestionStat, RegradeJob, Subject, QuizAttempt, QuizAssignment, Answer,
+    AttemptSubmission,
+)
 from app.schemas.schemas import (
-    QuizCreate, QuizResponse, QuizDetailResponse, QuizUpdate, QuizWithAnswers
+    QuizCreate, QuizResponse, QuizDetailResponse, QuizUpdate, QuizWithAnswers, QuestionCreate, QuizQuestionsPatch,
+    RegradeRequest
 )
 from app.core.deps import get_current_active_user, require_role
+from app.core.item_stats import OPTION_COLUMNS, insert_missing_stats
+from app.core.live_sessions import open_session
+from app.core.psychometrics import analyze_quiz
+from app.core.regrade import queue_regrade, regrade_runner, score_changes
+from app.core.sanity_flags import reflag_quiz_attempts
 
 router = APIRouter()
 
 # Allow a small clock-skew tolerance so students are not blocked at countdown zero.
 START_TIME_TOLERANCE_SECONDS = 90
 
+# Bulk CSV import (same columns as sample_quiz_template.csv)
+QUIZ_IMPORT_MAX_ROWS = 5000
+QUIZ_IMPORT_BATCH_SIZE = 50  # quizzes written per transaction
+QUIZ_IMPORT_REQUIRED_COLUMNS = ["quiz_title", "question_text", "question_type", "correct_answer"]
+QUESTION_TYPE_ALIASES = {
+    "multiple_choice": "mcq",
+    "mcq": "mcq",
+    "true_false": "true_false",
+    "short_answer": "short_answer",
+}
+
+
+def _csv_value(row: dict, key: str) -> str:
+    return (row.get(key) or "").strip()
+
+
+def _parse_csv_number(row: dict, key: str, cast, errors: list, default=None):
+    raw = _csv_value(row, key)
+    if not raw:
+        return default
+    try:
+        return cast(raw)
+    except ValueError:
+        errors.append(f"{key} must be a number")
+        return default
+
+
+def _parse_quiz_import_row(row: dict):
+    """Validate one CSV row and split it into quiz-level fields and a question."""
+    errors = [f"{column} is required" for column in QUIZ_IMPORT_REQUIRED_COLUMNS if not _csv_value(row, column)]
+
+    quiz_fields = {
+        "title": _csv_value(row, "quiz_title"),
+        "description": _csv_value(row, "quiz_description") or None,
+        "subject_id": _parse_csv_number(row, "subject_id", int, errors),
+        "duration_minutes": _parse_csv_number(row, "duration_minutes", int, errors, default=30),
+        "marks_per_correct": _parse_csv_number(row, "marks_per_correct", float, errors, default=1.0),
+        "negative_marking": _parse_csv_number(row, "negative_marking", float, errors, default=0.0),
+        "department": _csv_value(row, "department") or None,
+        "class_year": _csv_value(row, "class_year") or _csv_value(row, "year") or None,
+    }
+    if quiz_fields["negative_marking"] is not None and quiz_fields["negative_marking"] < 0:
+        errors.append("negative_marking cannot be negative")
+
+    raw_type = _csv_value(row, "question_type").lower()
+    question_type = QUESTION_TYPE_ALIASES.get(raw_type)
+    if raw_type and question_type is None:
+        errors.append("question_type must be multiple_choice (or mcq), true_false, or short_answer")
+
+    correct_answer = _csv_value(row, "correct_answer")
+    if question_type == "mcq" and not (_csv_value(row, "option_a") and _csv_value(row, "option_b")):
+        errors.append("Multiple choice questions must have at least options A and B")
+    if question_type == "true_false" and correct_answer and correct_answer.lower() not in {"true", "false"}:
+        errors.append('True/False questions must have correct answer as "true" or "false"')
+
+    marks = _parse_csv_number(row, "marks", float, errors, default=quiz_fields["marks_per_correct"])
+    question_bank_id = _parse_csv_number(row, "question_bank_id", int, errors)
+
+    if errors:
+        return quiz_fields, None, errors
+
+    is_mcq = question_type == "mcq"
+    try:
+        question = QuestionCreate(
+            question_text=_csv_value(row, "question_text"),
+            question_type=question_type,
+            option_a=_csv_value(row, "option_a") or None if is_mcq else None,
+            option_b=_csv_value(row, "option_b") or None if is_mcq else None,
+            option_c=_csv_value(row, "option_c") or None if is_mcq else None,
+            option_d=_csv_value(row, "option_d") or None if is_mcq else None,
+            correct_answer=correct_answer,
+            marks=marks,
+            question_bank_id=question_bank_id,
+        )
+    except ValidationError as error:
+        return quiz_fields, None, [
+            f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+        ]
+    return quiz_fields, question, []
+
 @router.post("/", response_model=QuizResponse, dependencies=[Depends(require_role(["admin", "teacher"]))])
 async def create_quiz(
     quiz_data: QuizCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -33,7 +128,7 @@ async def create_quiz(
     """
     # Verify subject if provided (optional - set to None if not found)
     if quiz_data.subject_id:
-        subject = db.query(Subject).filter(Subject.id == quiz_data.subject_id).first()
+        subject = await db.get(Subject, quiz_data.subject_id)
         if not subject:
             # Don't fail, just set subject_id to None
             print(f"Warning: Subject {quiz_data.subject_id} not found, creating quiz without subject")
@@ -74,15 +169,13 @@ async def create_quiz(
         )
 
         db.add(db_quiz)
-        db.flush()  # Get db_quiz.id without committing the transaction
+        await db.flush()  # Get db_quiz.id without committing the transaction
 
         # Create questions
         for idx, question_data in enumerate(quiz_data.questions):
             # If question is from bank, increment usage count
             if question_data.question_bank_id:
-                bank_question = db.query(QuestionBank).filter(
-                    QuestionBank.id == question_data.question_bank_id
-                ).first()
+                bank_question = await db.get(QuestionBank, question_data.question_bank_id)
                 if not bank_question:
                     raise HTTPException(
                         status_code=status.HTTP_400_BAD_REQUEST,
@@ -105,20 +198,21 @@ async def create_quiz(
             )
             db.add(db_question)
 
-        db.commit()
-        db.refresh(db_quiz)
+        await db.flush()
+        await db.execute(insert_missing_stats(Question.quiz_id == db_quiz.id))
+        await db.commit()
+        await db.refresh(db_quiz)
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except SQLAlchemyError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create quiz"
         )
     
     # Return formatted quiz response with attempts count
-    from app.models.models import QuizAttempt
     quiz_dict = {
         "id": db_quiz.id,
         "title": db_quiz.title,
@@ -139,12 +233,200 @@ async def create_quiz(
         "is_active": db_quiz.is_active,
         "created_at": db_quiz.created_at,
         "updated_at": db_quiz.updated_at,
-        "total_questions": len(db_quiz.questions) if db_quiz.questions else 0,
-        "attempts": db.query(QuizAttempt).filter(QuizAttempt.quiz_id == db_quiz.id).count()
+        "total_questions": len(quiz_data.questions),
+        "attempts": 0
     }
     
     return quiz_dict
 
+@router.post("/bulk-import", dependencies=[Depends(require_role(["admin", "teacher"]))])
+async def bulk_import_quizzes(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    skip_invalid: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Import quizzes from a CSV file (Admin and Teacher only)
+    - One row per question, grouped into quizzes by quiz_title
+    - Every row is validated before anything is written
+    - dry_run: only return the validation report
+    - skip_invalid: import the valid quizzes even if other quizzes have errors
+    Quizzes are created inactive, like POST /quizzes/.
+    """
+    if not file.filename.lower().endswith(".csv"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only CSV files are supported"
+        )
+
+    # Stream rows from the spooled upload instead of reading the whole file into memory
+    text_stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text_stream)
+        missing_columns = [column for column in QUIZ_IMPORT_REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing_columns:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Missing required columns: {', '.join(missing_columns)}"
+            )
+
+        groups = {}
+        errors = []
+        warnings = []
+        total_rows = 0
+        for row_num, row in enumerate(reader, start=2):  # start=2 because row 1 is header
+            total_rows += 1
+            if total_rows > QUIZ_IMPORT_MAX_ROWS:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Too many rows (max {QUIZ_IMPORT_MAX_ROWS})"
+                )
+
+            quiz_fields, question, row_errors = _parse_quiz_import_row(row)
+            quiz_key = quiz_fields["title"].lower()
+            if quiz_key:
+                group = groups.setdefault(quiz_key, {"fields": quiz_fields, "questions": [], "rows": [], "invalid": False})
+                group["rows"].append(row_num)
+                if question is not None:
+                    group["questions"].append((row_num, question))
+                if row_errors:
+                    group["invalid"] = True
+            for message in row_errors:
+                errors.append({"row": row_num, "quiz_title": quiz_fields["title"] or None, "error": message})
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be UTF-8 encoded"
+        )
+    finally:
+        text_stream.detach()
+
+    # Resolve question bank and subject references with one IN query each
+    bank_ids = {
+        question.question_bank_id
+        for group in groups.values()
+        for _, question in group["questions"]
+        if question.question_bank_id
+    }
+    known_bank_ids = set((await db.scalars(
+        select(QuestionBank.id).where(QuestionBank.id.in_(bank_ids))
+    )).all()) if bank_ids else set()
+
+    subject_ids = {group["fields"]["subject_id"] for group in groups.values() if group["fields"]["subject_id"]}
+    known_subject_ids = set((await db.scalars(
+        select(Subject.id).where(Subject.id.in_(subject_ids))
+    )).all()) if subject_ids else set()
+
+    for group in groups.values():
+        for row_num, question in group["questions"]:
+            if question.question_bank_id and question.question_bank_id not in known_bank_ids:
+                group["invalid"] = True
+                errors.append({
+                    "row": row_num,
+                    "quiz_title": group["fields"]["title"],
+                    "error": f"Question bank item {question.question_bank_id} not found"
+                })
+
+        subject_id = group["fields"]["subject_id"]
+        if subject_id and subject_id not in known_subject_ids:
+            # Same as create_quiz: don't fail, import without a subject
+            group["fields"]["subject_id"] = None
+            warnings.append({
+                "row": group["rows"][0],
+                "quiz_title": group["fields"]["title"],
+                "warning": f"Subject {subject_id} not found, importing quiz without subject"
+            })
+
+    errors.sort(key=lambda item: item["row"])
+    valid_groups = [group for group in groups.values() if not group["invalid"] and group["questions"]]
+    report = {
+        "dry_run": dry_run,
+        "total_rows": total_rows,
+        "quizzes_found": len(groups),
+        "valid_quizzes": len(valid_groups),
+        "created": [],
+        "skipped": [group["fields"]["title"] for group in groups.values() if group["invalid"]],
+        "errors": errors,
+        "warnings": warnings,
+    }
+
+    if dry_run or not valid_groups or (errors and not skip_invalid):
+        return report
+
+    for start in range(0, len(valid_groups), QUIZ_IMPORT_BATCH_SIZE):
+        batch = valid_groups[start:start + QUIZ_IMPORT_BATCH_SIZE]
+        try:
+            quiz_rows = [
+                {
+                    **group["fields"],
+                    "creator_id": current_user.id,
+                    "grace_period_minutes": 5,
+                    "is_live_session": False,
+                    "is_active": False,
+                    "total_marks": sum(question.marks for _, question in group["questions"]),
+                }
+                for group in batch
+            ]
+            if db.get_bind().dialect.insert_executemany_returning:
+                # One multi-row INSERT ... RETURNING; titles are unique within a batch
+                id_by_title = {
+                    title: quiz_id
+                    for quiz_id, title in (await db.execute(insert(Quiz).returning(Quiz.id, Quiz.title), quiz_rows)).all()
+                }
+                quiz_ids = [id_by_title[row["title"]] for row in quiz_rows]
+            else:
+                # No RETURNING (e.g. MySQL): let the ORM fetch ids per row
+                quizzes = [Quiz(**row) for row in quiz_rows]
+                db.add_all(quizzes)
+                await db.flush()
+                quiz_ids = [quiz.id for quiz in quizzes]
+
+            question_rows = [
+                {
+                    **question.model_dump(exclude={"order"}),
+                    "quiz_id": quiz_id,
+                    "order": idx,
+                }
+                for quiz_id, group in zip(quiz_ids, batch)
+                for idx, (_, question) in enumerate(group["questions"])
+            ]
+            await db.execute(insert(Question), question_rows)
+            await db.execute(insert_missing_stats(Question.quiz_id.in_(quiz_ids)))
+
+            bank_usage = Counter(
+                question.question_bank_id
+                for group in batch
+                for _, question in group["questions"]
+                if question.question_bank_id
+            )
+            if bank_usage:
+                await db.execute(
+                    update(QuestionBank)
+                    .where(QuestionBank.id.in_(bank_usage))
+                    .values(times_used=QuestionBank.times_used + case(bank_usage, value=QuestionBank.id, else_=0))
+                    .execution_options(synchronize_session=False)
+                )
+
+            await db.commit()
+        except SQLAlchemyError:
+            await db.rollback()
+            for group in valid_groups[start:]:
+                report["errors"].append({
+                    "row": group["rows"][0],
+                    "quiz_title": group["fields"]["title"],
+                    "error": "Failed to save quiz"
+                })
+            break
+
+        report["created"].extend(
+            {"id": quiz_id, "title": group["fields"]["title"], "total_questions": len(group["questions"])}
+            for quiz_id, group in zip(quiz_ids, batch)
+        )
+
+    return report
+
 @router.get("/", response_model=List[QuizResponse])
 async def get_all_quizzes(
     skip: int = 0,
@@ -153,7 +435,7 @@ async def get_all_quizzes(
     subject_id: Optional[int] = None,
     department: Optional[str] = None,
     class_year: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -162,41 +444,52 @@ async def get_all_quizzes(
     - Teachers: Only their created quizzes
     - Admin: All quizzes
     """
-    query = db.query(Quiz)
+    query = select(Quiz)
     
     # Role-based filtering
     if current_user.role == "student":
-        from app.models.models import QuizAssignment
-        
         # Only show quizzes that are:
         # 1. Active AND
         # 2. Assigned to this student (via QuizAssignment table)
-        query = query.filter(Quiz.is_active == True)
+        query = query.where(Quiz.is_active == True)
         query = query.join(QuizAssignment, Quiz.id == QuizAssignment.quiz_id)
-        query = query.filter(QuizAssignment.student_id == current_user.id)
+        query = query.where(QuizAssignment.student_id == current_user.id)
     elif current_user.role == "teacher":
-        query = query.filter(Quiz.creator_id == current_user.id)
+        query = query.where(Quiz.creator_id == current_user.id)
     
     # Additional filters
     if is_active is not None:
-        query = query.filter(Quiz.is_active == is_active)
+        query = query.where(Quiz.is_active == is_active)
     
     if subject_id:
-        query = query.filter(Quiz.subject_id == subject_id)
+        query = query.where(Quiz.subject_id == subject_id)
     
     if department:
-        query = query.filter(Quiz.department == department)
+        query = query.where(Quiz.department == department)
     
     if class_year:
-        query = query.filter(Quiz.class_year == class_year)
+        query = query.where(Quiz.class_year == class_year)
     
-    quizzes = query.order_by(Quiz.created_at.desc()).offset(skip).limit(limit).all()
+    quizzes = (await db.scalars(query.order_by(Quiz.created_at.desc()).offset(skip).limit(limit))).all()
+    if not quizzes:
+        return []
+
+    # Count questions and attempts for the whole page with one grouped query each
+    quiz_ids = [quiz.id for quiz in quizzes]
+    question_counts = dict((await db.execute(
+        select(Question.quiz_id, func.count(Question.id))
+        .where(Question.quiz_id.in_(quiz_ids))
+        .group_by(Question.quiz_id)
+    )).all())
+    attempt_counts = dict((await db.execute(
+        select(QuizAttempt.quiz_id, func.count(QuizAttempt.id))
+        .where(QuizAttempt.quiz_id.in_(quiz_ids), QuizAttempt.is_started)
+        .group_by(QuizAttempt.quiz_id)
+    )).all())
     
     # Add total_questions and attempts count to each quiz
     result = []
     for quiz in quizzes:
-        from app.models.models import QuizAttempt
-        
         quiz_dict = {
             "id": quiz.id,
             "title": quiz.title,
@@ -217,8 +510,8 @@ async def get_all_quizzes(
             "is_active": quiz.is_active,
             "created_at": quiz.created_at,
             "updated_at": quiz.updated_at,
-            "total_questions": db.query(Question).filter(Question.quiz_id == quiz.id).count(),
-            "attempts": db.query(QuizAttempt).filter(QuizAttempt.quiz_id == quiz.id).count()
+            "total_questions": question_counts.get(quiz.id, 0),
+            "attempts": attempt_counts.get(quiz.id, 0)
         }
         result.append(quiz_dict)
     
@@ -228,14 +521,14 @@ async def get_all_quizzes(
 async def get_quiz(
     quiz_id: int,
     include_answers: bool = False,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Get quiz details with questions
     - include_answers: For teachers/admin to see correct answers when editing
     """
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    quiz = await db.scalar(select(Quiz).options(selectinload(Quiz.questions)).where(Quiz.id == quiz_id))
     if not quiz:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -252,11 +545,10 @@ async def get_quiz(
     # Check permissions
     if current_user.role == "student":
         # Students can only access quizzes assigned to them
-        from app.models.models import QuizAssignment
-        assignment = db.query(QuizAssignment).filter(
+        assignment = await db.scalar(select(QuizAssignment).where(
             QuizAssignment.quiz_id == quiz.id,
             QuizAssignment.student_id == current_user.id,
-        ).first()
+        ))
         if not assignment:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -272,12 +564,12 @@ async def get_quiz(
         # For live sessions, enforce strict timing
         if quiz.is_live_session and quiz.live_start_time:
             now = datetime.now()
-            from app.models.models import QuizAttempt
-            active_attempt = db.query(QuizAttempt).filter(
+            active_attempt = await db.scalar(select(QuizAttempt).where(
                 QuizAttempt.quiz_id == quiz.id,
                 QuizAttempt.student_id == current_user.id,
-                QuizAttempt.is_completed == False
-            ).first()
+                QuizAttempt.is_completed == False,
+                QuizAttempt.is_started,
+            ))
             
             # Cannot access before start time
             if now < quiz.live_start_time:
@@ -349,6 +641,7 @@ async def get_quiz(
             "total_marks": quiz.total_marks,
             "marks_per_correct": quiz.marks_per_correct,
             "negative_marking": quiz.negative_marking,
+            "content_version": quiz.content_version,
             "is_active": quiz.is_active,
             "created_at": quiz.created_at,
             "updated_at": quiz.updated_at,
@@ -397,16 +690,14 @@ async def get_quiz(
 @router.get("/{quiz_id}/eligibility")
 async def check_quiz_eligibility(
     quiz_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Check if student can take the quiz
     Teachers and admins can preview quizzes anytime (bypass all restrictions)
     """
-    from app.models.models import QuizAttempt
-    
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    quiz = await db.get(Quiz, quiz_id)
     if not quiz:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -418,11 +709,10 @@ async def check_quiz_eligibility(
 
     # Students can only check eligibility for quizzes assigned to them
     if current_user.role == "student":
-        from app.models.models import QuizAssignment
-        assignment = db.query(QuizAssignment).filter(
+        assignment = await db.scalar(select(QuizAssignment).where(
             QuizAssignment.quiz_id == quiz.id,
             QuizAssignment.student_id == current_user.id,
-        ).first()
+        ))
         if not assignment:
             return {
                 "eligible": False,
@@ -437,11 +727,11 @@ async def check_quiz_eligibility(
 
     # Students cannot reattempt submitted quizzes
     if current_user.role == "student" and not is_teacher_or_admin:
-        completed_attempt = db.query(QuizAttempt).filter(
+        completed_attempt = await db.scalar(select(QuizAttempt).where(
             QuizAttempt.quiz_id == quiz_id,
             QuizAttempt.student_id == current_user.id,
             QuizAttempt.is_completed == True
-        ).first()
+        ))
         if completed_attempt:
             return {
                 "eligible": False,
@@ -449,11 +739,12 @@ async def check_quiz_eligibility(
             }
     
     # Check if there's an active (incomplete) attempt
-    active_attempt = db.query(QuizAttempt).filter(
+    active_attempt = await db.scalar(select(QuizAttempt).where(
         QuizAttempt.quiz_id == quiz_id,
         QuizAttempt.student_id == current_user.id,
-        QuizAttempt.is_completed == False
-    ).first()
+        QuizAttempt.is_completed == False,
+        QuizAttempt.is_started,
+    ))
     
     now = datetime.now()
     calculated_duration = quiz.duration_minutes
@@ -544,10 +835,10 @@ async def check_quiz_eligibility(
 async def update_quiz(
     quiz_id: int,
     quiz_data: QuizUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    quiz = await db.get(Quiz, quiz_id)
     if not quiz:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -572,11 +863,16 @@ async def update_quiz(
     # Handle student assignments if provided
     assigned_student_ids = update_data.pop('assigned_student_ids', None)
     if assigned_student_ids is not None:
-        from app.models.models import QuizAssignment
         unique_student_ids = list(dict.fromkeys(assigned_student_ids))
         
         # Delete existing assignments
-        db.query(QuizAssignment).filter(QuizAssignment.quiz_id == quiz_id).delete()
+        await db.execute(delete(QuizAssignment).where(QuizAssignment.quiz_id == quiz_id))
+        # Pending attempts from an opened live session only belong to assigned students
+        await db.execute(delete(QuizAttempt).where(
+            QuizAttempt.quiz_id == quiz_id,
+            QuizAttempt.started_at.is_(None),
+            QuizAttempt.student_id.notin_(unique_student_ids),
+        ))
         
         # Add new assignments
         for student_id in unique_student_ids:
@@ -590,11 +886,29 @@ async def update_quiz(
             if duration:
                 update_data['live_end_time'] = update_data['live_start_time'] + timedelta(minutes=duration)
     
+    marking_changed = any(
+        field in update_data and update_data[field] != getattr(quiz, field)
+        for field in ("marks_per_correct", "negative_marking")
+    )
+    # Wrong answers already graded carry the old penalty; re-mark them in the background
+    penalty_changed = "negative_marking" in update_data and update_data["negative_marking"] != quiz.negative_marking
     for field, value in update_data.items():
         setattr(quiz, field, value)
+    if marking_changed:
+        await db.flush()
+        await db.execute(reflag_quiz_attempts(quiz.id))
+    if penalty_changed:
+        await queue_regrade(db, quiz.id, requested_by=current_user.id)
     
-    db.commit()
-    db.refresh(quiz)
+    await db.commit()
+    if penalty_changed:
+        regrade_runner.notify()
+    await db.refresh(quiz)
+
+    total_questions = await db.scalar(select(func.count(Question.id)).where(Question.quiz_id == quiz.id))
+    total_attempts = await db.scalar(
+        select(func.count(QuizAttempt.id)).where(QuizAttempt.quiz_id == quiz.id, QuizAttempt.is_started)
+    )
     
     # Convert quiz to dict and set attempts count (not the list)
     quiz_dict = {
@@ -617,21 +931,53 @@ async def update_quiz(
         "is_active": quiz.is_active,
         "created_at": quiz.created_at,
         "updated_at": quiz.updated_at,
-        "total_questions": len(quiz.questions) if quiz.questions else 0,
-        "attempts": len(quiz.attempts) if quiz.attempts else 0
+        "total_questions": total_questions,
+        "attempts": total_attempts
     }
     
     return quiz_dict
 
+@router.post("/{quiz_id}/open-session", dependencies=[Depends(require_role(["admin", "teacher"]))])
+async def open_live_session(
+    quiz_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Pre-create pending attempts for every assigned student so joining the live
+    session only has to claim them (also done automatically shortly before start)
+    """
+    quiz = await db.get(Quiz, quiz_id)
+    if not quiz:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Quiz not found"
+        )
+
+    if current_user.role != "admin" and quiz.creator_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    if not quiz.is_live_session:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only live sessions can be opened"
+        )
+
+    created = await open_session(db, quiz)
+    await db.commit()
+
+    return {"quiz_id": quiz.id, "pending_attempts_created": created}
+
 @router.delete("/{quiz_id}", dependencies=[Depends(require_role(["admin", "teacher"]))])
 async def delete_quiz(
     quiz_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    from app.models.models import QuizAttempt, Question, Answer, QuizAssignment
-    
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    quiz = await db.get(Quiz, quiz_id)
     if not quiz:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -648,26 +994,30 @@ async def delete_quiz(
     try:
         # Delete in correct order to respect foreign key constraints:
         # 1. First delete answers (references quiz_attempts)
-        attempt_ids = [attempt.id for attempt in db.query(QuizAttempt).filter(QuizAttempt.quiz_id == quiz_id).all()]
+        attempt_ids = (await db.scalars(select(QuizAttempt.id).where(QuizAttempt.quiz_id == quiz_id))).all()
         if attempt_ids:
-            db.query(Answer).filter(Answer.attempt_id.in_(attempt_ids)).delete(synchronize_session=False)
+            await db.execute(delete(Answer).where(Answer.attempt_id.in_(attempt_ids)).execution_options(synchronize_session=False))
+            # Explicit: SQLite does not enforce ON DELETE CASCADE, and attempt ids can be reused
+            await db.execute(delete(AttemptSubmission).where(AttemptSubmission.attempt_id.in_(attempt_ids)))
         
         # 2. Delete quiz attempts (references quiz)
-        db.query(QuizAttempt).filter(QuizAttempt.quiz_id == quiz_id).delete()
+        await db.execute(delete(QuizAttempt).where(QuizAttempt.quiz_id == quiz_id))
         
         # 3. Delete quiz assignments (references quiz)
-        db.query(QuizAssignment).filter(QuizAssignment.quiz_id == quiz_id).delete()
+        await db.execute(delete(QuizAssignment).where(QuizAssignment.quiz_id == quiz_id))
         
-        # 4. Delete questions (references quiz)
-        db.query(Question).filter(Question.quiz_id == quiz_id).delete()
+        # 4. Delete regrade jobs, question stats and questions (references quiz)
+        await db.execute(delete(RegradeJob).where(RegradeJob.quiz_id == quiz_id))
+        await db.execute(delete(QuestionStat).where(QuestionStat.quiz_id == quiz_id))
+        await db.execute(delete(Question).where(Question.quiz_id == quiz_id))
         
         # 5. Finally delete the quiz
-        db.delete(quiz)
-        db.commit()
+        await db.delete(quiz)
+        await db.commit()
         
         return {"message": "Quiz deleted successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete quiz: {str(e)}"
@@ -677,16 +1027,13 @@ async def delete_quiz(
 @router.get("/{quiz_id}/statistics")
 async def get_quiz_statistics(
     quiz_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_role(["admin", "teacher"]))
 ):
     """
     Get detailed statistics for a quiz (Teacher/Admin only)
     """
-    from app.models.models import QuizAttempt
-    from sqlalchemy import func
-    
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    quiz = await db.get(Quiz, quiz_id)
     if not quiz:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -700,35 +1047,36 @@ async def get_quiz_statistics(
             detail="Not authorized to view this quiz's statistics"
         )
     
-    total_attempts = db.query(QuizAttempt).filter(
-        QuizAttempt.quiz_id == quiz_id
-    ).count()
+    total_attempts = await db.scalar(select(func.count(QuizAttempt.id)).where(
+        QuizAttempt.quiz_id == quiz_id,
+        QuizAttempt.is_started,
+    ))
     
-    completed_attempts = db.query(QuizAttempt).filter(
+    completed_attempts = await db.scalar(select(func.count(QuizAttempt.id)).where(
         QuizAttempt.quiz_id == quiz_id,
         QuizAttempt.is_completed == True
-    ).count()
+    ))
     
-    average_score = db.query(func.avg(QuizAttempt.score)).filter(
+    average_score = await db.scalar(select(func.avg(QuizAttempt.score)).where(
         QuizAttempt.quiz_id == quiz_id,
         QuizAttempt.is_completed == True
-    ).scalar() or 0
+    )) or 0
     
-    average_percentage = db.query(func.avg(QuizAttempt.percentage)).filter(
+    average_percentage = await db.scalar(select(func.avg(QuizAttempt.percentage)).where(
         QuizAttempt.quiz_id == quiz_id,
         QuizAttempt.is_completed == True
-    ).scalar() or 0
+    )) or 0
     
-    highest_score = db.query(func.max(QuizAttempt.score)).filter(
+    highest_score = await db.scalar(select(func.max(QuizAttempt.score)).where(
         QuizAttempt.quiz_id == quiz_id,
         QuizAttempt.is_completed == True
-    ).scalar() or 0
+    )) or 0
     
-    lowest_score = db.query(func.min(QuizAttempt.score)).filter(
+    lowest_score = await db.scalar(select(func.min(QuizAttempt.score)).where(
         QuizAttempt.quiz_id == quiz_id,
         QuizAttempt.is_completed == True,
         QuizAttempt.score > 0
-    ).scalar() or 0
+    )) or 0
     
     return {
         "quiz_id": quiz_id,
@@ -745,19 +1093,409 @@ async def get_quiz_statistics(
     }
 
 
+@router.get("/{quiz_id}/item-analysis")
+async def get_item_analysis(
+    quiz_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role(["admin", "teacher"]))
+):
+    """
+    Per-question answer statistics for a quiz (Teacher/Admin only)
+    - Read from the question_stats totals kept by grading, not from answers
+    """
+    quiz = await db.get(Quiz, quiz_id)
+    if not quiz:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Quiz not found"
+        )
+
+    if current_user.role == "teacher" and quiz.creator_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this quiz's statistics"
+        )
+
+    completed_attempts = await db.scalar(select(func.count(QuizAttempt.id)).where(
+        QuizAttempt.quiz_id == quiz_id,
+        QuizAttempt.is_completed == True
+    ))
+    rows = (await db.execute(
+        select(Question, QuestionStat)
+        .outerjoin(QuestionStat, QuestionStat.question_id == Question.id)
+        .where(Question.quiz_id == quiz_id)
+        .order_by(Question.order, Question.id)
+    )).all()
+
+    questions = []
+    for question, stats in rows:
+        answered = stats.attempts if stats else 0
+        correct = stats.correct_count if stats else 0
+        option_counts = {letter: getattr(stats, column) if stats else 0 for letter, column in OPTION_COLUMNS.items()}
+        option_counts["other"] = stats.other_count if stats else 0
+        questions.append({
+            "question_id": question.id,
+            "order": question.order,
+            "question_text": question.question_text,
+            "question_type": question.question_type,
+            "correct_answer": question.correct_answer,
+            "marks": question.marks,
+            "answered": answered,
+            "skipped": max(0, completed_attempts - answered),
+            "correct_count": correct,
+            "percent_correct": round(correct / answered * 100, 2) if answered else None,
+            "average_marks": round(stats.marks_total / answered, 4) if answered else None,
+            "option_counts": option_counts,
+        })
+
+    return {
+        "quiz_id": quiz_id,
+        "quiz_title": quiz.title,
+        "completed_attempts": completed_attempts,
+        "questions": questions,
+    }
+
+
+@router.get("/{quiz_id}/psychometrics")
+async def get_quiz_psychometrics(
+    quiz_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role(["admin", "teacher"]))
+):
+    """
+    Classical test theory item analysis for a quiz (Teacher/Admin only)
+    - Difficulty, point-biserial and upper/lower discrimination per question
+    - KR-20 reliability, option shares and distractor efficiency
+    - Cached until the quiz gets new attempts
+    """
+    quiz = await db.get(Quiz, quiz_id)
+    if not quiz:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Quiz not found"
+        )
+
+    if current_user.role == "teacher" and quiz.creator_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this quiz's statistics"
+        )
+
+    return await analyze_quiz(db, quiz)
+
+
+def _regrade_job_status(job: RegradeJob) -> dict:
+    return {
+        "job_id": job.id,
+        "quiz_id": job.quiz_id,
+        "question_id": job.question_id,
+        "status": job.status,
+        "total_attempts": job.total_attempts,
+        "processed_attempts": job.processed_attempts,
+        "changed_attempts": job.changed_attempts,
+        "detail": job.detail,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "status_url": f"/api/v1/quizzes/{job.quiz_id}/regrade-jobs/{job.id}",
+    }
+
+
+async def _owned_quiz(db: AsyncSession, quiz_id: int, current_user: User) -> Quiz:
+    quiz = await db.get(Quiz, quiz_id)
+    if not quiz:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Quiz not found"
+        )
+    if current_user.role != "admin" and quiz.creator_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return quiz
+
+
+@router.post("/{quiz_id}/regrade", dependencies=[Depends(require_role(["admin", "teacher"]))])
+async def regrade_quiz(
+    quiz_id: int,
+    regrade: RegradeRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Re-mark completed attempts with the current answer keys and marking scheme
+    - question_id limits it to one question's answers
+    - dry_run (default) lists the attempts whose score would change
+    - otherwise queues a background job (202); poll its status_url for progress
+    """
+    quiz = await _owned_quiz(db, quiz_id, current_user)
+
+    if regrade.question_id is not None:
+        question_quiz_id = await db.scalar(select(Question.quiz_id).where(Question.id == regrade.question_id))
+        if question_quiz_id != quiz.id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Question not found in this quiz"
+            )
+
+    if regrade.dry_run:
+        changes = (await db.execute(score_changes(quiz.id, regrade.question_id))).all()
+        return {
+            "quiz_id": quiz.id,
+            "question_id": regrade.question_id,
+            "dry_run": True,
+            "changed_attempts": len(changes),
+            "changes": [
+                {
+                    "attempt_id": row.id,
+                    "student_id": row.student_id,
+                    "old_score": row.old_score,
+                    "new_score": round(float(row.new_score), 2),
+                    "old_total_marks": row.old_total_marks,
+                    "new_total_marks": float(row.new_total_marks),
+                    "old_percentage": row.old_percentage,
+                    "new_percentage": round(float(row.new_percentage), 2),
+                }
+                for row in changes[:regrade.show]
+            ],
+        }
+
+    job = await queue_regrade(db, quiz.id, regrade.question_id, requested_by=current_user.id)
+    await db.commit()
+    await db.refresh(job)
+    regrade_runner.notify()
+    response.status_code = status.HTTP_202_ACCEPTED
+    return _regrade_job_status(job)
+
+
+@router.get("/{quiz_id}/regrade-jobs/{job_id}", dependencies=[Depends(require_role(["admin", "teacher"]))])
+async def get_regrade_job(
+    quiz_id: int,
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Status and progress of a regrade job"""
+    await _owned_quiz(db, quiz_id, current_user)
+    job = await db.get(RegradeJob, job_id)
+    if not job or job.quiz_id != quiz_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Regrade job not found"
+        )
+    return _regrade_job_status(job)
+
+
+# Question columns a PATCH /{quiz_id}/questions "update" may change, and which of them can't be NULL
+QUESTION_EDIT_FIELDS = (
+    "question_text", "question_type", "option_a", "option_b", "option_c", "option_d", "correct_answer", "marks",
+)
+QUESTION_REQUIRED_FIELDS = {"question_text", "question_type", "correct_answer", "marks"}
+
+
+@router.patch("/{quiz_id}/questions", dependencies=[Depends(require_role(["admin", "teacher"]))])
+async def patch_quiz_questions(
+    quiz_id: int,
+    patch: QuizQuestionsPatch,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Add, update, delete and reorder a quiz's questions in one transaction
+    - operations apply in order; only the net changes are written, one bulk statement per kind
+    - existing questions keep their ids, so attempts and answers stay linked
+    - questions that already have answers can't be deleted (409)
+    - content_version (from GET /quizzes/{id}) rejects edits to a stale copy (409)
+    - regrade queues a regrade of completed attempts when answer keys or marks change;
+      it also moves their total_marks and percentage to the new quiz total
+    """
+    quiz = await _owned_quiz(db, quiz_id, current_user)
+    version = quiz.content_version
+    if patch.content_version is not None and patch.content_version != version:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Quiz questions were edited since version {patch.content_version} (now {version})"
+        )
+
+    rows = (await db.execute(
+        select(Question.id, Question.order, *[getattr(Question, field) for field in QUESTION_EDIT_FIELDS])
+        .where(Question.quiz_id == quiz.id)
+    )).all()
+    current = {row.id: row._asdict() for row in rows}
+    edited = {question_id: dict(values) for question_id, values in current.items()}
+    added: List[QuestionCreate] = []
+    deleted: List[int] = []
+    new_order: Optional[List[int]] = None
+
+    for index, operation in enumerate(patch.operations):
+        def invalid(detail: str) -> HTTPException:
+            return HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"operations[{index}] ({operation.op}): {detail}"
+            )
+
+        if operation.op == "add":
+            if operation.question is None:
+                raise invalid("question is required")
+            added.append(operation.question)
+        elif operation.op == "reorder":
+            if operation.question_ids is None:
+                raise invalid("question_ids is required")
+            new_order = operation.question_ids
+        elif operation.id not in edited:
+            raise invalid(f"question {operation.id} is not in this quiz")
+        elif operation.op == "delete":
+            del edited[operation.id]
+            deleted.append(operation.id)
+        else:
+            changes = operation.changes.dict(exclude_unset=True) if operation.changes else {}
+            cleared = sorted(field for field in QUESTION_REQUIRED_FIELDS if field in changes and changes[field] is None)
+            if cleared:
+                raise invalid(f"{', '.join(cleared)} can't be null")
+            edited[operation.id].update(changes)
+
+    if new_order is not None and sorted(new_order) != sorted(edited):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="reorder must list every remaining question of the quiz exactly once"
+        )
+    if new_order is not None:
+        for position, question_id in enumerate(new_order):
+            edited[question_id]["order"] = position
+
+    updates = []
+    for question_id, values in edited.items():
+        changed = {field: value for field, value in values.items() if value != current[question_id][field]}
+        if changed:
+            updates.append({"id": question_id, **changed})
+    rekeyed = [
+        row["id"] for row in updates
+        if "correct_answer" in row or "marks" in row
+    ]
+
+    if not (added or deleted or updates):
+        return {
+            "quiz_id": quiz.id, "content_version": version, "total_marks": quiz.total_marks,
+            "added": [], "updated": [], "deleted": [], "regrade_job": None,
+        }
+
+    if deleted:
+        answered = (await db.scalars(
+            select(Answer.question_id).where(Answer.question_id.in_(deleted)).distinct()
+        )).all()
+        if answered:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Questions with answers can't be deleted: {sorted(answered)}"
+            )
+
+    bank_uses = Counter(question.question_bank_id for question in added if question.question_bank_id)
+    if bank_uses:
+        found = set((await db.scalars(select(QuestionBank.id).where(QuestionBank.id.in_(list(bank_uses))))).all())
+        missing = sorted(set(bank_uses) - found)
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Question bank items not found: {missing}"
+            )
+
+    marks_delta = (
+        sum(question.marks for question in added)
+        - sum(current[question_id]["marks"] or 0 for question_id in deleted)
+        + sum(row["marks"] - (current[row["id"]]["marks"] or 0) for row in updates if "marks" in row)
+    )
+    # Bumping the version first also serializes concurrent edits of the same quiz
+    bumped = await db.execute(
+        update(Quiz)
+        .where(Quiz.id == quiz.id, Quiz.content_version == version)
+        .values(
+            total_marks=func.coalesce(Quiz.total_marks, 0) + marks_delta,
+            content_version=Quiz.content_version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if bumped.rowcount != 1:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Quiz questions were edited concurrently; reload and retry"
+        )
+
+    if deleted:
+        await db.execute(delete(QuestionStat).where(QuestionStat.question_id.in_(deleted)))
+        await db.execute(
+            delete(Question).where(Question.id.in_(deleted)).execution_options(synchronize_session=False)
+        )
+    if updates:
+        await db.execute(update(Question).execution_options(synchronize_session=False), updates)
+    added_ids: List[int] = []
+    if added:
+        next_order = max((values["order"] or 0 for values in edited.values()), default=-1) + 1
+        await db.execute(insert(Question), [
+            {
+                "quiz_id": quiz.id,
+                "question_bank_id": question.question_bank_id,
+                "question_text": question.question_text,
+                "question_type": question.question_type,
+                "option_a": question.option_a,
+                "option_b": question.option_b,
+                "option_c": question.option_c,
+                "option_d": question.option_d,
+                "correct_answer": question.correct_answer,
+                "marks": question.marks,
+                "order": next_order + offset,
+            }
+            for offset, question in enumerate(added)
+        ])
+        if bank_uses:
+            await db.execute(
+                update(QuestionBank)
+                .where(QuestionBank.id.in_(list(bank_uses)))
+                .values(times_used=QuestionBank.times_used + case(bank_uses, value=QuestionBank.id, else_=0))
+                .execution_options(synchronize_session=False)
+            )
+        await db.execute(insert_missing_stats(Question.quiz_id == quiz.id))
+        added_ids = (await db.scalars(
+            select(Question.id)
+            .where(Question.quiz_id == quiz.id, Question.id.notin_(list(current)))
+            .order_by(Question.id)
+        )).all()
+    if added or deleted:
+        await db.execute(reflag_quiz_attempts(quiz.id))  # the flags depend on the question count
+
+    job = None
+    if patch.regrade and rekeyed:
+        job = await queue_regrade(db, quiz.id, rekeyed[0] if len(rekeyed) == 1 else None, requested_by=current_user.id)
+    await db.commit()
+    await db.refresh(quiz)
+    if job is not None:
+        await db.refresh(job)
+        regrade_runner.notify()
+
+    return {
+        "quiz_id": quiz.id,
+        "content_version": quiz.content_version,
+        "total_marks": quiz.total_marks,
+        "added": added_ids,
+        "updated": [row["id"] for row in updates],
+        "deleted": deleted,
+        "regrade_job": _regrade_job_status(job) if job is not None else None,
+    }
+
+
 @router.get("/{quiz_id}/assignments")
 async def get_quiz_assignments(
     quiz_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_role(["admin", "teacher"]))
 ):
     """
     Get assignment statistics for a quiz (Teacher/Admin only)
     Returns count of assigned and unassigned students
     """
-    from app.models.models import QuizAssignment
-    
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    quiz = await db.get(Quiz, quiz_id)
     if not quiz:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -765,16 +1503,20 @@ async def get_quiz_assignments(
         )
     
     # Get all students
-    all_students = db.query(User).filter(User.role == "student", User.is_active == True).all()
-    total_students = len(all_students)
+    total_students = await db.scalar(
+        select(func.count(User.id)).where(User.role == "student", User.is_active == True)
+    )
     
     # Get assigned students
-    assigned = db.query(QuizAssignment).filter(QuizAssignment.quiz_id == quiz_id).all()
-    assigned_count = len(assigned)
-    assigned_student_ids = [a.student_id for a in assigned]
+    assigned_student_ids = (await db.scalars(
+        select(QuizAssignment.student_id).where(QuizAssignment.quiz_id == quiz_id)
+    )).all()
+    assigned_count = len(assigned_student_ids)
     
     # Get assigned student details
-    assigned_students = db.query(User).filter(User.id.in_(assigned_student_ids)).all() if assigned_student_ids else []
+    assigned_students = (await db.scalars(
+        select(User).where(User.id.in_(assigned_student_ids))
+    )).all() if assigned_student_ids else []
     
     return {
         "quiz_id": quiz_id,
@@ -799,15 +1541,13 @@ async def get_quiz_assignments(
 @router.get("/{quiz_id}/attempts")
 async def get_quiz_attempts(
     quiz_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_role(["admin", "teacher"]))
 ):
     """
     Get all attempts for a quiz (Teacher/Admin only)
     """
-    from app.models.models import QuizAttempt
-    
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    quiz = await db.get(Quiz, quiz_id)
     if not quiz:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -821,8 +1561,9 @@ async def get_quiz_attempts(
             detail="Not authorized to view this quiz's attempts"
         )
     
-    attempts = db.query(QuizAttempt).filter(
-        QuizAttempt.quiz_id == quiz_id
-    ).all()
+    attempts = (await db.scalars(select(QuizAttempt).where(
+        QuizAttempt.quiz_id == quiz_id,
+        QuizAttempt.is_started,
+    ))).all()
     
     return attempts
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
-from app.core.deps import get_db, get_current_user, require_role
+from app.core.deps import get_db, get_current_user_sync, require_role_sync
 from app.models.models import Subject, User
 from app.schemas.schemas import SubjectCreate, SubjectUpdate, SubjectResponse
 
@@ -11,7 +11,7 @@ router = APIRouter()
 def create_subject(
     subject: SubjectCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(["admin", "teacher"]))
+    current_user: User = Depends(require_role_sync(["admin", "teacher"]))
 ):
     """
     Create a new subject (Admin and Teacher only)
@@ -49,7 +49,7 @@ def get_subjects(
     department: str = None,
     active_only: bool = True,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_sync)
 ):
     """
     Get all subjects with optional filtering
@@ -70,7 +70,7 @@ def get_subjects(
 def get_subject(
     subject_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_sync)
 ):
     """
     Get a specific subject by ID
@@ -89,7 +89,7 @@ def update_subject(
     subject_id: int,
     subject_update: SubjectUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(["admin", "teacher"]))
+    current_user: User = Depends(require_role_sync(["admin", "teacher"]))
 ):
     """
     Update a subject (Admin and Teacher only)
@@ -131,7 +131,7 @@ def update_subject(
 def delete_subject(
     subject_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role(["admin"]))
+    current_user: User = Depends(require_role_sync(["admin"]))
 ):
     """
     Delete a subject (Admin only)
@@ -153,7 +153,7 @@ def delete_subject(
 def get_subject_statistics(
     subject_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_sync)
 ):
     """
     Get statistics for a subject
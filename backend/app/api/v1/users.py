@@ -5,18 +5,20 @@ from typing import List
 import csv
 import io
 from app.db.database import get_db
-from app.models.models import User, QuizAttempt, Answer, QuizAssignment, Quiz, Subject, QuestionBank
+from app.models.models import User, QuizAttempt, Answer, AttemptSubmission, QuizAssignment, Quiz, Subject, QuestionBank
 from app.schemas.schemas import UserCreate, UserResponse, UserUpdate, UserActivityResponse
 from app.core.security import get_password_hash
-from app.core.deps import get_current_active_user, require_role
+from app.core.activity import activity_tracker
+from app.core.item_stats import record_answers
+from app.core.deps import get_current_active_user_sync, require_role_sync
 
 router = APIRouter()
 
-@router.post("/", response_model=UserResponse, dependencies=[Depends(require_role(["admin", "teacher"]))])
+@router.post("/", response_model=UserResponse, dependencies=[Depends(require_role_sync(["admin", "teacher"]))])
 async def create_user(
     user_data: UserCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user_sync)
 ):
     # Teachers can only create students
     if current_user.role == "teacher" and user_data.role != "student":
@@ -62,11 +64,11 @@ async def create_user(
     
     return db_user
 
-@router.post("/bulk-upload", dependencies=[Depends(require_role(["admin", "teacher"]))])
+@router.post("/bulk-upload", dependencies=[Depends(require_role_sync(["admin", "teacher"]))])
 async def bulk_upload_users(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user_sync)
 ):
     """
     Bulk upload users from CSV file. Teachers can only upload students.
@@ -233,13 +235,13 @@ async def bulk_upload_users(
             detail="Failed to process file"
         )
 
-@router.get("/", response_model=List[UserResponse], dependencies=[Depends(require_role(["admin", "teacher"]))])
+@router.get("/", response_model=List[UserResponse], dependencies=[Depends(require_role_sync(["admin", "teacher"]))])
 async def get_all_users(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=300),
     role: str = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user_sync)
 ):
     query = db.query(User)
     
@@ -254,15 +256,15 @@ async def get_all_users(
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user_sync)
 ):
     return current_user
 
-@router.get("/{user_id}", response_model=UserResponse, dependencies=[Depends(require_role(["admin"]))])
+@router.get("/{user_id}", response_model=UserResponse, dependencies=[Depends(require_role_sync(["admin"]))])
 async def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user_sync)
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -272,12 +274,12 @@ async def get_user(
         )
     return user
 
-@router.put("/{user_id}", response_model=UserResponse, dependencies=[Depends(require_role(["admin"]))])
+@router.put("/{user_id}", response_model=UserResponse, dependencies=[Depends(require_role_sync(["admin"]))])
 async def update_user(
     user_id: int,
     user_data: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user_sync)
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -330,11 +332,11 @@ async def update_user(
     
     return user
 
-@router.delete("/{user_id}", dependencies=[Depends(require_role(["admin"]))])
+@router.delete("/{user_id}", dependencies=[Depends(require_role_sync(["admin"]))])
 async def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user_sync)
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -361,7 +363,13 @@ async def delete_user(
             for (attempt_id,) in db.query(QuizAttempt.id).filter(QuizAttempt.student_id == user.id).all()
         ]
         if attempt_ids:
+            # Take their graded answers out of question_stats, as maintenance.delete_attempts does
+            db.execute(record_answers(Answer.attempt_id.in_(attempt_ids), sign=-1))
             db.query(Answer).filter(Answer.attempt_id.in_(attempt_ids)).delete(synchronize_session=False)
+            # Explicit: SQLite does not enforce ON DELETE CASCADE, and attempt ids can be reused
+            db.query(AttemptSubmission).filter(
+                AttemptSubmission.attempt_id.in_(attempt_ids)
+            ).delete(synchronize_session=False)
             db.query(QuizAttempt).filter(QuizAttempt.student_id == user.id).delete(synchronize_session=False)
         db.query(QuizAssignment).filter(QuizAssignment.student_id == user.id).delete(synchronize_session=False)
     
@@ -377,10 +385,10 @@ async def delete_user(
     
     return {"message": "User deleted successfully"}
 
-@router.get("/activity/teachers", response_model=List[UserActivityResponse], dependencies=[Depends(require_role(["admin"]))])
+@router.get("/activity/teachers", response_model=List[UserActivityResponse], dependencies=[Depends(require_role_sync(["admin"]))])
 async def get_teacher_activity(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user_sync)
 ):
     teachers = db.query(User).filter(User.role == "teacher").all()
     return [
@@ -392,16 +400,16 @@ async def get_teacher_activity(
             "department": teacher.department,
             "class_year": teacher.class_year,
             "student_id": teacher.student_id,
-            "last_active": teacher.last_active,
+            "last_active": activity_tracker.last_seen(teacher.id, teacher.last_active),
             "is_active": teacher.is_active,
         }
         for teacher in teachers
     ]
 
-@router.get("/activity/students", response_model=List[UserActivityResponse], dependencies=[Depends(require_role(["admin"]))])
+@router.get("/activity/students", response_model=List[UserActivityResponse], dependencies=[Depends(require_role_sync(["admin"]))])
 async def get_student_activity(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user_sync)
 ):
     students = db.query(User).filter(User.role == "student").all()
     return [
@@ -413,7 +421,7 @@ async def get_student_activity(
             "department": student.department,
             "class_year": student.class_year,
             "student_id": student.student_id,
-            "last_active": student.last_active,
+            "last_active": activity_tracker.last_seen(student.id, student.last_active),
             "is_active": student.is_active,
         }
         for student in students
@@ -0,0 +1,112 @@
+"""
+Coalesced ``users.last_active`` updates.
+
+Every authenticated request (and every login) records "user seen at" in
+memory instead of writing. A background task flushes the latest timestamp per
+user every ``ACTIVITY_FLUSH_SECONDS`` with one ``UPDATE ... SET last_active =
+CASE id WHEN ... END`` per chunk of users, and once more on shutdown.
+
+Until a flush, ``last_seen``/``recently_seen`` let the activity endpoints and
+the admin dashboard's "active now" counts include the buffered timestamps.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, update
+
+from app.models.models import User
+
+logger = logging.getLogger(__name__)
+
+# Users per UPDATE statement (two bound parameters each, plus the IN list)
+FLUSH_CHUNK_SIZE = 500
+
+
+class ActivityTracker:
+    def __init__(self):
+        self._seen: Dict[int, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.flushes = 0
+
+    def record(self, user_id: int, seen_at: Optional[datetime] = None) -> None:
+        seen_at = seen_at or datetime.utcnow()
+        previous = self._seen.get(user_id)
+        if previous is None or seen_at > previous:
+            self._seen[user_id] = seen_at
+
+    def pending(self) -> Dict[int, datetime]:
+        return dict(self._seen)
+
+    def last_seen(self, user_id: int, stored: Optional[datetime]) -> Optional[datetime]:
+        """``stored`` (users.last_active), or the buffered timestamp when it is newer."""
+        buffered = self._seen.get(user_id)
+        if buffered is None or (stored is not None and stored >= buffered):
+            return stored
+        return buffered
+
+    def recently_seen(self, since: datetime) -> List[int]:
+        """Users with a buffered timestamp at or after ``since``, not yet in the database."""
+        return [user_id for user_id, seen_at in self._seen.items() if seen_at >= since]
+
+    async def flush(self, session_factory, write_queue=None) -> int:
+        """Write the buffered timestamps; returns how many users were updated."""
+        seen, self._seen = self._seen, {}
+        if not seen:
+            return 0
+        user_ids = sorted(seen)
+
+        async def work(session):
+            for start in range(0, len(user_ids), FLUSH_CHUNK_SIZE):
+                chunk = user_ids[start:start + FLUSH_CHUNK_SIZE]
+                await session.execute(
+                    update(User)
+                    .where(User.id.in_(chunk))
+                    .values(last_active=case({user_id: seen[user_id] for user_id in chunk}, value=User.id))
+                    .execution_options(synchronize_session=False)
+                )
+
+        try:
+            if write_queue is not None:
+                await write_queue.submit(work)
+            else:
+                async with session_factory() as session:
+                    await work(session)
+                    await session.commit()
+        except Exception:
+            for user_id, seen_at in seen.items():  # keep them for the next flush
+                self.record(user_id, seen_at)
+            raise
+        self.flushes += 1
+        return len(user_ids)
+
+    async def _run(self, session_factory, write_queue, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush(session_factory, write_queue)
+            except Exception:
+                logger.exception("Flushing last_active failed")
+
+    def start(self, session_factory, write_queue=None, interval: float = 15.0) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(
+                self._run(session_factory, write_queue, interval), name="activity-flush"
+            )
+
+    async def stop(self, session_factory, write_queue=None) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush(session_factory, write_queue)
+
+
+activity_tracker = ActivityTracker()
@@ -0,0 +1,71 @@
+"""
+One answer normalization for submit grading and set-based regrading.
+
+An answer matches its key when both are equal after ``normalize_answer``:
+surrounding ASCII whitespace (space, tab, newline, CR, FF, VT) stripped and
+the rest lower-cased. Submit grading calls it in Python; regrades compare
+``normalized_answer(column)`` in SQL, which renders the same rules per
+dialect. SQL ``trim`` alone only strips spaces, and SQLite's ``lower`` only
+folds ASCII letters, so on SQLite the Python function itself is registered on
+every connection as ``macquiz_answer_key``.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import String, event, func, literal
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+ANSWER_WHITESPACE = " \t\n\r\f\v"
+SQLITE_FUNCTION = "macquiz_answer_key"
+
+
+def normalize_answer(text: Optional[str]) -> str:
+    return (text or "").strip(ANSWER_WHITESPACE).lower()
+
+
+def answers_match(answer_text: Optional[str], correct_answer: Optional[str]) -> bool:
+    return normalize_answer(answer_text) == normalize_answer(correct_answer)
+
+
+class normalized_answer(FunctionElement):
+    """``normalize_answer(column)`` as a SQL expression."""
+
+    type = String()
+    inherit_cache = True
+
+
+@compiles(normalized_answer)
+def _normalized_answer_default(element, compiler, **kw):
+    (text,) = element.clauses
+    return compiler.process(func.lower(func.trim(func.coalesce(text, ""))), **kw)
+
+
+@compiles(normalized_answer, "sqlite")
+def _normalized_answer_sqlite(element, compiler, **kw):
+    return compiler.process(getattr(func, SQLITE_FUNCTION)(*element.clauses), **kw)
+
+
+@compiles(normalized_answer, "postgresql")
+def _normalized_answer_postgresql(element, compiler, **kw):
+    (text,) = element.clauses
+    return compiler.process(func.lower(func.btrim(func.coalesce(text, ""), literal(ANSWER_WHITESPACE))), **kw)
+
+
+@compiles(normalized_answer, "mysql")
+def _normalized_answer_mysql(element, compiler, **kw):
+    (text,) = element.clauses
+    edges = f"^[{ANSWER_WHITESPACE}]+|[{ANSWER_WHITESPACE}]+$"
+    stripped = func.regexp_replace(func.coalesce(text, ""), literal(edges), literal(""))
+    return compiler.process(func.lower(stripped), **kw)
+
+
+@event.listens_for(Engine, "connect")
+def _register_sqlite_function(dbapi_connection, connection_record):
+    # Every engine (app, read replica, tests): only SQLite drivers have create_function
+    create_function = getattr(dbapi_connection, "create_function", None)
+    if create_function is not None:
+        create_function(SQLITE_FUNCTION, 1, normalize_answer, deterministic=True)
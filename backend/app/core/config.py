@@ -11,6 +11,75 @@ class Settings(BaseSettings):
     CORS_ALLOW_CREDENTIALS: bool = True
     ADMIN_EMAIL: str = "admin@macquiz.com"
     ADMIN_PASSWORD: str = "admin123"
+
+    # Request/SQL instrumentation (Server-Timing headers, /metrics, slow-request log)
+    METRICS_ENABLED: bool = False
+    SLOW_REQUEST_MS: int = 1000
+    METRICS_TOP_STATEMENTS: int = 5
+
+    # Connection pool (QueuePool per engine; DB_NULL_POOL or VERCEL/SERVERLESS disables pooling)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 3600
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_USE_LIFO: bool = False
+    DB_NULL_POOL: bool = False
+
+    # File-backed SQLite only
+    SQLITE_WAL: bool = True
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # with WAL, NORMAL only risks the last commits on power loss
+    SQLITE_MMAP_SIZE: int = 268435456  # 256 MB
+    SQLITE_CACHE_SIZE_KB: int = 65536  # per connection
+    # Serialize and group-commit attempt start/save-answer/submit through one writer connection
+    SQLITE_SINGLE_WRITER: bool = True
+    SQLITE_WRITER_MAX_BATCH: int = 64
+    SQLITE_WRITER_MAX_WAIT_MS: float = 2.0
+
+    # Rate limits ("<requests>/<seconds>") for login (per IP), save-answer and export (per token).
+    # RATE_LIMIT_STORAGE: memory (per worker), database (shared table) or a redis:// URL
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_STORAGE: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 10000
+    RATE_LIMIT_LOGIN: str = "10/300"
+    RATE_LIMIT_SAVE_ANSWER: str = "120/60"
+    RATE_LIMIT_EXPORT: str = "10/60"
+
+    # bcrypt runs in a thread pool; calls beyond BCRYPT_MAX_PENDING (running + queued) get 503
+    BCRYPT_MAX_WORKERS: int = 4
+    BCRYPT_MAX_PENDING: int = 256
+    # Seconds between batched users.last_active writes; "active now" = seen within ACTIVE_NOW_SECONDS
+    ACTIVITY_FLUSH_SECONDS: float = 15.0
+    ACTIVE_NOW_SECONDS: int = 300
+
+    # Queued submissions (POST /attempts/{id}/submissions) are graded by this many workers per process
+    GRADING_WORKERS: int = 4
+    GRADING_POLL_SECONDS: float = 2.0
+    GRADING_MAX_TRIES: int = 3
+
+    # Live sessions get pending attempt rows for every assigned student this long before live_start_time
+    SESSION_OPEN_LEAD_SECONDS: int = 120
+    SESSION_OPEN_POLL_SECONDS: float = 30.0
+
+    # Teacher/admin previews: PREVIEW_STORAGE memory (per worker, LRU), database (shared table) or a redis:// URL;
+    # each expires after PREVIEW_TTL_SECONDS idle
+    PREVIEW_STORAGE: str = "memory"
+    PREVIEW_MAX_ATTEMPTS: int = 1000
+    PREVIEW_TTL_SECONDS: float = 4 * 3600
+
+    # Psychometric item analyses cached per process (LRU), each until its quiz gets new attempts
+    ITEM_ANALYSIS_CACHE_QUIZZES: int = 256
+
+    # Regrade jobs (POST /quizzes/{id}/regrade) re-mark this many attempts per transaction
+    REGRADE_CHUNK_SIZE: int = 1000
+    REGRADE_POLL_SECONDS: float = 5.0
+
+    # Optional read replica for analytics/reporting reads (empty = primary only)
+    DATABASE_READ_URL: str = ""
+    READ_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    READ_REPLICA_LAG_CHECK_SECONDS: float = 5.0
+    READ_REPLICA_STICKY_SECONDS: float = 10.0
     
     @property
     def cors_origins_list(self) -> List[str]:
@@ -1,65 +1,131 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import Optional
+from app.core.activity import activity_tracker
 from app.core.security import decode_access_token
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db, get_read_db, get_read_router  # get_db/get_read_db re-exported for sync routers
+from app.db.replica import ReadRouter
 from app.models.models import User, RevokedToken, UserTokenBlock
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+
+def _token_claims(token: str) -> dict:
     payload = decode_access_token(token)
-    if payload is None:
-        raise credentials_exception
-    
-    email: str = payload.get("sub")
-    if email is None:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise credentials_exception
-
-    # Session checks
-    jti = payload.get("jti")
-    if jti:
-        revoked = db.query(RevokedToken).filter(RevokedToken.jti == jti).first()
-        if revoked:
-            raise credentials_exception
+    if payload is None or payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
 
+def _check_session(payload: dict, user: Optional[User], revoked: Optional[RevokedToken],
+                   block: Optional[UserTokenBlock]) -> User:
+    """Reject unknown users, revoked tokens and tokens issued before the user's block."""
+    if user is None or revoked is not None:
+        raise _credentials_exception()
     iat = payload.get("iat")
-    if iat:
-        block = db.query(UserTokenBlock).filter(UserTokenBlock.user_id == user.id).first()
-        if block:
-            token_issued_at = datetime.utcfromtimestamp(int(iat))
-            if token_issued_at < block.revoked_before:
-                raise credentials_exception
-    
+    if iat and block is not None and datetime.utcfromtimestamp(int(iat)) < block.revoked_before:
+        raise _credentials_exception()
     return user
 
+
+def _record_request(request: Request, read_router: ReadRouter, user: User) -> User:
+    # Buffered; written to users.last_active by the next batched flush
+    activity_tracker.record(user.id)
+
+    # Writers read from the primary for a while so they see their own changes.
+    if request.method not in SAFE_METHODS:
+        read_router.record_write(user.id)
+    return user
+
+
+async def get_current_user(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+    read_router: ReadRouter = Depends(get_read_router),
+) -> User:
+    payload = _token_claims(token)
+    user = await db.scalar(select(User).where(User.email == payload["sub"]))
+    jti, iat = payload.get("jti"), payload.get("iat")
+    revoked = await db.scalar(select(RevokedToken).where(RevokedToken.jti == jti)) if jti and user else None
+    block = await db.scalar(select(UserTokenBlock).where(UserTokenBlock.user_id == user.id)) if iat and user else None
+    return _record_request(request, read_router, _check_session(payload, user, revoked, block))
+
+
+def get_current_user_sync(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    read_router: ReadRouter = Depends(get_read_router),
+) -> User:
+    """``get_current_user`` on the request's sync session, for routers still on ``get_db``.
+
+    Sharing ``get_db`` (cached per request) keeps those requests on one
+    session and one pool connection instead of an extra async one for auth.
+    """
+    payload = _token_claims(token)
+    user = db.scalar(select(User).where(User.email == payload["sub"]))
+    jti, iat = payload.get("jti"), payload.get("iat")
+    revoked = db.scalar(select(RevokedToken).where(RevokedToken.jti == jti)) if jti and user else None
+    block = db.scalar(select(UserTokenBlock).where(UserTokenBlock.user_id == user.id)) if iat and user else None
+    return _record_request(request, read_router, _check_session(payload, user, revoked, block))
+
+
+def _require_active(user: User) -> User:
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return user
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
-    if not current_user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
+    return _require_active(current_user)
+
+
+def get_current_active_user_sync(
+    current_user: User = Depends(get_current_user_sync)
+) -> User:
+    return _require_active(current_user)
+
+async def get_read_your_writes_db(
+    current_user: User = Depends(get_current_user),
+    read_router: ReadRouter = Depends(get_read_router),
+):
+    """Replica session, unless the current user has written recently (e.g. just submitted)."""
+    async with (await read_router.async_session_factory(current_user.id))() as db:
+        yield db
+
+def _check_role(user: User, allowed_roles: list) -> User:
+    if user.role not in allowed_roles:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return user
+
 
 def require_role(allowed_roles: list):
     async def role_checker(current_user: User = Depends(get_current_active_user)):
-        if current_user.role not in allowed_roles:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not enough permissions"
-            )
-        return current_user
+        return _check_role(current_user, allowed_roles)
+    return role_checker
+
+
+def require_role_sync(allowed_roles: list):
+    """``require_role`` for routers on the sync ``get_db`` session."""
+    def role_checker(current_user: User = Depends(get_current_active_user_sync)):
+        return _check_role(current_user, allowed_roles)
     return role_checker
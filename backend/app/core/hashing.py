@@ -0,0 +1,114 @@
+"""
+bcrypt off the event loop.
+
+``verify_password``/``get_password_hash`` take ~200ms of CPU each. Called inside
+``async def`` they stall every other request on the worker, so the auth routes
+await them through a ``PasswordPool`` instead:
+
+- a thread pool of ``max_workers`` runs bcrypt (it releases the GIL),
+- at most ``max_pending`` calls may be running or queued; beyond that callers
+  get ``PasswordPoolBusy`` (503 + Retry-After) instead of an ever-growing queue.
+  A call counts until its bcrypt job ends, even if the caller stopped waiting,
+- queue depth and wait time are exported on /metrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from app.core.config import settings
+from app.core import security
+
+# Upper bounds (seconds) for the queue wait histogram.
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PasswordPoolBusy(Exception):
+    pass
+
+
+class PasswordPool:
+    def __init__(self, max_workers: int = 4, max_pending: int = 256):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        # Only touched from the event loop thread
+        self.pending = 0
+        self.max_pending_seen = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_bucket_counts: List[int] = [0] * len(WAIT_BUCKETS)
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordPoolBusy()
+        self.pending += 1
+        self.max_pending_seen = max(self.max_pending_seen, self.pending)
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            return started - submitted, func(*args)
+
+        loop = asyncio.get_running_loop()
+        job = self._executor.submit(timed)
+        # The slot is held until the job itself finishes: a cancelled caller (client gone)
+        # must not free it while bcrypt still runs. Cancelling a still-queued job frees it.
+        job.add_done_callback(lambda done: loop.call_soon_threadsafe(self._finished, done))
+        return (await asyncio.wrap_future(job, loop=loop))[1]
+
+    def _finished(self, job) -> None:
+        self.pending -= 1
+        if not job.cancelled() and job.exception() is None:
+            self._record_wait(job.result()[0])
+
+    def _record_wait(self, seconds: float) -> None:
+        self.completed += 1
+        self.wait_seconds_total += seconds
+        for index, upper in enumerate(WAIT_BUCKETS):
+            if seconds <= upper:
+                self.wait_bucket_counts[index] += 1
+
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(security.verify_password, plain_password, hashed_password)
+
+    async def get_password_hash(self, password: str) -> str:
+        return await self.run(security.get_password_hash, password)
+
+    def status(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "max_pending_seen": self.max_pending_seen,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP macquiz_password_pool_pending bcrypt calls running or queued.",
+            "# TYPE macquiz_password_pool_pending gauge",
+            f"macquiz_password_pool_pending {self.pending}",
+            "# HELP macquiz_password_pool_rejected_total bcrypt calls refused because the queue was full.",
+            "# TYPE macquiz_password_pool_rejected_total counter",
+            f"macquiz_password_pool_rejected_total {self.rejected}",
+            "# HELP macquiz_password_pool_wait_seconds Time bcrypt calls spent queued for a thread.",
+            "# TYPE macquiz_password_pool_wait_seconds histogram",
+        ]
+        for upper, count in zip(WAIT_BUCKETS, self.wait_bucket_counts):
+            lines.append(f'macquiz_password_pool_wait_seconds_bucket{{le="{upper}"}} {count}')
+        lines += [
+            f'macquiz_password_pool_wait_seconds_bucket{{le="+Inf"}} {self.completed}',
+            f"macquiz_password_pool_wait_seconds_sum {self.wait_seconds_total}",
+            f"macquiz_password_pool_wait_seconds_count {self.completed}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+password_pool = PasswordPool(max_workers=settings.BCRYPT_MAX_WORKERS, max_pending=settings.BCRYPT_MAX_PENDING)
@@ -0,0 +1,94 @@
+"""
+Per-question answer totals (``question_stats``) behind item analysis.
+
+One row per question holds running totals over the answers of completed
+attempts: how many answered it, how many were correct, how often each option
+letter was picked and the marks awarded. They are kept incrementally:
+
+- creating questions inserts their (zeroed) rows (``insert_missing_stats``),
+- grading and expiry finalization add the attempt's answers with one grouped
+  ``UPDATE ... FROM`` (``record_answers``); deleting graded attempts subtracts them,
+- fix_attempt_data.py rebuilds drifted or missing rows from ``answers``.
+
+So ``GET /quizzes/{id}/item-analysis`` reads one row per question whatever the
+number of attempts.
+"""
+
+from sqlalchemy import and_, case, exists, func, insert, select, update
+
+from app.models.models import Answer, Question, QuestionStat, QuizAttempt
+
+# Answer letters the quiz taker sends for MCQ options; anything else (true/false,
+# short answers, blanks) counts as "other"
+OPTION_COLUMNS = {
+    "A": "option_a_count",
+    "B": "option_b_count",
+    "C": "option_c_count",
+    "D": "option_d_count",
+}
+TOTAL_COLUMNS = ("attempts", "correct_count", *OPTION_COLUMNS.values(), "other_count", "marks_total")
+
+
+def answer_totals(*conditions):
+    """Totals per question over the answers of completed attempts matching ``conditions``."""
+    choice = func.upper(func.trim(Answer.answer_text))
+    options = [
+        func.sum(case((choice == letter, 1), else_=0)).label(column)
+        for letter, column in OPTION_COLUMNS.items()
+    ]
+    return (
+        select(
+            Answer.question_id,
+            func.count(Answer.id).label("attempts"),
+            func.sum(case((Answer.is_correct == True, 1), else_=0)).label("correct_count"),  # noqa: E712
+            *options,
+            func.sum(case((choice.in_(list(OPTION_COLUMNS)), 0), else_=1)).label("other_count"),
+            func.coalesce(func.sum(Answer.marks_awarded), 0.0).label("marks_total"),
+        )
+        .join(QuizAttempt, QuizAttempt.id == Answer.attempt_id)
+        .where(QuizAttempt.is_completed == True, *conditions)  # noqa: E712
+        .group_by(Answer.question_id)
+    )
+
+
+def record_answers(attempt_condition, sign: int = 1):
+    """UPDATE adding (``sign=-1``: removing) the answers of the attempts matching ``attempt_condition``.
+
+    Run it after the attempts are graded and flushed, or before they are deleted.
+    """
+    totals = answer_totals(attempt_condition).subquery("totals")
+    return (
+        update(QuestionStat)
+        .where(QuestionStat.question_id == totals.c.question_id)
+        .values({
+            column: getattr(QuestionStat, column) + sign * totals.c[column]
+            for column in TOTAL_COLUMNS
+        })
+        .execution_options(synchronize_session=False)
+    )
+
+
+def insert_missing_stats(question_condition):
+    """INSERT zeroed rows for the questions matching ``question_condition`` that have none."""
+    return insert(QuestionStat).from_select(
+        ["question_id", "quiz_id"],
+        select(Question.id, Question.quiz_id).where(
+            question_condition,
+            ~exists().where(QuestionStat.question_id == Question.id),
+        ),
+    )
+
+
+def rebuilt_stats(question_range):
+    """Recomputed totals for every question with an id in ``[low, high)``, answered or not."""
+    low, high = question_range
+    totals = answer_totals(Answer.question_id >= low, Answer.question_id < high).subquery("totals")
+    return (
+        select(
+            Question.id.label("question_id"),
+            Question.quiz_id,
+            *[func.coalesce(totals.c[column], 0).label(column) for column in TOTAL_COLUMNS],
+        )
+        .outerjoin(totals, totals.c.question_id == Question.id)
+        .where(and_(Question.id >= low, Question.id < high))
+    )
@@ -0,0 +1,144 @@
+"""
+Opening live sessions ahead of the join storm.
+
+Every assigned student of a live quiz calls ``POST /attempts/start`` within the
+same few minutes. Opening the session first creates a pending ``QuizAttempt``
+(``started_at IS NULL``) for each of them with a single ``INSERT ... SELECT``
+from ``quiz_assignments``; starting then only stamps ``started_at`` on that
+row instead of normalizing history, checking the assignment and inserting.
+
+Sessions are opened by the teacher (``POST /quizzes/{id}/open-session``) or by
+``SessionOpener``, which opens live quizzes ``SESSION_OPEN_LEAD_SECONDS`` before
+their start. Opening twice is harmless: students who already have an attempt
+for the quiz are skipped. Pending rows are excluded from attempt lists and
+counts (``QuizAttempt.is_started``) and never finalized, so a no-show stays a
+no-show.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Set
+
+from sqlalchemy import exists, false, insert, literal, null, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.models import Quiz, QuizAssignment, QuizAttempt
+
+logger = logging.getLogger(__name__)
+
+# Students may join a live session up to this long after live_start_time
+LIVE_JOIN_GRACE_MINUTES = 5
+
+
+def insert_active_attempts(session: AsyncSession, build: Callable):
+    """``build(insert(QuizAttempt))``, skipping rows that conflict on ``uq_quiz_attempts_active``.
+
+    On MySQL the conflict is a no-op ``ON DUPLICATE KEY UPDATE`` rather than
+    ``INSERT IGNORE``, which would also swallow FK and truncation errors.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return build(postgresql_insert(QuizAttempt)).on_conflict_do_nothing(
+            index_elements=["quiz_id", "student_id"], index_where=QuizAttempt.is_completed == False  # noqa: E712
+        )
+    if dialect == "sqlite":
+        return build(sqlite_insert(QuizAttempt)).on_conflict_do_nothing(
+            index_elements=["quiz_id", "student_id"], index_where=QuizAttempt.is_completed == False  # noqa: E712
+        )
+    if dialect == "mysql":
+        return build(mysql_insert(QuizAttempt)).on_duplicate_key_update(id=QuizAttempt.id)
+    return build(insert(QuizAttempt))
+
+
+async def open_session(session: AsyncSession, quiz: Quiz) -> int:
+    """Create pending attempts for assigned students without one; returns how many were created."""
+    already_attempted = exists().where(
+        QuizAttempt.quiz_id == QuizAssignment.quiz_id,
+        QuizAttempt.student_id == QuizAssignment.student_id,
+    )
+    # A student starting concurrently may insert their active attempt between
+    # the NOT EXISTS check and this insert; the conflict clause skips that row
+    result = await session.execute(insert_active_attempts(session, lambda statement: statement.from_select(
+        ["quiz_id", "student_id", "total_marks", "started_at", "is_completed", "is_graded"],
+        select(
+            QuizAssignment.quiz_id,
+            QuizAssignment.student_id,
+            literal(quiz.total_marks),
+            null(),
+            false(),
+            false(),
+        ).where(QuizAssignment.quiz_id == quiz.id, ~already_attempted),
+    )).execution_options(synchronize_session=False))
+    return result.rowcount
+
+
+class SessionOpener:
+    def __init__(self, lead_seconds: int = 120, poll_seconds: float = 30.0):
+        self.lead_seconds = lead_seconds
+        self.poll_seconds = poll_seconds
+        self._opened: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.sessions_opened = 0
+
+    async def open_due(self, session_factory, write_queue=None, now: Optional[datetime] = None) -> int:
+        """Open live quizzes starting within the lead time (or still joinable); returns sessions opened."""
+        now = now or datetime.now()
+        async with session_factory() as session:
+            due = (await session.scalars(select(Quiz).where(
+                Quiz.is_live_session == True,
+                Quiz.is_active == True,
+                Quiz.live_start_time <= now + timedelta(seconds=self.lead_seconds),
+                Quiz.live_start_time >= now - timedelta(minutes=LIVE_JOIN_GRACE_MINUTES),
+            ))).all()
+        self._opened &= {quiz.id for quiz in due}  # forget sessions past their join window
+        due = [quiz for quiz in due if quiz.id not in self._opened]
+
+        for quiz in due:
+            async def work(session, quiz=quiz):
+                return await open_session(session, quiz)
+
+            if write_queue is not None:
+                created = await write_queue.submit(work)
+            else:
+                async with session_factory() as session:
+                    created = await work(session)
+                    await session.commit()
+            self._opened.add(quiz.id)
+            self.sessions_opened += 1
+            logger.info("Opened live session for quiz %s (%s pending attempts)", quiz.id, created)
+        return len(due)
+
+    async def _run(self, session_factory, write_queue) -> None:
+        while True:
+            try:
+                await self.open_due(session_factory, write_queue)
+            except Exception:
+                logger.exception("Opening live sessions failed")
+            await asyncio.sleep(self.poll_seconds)
+
+    def start(self, session_factory, write_queue=None) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(
+                self._run(session_factory, write_queue), name="session-opener"
+            )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+session_opener = SessionOpener(
+    lead_seconds=settings.SESSION_OPEN_LEAD_SECONDS, poll_seconds=settings.SESSION_OPEN_POLL_SECONDS
+)
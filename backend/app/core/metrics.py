@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import heapq
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger("macquiz.metrics")
+
+# Upper bounds (seconds) for the request duration histogram.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Statements longer than this are truncated in logs and the slow-statement list.
+STATEMENT_PREVIEW_LENGTH = 300
+
+
+@dataclass
+class RequestStats:
+    """SQL activity recorded for a single in-flight request."""
+
+    started_at: float
+    top_n: int = 5
+    statement_count: int = 0
+    db_seconds: float = 0.0
+    slow_statements: List[Tuple[float, str]] = field(default_factory=list)
+
+    def record_statement(self, statement: str, seconds: float) -> None:
+        self.statement_count += 1
+        self.db_seconds += seconds
+        item = (seconds, statement[:STATEMENT_PREVIEW_LENGTH])
+        if len(self.slow_statements) < self.top_n:
+            heapq.heappush(self.slow_statements, item)
+        elif seconds > self.slow_statements[0][0]:
+            heapq.heapreplace(self.slow_statements, item)
+
+    def top_statements(self) -> List[Tuple[float, str]]:
+        return sorted(self.slow_statements, reverse=True)
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("macquiz_request_stats", default=None)
+
+
+@dataclass
+class RouteStats:
+    requests: int = 0
+    duration_seconds: float = 0.0
+    db_seconds: float = 0.0
+    statements: int = 0
+    bucket_counts: List[int] = field(default_factory=lambda: [0] * len(DURATION_BUCKETS))
+    slow_statements: Dict[str, float] = field(default_factory=dict)
+
+
+class MetricsRegistry:
+    """Process-local aggregation of request metrics keyed by route template."""
+
+    def __init__(self, top_n: int = 5):
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], RouteStats] = {}
+        self._status_counts: Dict[Tuple[str, str, str], int] = {}
+
+    def observe(self, method: str, route: str, status_code: int, duration: float, stats: RequestStats) -> None:
+        with self._lock:
+            route_stats = self._routes.get((method, route))
+            if route_stats is None:
+                route_stats = RouteStats()
+                self._routes[(method, route)] = route_stats
+
+            route_stats.requests += 1
+            route_stats.duration_seconds += duration
+            route_stats.db_seconds += stats.db_seconds
+            route_stats.statements += stats.statement_count
+            for idx, upper in enumerate(DURATION_BUCKETS):
+                if duration <= upper:
+                    route_stats.bucket_counts[idx] += 1
+
+            for seconds, statement in stats.slow_statements:
+                if seconds > route_stats.slow_statements.get(statement, 0.0):
+                    route_stats.slow_statements[statement] = seconds
+            if len(route_stats.slow_statements) > self.top_n:
+                keep = heapq.nlargest(self.top_n, route_stats.slow_statements.items(), key=lambda kv: kv[1])
+                route_stats.slow_statements = dict(keep)
+
+            status_key = (method, route, str(status_code))
+            self._status_counts[status_key] = self._status_counts.get(status_key, 0) + 1
+
+    def slow_statements(self) -> Dict[str, List[dict]]:
+        """Top slow statements seen per route, slowest first."""
+        with self._lock:
+            return {
+                f"{method} {route}": [
+                    {"ms": round(seconds * 1000, 2), "statement": statement}
+                    for statement, seconds in sorted(route_stats.slow_statements.items(), key=lambda kv: -kv[1])
+                ]
+                for (method, route), route_stats in self._routes.items()
+            }
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            routes = {key: value for key, value in self._routes.items()}
+            status_counts = dict(self._status_counts)
+
+        lines = [
+            "# HELP macquiz_http_requests_total Total HTTP requests by route template and status.",
+            "# TYPE macquiz_http_requests_total counter",
+        ]
+        for (method, route, status_code), count in sorted(status_counts.items()):
+            lines.append(
+                f'macquiz_http_requests_total{{method="{method}",route="{_escape(route)}",status="{status_code}"}} {count}'
+            )
+
+        lines += [
+            "# HELP macquiz_http_request_duration_seconds Total request latency.",
+            "# TYPE macquiz_http_request_duration_seconds histogram",
+        ]
+        for (method, route), route_stats in sorted(routes.items()):
+            labels = f'method="{method}",route="{_escape(route)}"'
+            for upper, count in zip(DURATION_BUCKETS, route_stats.bucket_counts):
+                lines.append(f'macquiz_http_request_duration_seconds_bucket{{{labels},le="{upper}"}} {count}')
+            lines.append(f'macquiz_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {route_stats.requests}')
+            lines.append(f"macquiz_http_request_duration_seconds_sum{{{labels}}} {route_stats.duration_seconds:.6f}")
+            lines.append(f"macquiz_http_request_duration_seconds_count{{{labels}}} {route_stats.requests}")
+
+        lines += [
+            "# HELP macquiz_db_statements_total SQL statements executed while serving requests.",
+            "# TYPE macquiz_db_statements_total counter",
+        ]
+        for (method, route), route_stats in sorted(routes.items()):
+            lines.append(
+                f'macquiz_db_statements_total{{method="{method}",route="{_escape(route)}"}} {route_stats.statements}'
+            )
+
+        lines += [
+            "# HELP macquiz_db_duration_seconds_total Time spent in SQL statements while serving requests.",
+            "# TYPE macquiz_db_duration_seconds_total counter",
+        ]
+        for (method, route), route_stats in sorted(routes.items()):
+            lines.append(
+                f'macquiz_db_duration_seconds_total{{method="{method}",route="{_escape(route)}"}} {route_stats.db_seconds:.6f}'
+            )
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+            self._status_counts.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_request.get() is not None:
+        conn.info.setdefault("macquiz_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_request.get()
+    if stats is None:
+        return
+    starts = conn.info.get("macquiz_query_start")
+    if not starts:
+        return
+    stats.record_statement(statement, time.perf_counter() - starts.pop())
+
+
+def install(top_n: int = 5) -> None:
+    """Attach SQL timing listeners to every engine. Only called when metrics are enabled."""
+    global _installed
+    registry.top_n = top_n
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+
+
+def instrument(app, top_n: int = 5, slow_request_ms: float = 1000) -> None:
+    """Install the SQL listeners and add the request middleware to ``app`` (only when metrics are enabled).
+
+    Requests are labelled with their route template (``/quizzes/{quiz_id}``),
+    never the raw path, so the number of series stays bounded.
+    """
+    install(top_n=top_n)
+
+    @app.middleware("http")
+    async def record_request_metrics(request, call_next):
+        stats, token = begin_request(top_n=top_n)
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+        finally:
+            end_request(token)
+            total_seconds = time.perf_counter() - stats.started_at
+            route = request.scope.get("route")
+            route_template = getattr(route, "path", "<unmatched>")
+            registry.observe(request.method, route_template, status_code, total_seconds, stats)
+            if total_seconds * 1000 >= slow_request_ms:
+                log_slow_request(request.method, route_template, request.url.path, status_code, total_seconds, stats)
+
+        response.headers["Server-Timing"] = server_timing_header(stats, total_seconds)
+        return response
+
+
+def begin_request(top_n: int = 5):
+    """Start collecting SQL stats for the current request; returns a reset token."""
+    stats = RequestStats(started_at=time.perf_counter(), top_n=top_n)
+    return stats, _current_request.set(stats)
+
+
+def end_request(token) -> None:
+    _current_request.reset(token)
+
+
+def server_timing_header(stats: RequestStats, total_seconds: float) -> str:
+    return (
+        f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.statement_count} queries", '
+        f"app;dur={total_seconds * 1000:.2f}"
+    )
+
+
+def log_slow_request(method: str, route: str, path: str, status_code: int, total_seconds: float, stats: RequestStats) -> None:
+    logger.warning(json.dumps({
+        "event": "slow_request",
+        "method": method,
+        "route": route,
+        "path": path,
+        "status": status_code,
+        "duration_ms": round(total_seconds * 1000, 2),
+        "db_ms": round(stats.db_seconds * 1000, 2),
+        "statements": stats.statement_count,
+        "top_statements": [
+            {"ms": round(seconds * 1000, 2), "statement": statement}
+            for seconds, statement in stats.top_statements()
+        ],
+    }))
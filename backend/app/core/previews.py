@@ -0,0 +1,289 @@
+"""
+Teacher/admin preview attempts, kept outside ``quiz_attempts``/``answers``.
+
+Previews used to be regular ``quiz_attempts``/``answers`` rows that every
+student-facing query had to filter out and every new preview had to delete.
+Now they live in a preview store:
+
+- preview attempts get negative ids, so they never collide with table ids and
+  go through the same ``/attempts/{id}/...`` URLs as real attempts,
+- the attempt and its answers are transient ``QuizAttempt``/``Answer`` objects
+  (never added to a session), graded by the same code as real submissions,
+- each preview expires ``ttl_seconds`` after its last use.
+
+Store backends, picked by PREVIEW_STORAGE like RATE_LIMIT_STORAGE:
+
+- ``PreviewStore`` (``memory``): per process, at most ``max_entries`` previews
+  (least recently used evicted first). With several workers or serverless
+  instances a preview only resolves on the process that started it, so use it
+  with a single worker only.
+- ``DatabasePreviewStore`` (``database``): a ``preview_attempts`` table shared
+  by every worker on the same database; preview ids are the negated row ids.
+  Starting a preview deletes those more than ``max_entries`` ids older.
+- ``RedisPreviewStore`` (``redis://``): one key per preview expiring with its
+  TTL; ids come from an INCR counter.
+
+Callers change a preview in place and then ``save`` it; the shared stores
+hand out copies, so unsaved changes are lost. Their calls block on I/O
+(``blocking``), so async code runs them in the threadpool.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import Boolean, Column, Float, Integer, MetaData, Table, Text, delete, func, insert, select, update
+
+from app.core.config import settings
+from app.core.rate_limit import redis_client, storage_engine
+from app.models.models import Answer, QuizAttempt
+
+logger = logging.getLogger(__name__)
+
+ATTEMPT_FIELDS = (
+    "quiz_id", "student_id", "total_marks", "started_at", "score", "percentage", "answered_count",
+    "correct_count", "last_answer_at", "submitted_at", "time_taken_minutes", "is_completed", "is_graded",
+)
+DATETIME_FIELDS = ("started_at", "last_answer_at", "submitted_at")
+ANSWER_FIELDS = ("question_id", "answer_text", "is_correct", "marks_awarded")
+
+
+def is_preview_id(attempt_id: int) -> bool:
+    return attempt_id < 0
+
+
+@dataclass
+class Preview:
+    attempt: QuizAttempt
+    answers: Dict[int, Answer] = field(default_factory=dict)  # by question id
+    expires_at: float = 0.0
+
+
+def _new_attempt(attempt_id: int, quiz_id: int, user_id: int, total_marks: float,
+                 started_at: Optional[datetime]) -> QuizAttempt:
+    return QuizAttempt(
+        id=attempt_id,
+        quiz_id=quiz_id,
+        student_id=user_id,
+        total_marks=total_marks,
+        started_at=started_at or datetime.now(),
+        answered_count=0,
+        correct_count=0,
+        is_completed=False,
+        is_graded=False,
+    )
+
+
+def dump_preview(preview: Preview) -> str:
+    """The preview's attempt fields and answers as JSON (the id is stored alongside)."""
+    attempt = {name: getattr(preview.attempt, name) for name in ATTEMPT_FIELDS}
+    for name in DATETIME_FIELDS:
+        if attempt[name] is not None:
+            attempt[name] = attempt[name].isoformat()
+    answers = [{name: getattr(answer, name) for name in ANSWER_FIELDS} for answer in preview.answers.values()]
+    return json.dumps({"attempt": attempt, "answers": answers})
+
+
+def load_preview(attempt_id: int, payload: str, expires_at: float) -> Preview:
+    data = json.loads(payload)
+    attempt = data["attempt"]
+    for name in DATETIME_FIELDS:
+        if attempt[name] is not None:
+            attempt[name] = datetime.fromisoformat(attempt[name])
+    return Preview(
+        attempt=QuizAttempt(id=attempt_id, **attempt),
+        answers={row["question_id"]: Answer(attempt_id=attempt_id, **row) for row in data["answers"]},
+        expires_at=expires_at,
+    )
+
+
+class PreviewStore:
+    """Previews in this process's memory; ``get`` returns the stored objects themselves."""
+
+    blocking = False
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 4 * 3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._previews: "OrderedDict[int, Preview]" = OrderedDict()
+        self._ids = itertools.count(-1, -1)
+
+    def start(self, quiz_id: int, user_id: int, total_marks: float, started_at: Optional[datetime] = None) -> QuizAttempt:
+        """Begin a fresh preview, discarding the user's unfinished previews of the quiz."""
+        for attempt_id, preview in list(self._previews.items()):
+            attempt = preview.attempt
+            if attempt.quiz_id == quiz_id and attempt.student_id == user_id and not attempt.is_completed:
+                del self._previews[attempt_id]
+
+        attempt = _new_attempt(next(self._ids), quiz_id, user_id, total_marks, started_at)
+        self._previews[attempt.id] = Preview(attempt=attempt, expires_at=self.clock() + self.ttl_seconds)
+        self._evict()
+        return attempt
+
+    def get(self, attempt_id: int) -> Optional[Preview]:
+        preview = self._previews.get(attempt_id)
+        if preview is None:
+            return None
+        now = self.clock()
+        if preview.expires_at <= now:
+            del self._previews[attempt_id]
+            return None
+        preview.expires_at = now + self.ttl_seconds
+        self._previews.move_to_end(attempt_id)
+        return preview
+
+    def save(self, preview: Preview) -> None:
+        """Nothing to write: ``get`` handed out the stored preview, already changed in place."""
+
+    def _evict(self) -> None:
+        now = self.clock()
+        for attempt_id in [key for key, preview in self._previews.items() if preview.expires_at <= now]:
+            del self._previews[attempt_id]
+        while len(self._previews) > self.max_entries:
+            self._previews.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._previews)
+
+
+preview_metadata = MetaData()
+
+preview_attempts = Table(
+    "preview_attempts",
+    preview_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("quiz_id", Integer, nullable=False),
+    Column("student_id", Integer, nullable=False),
+    Column("is_completed", Boolean, nullable=False, default=False),
+    Column("expires_at", Float, nullable=False, index=True),
+    Column("payload", Text, nullable=False),
+    sqlite_autoincrement=True,  # never reuse a deleted preview's id
+)
+
+
+class DatabasePreviewStore:
+    """Previews in a ``preview_attempts`` table; each call is one short transaction."""
+
+    blocking = True
+
+    def __init__(self, engine, max_entries: int = 1000, ttl_seconds: float = 4 * 3600, clock=time.time):
+        self.engine = engine
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock  # wall clock: expiry times are compared across processes
+        preview_metadata.create_all(engine)
+
+    def start(self, quiz_id: int, user_id: int, total_marks: float, started_at: Optional[datetime] = None) -> QuizAttempt:
+        """Begin a fresh preview, discarding the user's unfinished previews of the quiz."""
+        now = self.clock()
+        preview = Preview(attempt=_new_attempt(None, quiz_id, user_id, total_marks, started_at))
+        with self.engine.begin() as connection:
+            connection.execute(delete(preview_attempts).where(
+                preview_attempts.c.quiz_id == quiz_id,
+                preview_attempts.c.student_id == user_id,
+                preview_attempts.c.is_completed == False,  # noqa: E712
+            ))
+            row_id = connection.execute(insert(preview_attempts).values(
+                quiz_id=quiz_id, student_id=user_id, is_completed=False,
+                expires_at=now + self.ttl_seconds, payload=dump_preview(preview),
+            )).inserted_primary_key[0]
+            connection.execute(delete(preview_attempts).where(
+                (preview_attempts.c.expires_at <= now) | (preview_attempts.c.id <= row_id - self.max_entries)
+            ))
+        preview.attempt.id = -row_id
+        return preview.attempt
+
+    def get(self, attempt_id: int) -> Optional[Preview]:
+        now = self.clock()
+        expires_at = now + self.ttl_seconds
+        with self.engine.begin() as connection:
+            payload = connection.scalar(select(preview_attempts.c.payload).where(
+                preview_attempts.c.id == -attempt_id, preview_attempts.c.expires_at > now,
+            ))
+            if payload is None:
+                return None
+            connection.execute(
+                update(preview_attempts).where(preview_attempts.c.id == -attempt_id).values(expires_at=expires_at)
+            )
+        return load_preview(attempt_id, payload, expires_at)
+
+    def save(self, preview: Preview) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(update(preview_attempts).where(preview_attempts.c.id == -preview.attempt.id).values(
+                is_completed=bool(preview.attempt.is_completed),
+                expires_at=self.clock() + self.ttl_seconds,
+                payload=dump_preview(preview),
+            ))
+
+    def __len__(self) -> int:
+        with self.engine.connect() as connection:
+            return connection.scalar(
+                select(func.count()).select_from(preview_attempts).where(preview_attempts.c.expires_at > self.clock())
+            )
+
+
+class RedisPreviewStore:
+    """Previews on a Redis-protocol server: one JSON value per preview, expiring with its TTL."""
+
+    blocking = True
+
+    def __init__(self, url: str, ttl_seconds: float = 4 * 3600, prefix: str = "macquiz:preview:", client=None):
+        if client is None:
+            client = redis_client(url, "PREVIEW_STORAGE")
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    @property
+    def _ttl_ms(self) -> int:
+        return int(self.ttl_seconds * 1000)
+
+    def start(self, quiz_id: int, user_id: int, total_marks: float, started_at: Optional[datetime] = None) -> QuizAttempt:
+        """Begin a fresh preview, discarding the user's unfinished preview of the quiz."""
+        attempt = _new_attempt(-self.client.incr(self.prefix + "ids"), quiz_id, user_id, total_marks, started_at)
+        latest_key = f"{self.prefix}latest:{quiz_id}:{user_id}"
+        previous = self.client.set(latest_key, attempt.id, px=self._ttl_ms, get=True)
+        if previous is not None:
+            replaced = self.client.get(f"{self.prefix}{int(previous)}")
+            if replaced is not None and not json.loads(replaced)["attempt"]["is_completed"]:
+                self.client.delete(f"{self.prefix}{int(previous)}")
+        self.save(Preview(attempt=attempt))
+        return attempt
+
+    def get(self, attempt_id: int) -> Optional[Preview]:
+        payload = self.client.get(f"{self.prefix}{attempt_id}")
+        if payload is None:
+            return None
+        self.client.pexpire(f"{self.prefix}{attempt_id}", self._ttl_ms)
+        return load_preview(attempt_id, payload, time.time() + self.ttl_seconds)
+
+    def save(self, preview: Preview) -> None:
+        self.client.set(f"{self.prefix}{preview.attempt.id}", dump_preview(preview), px=self._ttl_ms)
+
+
+def build_preview_store(storage: str = None, database_url: str = None):
+    """Store named by PREVIEW_STORAGE: ``memory``, ``database`` or a ``redis://`` URL."""
+    storage = storage or settings.PREVIEW_STORAGE
+    limits = {"ttl_seconds": settings.PREVIEW_TTL_SECONDS}
+    if storage == "memory":
+        if int(os.environ.get("WEB_CONCURRENCY", "1") or 1) > 1:
+            logger.warning("PREVIEW_STORAGE=memory with WEB_CONCURRENCY > 1: previews only resolve on the "
+                           "worker that started them; use PREVIEW_STORAGE=database or a redis:// URL")
+        return PreviewStore(max_entries=settings.PREVIEW_MAX_ATTEMPTS, **limits)
+    if storage == "database":
+        return DatabasePreviewStore(storage_engine(database_url), max_entries=settings.PREVIEW_MAX_ATTEMPTS, **limits)
+    if storage.startswith(("redis://", "rediss://", "unix://")):
+        return RedisPreviewStore(storage, **limits)
+    raise ValueError(f"Unknown PREVIEW_STORAGE '{storage}' (use memory, database or a redis:// URL)")
+
+
+preview_store = build_preview_store()
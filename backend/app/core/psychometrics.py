@@ -0,0 +1,242 @@
+"""
+Classical test theory item analysis for a quiz.
+
+``analyze_quiz`` loads every answer of the quiz's completed attempts in one
+query, builds dense attempts x questions matrices (scored 0/1, and the option
+picked) and computes with NumPy, without per-answer Python loops:
+
+- difficulty index: share of attempts answering the question correctly,
+- point-biserial discrimination: correlation of the question with the rest
+  of the test (total minus the question, so it does not correlate with itself),
+- upper/lower discrimination: difficulty in the top minus the bottom 27% of
+  attempts by total,
+- KR-20 reliability of the quiz,
+- option shares (overall, upper and lower group) and distractor efficiency:
+  the percentage of a MCQ's wrong options picked by at least 5% of attempts.
+
+Unanswered questions score 0. The query returns one row per attempt, its
+answers packed into integers (``question_id << 4 | correct << 3 | choice``)
+and concatenated, since fetching one row per answer dominated the cost.
+Results are cached per quiz (``AnalysisCache``) until its completed attempts,
+questions (``content_version``) or answer keys change.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import String, case, cast, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.item_stats import OPTION_COLUMNS
+from app.models.models import Answer, Question, Quiz, QuizAttempt
+
+OPTION_LETTERS = tuple(OPTION_COLUMNS)  # choice codes 1..4; 0 = unanswered, 5 = anything else
+OTHER_CHOICE = len(OPTION_LETTERS) + 1
+GROUP_FRACTION = 0.27
+FUNCTIONAL_DISTRACTOR_SHARE = 0.05
+GROUP_CONCAT_MAX_LEN = 1 << 20
+
+
+class AnalysisCache:
+    """Latest analysis per quiz, valid while its stamp (content version, attempts, answer keys) is unchanged."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+
+    def get(self, quiz_id: int, stamp: Hashable) -> Optional[dict]:
+        entry = self._entries.get(quiz_id)
+        if entry is None or entry[0] != stamp:
+            return None
+        self._entries.move_to_end(quiz_id)
+        return entry[1]
+
+    def put(self, quiz_id: int, stamp: Hashable, analysis: dict) -> None:
+        self._entries[quiz_id] = (stamp, analysis)
+        self._entries.move_to_end(quiz_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, quiz_id: int) -> None:
+        """Drop the quiz's entry, for changes its stamp does not see (regraded answers)."""
+        self._entries.pop(quiz_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+analysis_cache = AnalysisCache(max_entries=settings.ITEM_ANALYSIS_CACHE_QUIZZES)
+
+
+def build_matrices(rows: Sequence, question_ids: Sequence[int]):
+    """Dense (correct, choice) matrices from ``(attempt_id, "packed,packed,...")`` rows.
+
+    Attempts without answers still get a (zero) matrix row; answers to
+    questions not in ``question_ids`` are ignored.
+    """
+    questions = len(question_ids)
+    correct = np.zeros((len(rows), questions), dtype=np.int8)
+    choices = np.zeros((len(rows), questions), dtype=np.int8)
+    if not rows or not questions:
+        return correct, choices
+    packed = np.fromstring(",".join(answers for _, answers in rows), dtype=np.int64, sep=",")
+    attempt_index = np.repeat(np.arange(len(rows)), [answers.count(",") + 1 for _, answers in rows])
+    answer_question = packed >> 4
+
+    ids = np.asarray(question_ids, dtype=np.int64)
+    order = np.argsort(ids)
+    position = np.minimum(np.searchsorted(ids[order], answer_question), questions - 1)
+    known = ids[order][position] == answer_question
+    column = order[position]
+    correct[attempt_index[known], column[known]] = (packed[known] >> 3) & 1
+    choices[attempt_index[known], column[known]] = packed[known] & 7
+    return correct, choices
+
+
+def _number(value) -> Optional[float]:
+    value = float(value)
+    return None if math.isnan(value) else round(value, 4)
+
+
+def item_analysis(correct: np.ndarray, choices: np.ndarray, keys: Sequence[Optional[str]],
+                  options: Sequence[Sequence[str]]) -> dict:
+    """CTT metrics for ``correct``/``choices`` (attempts x questions).
+
+    ``keys`` is each question's correct letter (None unless A-D) and ``options``
+    the letters each question actually offers.
+    """
+    attempts, questions = correct.shape
+    if attempts == 0 or questions == 0:
+        return {"attempts": attempts, "mean_score": None, "kr20": None, "items": [{} for _ in range(questions)]}
+
+    scored = correct.astype(np.float64)
+    totals = scored.sum(axis=1)
+    difficulty = scored.mean(axis=0)
+
+    rest = totals[:, None] - scored
+    item_dev = scored - difficulty
+    rest_dev = rest - rest.mean(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        point_biserial = (item_dev * rest_dev).sum(axis=0) / np.sqrt(
+            (item_dev ** 2).sum(axis=0) * (rest_dev ** 2).sum(axis=0)
+        )
+
+    group = max(1, int(round(attempts * GROUP_FRACTION)))
+    ranked = np.argsort(totals, kind="stable")
+    lower, upper = ranked[:group], ranked[-group:]
+    discrimination = scored[upper].mean(axis=0) - scored[lower].mean(axis=0)
+
+    variance = totals.var()
+    kr20 = None
+    if questions > 1 and variance > 0:
+        kr20 = questions / (questions - 1) * (1 - (difficulty * (1 - difficulty)).sum() / variance)
+
+    codes = np.arange(1, len(OPTION_LETTERS) + 1, dtype=np.int8)
+    picked = choices[:, :, None] == codes  # attempts x questions x options
+    shares = picked.mean(axis=0)
+    upper_shares = picked[upper].mean(axis=0)
+    lower_shares = picked[lower].mean(axis=0)
+
+    items = []
+    for column in range(questions):
+        option_stats = {
+            letter: {
+                "share": _number(shares[column, index]),
+                "upper_share": _number(upper_shares[column, index]),
+                "lower_share": _number(lower_shares[column, index]),
+            }
+            for index, letter in enumerate(OPTION_LETTERS)
+            if letter in options[column]
+        }
+        distractors = [letter for letter in option_stats if keys[column] is not None and letter != keys[column]]
+        efficiency = None
+        if distractors:
+            functional = sum(option_stats[letter]["share"] >= FUNCTIONAL_DISTRACTOR_SHARE for letter in distractors)
+            efficiency = round(functional / len(distractors) * 100, 2)
+        items.append({
+            "difficulty": _number(difficulty[column]),
+            "point_biserial": _number(point_biserial[column]),
+            "discrimination": _number(discrimination[column]),
+            "options": option_stats,
+            "distractor_efficiency": efficiency,
+        })
+    return {
+        "attempts": attempts,
+        "mean_score": _number(totals.mean()),
+        "kr20": _number(kr20) if kr20 is not None else None,
+        "items": items,
+    }
+
+
+def _packed_answer():
+    """``question_id << 4 | correct << 3 | choice`` as text; 5 (question 0) for an attempt without answers."""
+    choice = case(
+        {letter: code for code, letter in enumerate(OPTION_LETTERS, start=1)},
+        value=func.upper(func.trim(Answer.answer_text)),
+        else_=OTHER_CHOICE,
+    )
+    correct = case((Answer.is_correct == True, 8), else_=0)  # noqa: E712
+    return cast(func.coalesce(Answer.question_id, 0) * 16 + correct + choice, String)
+
+
+def _offered(question: Question) -> List[str]:
+    texts = (question.option_a, question.option_b, question.option_c, question.option_d)
+    return [letter for letter, text in zip(OPTION_LETTERS, texts) if text not in (None, "")]
+
+
+def _key(question: Question) -> Optional[str]:
+    key = (question.correct_answer or "").strip().upper()
+    return key if key in OPTION_LETTERS and question.question_type == "mcq" else None
+
+
+async def analyze_quiz(db: AsyncSession, quiz: Quiz) -> dict:
+    """The quiz's item analysis, from the cache unless attempts or answer keys changed."""
+    questions = (await db.scalars(
+        select(Question).where(Question.quiz_id == quiz.id).order_by(Question.order, Question.id)
+    )).all()
+    completed, last_submitted = (await db.execute(
+        select(func.count(QuizAttempt.id), func.max(QuizAttempt.submitted_at))
+        .where(QuizAttempt.quiz_id == quiz.id, QuizAttempt.is_completed == True)  # noqa: E712
+    )).one()
+    stamp = (
+        quiz.content_version,
+        completed,
+        last_submitted,
+        tuple((question.id, _key(question), tuple(_offered(question))) for question in questions),
+    )
+    cached = analysis_cache.get(quiz.id, stamp)
+    if cached is not None:
+        return cached
+
+    if db.get_bind().dialect.name == "mysql":
+        await db.execute(text(f"SET SESSION group_concat_max_len = {GROUP_CONCAT_MAX_LEN}"))  # default is 1024 bytes
+    rows = (await db.execute(
+        select(QuizAttempt.id, func.aggregate_strings(_packed_answer(), ","))
+        .outerjoin(Answer, Answer.attempt_id == QuizAttempt.id)
+        .where(QuizAttempt.quiz_id == quiz.id, QuizAttempt.is_completed == True)  # noqa: E712
+        .group_by(QuizAttempt.id)
+    )).all()
+
+    correct, choices = build_matrices(rows, [question.id for question in questions])
+    metrics = item_analysis(
+        correct, choices, [_key(question) for question in questions], [_offered(question) for question in questions]
+    )
+    analysis = {
+        "quiz_id": quiz.id,
+        "quiz_title": quiz.title,
+        "attempts": metrics["attempts"],
+        "questions": len(questions),
+        "mean_score": metrics["mean_score"],
+        "kr20": metrics["kr20"],
+        "items": [
+            {"question_id": question.id, "order": question.order, "correct_answer": question.correct_answer, **item}
+            for question, item in zip(questions, metrics["items"])
+        ],
+    }
+    analysis_cache.put(quiz.id, stamp, analysis)
+    return analysis
@@ -1,9 +1,38 @@
+"""
+Rate limiting with GCRA (generic cell rate algorithm) and pluggable storage.
+
+Each key stores a single number, its theoretical arrival time (TAT). A limit
+of ``limit`` requests per ``period`` seconds spaces requests ``period / limit``
+apart and tolerates a burst of ``limit``; a check reads and writes that one
+value, so it is O(1) whatever the limit.
+
+Storage backends:
+
+- ``MemoryStorage``: per process, bounded to ``max_keys`` with LRU eviction;
+  keys whose TAT has passed are dropped as they reach the LRU end.
+- ``DatabaseStorage``: a ``rate_limits`` table, shared by every worker that
+  uses the same database.
+- ``RedisStorage``: any server speaking the Redis protocol with EVAL (Redis,
+  Valkey, KeyDB, a local stand-in); needs the ``redis`` package. Keys expire
+  with their TAT.
+
+``default_rules()`` maps requests (login, save-answer, export) to limits from
+settings; ``app.main`` applies them as middleware.
+"""
+
 from __future__ import annotations
 
-from collections import deque
-from dataclasses import dataclass
+import hashlib
+import re
+import threading
 import time
-from typing import Deque, Dict
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from sqlalchemy import Column, Float, MetaData, String, Table, create_engine, exc, insert, select, update
+
+from app.core.config import settings
 
 
 @dataclass
@@ -12,30 +41,222 @@ class RateLimitResult:
     retry_after_seconds: int | None = None
 
 
-# In-memory sliding-window counters.
-# Note: resets on process restart and isn't shared across workers.
-_requests: Dict[str, Deque[float]] = {}
+def gcra(tat: Optional[float], now: float, interval: float, period: float) -> Tuple[Optional[float], float]:
+    """One GCRA step: ``(new_tat, 0.0)`` when allowed, ``(None, retry_after)`` when not."""
+    new_tat = max(tat or now, now) + interval
+    allow_at = new_tat - period
+    if now < allow_at:
+        return None, allow_at - now
+    return new_tat, 0.0
+
+
+class MemoryStorage:
+    """In-process TATs. Not shared across workers; resets on restart."""
+
+    blocking = False
 
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
 
-def check_rate_limit(key: str, limit: int, window_seconds: int) -> RateLimitResult:
-    """Simple sliding-window rate limiter.
+    def __len__(self) -> int:
+        return len(self._tats)
 
-    Returns whether the request is allowed, and (if blocked) how long to wait.
+    def acquire(self, key: str, now: float, interval: float, period: float) -> float:
+        with self._lock:
+            new_tat, retry_after = gcra(self._tats.get(key), now, interval, period)
+            if new_tat is not None:
+                self._tats[key] = new_tat
+                self._tats.move_to_end(key)
+                self._evict(now)
+            return retry_after
+
+    def _evict(self, now: float) -> None:
+        while self._tats:
+            oldest_key, oldest_tat = next(iter(self._tats.items()))
+            if oldest_tat > now and len(self._tats) <= self.max_keys:
+                break
+            del self._tats[oldest_key]
+
+
+rate_limit_metadata = MetaData()
+
+rate_limits = Table(
+    "rate_limits",
+    rate_limit_metadata,
+    Column("key", String(255), primary_key=True),
+    Column("tat", Float, nullable=False),
+)
+
+
+class DatabaseStorage:
+    """TATs in a ``rate_limits`` table; each check is one short transaction.
+
+    The row is locked with SELECT ... FOR UPDATE; on SQLite pass an engine
+    whose transactions start with BEGIN IMMEDIATE (see
+    ``app.db.sqlite_writer.use_immediate_transactions``) so checks serialize.
     """
-    now = time.monotonic()
-    window_start = now - window_seconds
 
-    bucket = _requests.get(key)
-    if bucket is None:
-        bucket = deque()
-        _requests[key] = bucket
+    blocking = True
+
+    def __init__(self, engine, purge_every: int = 1000):
+        self.engine = engine
+        self.purge_every = purge_every
+        self._checks = 0
+        rate_limit_metadata.create_all(engine)
+
+    def acquire(self, key: str, now: float, interval: float, period: float) -> float:
+        for attempt in range(2):
+            try:
+                retry_after = self._acquire(key, now, interval, period)
+                break
+            except exc.IntegrityError:  # another worker inserted the key first
+                if attempt:
+                    raise
+        self._checks += 1
+        if self._checks % self.purge_every == 0:
+            self.purge(now)
+        return retry_after
+
+    def _acquire(self, key: str, now: float, interval: float, period: float) -> float:
+        with self.engine.begin() as connection:
+            tat = connection.scalar(select(rate_limits.c.tat).where(rate_limits.c.key == key).with_for_update())
+            new_tat, retry_after = gcra(tat, now, interval, period)
+            if new_tat is not None:
+                if tat is None:
+                    connection.execute(insert(rate_limits).values(key=key, tat=new_tat))
+                else:
+                    connection.execute(update(rate_limits).where(rate_limits.c.key == key).values(tat=new_tat))
+            return retry_after
+
+    def purge(self, now: float) -> int:
+        """Delete keys whose TAT has passed; they behave exactly like absent keys."""
+        with self.engine.begin() as connection:
+            return connection.execute(rate_limits.delete().where(rate_limits.c.tat <= now)).rowcount
+
+
+# Returns the retry delay as a string: Lua numbers are truncated to integers in replies.
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local period = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or ARGV[1])
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if now < allow_at then return tostring(allow_at - now) end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return '0'
+"""
+
+
+def redis_client(url: str, setting: str):
+    """A client for ``url``; ``setting`` names the option in the missing-package error."""
+    try:
+        import redis
+    except ImportError as error:
+        raise RuntimeError(f"{setting} is a redis:// URL but the 'redis' package is not installed") from error
+    return redis.Redis.from_url(url, socket_timeout=1.0)
+
+
+class RedisStorage:
+    """TATs on a Redis-protocol server, updated atomically by a Lua script."""
+
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "macquiz:rl:", client=None):
+        if client is None:
+            client = redis_client(url, "RATE_LIMIT_STORAGE")
+        self.prefix = prefix
+        self._script = client.register_script(GCRA_SCRIPT)
+
+    def acquire(self, key: str, now: float, interval: float, period: float) -> float:
+        reply = self._script(keys=[self.prefix + key], args=[repr(now), repr(interval), repr(period)])
+        return float(reply)
+
+
+class RateLimiter:
+    def __init__(self, storage, clock=time.time):
+        self.storage = storage
+        self.clock = clock
+
+    def check(self, key: str, limit: int, period: float) -> RateLimitResult:
+        retry_after = self.storage.acquire(key, self.clock(), period / limit, period)
+        if retry_after > 0:
+            return RateLimitResult(allowed=False, retry_after_seconds=max(1, int(retry_after + 0.999)))
+        return RateLimitResult(allowed=True)
+
+
+def storage_engine(database_url: str = None):
+    """A sync engine on ``DATABASE_URL`` for shared state tables; SQLite transactions begin IMMEDIATE."""
+    from app.db.pool import install_sqlite_pragmas, pool_kwargs
+    from app.db.sqlite_writer import use_immediate_transactions
+
+    database_url = database_url or settings.DATABASE_URL
+    engine = create_engine(database_url, **pool_kwargs(database_url))
+    if engine.dialect.name == "sqlite":
+        install_sqlite_pragmas(engine)
+        use_immediate_transactions(engine)
+    return engine
+
+
+def build_storage(storage: str = None, database_url: str = None):
+    """Storage named by RATE_LIMIT_STORAGE: ``memory``, ``database`` or a ``redis://`` URL."""
+    storage = storage or settings.RATE_LIMIT_STORAGE
+    if storage == "memory":
+        return MemoryStorage(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+    if storage == "database":
+        return DatabaseStorage(storage_engine(database_url))
+    if storage.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStorage(storage)
+    raise ValueError(f"Unknown RATE_LIMIT_STORAGE '{storage}' (use memory, database or a redis:// URL)")
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    method: str
+    path: re.Pattern
+    limit: int
+    period: float
+    per: str  # "ip" or "token"
+    message: str = "Too many requests. Please try again later."
+
+    def key_for(self, request) -> str:
+        client = request.client.host if request.client else "unknown"
+        if self.per == "token":
+            authorization = request.headers.get("authorization", "")
+            if authorization:
+                # A digest of the bearer token: unlike unverified JWT claims it cannot be
+                # forged to spend another user's budget.
+                client = "t:" + hashlib.sha256(authorization.encode()).hexdigest()[:32]
+        return f"{self.name}:{client}"
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """``"10/300"`` -> 10 requests per 300 seconds."""
+    limit, _, period = rate.partition("/")
+    if not limit.strip().isdigit() or int(limit) < 1 or float(period or 0) <= 0:
+        raise ValueError(f"Invalid rate '{rate}'; expected '<requests>/<seconds>'")
+    return int(limit), float(period)
+
 
-    while bucket and bucket[0] < window_start:
-        bucket.popleft()
+def default_rules() -> list:
+    login = parse_rate(settings.RATE_LIMIT_LOGIN)
+    save_answer = parse_rate(settings.RATE_LIMIT_SAVE_ANSWER)
+    export = parse_rate(settings.RATE_LIMIT_EXPORT)
+    return [
+        RateLimitRule("login", "POST", re.compile(r"^/api/v1/auth/login(-json)?$"), *login, per="ip",
+                      message="Too many login attempts. Please try again later."),
+        RateLimitRule("save-answer", "POST", re.compile(r"^/api/v1/attempts/\d+/save-answer$"), *save_answer,
+                      per="token"),
+        RateLimitRule("export", "GET", re.compile(r"^/api/v1/attempts/export$"), *export, per="token"),
+    ]
 
-    if len(bucket) >= limit:
-        retry_after = int(max(1, bucket[0] + window_seconds - now))
-        return RateLimitResult(allowed=False, retry_after_seconds=retry_after)
 
-    bucket.append(now)
-    return RateLimitResult(allowed=True)
+def match_rule(rules, method: str, path: str) -> Optional[RateLimitRule]:
+    for rule in rules:
+        if rule.method == method and rule.path.match(path):
+            return rule
+    return None
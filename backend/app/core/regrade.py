@@ -0,0 +1,350 @@
+"""
+Set-based regrading of completed attempts after an answer key or marking change.
+
+A regrade covers a quiz, or one of its questions, and re-marks the stored
+answers with the current ``correct_answer``/``marks`` and the quiz's
+``negative_marking`` (the submit rules). ``RegradeRunner`` works through the
+quiz's completed attempts in chunks of ``chunk_size`` ids, one transaction per
+chunk, each a handful of statements whatever the chunk size:
+
+1. take the chunk's in-scope answers out of ``question_stats``,
+2. ``UPDATE answers ... FROM questions, quizzes`` where ``is_correct`` or
+   ``marks_awarded`` changes (only answers to the regraded questions),
+3. put them back into ``question_stats``,
+4. ``UPDATE quiz_attempts`` score, correct_count, total_marks and percentage
+   where they drifted from the answers and the quiz's current question marks,
+   then the sanity flags.
+
+An attempt's ``total_marks`` is a snapshot taken at start, so after a marks
+change it is reset to the quiz's current total (the sum of its question
+marks) together with the score; ``quizzes.total_marks`` is synced when a job
+starts.
+
+Jobs are ``RegradeJob`` rows, so progress survives the request and a queued
+job is picked up by any process's runner. ``score_changes`` is the dry run:
+the same rules as a SELECT of attempts whose score would change.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.answer_keys import normalized_answer
+from app.core.config import settings
+from app.core.item_stats import record_answers
+from app.core.psychometrics import analysis_cache
+from app.core.sanity_flags import sanity_flags_expression
+from app.models.models import Answer, Question, Quiz, QuizAttempt, RegradeJob
+
+logger = logging.getLogger(__name__)
+
+SCORE_TOLERANCE = 1e-6
+
+
+def _in_scope(question_id: Optional[int]):
+    return Question.id == question_id if question_id is not None else true()
+
+
+def _regraded():
+    """``(is_correct, marks_awarded)`` of the current answers row under the current key and marking."""
+    is_correct = normalized_answer(Answer.answer_text) == normalized_answer(Question.correct_answer)
+    negative_marking = func.coalesce(Quiz.negative_marking, 0)
+    marks = case(
+        (is_correct, func.coalesce(Question.marks, 0)),
+        (negative_marking > 0, -negative_marking),
+        else_=0.0,
+    )
+    return is_correct, marks
+
+
+def quiz_total_marks(quiz_id: int):
+    """The quiz's current total: the sum of its questions' marks."""
+    return (
+        select(func.coalesce(func.sum(Question.marks), 0.0))
+        .where(Question.quiz_id == quiz_id)
+        .scalar_subquery()
+    )
+
+
+def _percentage(score, total):
+    return case((total > 0, score / total * 100), else_=0.0)
+
+
+def _completed_attempts(quiz_id: int, attempt_range: Tuple[int, int]):
+    low, high = attempt_range
+    return and_(
+        QuizAttempt.quiz_id == quiz_id,
+        QuizAttempt.is_completed == True,  # noqa: E712
+        QuizAttempt.id >= low,
+        QuizAttempt.id < high,
+    )
+
+
+def score_changes(quiz_id: int, question_id: Optional[int] = None):
+    """Completed attempts whose score or total would change, with old and new score/total/percentage."""
+    is_correct, marks = _regraded()
+    answer_marks = case(
+        (Answer.id.is_(None), 0.0),
+        (_in_scope(question_id), marks),
+        else_=func.coalesce(Answer.marks_awarded, 0.0),
+    )
+    raw = func.coalesce(func.sum(answer_marks), 0.0)
+    new_score = case((raw > 0, raw), else_=0.0)
+    new_total = quiz_total_marks(quiz_id)
+    return (
+        select(
+            QuizAttempt.id,
+            QuizAttempt.student_id,
+            QuizAttempt.score.label("old_score"),
+            new_score.label("new_score"),
+            QuizAttempt.total_marks.label("old_total_marks"),
+            new_total.label("new_total_marks"),
+            QuizAttempt.percentage.label("old_percentage"),
+            _percentage(new_score, new_total).label("new_percentage"),
+        )
+        .join(Quiz, Quiz.id == QuizAttempt.quiz_id)
+        .outerjoin(Answer, Answer.attempt_id == QuizAttempt.id)
+        .outerjoin(Question, Question.id == Answer.question_id)
+        .where(QuizAttempt.quiz_id == quiz_id, QuizAttempt.is_completed == True)  # noqa: E712
+        .group_by(QuizAttempt.id, QuizAttempt.student_id, QuizAttempt.score, QuizAttempt.percentage,
+                  QuizAttempt.total_marks)
+        .having(or_(
+            QuizAttempt.score.is_(None),
+            func.abs(QuizAttempt.score - new_score) > SCORE_TOLERANCE,
+            func.abs(func.coalesce(QuizAttempt.total_marks, 0.0) - new_total) > SCORE_TOLERANCE,
+        ))
+        .order_by(QuizAttempt.id)
+    )
+
+
+async def regrade_attempts(
+    db: AsyncSession, quiz_id: int, question_id: Optional[int], attempt_range: Tuple[int, int]
+) -> int:
+    """Regrade the quiz's completed attempts with ids in ``[low, high)``; returns attempts changed."""
+    in_range = select(QuizAttempt.id).where(_completed_attempts(quiz_id, attempt_range))
+    scoped_answers = and_(
+        Answer.attempt_id.in_(in_range),
+        Answer.question_id == question_id if question_id is not None else true(),
+    )
+    is_correct, marks = _regraded()
+
+    await db.execute(record_answers(scoped_answers, sign=-1))
+    await db.execute(
+        update(Answer)
+        .where(
+            Answer.question_id == Question.id,
+            Question.quiz_id == Quiz.id,
+            Quiz.id == quiz_id,
+            _in_scope(question_id),
+            Answer.attempt_id.in_(in_range),
+            or_(
+                Answer.is_correct.is_(None),
+                Answer.is_correct != is_correct,
+                func.abs(func.coalesce(Answer.marks_awarded, 0.0) - marks) > SCORE_TOLERANCE,
+            ),
+        )
+        .values(is_correct=is_correct, marks_awarded=marks)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(record_answers(scoped_answers))
+
+    raw = (
+        select(func.coalesce(func.sum(Answer.marks_awarded), 0.0))
+        .where(Answer.attempt_id == QuizAttempt.id)
+        .correlate(QuizAttempt)
+        .scalar_subquery()
+    )
+    correct = (
+        select(func.count(Answer.id))
+        .where(Answer.attempt_id == QuizAttempt.id, Answer.is_correct == True)  # noqa: E712
+        .correlate(QuizAttempt)
+        .scalar_subquery()
+    )
+    new_score = case((raw > 0, raw), else_=0.0)
+    new_total = quiz_total_marks(quiz_id)
+    changed = await db.execute(
+        update(QuizAttempt)
+        .where(
+            _completed_attempts(quiz_id, attempt_range),
+            or_(
+                QuizAttempt.score.is_(None),
+                func.abs(QuizAttempt.score - new_score) > SCORE_TOLERANCE,
+                QuizAttempt.correct_count != correct,
+                func.abs(func.coalesce(QuizAttempt.total_marks, 0.0) - new_total) > SCORE_TOLERANCE,
+            ),
+        )
+        .values(
+            score=new_score,
+            total_marks=new_total,
+            percentage=_percentage(new_score, new_total),
+            correct_count=correct,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    flags = sanity_flags_expression()
+    await db.execute(
+        update(QuizAttempt)
+        .where(_completed_attempts(quiz_id, attempt_range), QuizAttempt.sanity_flags != flags)
+        .values(sanity_flags=flags)
+        .execution_options(synchronize_session=False)
+    )
+    return changed.rowcount
+
+
+async def queue_regrade(
+    db: AsyncSession, quiz_id: int, question_id: Optional[int] = None, requested_by: Optional[int] = None
+) -> RegradeJob:
+    """Add a queued job (flushed, not committed); notify the runner once committed."""
+    total = await db.scalar(select(func.count(QuizAttempt.id)).where(
+        QuizAttempt.quiz_id == quiz_id, QuizAttempt.is_completed == True  # noqa: E712
+    ))
+    job = RegradeJob(
+        quiz_id=quiz_id, question_id=question_id, requested_by=requested_by,
+        status="queued", total_attempts=total or 0, created_at=datetime.now(),
+    )
+    db.add(job)
+    await db.flush()
+    return job
+
+
+class RegradeRunner:
+    def __init__(self, chunk_size: int = 1000, poll_seconds: float = 5.0):
+        self.chunk_size = chunk_size
+        self.poll_seconds = poll_seconds
+        self.session_factory = None
+        self.write_queue = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    async def _transaction(self, work):
+        if self.write_queue is not None:
+            return await self.write_queue.submit(work)
+        async with self.session_factory() as session:
+            result = await work(session)
+            await session.commit()
+            return result
+
+    async def process(self, job_id: int) -> str:
+        """Run one queued job to completion; returns its resulting status."""
+
+        async def claim(session: AsyncSession):
+            claimed = await session.execute(
+                update(RegradeJob)
+                .where(RegradeJob.id == job_id, RegradeJob.status == "queued")
+                .values(status="running", started_at=datetime.now())
+                .execution_options(synchronize_session=False)
+            )
+            if claimed.rowcount != 1:
+                return None
+            target = (await session.execute(
+                select(RegradeJob.quiz_id, RegradeJob.question_id).where(RegradeJob.id == job_id)
+            )).one()
+            await session.execute(
+                update(Quiz)
+                .where(Quiz.id == target.quiz_id)
+                .values(total_marks=quiz_total_marks(target.quiz_id))
+                .execution_options(synchronize_session=False)
+            )
+            return target
+
+        target = await self._transaction(claim)
+        if target is None:
+            return "skipped"  # running or done elsewhere
+        quiz_id, question_id = target
+
+        async def finish(session: AsyncSession, outcome: str, detail: Optional[str] = None):
+            await session.execute(
+                update(RegradeJob)
+                .where(RegradeJob.id == job_id)
+                .values(status=outcome, detail=detail, finished_at=datetime.now())
+                .execution_options(synchronize_session=False)
+            )
+            return outcome
+
+        last_id = 0
+        try:
+            while True:
+                async def chunk(session: AsyncSession, after: int = last_id):
+                    ids = (await session.scalars(
+                        select(QuizAttempt.id)
+                        .where(QuizAttempt.quiz_id == quiz_id, QuizAttempt.is_completed == True,  # noqa: E712
+                               QuizAttempt.id > after)
+                        .order_by(QuizAttempt.id)
+                        .limit(self.chunk_size)
+                    )).all()
+                    if not ids:
+                        return None
+                    changed = await regrade_attempts(session, quiz_id, question_id, (ids[0], ids[-1] + 1))
+                    await session.execute(
+                        update(RegradeJob)
+                        .where(RegradeJob.id == job_id)
+                        .values(
+                            processed_attempts=RegradeJob.processed_attempts + len(ids),
+                            changed_attempts=RegradeJob.changed_attempts + changed,
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                    return ids[-1]
+
+                last_id = await self._transaction(chunk)
+                if last_id is None:
+                    break
+            outcome = await self._transaction(lambda session: finish(session, "done"))
+        except Exception as error:
+            logger.exception("Regrade job %s failed", job_id)
+            outcome = await self._transaction(lambda session: finish(session, "failed", str(error)))
+        analysis_cache.discard(quiz_id)
+        return outcome
+
+    async def run_pending(self) -> int:
+        """Run every queued job in this task; returns how many were processed."""
+        async with self.session_factory() as session:
+            job_ids = (await session.scalars(
+                select(RegradeJob.id).where(RegradeJob.status == "queued").order_by(RegradeJob.id)
+            )).all()
+        for job_id in job_ids:
+            await self.process(job_id)
+        return len(job_ids)
+
+    def notify(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_pending()
+            except Exception:
+                logger.exception("Running regrade jobs failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self, session_factory, write_queue=None) -> None:
+        self.session_factory = session_factory
+        self.write_queue = write_queue
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="regrade")
+
+    async def stop(self) -> None:
+        """Stop the runner; a job in progress is left ``running`` (regrading is idempotent, re-queue it)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._wake = None
+
+
+regrade_runner = RegradeRunner(chunk_size=settings.REGRADE_CHUNK_SIZE, poll_seconds=settings.REGRADE_POLL_SECONDS)
@@ -0,0 +1,103 @@
+"""
+Attempt sanity flags, stored as a bitmask on ``quiz_attempts.sanity_flags``.
+
+The rules are a single SQL expression (``sanity_flags_expression``) over the
+attempt row, its quiz's marking scheme and question count, so the same
+definition serves every writer:
+
+- grading and expiry finalization set the flags for that one attempt,
+- a quiz marking-scheme or question change recomputes the quiz's completed
+  attempts with one ``UPDATE``,
+- fix_attempt_data.py recomputes every attempt after the rules change.
+
+Readers decode the stored bits (``flag_names``) and the review queue filters
+on ``sanity_flags > 0`` through ``ix_quiz_attempts_sanity_flags``. Bits are
+positional: append new flags, never reorder.
+"""
+
+from typing import List
+
+from sqlalchemy import and_, case, func, select, update
+
+from app.models.models import Question, Quiz, QuizAttempt
+
+SANITY_FLAGS = (
+    "negative_score",
+    "score_exceeds_total",
+    "percentage_out_of_range",
+    "correct_exceeds_answered",
+    "answered_exceeds_total",
+    "high_correct_zero_score",
+    "very_fast_completion",
+)
+FLAG_BITS = {name: 1 << position for position, name in enumerate(SANITY_FLAGS)}
+
+SCORE_TOLERANCE = 1e-6
+PERCENTAGE_TOLERANCE = 0.1
+HIGH_CORRECT_RATIO = 0.5
+# Completing a quiz of at least this many questions in under this many minutes
+FAST_COMPLETION_QUESTIONS = 20
+FAST_COMPLETION_MINUTES = 0.5
+
+
+def flag_names(mask: int) -> List[str]:
+    return [name for name in SANITY_FLAGS if mask & FLAG_BITS[name]]
+
+
+def _quiz_value(column):
+    return select(column).where(Quiz.id == QuizAttempt.quiz_id).correlate(QuizAttempt).scalar_subquery()
+
+
+def sanity_flags_expression():
+    """The flag bitmask of the current ``quiz_attempts`` row, for SELECT or UPDATE ... SET."""
+    total_questions = (
+        select(func.count(Question.id))
+        .where(Question.quiz_id == QuizAttempt.quiz_id)
+        .correlate(QuizAttempt)
+        .scalar_subquery()
+    )
+    marks_per_correct = func.coalesce(func.nullif(_quiz_value(Quiz.marks_per_correct), 0), 1)
+    negative_marking = func.coalesce(_quiz_value(Quiz.negative_marking), 0)
+    score = func.coalesce(QuizAttempt.score, 0)
+    total_marks = func.coalesce(QuizAttempt.total_marks, 0)
+    completed = and_(QuizAttempt.is_completed == True, total_questions > 0)  # noqa: E712
+
+    rules = {
+        "negative_score": score < 0,
+        "score_exceeds_total": and_(total_marks >= 0, score > total_marks + SCORE_TOLERANCE),
+        "percentage_out_of_range": and_(
+            QuizAttempt.percentage.isnot(None),
+            (QuizAttempt.percentage < -PERCENTAGE_TOLERANCE) | (QuizAttempt.percentage > 100 + PERCENTAGE_TOLERANCE),
+        ),
+        "correct_exceeds_answered": QuizAttempt.correct_count > QuizAttempt.answered_count,
+        "answered_exceeds_total": and_(total_questions > 0, QuizAttempt.answered_count > total_questions),
+        # Many correct answers but the net score clamped to zero, although negative
+        # marking isn't aggressive enough to typically offset that level of correctness
+        "high_correct_zero_score": and_(
+            completed,
+            score <= 0,
+            # AND doesn't short-circuit in SQL (PostgreSQL): never divide by zero
+            QuizAttempt.correct_count * 1.0 / func.nullif(total_questions, 0) >= HIGH_CORRECT_RATIO,
+            negative_marking <= marks_per_correct,
+        ),
+        "very_fast_completion": and_(
+            completed,
+            total_questions >= FAST_COMPLETION_QUESTIONS,
+            QuizAttempt.time_taken_minutes < FAST_COMPLETION_MINUTES,
+        ),
+    }
+    mask = None
+    for name in SANITY_FLAGS:
+        bit = case((rules[name], FLAG_BITS[name]), else_=0)
+        mask = bit if mask is None else mask + bit
+    return mask
+
+
+def reflag_quiz_attempts(quiz_id: int):
+    """UPDATE recomputing the flags of a quiz's completed attempts after its marking scheme or questions change."""
+    return (
+        update(QuizAttempt)
+        .where(QuizAttempt.quiz_id == quiz_id, QuizAttempt.is_completed == True)  # noqa: E712
+        .values(sanity_flags=sanity_flags_expression())
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,183 @@
+"""
+Asynchronous grading of queued submissions.
+
+At a live session's end time the whole cohort submits in the same second.
+The intake endpoint only validates and stores the answer sheet as an
+``AttemptSubmission`` row (durable, with its ``received_at``) and answers
+``202 Accepted``. ``GradingWorkers`` then grade those rows with a fixed number
+of workers, so the database sees a steady ``workers``-wide stream instead of
+the whole burst at once:
+
+- new submissions are handed to the workers directly (``notify``); a poller
+  also picks up queued rows every ``poll_seconds``, e.g. after a restart or
+  when another process took the submission,
+- each submission is claimed (``queued`` -> ``graded``) and graded in one
+  transaction, so a crash or error leaves it ``queued`` for a retry,
+- ``SubmissionRejected`` from the grade function marks it ``rejected``;
+  after ``max_tries`` unexpected errors it is marked ``failed``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Optional, Set
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import AttemptSubmission
+
+logger = logging.getLogger(__name__)
+
+GradeFunction = Callable[[AsyncSession, AttemptSubmission], Awaitable[None]]
+
+
+class SubmissionRejected(Exception):
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class GradingWorkers:
+    def __init__(self, grade: GradeFunction, workers: int = 4, poll_seconds: float = 2.0, max_tries: int = 3):
+        self.grade = grade
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.max_tries = max_tries
+        self.session_factory = None
+        self.write_queue = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+        self._inflight: Set[int] = set()
+        self.graded = 0
+        self.rejected = 0
+        self.failed = 0
+
+    async def _transaction(self, work):
+        if self.write_queue is not None:
+            return await self.write_queue.submit(work)
+        async with self.session_factory() as session:
+            result = await work(session)
+            await session.commit()
+            return result
+
+    async def process(self, submission_id: int) -> str:
+        """Grade one queued submission; returns its resulting status."""
+
+        async def grade(session: AsyncSession) -> str:
+            claimed = await session.execute(
+                update(AttemptSubmission)
+                .where(AttemptSubmission.id == submission_id, AttemptSubmission.status == "queued")
+                .values(status="graded", graded_at=datetime.now())
+                .execution_options(synchronize_session=False)
+            )
+            if claimed.rowcount != 1:
+                return "skipped"  # graded elsewhere already
+            submission = await session.get(AttemptSubmission, submission_id)
+            await self.grade(session, submission)
+            return "graded"
+
+        try:
+            outcome = await self._transaction(grade)
+        except SubmissionRejected as rejection:
+            outcome = await self._finish(submission_id, "rejected", rejection.detail)
+        except Exception as error:
+            logger.exception("Grading submission %s failed", submission_id)
+            outcome = await self._finish(submission_id, None, str(error))
+        if outcome == "graded":
+            self.graded += 1
+        elif outcome == "rejected":
+            self.rejected += 1
+        elif outcome == "failed":
+            self.failed += 1
+        return outcome
+
+    async def _finish(self, submission_id: int, status: Optional[str], detail: str) -> str:
+        """Record a rejection, or count a failed try (``status=None``)."""
+
+        async def record(session: AsyncSession) -> str:
+            submission = await session.get(AttemptSubmission, submission_id)
+            if submission is None or submission.status != "queued":
+                return "skipped"
+            submission.detail = detail
+            if status is None:
+                submission.tries += 1
+                if submission.tries < self.max_tries:
+                    return "queued"
+            submission.status = status or "failed"
+            submission.graded_at = datetime.now()
+            return submission.status
+
+        return await self._transaction(record)
+
+    async def queued_ids(self, limit: int = 500) -> list:
+        async with self.session_factory() as session:
+            return list((await session.scalars(
+                select(AttemptSubmission.id)
+                .where(AttemptSubmission.status == "queued")
+                .order_by(AttemptSubmission.id)
+                .limit(limit)
+            )).all())
+
+    async def run_pending(self) -> int:
+        """Grade every queued submission in this task; returns how many were processed."""
+        processed = 0
+        for submission_id in await self.queued_ids():
+            if submission_id not in self._inflight:
+                await self.process(submission_id)
+                processed += 1
+        return processed
+
+    def notify(self, submission_id: int) -> None:
+        if self._queue is not None and submission_id not in self._inflight:
+            self._inflight.add(submission_id)
+            self._queue.put_nowait(submission_id)
+
+    async def _work(self) -> None:
+        while True:
+            submission_id = await self._queue.get()
+            try:
+                await self.process(submission_id)
+            except Exception:
+                logger.exception("Grading worker error")
+            finally:
+                self._inflight.discard(submission_id)
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                for submission_id in await self.queued_ids():
+                    self.notify(submission_id)
+            except Exception:
+                logger.exception("Polling queued submissions failed")
+            await asyncio.sleep(self.poll_seconds)
+
+    def start(self, session_factory, write_queue=None) -> None:
+        self.session_factory = session_factory
+        self.write_queue = write_queue
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._tasks = [loop.create_task(self._work(), name=f"grading-{n}") for n in range(self.workers)]
+        self._tasks.append(loop.create_task(self._poll(), name="grading-poll"))
+
+    async def stop(self) -> None:
+        """Stop the workers; queued submissions stay in the table for the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._inflight.clear()
+
+    def status(self) -> dict:
+        return {
+            "workers": self.workers,
+            "backlog": self._queue.qsize() if self._queue is not None else 0,
+            "graded": self.graded,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
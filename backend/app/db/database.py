@@ -1,36 +1,160 @@
+from fastapi import Depends
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
 import os
 from app.core.config import settings
+from app.db.pool import install_sqlite_pragmas, is_file_sqlite, pool_kwargs
+from app.db.replica import ReadRouter
+from app.db.sqlite_writer import WriteQueue, use_immediate_transactions
 
-# Create engine with appropriate settings for MySQL
-# Remove SQLite-specific connect_args
-connect_args = {}
-if settings.DATABASE_URL.startswith('sqlite'):
-    connect_args = {"check_same_thread": False}
-
-engine_kwargs = {
-    "connect_args": connect_args,
-    "pool_pre_ping": True,  # Verify connections before using
-    "pool_recycle": 3600,   # Recycle connections after 1 hour
-    "echo": False,
-}
+SERVERLESS = bool(os.getenv('VERCEL') or os.getenv('SERVERLESS'))
+
+
+def _engine_kwargs(database_url: str, is_async: bool = False) -> dict:
+    kwargs = {"echo": False, **pool_kwargs(database_url, is_async=is_async, serverless=SERVERLESS)}
+    # SQLite-specific connect_args; not used by MySQL/PostgreSQL or the async drivers
+    if database_url.startswith('sqlite') and not is_async:
+        kwargs["connect_args"] = {"check_same_thread": False}
+    return kwargs
 
-# Vercel/Serverless: disable connection pooling to avoid stale pooled connections across invocations
-if os.getenv('VERCEL') or os.getenv('SERVERLESS'):
-    engine_kwargs["poolclass"] = NullPool
 
-engine = create_engine(settings.DATABASE_URL, **engine_kwargs)
+# Sync engine: used by scripts, startup bootstrap and routers not yet ported to AsyncSession
+engine = create_engine(settings.DATABASE_URL, **_engine_kwargs(settings.DATABASE_URL))
+install_sqlite_pragmas(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers for each backend. psycopg 3 serves both the sync and async
+# PostgreSQL engines, and unlike asyncpg it works behind transaction-mode poolers.
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "mysql": "aiomysql",
+    "postgresql": "psycopg",
+}
+
+
+def to_async_url(database_url: str):
+    """Swap the sync driver in DATABASE_URL for its asyncio counterpart."""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+async_engine = create_async_engine(
+    to_async_url(settings.DATABASE_URL), **_engine_kwargs(settings.DATABASE_URL, is_async=True)
+)
+install_sqlite_pragmas(async_engine.sync_engine)
+
+# expire_on_commit=False: attributes must stay readable after commit without lazy IO
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession)
+
+# SQLite single writer: one dedicated connection (BEGIN IMMEDIATE) that serializes
+# and group-commits the hot attempt writes. Other databases handle concurrent writers.
+writer_engine = None
+write_queue = None
+if settings.SQLITE_SINGLE_WRITER and is_file_sqlite(settings.DATABASE_URL):
+    writer_engine = create_async_engine(
+        to_async_url(settings.DATABASE_URL),
+        **{**_engine_kwargs(settings.DATABASE_URL, is_async=True), "pool_size": 1, "max_overflow": 0},
+    )
+    install_sqlite_pragmas(writer_engine.sync_engine)
+    use_immediate_transactions(writer_engine.sync_engine)
+    write_queue = WriteQueue(
+        async_sessionmaker(bind=writer_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession),
+        max_batch=settings.SQLITE_WRITER_MAX_BATCH,
+        max_wait_ms=settings.SQLITE_WRITER_MAX_WAIT_MS,
+    )
+
+# Optional read replica (DATABASE_READ_URL). Without it every read stays on the primary.
+read_engine = None
+async_read_engine = None
+ReadSessionLocal = None
+AsyncReadSessionLocal = None
+if settings.DATABASE_READ_URL:
+    read_engine = create_engine(settings.DATABASE_READ_URL, **_engine_kwargs(settings.DATABASE_READ_URL))
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+    async_read_engine = create_async_engine(
+        to_async_url(settings.DATABASE_READ_URL), **_engine_kwargs(settings.DATABASE_READ_URL, is_async=True)
+    )
+    install_sqlite_pragmas(read_engine)
+    install_sqlite_pragmas(async_read_engine.sync_engine)
+    AsyncReadSessionLocal = async_sessionmaker(
+        bind=async_read_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession
+    )
+
+read_router = ReadRouter(
+    primary=SessionLocal,
+    replica=ReadSessionLocal,
+    async_primary=AsyncSessionLocal,
+    async_replica=AsyncReadSessionLocal,
+    sticky_seconds=settings.READ_REPLICA_STICKY_SECONDS,
+    max_lag_seconds=settings.READ_REPLICA_MAX_LAG_SECONDS,
+    lag_check_seconds=settings.READ_REPLICA_LAG_CHECK_SECONDS,
+)
+
 Base = declarative_base()
 
+
+def pooled_engines() -> dict:
+    """Engines whose pools are reported on /health and /metrics, by label."""
+    engines = {"primary": engine, "primary_async": async_engine.sync_engine}
+    if writer_engine is not None:
+        engines["sqlite_writer"] = writer_engine.sync_engine
+    if read_engine is not None:
+        engines.update({"replica": read_engine, "replica_async": async_read_engine.sync_engine})
+    return engines
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_async_session_factory():
+    """Session factory for work that outlives the request scope, e.g. a StreamingResponse body.
+
+    Dependencies with yield are torn down before a streamed body is sent,
+    so such handlers open their own session from this factory.
+    """
+    return AsyncSessionLocal
+
+
+def get_read_router():
+    return read_router
+
+
+def get_read_db(router: ReadRouter = Depends(get_read_router)):
+    """Sync session for read-only endpoints: the replica when it is fresh enough, else the primary."""
+    db = router.session_factory()()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(router: ReadRouter = Depends(get_read_router)):
+    async with (await router.async_session_factory())() as db:
+        yield db
+
+
+async def get_async_read_session_factory(router: ReadRouter = Depends(get_read_router)):
+    """Like get_async_session_factory, routed to the replica when it is fresh enough."""
+    return await router.async_session_factory()
+
+
+def get_write_queue():
+    """The SQLite single-writer queue, or None when writes commit on the request session."""
+    return write_queue
@@ -0,0 +1,335 @@
+"""
+Set-based SQL for attempt data repair jobs.
+
+Every job works on one id range at a time (see ``id_ranges``) so maintenance
+scripts commit small transactions and never hold locks on the whole
+``quiz_attempts``/``answers`` tables. The same statements back the dry-run
+reports and the ``--apply`` path.
+"""
+
+from typing import Iterator, Sequence, Tuple
+
+from sqlalchemy import and_, case, delete, func, insert, or_, select, update
+from sqlalchemy.engine import Connection
+
+from app.core.item_stats import TOTAL_COLUMNS, rebuilt_stats, record_answers
+from app.core.sanity_flags import sanity_flags_expression
+from app.models.models import Answer, AttemptSubmission, Question, QuestionStat, Quiz, QuizAttempt, User
+
+PREVIEW_ROLES = ("teacher", "admin")
+SCORE_TOLERANCE = 1e-6
+
+
+def id_ranges(connection: Connection, column, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    """Yield half-open ``[low, high)`` ranges covering ``column`` in steps of ``chunk_size``."""
+    low, high = connection.execute(select(func.min(column), func.max(column))).one()
+    if low is None:
+        return
+    start = int(low)
+    while start <= int(high):
+        yield start, start + chunk_size
+        start += chunk_size
+
+
+def ranked_attempts(student_range: Tuple[int, int]):
+    """Attempts per (student, quiz), ranked best first: completed, newest, highest id.
+
+    Partitions are per student, so restricting the scan to a student id range
+    before windowing still ranks every partition completely.
+    """
+    low, high = student_range
+    return (
+        select(
+            QuizAttempt.id,
+            QuizAttempt.student_id,
+            QuizAttempt.quiz_id,
+            QuizAttempt.is_completed,
+            QuizAttempt.started_at,
+            QuizAttempt.score,
+            func.row_number().over(
+                partition_by=(QuizAttempt.student_id, QuizAttempt.quiz_id),
+                order_by=(
+                    QuizAttempt.is_completed.desc(),
+                    QuizAttempt.started_at.desc(),
+                    QuizAttempt.id.desc(),
+                ),
+            ).label("rank"),
+        )
+        .where(QuizAttempt.student_id >= low, QuizAttempt.student_id < high)
+        .subquery("ranked")
+    )
+
+
+def duplicate_attempts(student_range: Tuple[int, int]):
+    """Every attempt except the one kept per (student, quiz)."""
+    ranked = ranked_attempts(student_range)
+    return select(ranked).where(ranked.c.rank > 1).order_by(ranked.c.student_id, ranked.c.quiz_id, ranked.c.rank)
+
+
+def duplicate_active_attempts():
+    """(quiz, student) pairs with more than one incomplete attempt, which uq_quiz_attempts_active rejects."""
+    return (
+        select(QuizAttempt.quiz_id, QuizAttempt.student_id, func.count().label("attempts"))
+        .where(QuizAttempt.is_completed == False)  # noqa: E712
+        .group_by(QuizAttempt.quiz_id, QuizAttempt.student_id)
+        .having(func.count() > 1)
+    )
+
+
+def preview_attempts(attempt_range: Tuple[int, int]):
+    """Attempts by teachers/admins, stored by previews before they moved to memory."""
+    low, high = attempt_range
+    return (
+        select(QuizAttempt.id, QuizAttempt.student_id, QuizAttempt.quiz_id, QuizAttempt.started_at)
+        .join(User, User.id == QuizAttempt.student_id)
+        .where(
+            QuizAttempt.id >= low,
+            QuizAttempt.id < high,
+            User.role.in_(PREVIEW_ROLES),
+        )
+        .order_by(QuizAttempt.id)
+    )
+
+
+def delete_attempts(connection: Connection, attempt_ids: Sequence[int]) -> int:
+    """Delete attempts, their answers and submissions, taking graded answers out of the question stats."""
+    if not attempt_ids:
+        return 0
+    connection.execute(record_answers(Answer.attempt_id.in_(attempt_ids), sign=-1))
+    connection.execute(
+        delete(Answer).where(Answer.attempt_id.in_(attempt_ids)).execution_options(synchronize_session=False)
+    )
+    connection.execute(delete(AttemptSubmission).where(AttemptSubmission.attempt_id.in_(attempt_ids)))
+    result = connection.execute(
+        delete(QuizAttempt).where(QuizAttempt.id.in_(attempt_ids)).execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def _recomputed_scores(attempt_range: Tuple[int, int]):
+    """Score per completed attempt from its stored answers, using the submit marking rules."""
+    low, high = attempt_range
+    negative_marking = func.coalesce(Quiz.negative_marking, 0)
+    answer_marks = case(
+        (Question.id.is_(None), 0.0),
+        (Answer.is_correct == True, func.coalesce(Question.marks, 0)),  # noqa: E712
+        (negative_marking > 0, -negative_marking),
+        else_=0.0,
+    )
+    total = func.coalesce(func.sum(answer_marks), 0.0)
+    return (
+        select(
+            QuizAttempt.id.label("attempt_id"),
+            case((total > 0, total), else_=0.0).label("new_score"),
+        )
+        .join(Quiz, Quiz.id == QuizAttempt.quiz_id)
+        .outerjoin(Answer, Answer.attempt_id == QuizAttempt.id)
+        .outerjoin(Question, Question.id == Answer.question_id)
+        .where(QuizAttempt.id >= low, QuizAttempt.id < high, QuizAttempt.is_completed == True)  # noqa: E712
+        .group_by(QuizAttempt.id)
+        .subquery("recomputed")
+    )
+
+
+def _score_drifted(recomputed):
+    return and_(
+        QuizAttempt.id == recomputed.c.attempt_id,
+        or_(
+            QuizAttempt.score.is_(None),
+            func.abs(QuizAttempt.score - recomputed.c.new_score) > SCORE_TOLERANCE,
+        ),
+    )
+
+
+def _percentage(score):
+    return case((QuizAttempt.total_marks > 0, score / QuizAttempt.total_marks * 100), else_=0.0)
+
+
+def drifted_scores(attempt_range: Tuple[int, int]):
+    """Completed attempts whose stored score differs from their answers."""
+    recomputed = _recomputed_scores(attempt_range)
+    return (
+        select(
+            QuizAttempt.id,
+            QuizAttempt.score.label("old_score"),
+            recomputed.c.new_score,
+            _percentage(recomputed.c.new_score).label("new_percentage"),
+        )
+        .where(_score_drifted(recomputed))
+        .order_by(QuizAttempt.id)
+    )
+
+
+def rescore_attempts(connection: Connection, attempt_range: Tuple[int, int]) -> int:
+    """Rewrite drifted scores with one grouped ``UPDATE ... FROM``."""
+    recomputed = _recomputed_scores(attempt_range)
+    result = connection.execute(
+        update(QuizAttempt)
+        .where(_score_drifted(recomputed))
+        .values(score=recomputed.c.new_score, percentage=_percentage(recomputed.c.new_score))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def _overlong_condition(attempt_range: Tuple[int, int]):
+    low, high = attempt_range
+    return and_(
+        Quiz.id == QuizAttempt.quiz_id,
+        QuizAttempt.id >= low,
+        QuizAttempt.id < high,
+        Quiz.duration_minutes > 0,
+        QuizAttempt.time_taken_minutes > Quiz.duration_minutes,
+    )
+
+
+def overlong_attempts(attempt_range: Tuple[int, int]):
+    """Attempts whose recorded time exceeds the quiz duration."""
+    return (
+        select(QuizAttempt.id, QuizAttempt.time_taken_minutes, Quiz.duration_minutes)
+        .where(_overlong_condition(attempt_range))
+        .order_by(QuizAttempt.id)
+    )
+
+
+def cap_time_taken(connection: Connection, attempt_range: Tuple[int, int]) -> int:
+    """Cap ``time_taken_minutes`` at the quiz duration with one ``UPDATE ... FROM quizzes``."""
+    result = connection.execute(
+        update(QuizAttempt)
+        .where(_overlong_condition(attempt_range))
+        .values(time_taken_minutes=Quiz.duration_minutes)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def _counted_answers():
+    answered = (
+        select(func.count(Answer.id))
+        .where(Answer.attempt_id == QuizAttempt.id)
+        .correlate(QuizAttempt)
+        .scalar_subquery()
+    )
+    correct = (
+        select(func.count(Answer.id))
+        .where(Answer.attempt_id == QuizAttempt.id, Answer.is_correct == True)  # noqa: E712
+        .correlate(QuizAttempt)
+        .scalar_subquery()
+    )
+    return answered, correct
+
+
+def _counters_drifted(attempt_range: Tuple[int, int], answered, correct):
+    low, high = attempt_range
+    return and_(
+        QuizAttempt.id >= low,
+        QuizAttempt.id < high,
+        or_(QuizAttempt.answered_count != answered, QuizAttempt.correct_count != correct),
+    )
+
+
+def drifted_answer_counters(attempt_range: Tuple[int, int]):
+    """Attempts whose answered/correct counters differ from their answers."""
+    answered, correct = _counted_answers()
+    return (
+        select(
+            QuizAttempt.id,
+            QuizAttempt.answered_count,
+            QuizAttempt.correct_count,
+            answered.label("new_answered"),
+            correct.label("new_correct"),
+        )
+        .where(_counters_drifted(attempt_range, answered, correct))
+        .order_by(QuizAttempt.id)
+    )
+
+
+def recount_answers(connection: Connection, attempt_range: Tuple[int, int]) -> int:
+    """Reset drifted counters from the answers; backfills ``last_answer_at`` with the submission time."""
+    answered, correct = _counted_answers()
+    result = connection.execute(
+        update(QuizAttempt)
+        .where(_counters_drifted(attempt_range, answered, correct))
+        .values(
+            answered_count=answered,
+            correct_count=correct,
+            last_answer_at=func.coalesce(QuizAttempt.last_answer_at, QuizAttempt.submitted_at),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def _flags_drifted(attempt_range: Tuple[int, int], flags):
+    low, high = attempt_range
+    return and_(QuizAttempt.id >= low, QuizAttempt.id < high, QuizAttempt.sanity_flags != flags)
+
+
+def drifted_sanity_flags(attempt_range: Tuple[int, int]):
+    """Attempts whose stored sanity flags differ from the current rules."""
+    flags = sanity_flags_expression()
+    return (
+        select(QuizAttempt.id, QuizAttempt.sanity_flags, flags.label("new_flags"))
+        .where(_flags_drifted(attempt_range, flags))
+        .order_by(QuizAttempt.id)
+    )
+
+
+def reflag_attempts(connection: Connection, attempt_range: Tuple[int, int]) -> int:
+    """Recompute sanity flags after the flag rules change."""
+    flags = sanity_flags_expression()
+    result = connection.execute(
+        update(QuizAttempt)
+        .where(_flags_drifted(attempt_range, flags))
+        .values(sanity_flags=flags)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def _stats_drifted(rebuilt):
+    """Stored question_stats rows that differ from ``rebuilt`` (missing rows are not included)."""
+    return and_(
+        QuestionStat.question_id == rebuilt.c.question_id,
+        or_(*[
+            func.abs(getattr(QuestionStat, column) - rebuilt.c[column]) > SCORE_TOLERANCE
+            for column in TOTAL_COLUMNS
+        ]),
+    )
+
+
+def drifted_question_stats(question_range: Tuple[int, int]):
+    """Questions whose stats row is missing or differs from their graded answers."""
+    rebuilt = rebuilt_stats(question_range).subquery("rebuilt")
+    return (
+        select(
+            rebuilt.c.question_id.label("id"),
+            QuestionStat.attempts,
+            QuestionStat.correct_count,
+            rebuilt.c.attempts.label("new_attempts"),
+            rebuilt.c.correct_count.label("new_correct"),
+        )
+        .outerjoin(QuestionStat, QuestionStat.question_id == rebuilt.c.question_id)
+        .where(or_(QuestionStat.question_id.is_(None), _stats_drifted(rebuilt)))
+        .order_by(rebuilt.c.question_id)
+    )
+
+
+def rebuild_question_stats(connection: Connection, question_range: Tuple[int, int]) -> int:
+    """Replace drifted stats rows and create missing ones from the answers."""
+    rebuilt = rebuilt_stats(question_range).subquery("rebuilt")
+    connection.execute(
+        delete(QuestionStat)
+        .where(QuestionStat.question_id.in_(select(rebuilt.c.question_id).where(_stats_drifted(rebuilt))))
+        .execution_options(synchronize_session=False)
+    )
+    low, high = question_range
+    rebuilt = rebuilt_stats(question_range).where(
+        Question.id.notin_(select(QuestionStat.question_id).where(
+            QuestionStat.question_id >= low, QuestionStat.question_id < high
+        ))
+    )
+    result = connection.execute(
+        insert(QuestionStat).from_select(["question_id", "quiz_id", *TOTAL_COLUMNS], rebuilt)
+    )
+    return result.rowcount
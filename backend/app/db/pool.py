@@ -0,0 +1,205 @@
+"""
+Connection pool configuration and instrumentation.
+
+Pools are QueuePools sized from Settings (DB_POOL_*). They record how long
+requests wait on checkout, how often checkout times out, and expose live
+in-use/overflow counts for /health and /metrics.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from app.core.config import settings
+
+# Upper bounds (seconds) for the checkout wait histogram.
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+@dataclass
+class CheckoutStats:
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    bucket_counts: list = field(default_factory=lambda: [0] * len(WAIT_BUCKETS))
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def observe(self, seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            for idx, upper in enumerate(WAIT_BUCKETS):
+                if seconds <= upper:
+                    self.bucket_counts[idx] += 1
+
+
+class _CheckoutTiming:
+    """Mixin timing ``_do_get``, the point where a checkout blocks on a full pool."""
+
+    checkout_stats: CheckoutStats
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_stats = CheckoutStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.checkout_stats.observe(time.perf_counter() - started, timed_out=True)
+            raise
+        self.checkout_stats.observe(time.perf_counter() - started, timed_out=False)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep the counters across it.
+        pool = super().recreate()
+        pool.checkout_stats = self.checkout_stats
+        return pool
+
+
+class InstrumentedQueuePool(_CheckoutTiming, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTiming, AsyncAdaptedQueuePool):
+    pass
+
+
+def _is_memory_sqlite(database_url) -> bool:
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def pool_kwargs(database_url: str, is_async: bool = False, serverless: bool = False) -> dict:
+    """Engine keyword arguments for the pool, from Settings."""
+    kwargs = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,  # Verify connections before using
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if serverless or settings.DB_NULL_POOL:
+        # Vercel/Serverless: no pooling, avoids stale pooled connections across invocations
+        kwargs["poolclass"] = NullPool
+    elif not _is_memory_sqlite(database_url):
+        # In-memory SQLite lives in one connection and keeps SQLAlchemy's default pool.
+        kwargs.update({
+            "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_use_lifo": settings.DB_POOL_USE_LIFO,
+        })
+    return kwargs
+
+
+SQLITE_SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def is_file_sqlite(database_url) -> bool:
+    return make_url(database_url).get_backend_name() == "sqlite" and not _is_memory_sqlite(database_url)
+
+
+def sqlite_pragmas() -> list:
+    """PRAGMA statements run on every new file-backed SQLite connection, from Settings."""
+    pragmas = [f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}"]
+    if settings.SQLITE_WAL:
+        pragmas.append("PRAGMA journal_mode = WAL")
+    synchronous = settings.SQLITE_SYNCHRONOUS.upper()
+    if synchronous not in SQLITE_SYNCHRONOUS_LEVELS:
+        raise ValueError(f"SQLITE_SYNCHRONOUS must be one of {sorted(SQLITE_SYNCHRONOUS_LEVELS)}")
+    pragmas += [
+        f"PRAGMA synchronous = {synchronous}",
+        f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}",
+        f"PRAGMA cache_size = {-int(settings.SQLITE_CACHE_SIZE_KB)}",  # negative = KiB
+        "PRAGMA temp_store = MEMORY",
+    ]
+    return pragmas
+
+
+def install_sqlite_pragmas(sync_engine) -> None:
+    """Apply ``sqlite_pragmas()`` to every new connection of a file-backed SQLite engine."""
+    if not is_file_sqlite(sync_engine.url):
+        return
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def pool_status(sync_engine) -> Optional[Dict[str, float]]:
+    """Live pool gauges plus checkout wait counters; None for pools without a queue."""
+    pool = sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return None
+    status = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "in_use": pool.checkedout(),
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": pool._max_overflow,
+        "timeout_seconds": pool.timeout(),
+    }
+    stats = getattr(pool, "checkout_stats", None)
+    if stats is not None:
+        status.update({
+            "checkouts": stats.checkouts,
+            "checkout_timeouts": stats.timeouts,
+            "checkout_wait_seconds_total": round(stats.wait_seconds, 6),
+            "checkout_wait_seconds_max": round(stats.max_wait_seconds, 6),
+        })
+    return status
+
+
+def render_prometheus(engines: Dict[str, object]) -> str:
+    """Pool gauges and checkout wait histograms, labelled by engine name."""
+    gauges = [
+        ("macquiz_db_pool_size", "Configured pool size.", "size"),
+        ("macquiz_db_pool_in_use", "Connections currently checked out.", "in_use"),
+        ("macquiz_db_pool_overflow", "Overflow connections currently open.", "overflow"),
+        ("macquiz_db_pool_checkout_timeouts_total", "Checkouts that timed out waiting for a connection.",
+         "checkout_timeouts"),
+    ]
+    statuses = {name: pool_status(sync_engine) for name, sync_engine in engines.items()}
+    statuses = {name: status for name, status in statuses.items() if status is not None}
+
+    lines = []
+    for metric, help_text, key in gauges:
+        metric_type = "counter" if metric.endswith("_total") else "gauge"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {metric_type}"]
+        for name, status in sorted(statuses.items()):
+            if key in status:
+                lines.append(f'{metric}{{engine="{name}"}} {status[key]}')
+
+    lines += [
+        "# HELP macquiz_db_pool_checkout_wait_seconds Time spent waiting for a pooled connection.",
+        "# TYPE macquiz_db_pool_checkout_wait_seconds histogram",
+    ]
+    for name, sync_engine in sorted(engines.items()):
+        stats = getattr(sync_engine.pool, "checkout_stats", None)
+        if stats is None:
+            continue
+        labels = f'engine="{name}"'
+        for upper, count in zip(WAIT_BUCKETS, stats.bucket_counts):
+            lines.append(f'macquiz_db_pool_checkout_wait_seconds_bucket{{{labels},le="{upper}"}} {count}')
+        total = stats.checkouts + stats.timeouts
+        lines.append(f'macquiz_db_pool_checkout_wait_seconds_bucket{{{labels},le="+Inf"}} {total}')
+        lines.append(f"macquiz_db_pool_checkout_wait_seconds_sum{{{labels}}} {stats.wait_seconds:.6f}")
+        lines.append(f"macquiz_db_pool_checkout_wait_seconds_count{{{labels}}} {total}")
+    return "\n".join(lines) + "\n"
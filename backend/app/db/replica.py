@@ -0,0 +1,137 @@
+"""
+Read-replica routing.
+
+Read-only endpoints take their session from a ``ReadRouter``. It hands out a
+replica session unless:
+
+- no replica is configured (DATABASE_READ_URL empty), or
+- the replica's measured lag is above ``max_lag_seconds`` or cannot be read, or
+- the caller is a user who wrote within the last ``sticky_seconds``
+  (read-your-writes, e.g. my-attempts right after submit).
+
+Lag is probed at most once per ``lag_check_seconds`` and cached. Writes are
+tracked per process, so with several workers keep ``sticky_seconds`` above
+the lag you tolerate rather than relying on the tracker alone.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+
+def probe_replica_lag(connection: Connection) -> Optional[float]:
+    """Seconds the replica is behind its primary; None when replication is broken."""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        lag = connection.scalar(text(
+            "SELECT CASE WHEN pg_is_in_recovery() "
+            "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+            "ELSE 0 END"
+        ))
+        return float(lag)
+    if dialect == "mysql":
+        row = connection.execute(text("SHOW REPLICA STATUS")).mappings().first()
+        if row is None:
+            return 0.0  # Not a replica (e.g. a stand-in pointing at the primary)
+        lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+        return None if lag is None else float(lag)
+    # SQLite files and other stand-ins have no replication to measure.
+    return 0.0
+
+
+class ReadRouter:
+    def __init__(
+        self,
+        primary,
+        replica=None,
+        async_primary=None,
+        async_replica=None,
+        sticky_seconds: float = 10.0,
+        max_lag_seconds: float = 5.0,
+        lag_check_seconds: float = 5.0,
+        lag_probe: Callable[[Connection], Optional[float]] = probe_replica_lag,
+    ):
+        self.primary = primary
+        self.replica = replica
+        self.async_primary = async_primary
+        self.async_replica = async_replica
+        self.sticky_seconds = sticky_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_check_seconds = lag_check_seconds
+        self.lag_probe = lag_probe
+
+        self._lock = threading.Lock()
+        self._last_write: Dict[int, float] = {}
+        self._lag: Optional[float] = None
+        self._lag_checked_at: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.replica is not None or self.async_replica is not None
+
+    def record_write(self, user_id: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._last_write[user_id] = now
+            if len(self._last_write) > 10000:
+                cutoff = now - self.sticky_seconds
+                self._last_write = {uid: at for uid, at in self._last_write.items() if at >= cutoff}
+
+    def wrote_recently(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        with self._lock:
+            last_write = self._last_write.get(user_id)
+        return last_write is not None and time.monotonic() - last_write < self.sticky_seconds
+
+    def _lag_is_stale(self) -> bool:
+        return self._lag_checked_at is None or time.monotonic() - self._lag_checked_at >= self.lag_check_seconds
+
+    def _store_lag(self, lag: Optional[float]) -> None:
+        self._lag = lag
+        self._lag_checked_at = time.monotonic()
+
+    def _lag_ok(self) -> bool:
+        return self._lag is not None and self._lag <= self.max_lag_seconds
+
+    def _measure(self, connection: Connection) -> Optional[float]:
+        try:
+            return self.lag_probe(connection)
+        except Exception:
+            return None
+
+    @property
+    def replica_lag(self) -> Optional[float]:
+        return self._lag
+
+    def use_replica(self, user_id: Optional[int] = None) -> bool:
+        """Sync routing decision; probes the replica when the cached lag is stale."""
+        if self.replica is None or self.wrote_recently(user_id):
+            return False
+        if self._lag_is_stale():
+            try:
+                with self.replica.kw["bind"].connect() as connection:
+                    self._store_lag(self._measure(connection))
+            except Exception:
+                self._store_lag(None)
+        return self._lag_ok()
+
+    async def use_async_replica(self, user_id: Optional[int] = None) -> bool:
+        if self.async_replica is None or self.wrote_recently(user_id):
+            return False
+        if self._lag_is_stale():
+            try:
+                async with self.async_replica.kw["bind"].connect() as connection:
+                    self._store_lag(await connection.run_sync(self._measure))
+            except Exception:
+                self._store_lag(None)
+        return self._lag_ok()
+
+    def session_factory(self, user_id: Optional[int] = None):
+        return self.replica if self.use_replica(user_id) else self.primary
+
+    async def async_session_factory(self, user_id: Optional[int] = None):
+        return self.async_replica if await self.use_async_replica(user_id) else self.async_primary
@@ -0,0 +1,145 @@
+"""
+Single-writer queue for SQLite.
+
+SQLite allows one writer at a time. When every request commits on its own,
+concurrent autosaves and submits race for the write lock and fail with
+"database is locked". Instead, hot write paths submit a unit of work here:
+
+- one task owns one dedicated connection and runs the work items in order,
+- transactions start with BEGIN IMMEDIATE, so the lock is taken up front,
+- each item runs in its own SAVEPOINT, so a failing item is rolled back alone,
+- items queued within ``max_wait_ms`` of each other share one COMMIT
+  (group commit), and callers get their result once that commit is durable.
+
+Readers are unaffected: with WAL they keep reading through the regular pool.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+WorkItem = Callable[[AsyncSession], Awaitable[Any]]
+
+
+def use_immediate_transactions(sync_engine) -> None:
+    """Let SQLAlchemy, not the sqlite3 module, emit BEGIN, and make it BEGIN IMMEDIATE.
+
+    Also required for SAVEPOINT to behave with the pysqlite/aiosqlite drivers.
+    """
+
+    @event.listens_for(sync_engine, "connect")
+    def _disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(sync_engine, "begin")
+    def _begin_immediate(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+@dataclass
+class _Job:
+    work: WorkItem
+    future: asyncio.Future
+
+
+class WriteQueue:
+    def __init__(self, session_factory, max_batch: int = 64, max_wait_ms: float = 2.0):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run(self._queue), name="sqlite-writer")
+
+    async def start(self) -> None:
+        self._ensure_running()
+
+    async def stop(self) -> None:
+        if self._task is None or self._task.done():
+            return
+        await self._queue.put(None)
+        await self._task
+
+    async def submit(self, work: WorkItem) -> Any:
+        """Queue ``work(session)``; returns its result after the group commit."""
+        self._ensure_running()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Job(work=work, future=future))
+        return await future
+
+    async def _collect(self, queue: asyncio.Queue, first: _Job) -> Tuple[List[_Job], bool]:
+        batch, stopping = [first], False
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                job = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    job = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if job is None:
+                stopping = True
+                break
+            batch.append(job)
+        return batch, stopping
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            first = await queue.get()
+            if first is None:
+                return
+            batch, stopping = await self._collect(queue, first)
+            try:
+                await self._run_batch(batch)
+            except Exception as error:  # keep the writer alive; callers get the error
+                logger.exception("SQLite writer batch failed")
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(error)
+            if stopping:
+                return
+
+    async def _run_batch(self, batch: List[_Job]) -> None:
+        outcomes = []
+        async with self.session_factory() as session:
+            for job in batch:
+                if job.future.done():  # caller went away (cancelled request)
+                    continue
+                savepoint = await session.begin_nested()
+                try:
+                    result = await job.work(session)
+                except Exception as error:
+                    await savepoint.rollback()
+                    outcomes.append((job, None, error))
+                else:
+                    await savepoint.commit()
+                    outcomes.append((job, result, None))
+            await session.commit()
+
+        self.batches += 1
+        self.items += len(outcomes)
+        for job, result, error in outcomes:
+            if job.future.done():
+                continue
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
@@ -1,11 +1,22 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
 import logging
 from app.core.config import settings
-from app.db.database import engine, Base, SessionLocal
+from app.db.database import (
+    engine, async_engine, async_read_engine, writer_engine, write_queue, Base, SessionLocal, AsyncSessionLocal,
+    pooled_engines,
+)
+from app.db import pool
 from app.models.models import User
 from app.core.security import get_password_hash
+from app.core import metrics, rate_limit
+from app.core.activity import activity_tracker
+from app.core.hashing import password_pool
+from app.core.live_sessions import session_opener
+from app.core.regrade import regrade_runner
 from app.api.v1 import auth, users, quizzes, attempts, subjects, question_bank, analytics
 
 logger = logging.getLogger(__name__)
@@ -53,8 +64,27 @@ async def lifespan(app: FastAPI):
         app.state.db_startup_ok = False
         app.state.db_startup_error = str(error)
         logger.exception("Database startup/bootstrap failed")
+    if write_queue is not None:
+        await write_queue.start()
+    activity_tracker.start(AsyncSessionLocal, write_queue, interval=settings.ACTIVITY_FLUSH_SECONDS)
+    attempts.submission_workers.start(AsyncSessionLocal, write_queue)
+    session_opener.start(AsyncSessionLocal, write_queue)
+    regrade_runner.start(AsyncSessionLocal, write_queue)
     yield
-    # Shutdown (nothing to do)
+    # Shutdown
+    await regrade_runner.stop()
+    await session_opener.stop()
+    await attempts.submission_workers.stop()
+    try:
+        await activity_tracker.stop(AsyncSessionLocal, write_queue)
+    except Exception:
+        logger.exception("Final last_active flush failed")
+    if write_queue is not None:
+        await write_queue.stop()
+        await writer_engine.dispose()
+    await async_engine.dispose()
+    if async_read_engine is not None:
+        await async_read_engine.dispose()
 
 app = FastAPI(
     title="MacQuiz API",
@@ -65,6 +95,33 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Rate limits for login, save-answer and export. Registered before CORS so 429s
+# still carry CORS headers; the limiter lives on app.state so tests can swap it.
+app.state.rate_limiter = rate_limit.RateLimiter(rate_limit.build_storage()) if settings.RATE_LIMIT_ENABLED else None
+rate_limit_rules = rate_limit.default_rules()
+
+
+@app.middleware("http")
+async def enforce_rate_limits(request, call_next):
+    limiter = request.app.state.rate_limiter
+    rule = rate_limit.match_rule(rate_limit_rules, request.method, request.url.path) if limiter else None
+    if rule is None:
+        return await call_next(request)
+
+    key = rule.key_for(request)
+    if limiter.storage.blocking:
+        result = await run_in_threadpool(limiter.check, key, rule.limit, rule.period)
+    else:
+        result = limiter.check(key, rule.limit, rule.period)
+    if not result.allowed:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": rule.message},
+            headers={"Retry-After": str(result.retry_after_seconds)},
+        )
+    return await call_next(request)
+
+
 # CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -88,6 +145,10 @@ async def add_security_headers(request, call_next):
     )
     return response
 
+
+if settings.METRICS_ENABLED:
+    metrics.instrument(app, top_n=settings.METRICS_TOP_STATEMENTS, slow_request_ms=settings.SLOW_REQUEST_MS)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/api/v1/users", tags=["Users"])
@@ -125,4 +186,25 @@ async def health_check():
         "version": "2.0.0",
         "database": "connected" if getattr(app.state, "db_startup_ok", True) else "unavailable",
         "startup_error": getattr(app.state, "db_startup_error", None),
+        "pool": {name: pool.pool_status(sync_engine) for name, sync_engine in pooled_engines().items()},
+        "grading": attempts.submission_workers.status(),
     }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(
+        metrics.registry.render_prometheus()
+        + pool.render_prometheus(pooled_engines())
+        + password_pool.render_prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@app.get("/metrics/slow-statements", include_in_schema=False)
+async def slow_statements():
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return metrics.registry.slow_statements()
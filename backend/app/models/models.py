@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Text, JSON, UniqueConstraint, Index
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Text, JSON, UniqueConstraint, Index, DDL, event, text
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
@@ -22,6 +23,9 @@ DIFFICULTY_LENGTH = 20
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_role_department_class_year", "role", "department", "class_year"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(EMAIL_LENGTH), unique=True, index=True, nullable=False)
@@ -47,6 +51,9 @@ class User(Base):
 
 class Quiz(Base):
     __tablename__ = "quizzes"
+    __table_args__ = (
+        Index("ix_quizzes_creator_created", "creator_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(TITLE_LENGTH), nullable=False)
@@ -70,6 +77,7 @@ class Quiz(Base):
     total_marks = Column(Float, default=0)
     marks_per_correct = Column(Float, default=1)  # Default marks for correct answer
     negative_marking = Column(Float, default=0)  # Negative marks for incorrect answer
+    content_version = Column(Integer, default=1, server_default="1", nullable=False)  # Bumped by question edits
     
     # Status
     is_active = Column(Boolean, default=False)
@@ -84,6 +92,9 @@ class Quiz(Base):
 
 class Question(Base):
     __tablename__ = "questions"
+    __table_args__ = (
+        Index("ix_questions_quiz_order", "quiz_id", "order"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=False)
@@ -108,6 +119,19 @@ class Question(Base):
 
 class QuizAttempt(Base):
     __tablename__ = "quiz_attempts"
+    __table_args__ = (
+        Index("ix_quiz_attempts_student_quiz_completed", "student_id", "quiz_id", "is_completed"),
+        Index("ix_quiz_attempts_quiz_completed", "quiz_id", "is_completed"),
+        Index("ix_quiz_attempts_sanity_flags", "sanity_flags", "submitted_at"),
+        # At most one incomplete attempt per (quiz, student). MySQL has no partial
+        # indexes and gets a generated column instead (ACTIVE_ATTEMPT_MYSQL_DDL).
+        Index(
+            "uq_quiz_attempts_active", "quiz_id", "student_id",
+            unique=True,
+            sqlite_where=text("is_completed = 0"),
+            postgresql_where=text("is_completed = false"),
+        ).ddl_if(dialect=("sqlite", "postgresql")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=False)
@@ -119,9 +143,20 @@ class QuizAttempt(Base):
     percentage = Column(Float, nullable=True)
     
     # Timing
+    # NULL while the attempt is pending: pre-created when a live session opens, not yet claimed by the student
     started_at = Column(DateTime, default=datetime.now)  # Uses datetime.now() at insertion
     submitted_at = Column(DateTime, nullable=True)
     time_taken_minutes = Column(Float, nullable=True)  # Actual time taken
+
+    # Answer counters, kept in step with the answers rows by autosave and grading
+    # (backfill: fix_attempt_data.py) so attempt lists never aggregate answers
+    answered_count = Column(Integer, default=0, server_default="0", nullable=False)
+    correct_count = Column(Integer, default=0, server_default="0", nullable=False)
+    last_answer_at = Column(DateTime, nullable=True)
+
+    # Bitmask of app.core.sanity_flags.SANITY_FLAGS, set when the attempt is graded
+    # (recompute: fix_attempt_data.py); non-zero attempts make up the review queue
+    sanity_flags = Column(Integer, default=0, server_default="0", nullable=False)
     
     # Status
     is_completed = Column(Boolean, default=False)
@@ -132,6 +167,25 @@ class QuizAttempt(Base):
     student = relationship("User", back_populates="quiz_attempts")
     answers = relationship("Answer", back_populates="attempt", cascade="all, delete-orphan")
 
+    @hybrid_property
+    def is_started(self):
+        """False for pending (pre-created, unclaimed) attempts, which reads should skip."""
+        return self.started_at is not None
+
+    @is_started.expression
+    def is_started(cls):
+        return cls.started_at.isnot(None)
+
+
+# MySQL counterpart of uq_quiz_attempts_active: active_key is NULL once the attempt
+# is completed, and NULLs never collide in a unique index.
+ACTIVE_ATTEMPT_MYSQL_DDL = DDL(
+    "ALTER TABLE quiz_attempts "
+    "ADD COLUMN active_key INTEGER AS (IF(is_completed = 0, student_id, NULL)) STORED, "
+    "ADD UNIQUE INDEX uq_quiz_attempts_active (quiz_id, active_key)"
+)
+event.listen(QuizAttempt.__table__, "after_create", ACTIVE_ATTEMPT_MYSQL_DDL.execute_if(dialect="mysql"))
+
 
 class Answer(Base):
     __tablename__ = "answers"
@@ -151,6 +205,24 @@ class Answer(Base):
     attempt = relationship("QuizAttempt", back_populates="answers")
 
 
+class QuestionStat(Base):
+    """Running answer totals for one question over completed attempts (app.core.item_stats)."""
+
+    __tablename__ = "question_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), unique=True, nullable=False)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=False, index=True)
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    correct_count = Column(Integer, default=0, server_default="0", nullable=False)
+    option_a_count = Column(Integer, default=0, server_default="0", nullable=False)
+    option_b_count = Column(Integer, default=0, server_default="0", nullable=False)
+    option_c_count = Column(Integer, default=0, server_default="0", nullable=False)
+    option_d_count = Column(Integer, default=0, server_default="0", nullable=False)
+    other_count = Column(Integer, default=0, server_default="0", nullable=False)  # true/false, short answers
+    marks_total = Column(Float, default=0, server_default="0", nullable=False)
+
+
 # NEW MODELS FOR ENHANCED FEATURES
 
 class Subject(Base):
@@ -173,6 +245,9 @@ class Subject(Base):
 
 class QuestionBank(Base):
     __tablename__ = "question_bank"
+    __table_args__ = (
+        Index("ix_question_bank_subject_active_difficulty", "subject_id", "is_active", "difficulty"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False)
@@ -224,6 +299,51 @@ class QuizAssignment(Base):
     student = relationship("User", backref="assigned_quizzes")
 
 
+class AttemptSubmission(Base):
+    """A submitted answer sheet waiting for (or done with) asynchronous grading.
+
+    ``received_at`` is the submission time used for deadline checks, however
+    long the row waits for a grading worker.
+    """
+
+    __tablename__ = "attempt_submissions"
+    __table_args__ = (
+        Index("ix_attempt_submissions_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    attempt_id = Column(Integer, ForeignKey("quiz_attempts.id", ondelete="CASCADE"), unique=True, nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    payload = Column(JSON, nullable=False)  # QuizAttemptSubmit as submitted
+    received_at = Column(DateTime, nullable=False, default=datetime.now)
+    status = Column(String(20), nullable=False, default="queued")  # queued, graded, rejected, failed
+    detail = Column(Text, nullable=True)  # why it was rejected/failed
+    tries = Column(Integer, nullable=False, default=0)
+    graded_at = Column(DateTime, nullable=True)
+
+
+class RegradeJob(Base):
+    """A background regrade of a quiz's completed attempts (app.core.regrade)."""
+
+    __tablename__ = "regrade_jobs"
+    __table_args__ = (
+        Index("ix_regrade_jobs_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False, index=True)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=True)  # NULL: whole quiz
+    requested_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, done, failed
+    total_attempts = Column(Integer, nullable=False, default=0)
+    processed_attempts = Column(Integer, nullable=False, default=0)
+    changed_attempts = Column(Integer, nullable=False, default=0)  # attempts whose score or counters changed
+    detail = Column(Text, nullable=True)  # why it failed
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
 # --- SESSION MANAGEMENT TABLES ---
 
 class RevokedToken(Base):
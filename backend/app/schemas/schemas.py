@@ -141,6 +141,28 @@ class QuestionCreate(BaseModel):
     question_bank_id: Optional[int] = None  # If pulling from question bank
     order: int = 0
 
+class QuestionChanges(BaseModel):
+    question_text: Optional[str] = None
+    question_type: Optional[str] = Field(default=None, pattern="^(mcq|true_false|short_answer)$")
+    option_a: Optional[str] = None
+    option_b: Optional[str] = None
+    option_c: Optional[str] = None
+    option_d: Optional[str] = None
+    correct_answer: Optional[str] = None
+    marks: Optional[float] = None
+
+class QuestionOperation(BaseModel):
+    op: str = Field(..., pattern="^(add|update|delete|reorder)$")
+    id: Optional[int] = None  # update/delete: the question
+    question: Optional[QuestionCreate] = None  # add: appended after the existing questions
+    changes: Optional[QuestionChanges] = None  # update: only the fields to change
+    question_ids: Optional[List[int]] = None  # reorder: existing question ids in their new order
+
+class QuizQuestionsPatch(BaseModel):
+    operations: List[QuestionOperation]
+    content_version: Optional[int] = None  # reject (409) if the quiz was edited since this version
+    regrade: bool = False  # queue a regrade when answer keys or marks change
+
 class QuestionResponse(BaseModel):
     id: int
     quiz_id: int
@@ -203,6 +225,11 @@ class QuizUpdate(BaseModel):
     is_active: Optional[bool] = None
     assigned_student_ids: Optional[List[int]] = None  # List of student IDs to assign
 
+class RegradeRequest(BaseModel):
+    question_id: Optional[int] = None  # None = every question of the quiz
+    dry_run: bool = True  # report the score changes without applying them
+    show: int = Field(default=50, ge=0, le=500)  # changed attempts listed in a dry run
+
 class QuizResponse(BaseModel):
     id: int
     title: str
@@ -270,7 +297,7 @@ class QuizAttemptResponse(BaseModel):
     score: Optional[float]
     total_marks: float
     percentage: Optional[float]
-    started_at: datetime
+    started_at: Optional[datetime]  # None while pending (live session opened, not joined)
     submitted_at: Optional[datetime]
     time_taken_minutes: Optional[float]
     is_completed: bool
@@ -286,6 +313,16 @@ class QuizAttemptResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class SubmissionStatusResponse(BaseModel):
+    submission_id: int
+    attempt_id: int
+    status: str  # queued, graded, rejected, failed
+    received_at: datetime
+    graded_at: Optional[datetime] = None
+    detail: Optional[str] = None
+    status_url: str
+    attempt: Optional[QuizAttemptResponse] = None  # once graded
+
 class QuizAttemptDetail(QuizAttemptResponse):
     quiz: QuizResponse
     student: UserResponse
@@ -325,6 +362,8 @@ class DashboardStats(BaseModel):
     total_questions_bank: int
     yesterday_assessments: int
     total_attempts: int
+    online_students: int = 0  # seen within ACTIVE_NOW_SECONDS
+    online_teachers: int = 0
 
 class ActivityItem(BaseModel):
     id: int
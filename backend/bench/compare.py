@@ -0,0 +1,74 @@
+"""
+Compare two benchmark reports written by ``bench.live_exam``.
+
+    python -m bench.compare baseline.json candidate.json --max-regression 10
+
+Exits with code 1 if any endpoint's p95 latency regresses by more than
+--max-regression percent, or its SQL statement count goes up.
+"""
+
+import argparse
+import json
+
+
+def _delta(before, after):
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(baseline: dict, candidate: dict, max_regression: float) -> int:
+    base_endpoints = baseline["results"]["endpoints"]
+    cand_endpoints = candidate["results"]["endpoints"]
+
+    print(f"baseline:  {baseline['meta'].get('git_commit')} ({baseline['meta'].get('timestamp')})")
+    print(f"candidate: {candidate['meta'].get('git_commit')} ({candidate['meta'].get('timestamp')})\n")
+    header = f"{'endpoint':44} {'p95 before':>11} {'p95 after':>10} {'change':>8} {'sql':>9}"
+    print(header)
+    print("-" * len(header))
+
+    regressions = []
+    for name in sorted(set(base_endpoints) | set(cand_endpoints)):
+        before = base_endpoints.get(name)
+        after = cand_endpoints.get(name)
+        if before is None or after is None:
+            print(f"{name:44} {'(only in ' + ('candidate' if before is None else 'baseline') + ')':>31}")
+            continue
+
+        change = _delta(before["p95_ms"], after["p95_ms"])
+        change_text = "-" if change is None else f"{change:+.1f}%"
+        sql_text = f"{before['queries_max'] or '-'}→{after['queries_max'] or '-'}"
+        print(f"{name:44} {before['p95_ms']:>11} {after['p95_ms']:>10} {change_text:>8} {sql_text:>9}")
+
+        if change is not None and change > max_regression:
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {after['p95_ms']}ms ({change:+.1f}%)")
+        if before.get("queries_max") is not None and after.get("queries_max") is not None \
+                and after["queries_max"] > before["queries_max"]:
+            regressions.append(f"{name}: SQL statements {before['queries_max']} -> {after['queries_max']}")
+
+    if regressions:
+        print("\n⚠️  Regressions:")
+        for item in regressions:
+            print(f"  - {item}")
+        return 1
+
+    print("\n✅ No regressions beyond threshold")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two live-exam benchmark reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="Allowed p95 increase in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    with open(args.candidate, encoding="utf-8") as handle:
+        candidate = json.load(handle)
+    raise SystemExit(compare(baseline, candidate, args.max_regression))
+
+
+if __name__ == "__main__":
+    main()
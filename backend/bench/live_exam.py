@@ -0,0 +1,291 @@
+"""
+Live-exam load test against a running MacQuiz server.
+
+Every simulated student runs the real flow:
+    start -> save-answer (x answers) -> remaining-time -> submit
+while teacher pollers hit all-attempts like the live monitor does.
+
+Per endpoint it reports p50/p95/p99 latency, throughput, error counts and,
+when the server runs with METRICS_ENABLED=true, SQL statements per request
+(parsed from the Server-Timing header). Results are written as JSON so runs
+can be compared across commits with ``python -m bench.compare``.
+
+    DATABASE_URL=sqlite:///./bench.db uvicorn app.main:app --port 8000
+    DATABASE_URL=sqlite:///./bench.db python -m bench.live_exam --students 1000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import re
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.core.security import create_access_token
+from app.db.database import engine
+from bench.seed import Manifest, seed
+
+QUERY_COUNT_PATTERN = re.compile(r'desc="(\d+) queries"')
+
+
+class Recorder:
+    """Collects latency samples, statuses and SQL counts per endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.query_counts: Dict[str, List[int]] = defaultdict(list)
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+
+    async def call(self, name: str, request) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            self.latencies[name].append(time.perf_counter() - started)
+            self.errors[name] += 1
+            self.statuses[name][0] += 1
+            return None
+
+        self.latencies[name].append(time.perf_counter() - started)
+        self.statuses[name][response.status_code] += 1
+        if response.status_code >= 400:
+            self.errors[name] += 1
+
+        match = QUERY_COUNT_PATTERN.search(response.headers.get("server-timing", ""))
+        if match:
+            self.query_counts[name].append(int(match.group(1)))
+        return response
+
+    def summary(self) -> dict:
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        endpoints = {}
+        for name, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            queries = self.query_counts.get(name, [])
+            endpoints[name] = {
+                "requests": len(ordered),
+                "errors": self.errors.get(name, 0),
+                "statuses": {str(code): count for code, count in sorted(self.statuses[name].items())},
+                "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed > 0 else None,
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+                "p50_ms": _percentile_ms(ordered, 50),
+                "p95_ms": _percentile_ms(ordered, 95),
+                "p99_ms": _percentile_ms(ordered, 99),
+                "max_ms": round(ordered[-1] * 1000, 2),
+                "queries_avg": round(sum(queries) / len(queries), 2) if queries else None,
+                "queries_max": max(queries) if queries else None,
+            }
+
+        total_requests = sum(len(samples) for samples in self.latencies.values())
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "total_requests": total_requests,
+            "total_errors": sum(self.errors.values()),
+            "throughput_rps": round(total_requests / elapsed, 2) if elapsed > 0 else None,
+            "endpoints": endpoints,
+        }
+
+
+def _percentile_ms(ordered: List[float], percentile: int) -> float:
+    """Nearest-rank percentile of an already sorted sample, in milliseconds."""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-percentile * len(ordered) // 100))
+    return round(ordered[rank - 1] * 1000, 2)
+
+
+async def _authenticate(client: httpx.AsyncClient, recorder: Recorder, email: str, password: str, use_login: bool) -> Optional[dict]:
+    if not use_login:
+        # Tokens are minted locally with the server's SECRET_KEY, so the login
+        # rate limiter does not throttle a single-IP benchmark.
+        return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+    response = await recorder.call(
+        "POST /auth/login-json",
+        client.post("/api/v1/auth/login-json", json={"username": email, "password": password}),
+    )
+    if response is None or response.status_code != 200:
+        return None
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run_student(client, recorder, manifest: Manifest, student: dict, args, semaphore: asyncio.Semaphore):
+    await asyncio.sleep(random.uniform(0, args.ramp_seconds))
+    async with semaphore:
+        headers = await _authenticate(client, recorder, student["email"], manifest.password, args.login)
+        if headers is None:
+            return
+
+        quiz_id = student["quiz_id"]
+        response = await recorder.call(
+            "POST /attempts/start",
+            client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers),
+        )
+        if response is None or response.status_code != 200:
+            return
+        attempt_id = response.json()["id"]
+
+        question_ids = manifest.question_ids[quiz_id][: args.answers]
+        answers = []
+        for question_id in question_ids:
+            answer_text = random.choice("ABCD")
+            answers.append({"question_id": question_id, "answer_text": answer_text})
+            await recorder.call(
+                "POST /attempts/{attempt_id}/save-answer",
+                client.post(
+                    f"/api/v1/attempts/{attempt_id}/save-answer",
+                    json={"question_id": question_id, "answer_text": answer_text},
+                    headers=headers,
+                ),
+            )
+            if args.think_ms:
+                await asyncio.sleep(random.uniform(0, args.think_ms) / 1000)
+
+        await recorder.call(
+            "GET /attempts/{attempt_id}/remaining-time",
+            client.get(f"/api/v1/attempts/{attempt_id}/remaining-time", headers=headers),
+        )
+        await recorder.call(
+            "POST /attempts/submit",
+            client.post(
+                "/api/v1/attempts/submit",
+                params={"attempt_id": attempt_id},
+                json={"answers": answers},
+                headers=headers,
+            ),
+        )
+
+
+async def run_teacher_poller(client, recorder, manifest: Manifest, args, done: asyncio.Event):
+    headers = await _authenticate(client, recorder, manifest.teacher_email, manifest.password, args.login)
+    if headers is None:
+        return
+    while not done.is_set():
+        for quiz_id in manifest.quiz_ids:
+            await recorder.call(
+                "GET /attempts/all-attempts",
+                client.get(
+                    "/api/v1/attempts/all-attempts",
+                    params={"quiz_id": quiz_id, "completed_only": False, "limit": 300},
+                    headers=headers,
+                ),
+            )
+        try:
+            await asyncio.wait_for(done.wait(), timeout=args.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_benchmark(manifest: Manifest, args) -> dict:
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    done = asyncio.Event()
+    limits = httpx.Limits(max_connections=args.concurrency + args.pollers, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        pollers = [
+            asyncio.create_task(run_teacher_poller(client, recorder, manifest, args, done))
+            for _ in range(args.pollers)
+        ]
+        await asyncio.gather(*[
+            run_student(client, recorder, manifest, student, args, semaphore)
+            for student in manifest.students
+        ])
+        recorder.finished_at = time.perf_counter()
+        done.set()
+        await asyncio.gather(*pollers)
+
+    return recorder.summary()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_summary(report: dict) -> None:
+    results = report["results"]
+    print(f"\n📊 {results['total_requests']} requests in {results['elapsed_seconds']}s "
+          f"({results['throughput_rps']} req/s, {results['total_errors']} errors)\n")
+    header = f"{'endpoint':44} {'reqs':>6} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>8} {'sql':>6}"
+    print(header)
+    print("-" * len(header))
+    for name, stats in results["endpoints"].items():
+        queries = "-" if stats["queries_avg"] is None else f"{stats['queries_avg']:g}"
+        print(f"{name:44} {stats['requests']:>6} {stats['errors']:>5} {stats['p50_ms']:>8} "
+              f"{stats['p95_ms']:>8} {stats['p99_ms']:>8} {stats['throughput_rps']:>8} {queries:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a live exam against a local MacQuiz server")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--quizzes", type=int, default=1)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--answers", type=int, default=None, help="Answers saved per student (default: all questions)")
+    parser.add_argument("--duration", type=int, default=30, help="Live session duration in minutes")
+    parser.add_argument("--concurrency", type=int, default=100, help="Students in flight at once")
+    parser.add_argument("--ramp-seconds", type=float, default=0.0,
+                        help="Spread student starts over this window (the grace window is 300s)")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Max random pause between autosaves")
+    parser.add_argument("--pollers", type=int, default=1, help="Teacher live-monitor pollers")
+    parser.add_argument("--poll-interval", type=float, default=10.0, help="Seconds between monitor polls")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--login", action="store_true", help="Log in via /auth/login-json instead of minting tokens")
+    parser.add_argument("--manifest", type=str, default=None, help="Reuse a manifest from bench.seed instead of seeding")
+    parser.add_argument("--seed-value", type=int, default=1234, help="Random seed for answer choices and ramp")
+    parser.add_argument("--output", type=str, default="bench_results.json")
+    args = parser.parse_args()
+
+    random.seed(args.seed_value)
+
+    if args.manifest:
+        with open(args.manifest, encoding="utf-8") as handle:
+            manifest = Manifest.from_json(handle.read())
+    else:
+        print(f"🌱 Seeding {args.students} students and {args.quizzes} live quiz(zes)...")
+        manifest = seed(args.students, args.quizzes, args.questions, args.duration)
+    if args.answers is None:
+        args.answers = args.questions
+
+    print(f"🚀 Running live exam: {len(manifest.students)} students, concurrency {args.concurrency}")
+    results = asyncio.run(run_benchmark(manifest, args))
+
+    report = {
+        "meta": {
+            "git_commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "run_id": manifest.run_id,
+            "database": engine.dialect.name,
+            "python": platform.python_version(),
+            "params": {
+                key: getattr(args, key)
+                for key in ("students", "quizzes", "questions", "answers", "concurrency",
+                            "ramp_seconds", "think_ms", "pollers", "poll_interval", "login")
+            },
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+
+    _print_summary(report)
+    print(f"\n💾 Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
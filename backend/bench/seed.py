@@ -0,0 +1,163 @@
+"""
+Seed a live-exam scenario for the benchmark harness.
+
+Creates one teacher, N students and M live quizzes starting now (each with
+Q questions), and assigns students to quizzes round-robin. Rows are tagged
+with a run id so several runs can share a throwaway database.
+
+    python -m bench.seed --students 1000 --quizzes 2 --questions 20
+"""
+
+import argparse
+import json
+import uuid
+from dataclasses import dataclass, asdict, field
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import insert
+
+from app.core.security import get_password_hash
+from app.db.database import SessionLocal, engine, Base
+from app.models.models import User, Quiz, Question, QuizAssignment
+
+BENCH_PASSWORD = "bench-password"
+
+
+@dataclass
+class Manifest:
+    run_id: str
+    teacher_email: str
+    password: str
+    quiz_ids: List[int]
+    question_ids: Dict[int, List[int]]
+    students: List[dict] = field(default_factory=list)  # {"email": ..., "quiz_id": ...}
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, raw: str) -> "Manifest":
+        data = json.loads(raw)
+        data["question_ids"] = {int(key): value for key, value in data["question_ids"].items()}
+        return cls(**data)
+
+
+def seed(students: int, quizzes: int, questions: int, duration_minutes: int, start_offset_seconds: int = 0) -> Manifest:
+    """Insert the scenario with bulk statements and return a manifest describing it."""
+    Base.metadata.create_all(bind=engine)
+
+    run_id = uuid.uuid4().hex[:8]
+    now = datetime.now()
+    live_start = now + timedelta(seconds=start_offset_seconds)
+    password_hash = get_password_hash(BENCH_PASSWORD)
+
+    db = SessionLocal()
+    try:
+        teacher = User(
+            email=f"bench-{run_id}-teacher@bench.local",
+            hashed_password=password_hash,
+            first_name="Bench",
+            last_name="Teacher",
+            role="teacher",
+            is_active=True,
+        )
+        db.add(teacher)
+        db.flush()
+
+        quiz_rows = []
+        for n in range(quizzes):
+            quiz = Quiz(
+                title=f"Bench {run_id} live quiz {n + 1}",
+                creator_id=teacher.id,
+                duration_minutes=duration_minutes,
+                grace_period_minutes=5,
+                is_live_session=True,
+                live_start_time=live_start,
+                live_end_time=live_start + timedelta(minutes=duration_minutes),
+                total_marks=float(questions),
+                marks_per_correct=1,
+                negative_marking=0.25,
+                is_active=True,
+            )
+            db.add(quiz)
+            quiz_rows.append(quiz)
+        db.flush()
+        quiz_ids = [quiz.id for quiz in quiz_rows]
+
+        db.execute(insert(Question), [
+            {
+                "quiz_id": quiz_id,
+                "question_text": f"Bench question {n + 1}",
+                "question_type": "mcq",
+                "option_a": "A", "option_b": "B", "option_c": "C", "option_d": "D",
+                "correct_answer": "ABCD"[n % 4],
+                "marks": 1,
+                "order": n,
+            }
+            for quiz_id in quiz_ids
+            for n in range(questions)
+        ])
+
+        emails = [f"bench-{run_id}-s{n:05d}@bench.local" for n in range(students)]
+        db.execute(insert(User), [
+            {
+                "email": email,
+                "hashed_password": password_hash,
+                "first_name": "Bench",
+                "last_name": f"Student {n}",
+                "role": "student",
+                "is_active": True,
+                "student_id": f"B{run_id}{n:05d}",
+                "department": "BENCH",
+                "class_year": "1st Year",
+                "created_at": now,
+                "last_active": now,
+            }
+            for n, email in enumerate(emails)
+        ])
+
+        student_ids = dict(db.query(User.email, User.id).filter(User.email.in_(emails)).all())
+        assignments = [
+            {"quiz_id": quiz_ids[n % quizzes], "student_id": student_ids[email], "assigned_at": now}
+            for n, email in enumerate(emails)
+        ]
+        db.execute(insert(QuizAssignment), assignments)
+
+        question_ids: Dict[int, List[int]] = {quiz_id: [] for quiz_id in quiz_ids}
+        for question_id, quiz_id in db.query(Question.id, Question.quiz_id).filter(
+            Question.quiz_id.in_(quiz_ids)
+        ).order_by(Question.quiz_id, Question.order).all():
+            question_ids[quiz_id].append(question_id)
+
+        db.commit()
+    finally:
+        db.close()
+
+    return Manifest(
+        run_id=run_id,
+        teacher_email=f"bench-{run_id}-teacher@bench.local",
+        password=BENCH_PASSWORD,
+        quiz_ids=quiz_ids,
+        question_ids=question_ids,
+        students=[{"email": email, "quiz_id": quiz_ids[n % quizzes]} for n, email in enumerate(emails)],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a live-exam benchmark scenario")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--quizzes", type=int, default=1)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--duration", type=int, default=30, help="Live session duration in minutes")
+    parser.add_argument("--manifest", type=str, default="bench_manifest.json", help="Where to write the manifest")
+    args = parser.parse_args()
+
+    manifest = seed(args.students, args.quizzes, args.questions, args.duration)
+    with open(args.manifest, "w", encoding="utf-8") as handle:
+        handle.write(manifest.to_json())
+    print(f"✅ Seeded run {manifest.run_id}: {args.students} students, {args.quizzes} quiz(zes) -> {args.manifest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+EXPLAIN-based validation of MacQuiz hot query shapes.
+
+Runs the query shapes behind attempts, quizzes, users and question bank
+endpoints through the database planner and fails (exit code 1) if any of
+them falls back to a full table scan.
+
+- SQLite: EXPLAIN QUERY PLAN, a bare "SCAN <table>" is a full scan
+- PostgreSQL: EXPLAIN (FORMAT JSON) with seq scans disabled, so a remaining
+  "Seq Scan" means no usable index exists
+- MySQL: EXPLAIN, access type ALL without the expected index in possible_keys
+
+Each query is also executed once and its latency reported.
+"""
+
+import argparse
+import json
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import select, text
+
+from app.db.database import engine
+from app.models.models import User, Quiz, Question, QuizAttempt, QuestionBank
+
+
+@dataclass
+class HotQuery:
+    name: str
+    table: str
+    expected_index: str
+    statement: object
+
+
+def _hot_queries(sample):
+    return [
+        HotQuery(
+            name="student attempts for quiz",
+            table="quiz_attempts",
+            expected_index="ix_quiz_attempts_student_quiz_completed",
+            statement=select(QuizAttempt.id).where(
+                QuizAttempt.student_id == sample["student_id"],
+                QuizAttempt.quiz_id == sample["quiz_id"],
+                QuizAttempt.is_completed == False,
+            ),
+        ),
+        HotQuery(
+            name="completed attempts for quiz",
+            table="quiz_attempts",
+            expected_index="ix_quiz_attempts_quiz_completed",
+            statement=select(QuizAttempt.id, QuizAttempt.score).where(
+                QuizAttempt.quiz_id == sample["quiz_id"],
+                QuizAttempt.is_completed == True,
+            ),
+        ),
+        HotQuery(
+            name="ordered questions for quiz",
+            table="questions",
+            expected_index="ix_questions_quiz_order",
+            statement=select(Question.id).where(
+                Question.quiz_id == sample["quiz_id"],
+            ).order_by(Question.order.asc()),
+        ),
+        HotQuery(
+            name="teacher quizzes by recency",
+            table="quizzes",
+            expected_index="ix_quizzes_creator_created",
+            statement=select(Quiz.id).where(
+                Quiz.creator_id == sample["creator_id"],
+            ).order_by(Quiz.created_at.desc()).limit(100),
+        ),
+        HotQuery(
+            name="users by role/department/class",
+            table="users",
+            expected_index="ix_users_role_department_class_year",
+            statement=select(User.id).where(
+                User.role == "student",
+                User.department == sample["department"],
+                User.class_year == sample["class_year"],
+            ),
+        ),
+        HotQuery(
+            name="question bank by subject/difficulty",
+            table="question_bank",
+            expected_index="ix_question_bank_subject_active_difficulty",
+            statement=select(QuestionBank.id).where(
+                QuestionBank.subject_id == sample["subject_id"],
+                QuestionBank.is_active == True,
+                QuestionBank.difficulty == "medium",
+            ),
+        ),
+    ]
+
+
+def _sample_values(connection):
+    """Pick realistic filter values from existing data (falls back to 1/'CSE')."""
+    def first(sql, default):
+        value = connection.execute(text(sql)).scalar()
+        return default if value is None else value
+
+    return {
+        "student_id": first("SELECT student_id FROM quiz_attempts ORDER BY id DESC LIMIT 1", 1),
+        "quiz_id": first("SELECT quiz_id FROM quiz_attempts ORDER BY id DESC LIMIT 1", 1),
+        "creator_id": first("SELECT creator_id FROM quizzes ORDER BY id DESC LIMIT 1", 1),
+        "subject_id": first("SELECT subject_id FROM question_bank ORDER BY id DESC LIMIT 1", 1),
+        "department": first("SELECT department FROM users WHERE department IS NOT NULL LIMIT 1", "CSE"),
+        "class_year": first("SELECT class_year FROM users WHERE class_year IS NOT NULL LIMIT 1", "1st Year"),
+    }
+
+
+def _compile(statement) -> str:
+    return str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def _explain_sqlite(connection, sql: str, hot_query: HotQuery):
+    rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    plan = [row[-1] for row in rows]
+    full_scan = any(
+        detail.startswith(f"SCAN {hot_query.table}") and "USING" not in detail
+        for detail in plan
+    )
+    return plan, full_scan
+
+
+def _walk_pg_plan(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk_pg_plan(child)
+
+
+def _explain_postgresql(connection, sql: str, hot_query: HotQuery):
+    with connection.begin():
+        # Small tables are seq-scanned regardless of indexes; disabling seq scans
+        # asks the planner whether an index path exists at all.
+        connection.execute(text("SET LOCAL enable_seqscan = off"))
+        raw = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    document = raw if isinstance(raw, list) else json.loads(raw)
+    nodes = list(_walk_pg_plan(document[0]["Plan"]))
+    plan = [
+        f"{node['Node Type']} {node.get('Relation Name', '')} {node.get('Index Name', '')}".strip()
+        for node in nodes
+    ]
+    full_scan = any(
+        node["Node Type"] == "Seq Scan" and node.get("Relation Name") == hot_query.table
+        for node in nodes
+    )
+    return plan, full_scan
+
+
+def _explain_mysql(connection, sql: str, hot_query: HotQuery):
+    rows = connection.execute(text(f"EXPLAIN {sql}")).mappings().all()
+    plan = [
+        f"table={row['table']} type={row['type']} key={row['key']} possible_keys={row['possible_keys']}"
+        for row in rows
+    ]
+    full_scan = any(
+        row["table"] == hot_query.table
+        and row["type"] == "ALL"
+        and hot_query.expected_index not in (row["possible_keys"] or "")
+        for row in rows
+    )
+    return plan, full_scan
+
+
+EXPLAINERS = {
+    "sqlite": _explain_sqlite,
+    "postgresql": _explain_postgresql,
+    "mysql": _explain_mysql,
+}
+
+
+def run(verbose: bool) -> int:
+    dialect = engine.dialect.name
+    explain = EXPLAINERS.get(dialect)
+    if explain is None:
+        print(f"❌ Unsupported dialect: {dialect}")
+        return 2
+
+    print(f"🔍 Checking hot query plans on {dialect}...\n")
+    failures = []
+
+    with engine.connect() as connection:
+        sample = _sample_values(connection)
+        if connection.in_transaction():
+            connection.commit()
+
+        for hot_query in _hot_queries(sample):
+            sql = _compile(hot_query.statement)
+            plan, full_scan = explain(connection, sql, hot_query)
+            if connection.in_transaction():
+                connection.commit()
+
+            started = time.perf_counter()
+            connection.execute(text(sql)).fetchall()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            marker = "❌ FULL SCAN" if full_scan else "✅ indexed"
+            print(f"  {marker}  {hot_query.name} ({elapsed_ms:.2f} ms)")
+            if verbose or full_scan:
+                for line in plan:
+                    print(f"        {line}")
+
+            if full_scan:
+                failures.append(hot_query)
+
+    if failures:
+        print(f"\n⚠️  {len(failures)} hot query shape(s) fall back to a full scan:")
+        for hot_query in failures:
+            print(f"  - {hot_query.name}: expected {hot_query.expected_index} on {hot_query.table}")
+        print("Run `python migrate_hot_indexes.py --apply` and re-check.")
+        return 1
+
+    print("\n🎉 All hot query shapes use an index.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if hot query shapes fall back to full table scans")
+    parser.add_argument("--verbose", action="store_true", help="Print the plan for every query")
+    args = parser.parse_args()
+    raise SystemExit(run(verbose=args.verbose))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,79 +1,104 @@
-from app.db.database import SessionLocal
-from app.models.models import QuizAttempt, User, Quiz, Answer
-from collections import defaultdict
+"""
+Remove redundant quiz attempts.
+
+Features:
+- Duplicate attempts per (student, quiz) found with ROW_NUMBER() over each
+  student's attempts; the completed, newest attempt is kept
+- Teacher/admin preview attempts stored before previews moved to memory
+- Batched deletes (answers, then attempts) in one short transaction per
+  --chunk-size id range, so the app keeps running while it works
+- Dry-run report by default; pass --apply to delete
+
+Report only: python check_redundancy.py
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+
+from app.db.database import engine
+from app.db.maintenance import (
+    delete_attempts,
+    duplicate_attempts,
+    id_ranges,
+    preview_attempts,
+)
+from app.models.models import QuizAttempt
+
+
+@dataclass
+class CleanupJob:
+    name: str
+    description: str
+    range_column: object
+    query: object  # id range -> SELECT of attempt rows to remove
+
+
+JOBS = [
+    CleanupJob(
+        name="duplicates",
+        description="Duplicate attempts (same student + quiz)",
+        range_column=QuizAttempt.student_id,
+        query=duplicate_attempts,
+    ),
+    CleanupJob(
+        name="previews",
+        description="Stored teacher/admin preview attempts",
+        range_column=QuizAttempt.id,
+        query=preview_attempts,
+    ),
+]
+
+
+def run_job(job: CleanupJob, apply_changes: bool, chunk_size: int, show: int) -> int:
+    found = 0
+    with engine.connect() as connection:
+        ranges = list(id_ranges(connection, job.range_column, chunk_size))
+
+    for id_range in ranges:
+        with engine.begin() as connection:
+            rows = connection.execute(job.query(id_range)).all()
+            for row in rows[: max(0, show - found)]:
+                state = "Completed" if getattr(row, "is_completed", False) else "Incomplete"
+                print(f"   ✗ Attempt #{row.id}: student {row.student_id}, quiz {row.quiz_id} ({state})")
+            found += len(rows)
+            if apply_changes:
+                delete_attempts(connection, [row.id for row in rows])
+    return found
+
+
+def run(apply_changes: bool, chunk_size: int, show: int) -> int:
+    print(f"🧹 {'Removing' if apply_changes else 'Checking for'} redundant attempts on {engine.dialect.name}...\n")
+    total = 0
+    for number, job in enumerate(JOBS, start=1):
+        print(f"{number}️⃣ {job.description}")
+        started = time.perf_counter()
+        found = run_job(job, apply_changes, chunk_size, show)
+        elapsed = time.perf_counter() - started
+        if found > show:
+            print(f"   ... and {found - show} more")
+        verb = "Removed" if apply_changes else "Found"
+        print(f"   {verb} {found} attempt(s) in {elapsed:.2f}s\n")
+        total += found
+
+    if not total:
+        print("✅ No redundant attempts")
+        return 0
+    if not apply_changes:
+        print(f"ℹ️  Dry run only. {total} attempt(s) would be removed. Re-run with --apply to delete them.")
+        return 1
+    print(f"✅ Cleanup complete! Total removed: {total} redundant attempts")
+    return 0
+
 
 def main():
-    db = SessionLocal()
-    try:
-        print("🧹 Starting cleanup of redundant data...\n")
-
-        # 1. Remove duplicate attempts - keep only the latest completed one per user+quiz
-        print("1️⃣ Cleaning duplicate attempts...")
-        attempts = db.query(QuizAttempt).all()
-        duplicates = defaultdict(list)
-
-        for attempt in attempts:
-            key = (attempt.student_id, attempt.quiz_id)
-            duplicates[key].append(attempt)
-
-        removed_count = 0
-        for (student_id, quiz_id), attempt_list in duplicates.items():
-            if len(attempt_list) > 1:
-                # Sort by: completed first, then by started_at (newest first)
-                sorted_attempts = sorted(
-                    attempt_list,
-                    key=lambda x: (not x.is_completed, x.started_at),
-                    reverse=True
-                )
-
-                # Keep the first one (completed and newest, or just newest)
-                keep = sorted_attempts[0]
-                to_remove = sorted_attempts[1:]
-
-                user = db.query(User).filter(User.id == student_id).first()
-                quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
-
-                print(f"   User: {user.email}, Quiz: {quiz.title if quiz else 'Unknown'}")
-                print(f"   ✓ Keeping: Attempt #{keep.id} ({'Completed' if keep.is_completed else 'Incomplete'})")
-
-                for attempt_item in to_remove:
-                    print(
-                        f"   ✗ Removing: Attempt #{attempt_item.id} "
-                        f"({'Completed' if attempt_item.is_completed else 'Incomplete'})"
-                    )
-                    db.query(Answer).filter(Answer.attempt_id == attempt_item.id).delete(synchronize_session=False)
-                    db.delete(attempt_item)
-                    removed_count += 1
-
-        db.commit()
-        print(f"   Removed {removed_count} duplicate attempts\n")
-
-        # 2. Clean up incomplete teacher/admin attempts
-        print("2️⃣ Cleaning incomplete teacher/admin preview attempts...")
-        teacher_attempts = db.query(QuizAttempt).join(User).filter(
-            User.role.in_(['teacher', 'admin']),
-            QuizAttempt.is_completed == False
-        ).all()
-
-        teacher_removed = 0
-        for attempt_item in teacher_attempts:
-            user = db.query(User).filter(User.id == attempt_item.student_id).first()
-            quiz = db.query(Quiz).filter(Quiz.id == attempt_item.quiz_id).first()
-            print(
-                f"   ✗ Removing incomplete preview: {user.email}, "
-                f"Quiz: {quiz.title if quiz else 'Unknown'}, Attempt #{attempt_item.id}"
-            )
-            db.query(Answer).filter(Answer.attempt_id == attempt_item.id).delete(synchronize_session=False)
-            db.delete(attempt_item)
-            teacher_removed += 1
-
-        db.commit()
-        print(f"   Removed {teacher_removed} incomplete teacher/admin attempts\n")
-
-        print("✅ Cleanup complete!")
-        print(f"   Total removed: {removed_count + teacher_removed} redundant attempts")
-    finally:
-        db.close()
+    parser = argparse.ArgumentParser(description="Remove duplicate and stored preview quiz attempts")
+    parser.add_argument("--apply", action="store_true", help="Delete the attempts (default is a dry run)")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="Width of the id range handled per transaction")
+    parser.add_argument("--show", type=int, default=20, help="Attempts listed per category")
+    args = parser.parse_args()
+    raise SystemExit(run(apply_changes=args.apply, chunk_size=args.chunk_size, show=args.show))
 
 
 if __name__ == "__main__":
@@ -1,66 +1,154 @@
 """
-Fix incorrect attempt data (score and time_taken) for existing attempts
+Fix incorrect attempt data (score and time_taken) for existing attempts.
+
+Features:
+- Recomputes scores from stored answers with the submit marking rules
+  (full question marks when correct, quiz negative marking otherwise,
+  floored at zero) in one grouped UPDATE ... FROM per id range
+- Caps time_taken_minutes at the quiz duration with an UPDATE ... FROM quizzes
+- Recounts (and backfills) the answered/correct counters on quiz_attempts
+- Recomputes the stored sanity flags (run after changing app.core.sanity_flags)
+- Rebuilds missing or drifted per-question stats (question_stats) from answers
+- One short transaction per --chunk-size range of attempt ids
+- Dry-run report by default; pass --apply to write
 """
-from app.db.database import SessionLocal
-from app.models.models import QuizAttempt, Quiz, Answer, Question
-
-def fix_attempt_scores_and_time():
-    db = SessionLocal()
-    try:
-        # Get all completed attempts
-        attempts = db.query(QuizAttempt).filter(QuizAttempt.is_completed == True).all()
-        
-        print(f"Found {len(attempts)} completed attempts to check...")
-        
-        for attempt in attempts:
-            quiz = db.query(Quiz).filter(Quiz.id == attempt.quiz_id).first()
-            if not quiz:
-                continue
-            
-            # Recalculate score
-            correct_count = 0
-            total_score = 0
-            
-            answers = db.query(Answer).filter(Answer.attempt_id == attempt.id).all()
-            for answer in answers:
-                question = db.query(Question).filter(Question.id == answer.question_id).first()
-                if question:
-                    if answer.is_correct:
-                        # Award full question marks (not marks_per_correct * marks)
-                        total_score += question.marks
-                        correct_count += 1
-                    else:
-                        # Apply negative marking
-                        if quiz.negative_marking and quiz.negative_marking > 0:
-                            total_score -= quiz.negative_marking
-            
-            # Fix score if different
-            old_score = attempt.score
-            new_score = max(0, total_score)
-            
-            if old_score != new_score:
-                print(f"\nAttempt ID {attempt.id}:")
-                print(f"  Old score: {old_score} -> New score: {new_score}")
-                attempt.score = new_score
-                attempt.percentage = (new_score / attempt.total_marks * 100) if attempt.total_marks > 0 else 0
-                print(f"  New percentage: {attempt.percentage:.1f}%")
-            
-            # Fix time_taken if it exceeds quiz duration
-            if attempt.time_taken_minutes and quiz.duration_minutes:
-                if attempt.time_taken_minutes > quiz.duration_minutes:
-                    print(f"\nAttempt ID {attempt.id}:")
-                    print(f"  Time taken was {attempt.time_taken_minutes:.2f}m (exceeds quiz duration)")
-                    print(f"  Capping at quiz duration: {quiz.duration_minutes}m")
-                    attempt.time_taken_minutes = quiz.duration_minutes
-        
-        db.commit()
-        print("\n✅ All attempts fixed successfully!")
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        db.rollback()
-    finally:
-        db.close()
+
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from sqlalchemy import func, select
+
+from app.core.sanity_flags import flag_names
+from app.db.database import engine
+from app.db.maintenance import (
+    cap_time_taken,
+    drifted_scores,
+    id_ranges,
+    drifted_answer_counters,
+    drifted_question_stats,
+    drifted_sanity_flags,
+    overlong_attempts,
+    rebuild_question_stats,
+    recount_answers,
+    reflag_attempts,
+    rescore_attempts,
+)
+from app.models.models import Question, QuizAttempt
+
+
+@dataclass
+class RepairJob:
+    description: str
+    report: Callable  # id range -> SELECT of affected rows
+    repair: Callable  # (connection, id range) -> rows updated
+    describe: Callable  # row -> printable line
+    ranges_over: Any = QuizAttempt.id  # column the id ranges are taken from
+    unit: str = "attempt"
+
+
+JOBS = [
+    RepairJob(
+        description="Scores that don't match the stored answers",
+        report=drifted_scores,
+        repair=rescore_attempts,
+        describe=lambda row: (
+            f"Attempt #{row.id}: score {row.old_score} -> {row.new_score} ({row.new_percentage:.1f}%)"
+        ),
+    ),
+    RepairJob(
+        description="Time taken longer than the quiz duration",
+        report=overlong_attempts,
+        repair=cap_time_taken,
+        describe=lambda row: (
+            f"Attempt #{row.id}: {row.time_taken_minutes:.2f}m capped at {row.duration_minutes}m"
+        ),
+    ),
+    RepairJob(
+        description="Answer counters that don't match the answers",
+        report=drifted_answer_counters,
+        repair=recount_answers,
+        describe=lambda row: (
+            f"Attempt #{row.id}: answered {row.answered_count} -> {row.new_answered}, "
+            f"correct {row.correct_count} -> {row.new_correct}"
+        ),
+    ),
+    # Last: the flags read the scores and counters fixed above
+    RepairJob(
+        description="Sanity flags that don't match the current rules",
+        report=drifted_sanity_flags,
+        repair=reflag_attempts,
+        describe=lambda row: (
+            f"Attempt #{row.id}: {flag_names(row.sanity_flags) or 'none'} -> {flag_names(row.new_flags) or 'none'}"
+        ),
+    ),
+    RepairJob(
+        description="Question stats that don't match the graded answers",
+        report=drifted_question_stats,
+        repair=rebuild_question_stats,
+        describe=lambda row: (
+            f"Question #{row.id}: answered {row.attempts if row.attempts is not None else 'missing'} -> "
+            f"{row.new_attempts}, correct {row.correct_count if row.correct_count is not None else 'missing'} -> "
+            f"{row.new_correct}"
+        ),
+        ranges_over=Question.id,
+        unit="question",
+    ),
+]
+
+
+def run_job(job: RepairJob, apply_changes: bool, chunk_size: int, show: int) -> int:
+    affected = 0
+    with engine.connect() as connection:
+        ranges = list(id_ranges(connection, job.ranges_over, chunk_size))
+
+    for id_range in ranges:
+        with engine.begin() as connection:
+            if affected < show:
+                for row in connection.execute(job.report(id_range).limit(show - affected)):
+                    print(f"   • {job.describe(row)}")
+            if apply_changes:
+                affected += job.repair(connection, id_range)
+            else:
+                affected += connection.scalar(select(func.count()).select_from(job.report(id_range).subquery()))
+    return affected
+
+
+def run(apply_changes: bool, chunk_size: int, show: int) -> int:
+    print(f"🔧 {'Fixing' if apply_changes else 'Checking'} attempt data on {engine.dialect.name}...\n")
+    total = 0
+    for number, job in enumerate(JOBS, start=1):
+        print(f"{number}️⃣ {job.description}")
+        started = time.perf_counter()
+        affected = run_job(job, apply_changes, chunk_size, show)
+        if affected > show:
+            print(f"   ... and {affected - show} more")
+        verb = "Fixed" if apply_changes else "Found"
+        print(f"   {verb} {affected} {job.unit}(s) in {time.perf_counter() - started:.2f}s\n")
+        total += affected
+
+    if not total:
+        print("✅ All attempts are consistent")
+        return 0
+    if not apply_changes:
+        print(f"ℹ️  Dry run only. {total} fix(es) pending. Re-run with --apply to write them.")
+        return 1
+    print("✅ All attempts fixed successfully!")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recompute attempt scores, answer counters, sanity flags and question stats, cap time taken"
+    )
+    parser.add_argument("--apply", action="store_true", help="Write the fixes (default is a dry run)")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="Attempt (or question) ids handled per transaction")
+    parser.add_argument("--show", type=int, default=20, help="Attempts listed per category")
+    args = parser.parse_args()
+    raise SystemExit(run(apply_changes=args.apply, chunk_size=args.chunk_size, show=args.show))
+
 
 if __name__ == "__main__":
-    fix_attempt_scores_and_time()
+    main()
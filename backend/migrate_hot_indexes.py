@@ -0,0 +1,227 @@
+"""
+Composite index migration for MacQuiz hot query shapes.
+
+Features:
+- Works on SQLite, MySQL and PostgreSQL
+- Index definitions are read from the ORM models (single source of truth)
+- Dry-run mode by default (read-only: missing tables are reported, not
+  created), idempotent when re-run with --apply
+- Optional CONCURRENTLY builds on PostgreSQL to avoid write locks
+- Reports table sizes and build time per index
+- Unique indexes are only built once no existing rows violate them
+
+Validate the result with: python check_query_plans.py
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.schema import DDL
+
+from app.db.database import engine, Base
+from app.db.maintenance import duplicate_active_attempts
+from app.models.models import ACTIVE_ATTEMPT_MYSQL_DDL
+
+
+@dataclass
+class HotIndex:
+    table: str
+    name: str
+    description: str
+    violations: Optional[Callable] = None  # SELECT of rows the index would reject
+    mysql_ddl: Optional[DDL] = None  # replaces the model index on MySQL
+
+
+HOT_INDEXES = [
+    HotIndex(
+        table="quiz_attempts",
+        name="ix_quiz_attempts_student_quiz_completed",
+        description="Student start/eligibility/my-attempts lookups",
+    ),
+    HotIndex(
+        table="quiz_attempts",
+        name="ix_quiz_attempts_quiz_completed",
+        description="Teacher monitor and quiz statistics per quiz",
+    ),
+    HotIndex(
+        table="quiz_attempts",
+        name="uq_quiz_attempts_active",
+        description="One incomplete attempt per student and quiz (single-statement start)",
+        violations=duplicate_active_attempts,
+        mysql_ddl=ACTIVE_ATTEMPT_MYSQL_DDL,
+    ),
+    HotIndex(
+        table="quiz_attempts",
+        name="ix_quiz_attempts_sanity_flags",
+        description="Review queue of flagged attempts, newest first",
+    ),
+    HotIndex(
+        table="questions",
+        name="ix_questions_quiz_order",
+        description="Ordered question list for a quiz",
+    ),
+    HotIndex(
+        table="quizzes",
+        name="ix_quizzes_creator_created",
+        description="Teacher quiz list ordered by creation time",
+    ),
+    HotIndex(
+        table="users",
+        name="ix_users_role_department_class_year",
+        description="Role/department/class filters in user and analytics lists",
+    ),
+    HotIndex(
+        table="question_bank",
+        name="ix_question_bank_subject_active_difficulty",
+        description="Question bank browsing by subject and difficulty",
+    ),
+]
+
+
+def _model_index(hot_index: HotIndex):
+    table = Base.metadata.tables[hot_index.table]
+    for index in table.indexes:
+        if index.name == hot_index.name:
+            return index
+    raise LookupError(f"{hot_index.name} is not declared on the {hot_index.table} model")
+
+
+def _existing_index_names(table_name: str) -> set:
+    inspector = inspect(engine)
+    return {idx["name"] for idx in inspector.get_indexes(table_name)}
+
+
+def _row_count(connection, table_name: str) -> int:
+    quoted = engine.dialect.identifier_preparer.quote(table_name)
+    return int(connection.execute(text(f"SELECT COUNT(*) FROM {quoted}")).scalar() or 0)
+
+
+def _violation_count(connection, hot_index: HotIndex) -> int:
+    if hot_index.violations is None:
+        return 0
+    return int(connection.scalar(select(func.count()).select_from(hot_index.violations().subquery())) or 0)
+
+
+def _create_index(hot_index: HotIndex, concurrently: bool) -> None:
+    index = _model_index(hot_index)
+
+    if engine.dialect.name == "mysql" and hot_index.mysql_ddl is not None:
+        with engine.begin() as connection:
+            connection.execute(hot_index.mysql_ddl)
+        return
+
+    if engine.dialect.name == "postgresql" and concurrently:
+        preparer = engine.dialect.identifier_preparer
+        columns = ", ".join(preparer.quote(column.name) for column in index.columns)
+        unique = "UNIQUE " if index.unique else ""
+        where = index.dialect_options["postgresql"]["where"]
+        sql = (
+            f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {preparer.quote(index.name)} "
+            f"ON {preparer.quote(hot_index.table)} ({columns})"
+            + (f" WHERE {where}" if where is not None else "")
+        )
+        # CONCURRENTLY cannot run inside a transaction block.
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text(sql))
+        return
+
+    with engine.begin() as connection:
+        index.create(bind=connection, checkfirst=True)
+
+
+def run(apply_changes: bool, concurrently: bool) -> int:
+    dialect = engine.dialect.name
+    if dialect not in {"sqlite", "mysql", "postgresql"}:
+        print(f"❌ Unsupported dialect: {dialect}")
+        return 2
+
+    if concurrently and dialect != "postgresql":
+        print("ℹ️  --concurrently only applies to PostgreSQL; using regular index builds")
+        concurrently = False
+
+    print(f"🔍 Checking hot-path indexes on {dialect}...")
+    existing_tables = set(inspect(engine).get_table_names())
+    missing_tables = [table for table in Base.metadata.sorted_tables if table.name not in existing_tables]
+    for table in missing_tables:
+        print(f"  - table {table.name}: MISSING")
+
+    missing = []
+    with engine.connect() as connection:
+        for hot_index in HOT_INDEXES:
+            if hot_index.table not in existing_tables:
+                print(f"  - {hot_index.name} on {hot_index.table}: MISSING (created with its table)")
+                missing.append(hot_index)
+                continue
+            rows = _row_count(connection, hot_index.table)
+            present = hot_index.name in _existing_index_names(hot_index.table)
+            state = "PRESENT" if present else "MISSING"
+            print(f"  - {hot_index.name} on {hot_index.table} ({rows} rows): {state}")
+            if not present:
+                missing.append(hot_index)
+
+    if not missing and not missing_tables:
+        print("\n✅ All hot-path indexes are already in place")
+        return 0
+
+    if not apply_changes:
+        print(f"\nℹ️  Dry run only. {len(missing_tables)} table(s) and {len(missing)} index(es) missing. "
+              "Re-run with --apply to create them.")
+        return 1
+
+    if missing_tables:
+        print("\n🚀 Creating missing tables...")
+        Base.metadata.create_all(bind=engine, tables=missing_tables, checkfirst=True)
+        for table in missing_tables:
+            print(f"  ✅ Created {table.name} with its indexes")
+
+    print("\n🚀 Creating missing indexes...")
+    skipped = 0
+    for hot_index in missing:
+        if hot_index.table not in existing_tables:
+            continue  # built by create_all with the table
+        with engine.connect() as connection:
+            violations = _violation_count(connection, hot_index)
+        if violations:
+            print(f"  ⚠️  Skipped {hot_index.name}: {violations} existing row(s) violate it. "
+                  "Run `python cleanup_redundancy.py --apply` first.")
+            skipped += 1
+            continue
+        started = time.perf_counter()
+        _create_index(hot_index, concurrently=concurrently)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"  ✅ Created {hot_index.name} in {elapsed_ms:.1f} ms ({hot_index.description})")
+
+    if dialect in {"sqlite", "postgresql"}:
+        # Refresh planner statistics so the new indexes are picked up immediately.
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("ANALYZE"))
+        print("  ✅ Refreshed planner statistics (ANALYZE)")
+
+    if skipped:
+        print(f"\n⚠️  {skipped} index(es) skipped. Clean up the listed rows and re-run.")
+        return 1
+    print("\n🎉 Hot-path indexes applied. Run `python check_query_plans.py` to verify query plans.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create composite indexes for hot query shapes")
+    parser.add_argument(
+        "--apply",
+        action="store_true",
+        help="Create missing indexes (default is a dry run)",
+    )
+    parser.add_argument(
+        "--concurrently",
+        action="store_true",
+        help="PostgreSQL only: build indexes with CREATE INDEX CONCURRENTLY",
+    )
+    args = parser.parse_args()
+    raise SystemExit(run(apply_changes=args.apply, concurrently=args.concurrently))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,11 +12,21 @@ from datetime import datetime
 from sqlalchemy import inspect, text
 
 from app.db.database import engine, Base
+from app.models.models import Quiz, QuizAttempt
 
 
 DB_PATH = "quizapp.db"
 BACKUP_PATH = f"quizapp_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
 
+# Columns added to existing tables after they were first created
+ADDED_COLUMNS = [
+    ("quiz_attempts", QuizAttempt.__table__.c.answered_count),
+    ("quiz_attempts", QuizAttempt.__table__.c.correct_count),
+    ("quiz_attempts", QuizAttempt.__table__.c.last_answer_at),
+    ("quiz_attempts", QuizAttempt.__table__.c.sanity_flags),
+    ("quizzes", Quiz.__table__.c.content_version),
+]
+
 
 def backup_database():
     """Create a backup of SQLite database before migration."""
@@ -37,6 +47,14 @@ def migrate_database():
     existing_indexes.update({idx["name"] for idx in inspector.get_indexes("quiz_assignments")})
 
     statements = []
+    for table_name, column in ADDED_COLUMNS:
+        if column.name in {existing["name"] for existing in inspector.get_columns(table_name)}:
+            continue
+        column_sql = f"{column.name} {column.type.compile(dialect=engine.dialect)}"
+        if column.server_default is not None:
+            column_sql += f" NOT NULL DEFAULT {column.server_default.arg}"
+        statements.append(f"ALTER TABLE {table_name} ADD COLUMN {column_sql}")
+
     if "uq_answers_attempt_question" not in existing_indexes:
         statements.append(
             "CREATE UNIQUE INDEX uq_answers_attempt_question ON answers (attempt_id, question_id)"
@@ -63,6 +81,7 @@ def migrate_database():
                     print(f"⚠️  Skipping index statement due to error: {error}")
 
     print("✅ Migration completed successfully!")
+    print("ℹ️  Backfill new attempt counters with: python fix_attempt_data.py --apply")
 
 
 def verify_migration():
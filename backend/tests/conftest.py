@@ -0,0 +1,280 @@
+import os
+from datetime import datetime, timedelta
+
+# Keep the app away from the developer database and the admin bootstrap.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("ADMIN_EMAIL", "")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.core.rate_limit import MemoryStorage, RateLimiter
+from app.core.security import create_access_token, get_password_hash
+from app.db import maintenance
+from app.db.database import Base, get_db, get_async_db, get_async_session_factory, get_read_router, get_write_queue
+from app.db.replica import ReadRouter
+from app.main import app
+from app.models.models import (
+    User, Subject, QuestionBank, Quiz, Question, QuizAttempt, Answer, QuizAssignment,
+)
+from tests.query_counter import count_queries
+
+STUDENTS = 60
+QUIZZES_PER_TEACHER = 3
+QUESTIONS_PER_QUIZ = 10
+COMPLETED_PER_QUIZ = 40
+IN_PROGRESS_PER_QUIZ = 10
+
+
+def _seed(session) -> dict:
+    """Seed a realistic tree: 2 teachers, 60 students, 6 quizzes with attempts and answers."""
+    now = datetime.now()
+    password_hash = get_password_hash("password123")
+
+    def user_row(email, role, **extra):
+        return {
+            "email": email,
+            "hashed_password": password_hash,
+            "first_name": email.split("@")[0].title(),
+            "last_name": "Test",
+            "role": role,
+            "is_active": True,
+            "created_at": now,
+            "last_active": now,
+            **extra,
+        }
+
+    session.execute(insert(User), [
+        user_row("admin@example.com", "admin"),
+        user_row("teacher1@example.com", "teacher"),
+        user_row("teacher2@example.com", "teacher"),
+    ] + [
+        user_row(
+            f"student{n}@example.com",
+            "student",
+            student_id=f"S{n:04d}",
+            department="CSE" if n % 2 else "ECE",
+            class_year=f"{n % 4 + 1} Year",
+        )
+        for n in range(1, STUDENTS + 1)
+    ])
+    users = {user.email: user for user in session.query(User).all()}
+    teachers = [users["teacher1@example.com"], users["teacher2@example.com"]]
+    students = [users[f"student{n}@example.com"] for n in range(1, STUDENTS + 1)]
+
+    subject = Subject(name="Algorithms", code="CS201", creator_id=teachers[0].id, created_at=now)
+    session.add(subject)
+    session.flush()
+    session.execute(insert(QuestionBank), [
+        {
+            "subject_id": subject.id,
+            "creator_id": teachers[0].id,
+            "question_text": f"Bank question {n}",
+            "question_type": "mcq",
+            "option_a": "A", "option_b": "B", "option_c": "C", "option_d": "D",
+            "correct_answer": "A",
+            "difficulty": "medium",
+            "marks": 1,
+            "times_used": 0,
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for n in range(20)
+    ])
+
+    quizzes = []
+    for teacher in teachers:
+        for n in range(QUIZZES_PER_TEACHER):
+            quiz = Quiz(
+                title=f"{teacher.first_name} quiz {n}",
+                creator_id=teacher.id,
+                subject_id=subject.id,
+                duration_minutes=60,
+                grace_period_minutes=5,
+                total_marks=QUESTIONS_PER_QUIZ,
+                marks_per_correct=1,
+                negative_marking=0.25,
+                is_active=True,
+                created_at=now - timedelta(days=n),
+                updated_at=now,
+            )
+            session.add(quiz)
+            quizzes.append(quiz)
+    session.flush()
+
+    session.execute(insert(Question), [
+        {
+            "quiz_id": quiz.id,
+            "question_text": f"Question {n}",
+            "question_type": "mcq",
+            "option_a": "A", "option_b": "B", "option_c": "C", "option_d": "D",
+            "correct_answer": "A",
+            "marks": 1,
+            "order": n,
+        }
+        for quiz in quizzes
+        for n in range(QUESTIONS_PER_QUIZ)
+    ])
+    session.execute(insert(QuizAssignment), [
+        {"quiz_id": quiz.id, "student_id": student.id, "assigned_at": now}
+        for quiz in quizzes
+        for student in students
+    ])
+
+    questions_by_quiz = {}
+    for question in session.query(Question).all():
+        questions_by_quiz.setdefault(question.quiz_id, []).append(question)
+
+    attempt_rows = []
+    for quiz in quizzes:
+        for idx, student in enumerate(students[:COMPLETED_PER_QUIZ + IN_PROGRESS_PER_QUIZ]):
+            completed = idx < COMPLETED_PER_QUIZ
+            attempt_rows.append({
+                "quiz_id": quiz.id,
+                "student_id": student.id,
+                "total_marks": quiz.total_marks,
+                "score": float(idx % QUESTIONS_PER_QUIZ) if completed else None,
+                "percentage": float(idx % QUESTIONS_PER_QUIZ) * 10 if completed else None,
+                "started_at": now - timedelta(minutes=30),
+                "submitted_at": now - timedelta(minutes=5) if completed else None,
+                "time_taken_minutes": 25.0 if completed else None,
+                "is_completed": completed,
+                "is_graded": completed,
+            })
+    session.execute(insert(QuizAttempt), attempt_rows)
+
+    answer_rows = []
+    for attempt in session.query(QuizAttempt).all():
+        for n, question in enumerate(questions_by_quiz[attempt.quiz_id]):
+            correct = n % 3 != 0
+            answer_rows.append({
+                "attempt_id": attempt.id,
+                "question_id": question.id,
+                "answer_text": "A" if correct else "B",
+                "is_correct": correct if attempt.is_completed else False,
+                "marks_awarded": (1.0 if correct else -0.25) if attempt.is_completed else 0.0,
+            })
+    session.execute(insert(Answer), answer_rows)
+    maintenance.recount_answers(session.connection(), (0, len(attempt_rows) + 1))
+    maintenance.rebuild_question_stats(session.connection(), (0, session.scalar(select(func.max(Question.id))) + 1))
+    session.commit()
+
+    return {
+        "admin": users["admin@example.com"],
+        "teacher": teachers[0],
+        "students": students,
+        "quizzes": quizzes,
+        "fresh_student": students[-1],
+    }
+
+
+@pytest.fixture(scope="session")
+def database_path(tmp_path_factory):
+    # A file database so the sync engine (seeding, sync routers) and the
+    # aiosqlite engine (async routers) see the same data.
+    return tmp_path_factory.mktemp("db") / "test.db"
+
+
+@pytest.fixture(scope="session")
+def engine(database_path):
+    engine = create_engine(
+        f"sqlite:///{database_path}",
+        connect_args={"check_same_thread": False},
+        poolclass=NullPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def async_engine(database_path):
+    # NullPool: each TestClient runs its own event loop, so connections must not be reused across tests
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}", poolclass=NullPool)
+    yield async_engine
+    async_engine.sync_engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(scope="session")
+def seeded(session_factory):
+    session = session_factory()
+    try:
+        data = _seed(session)
+        return {
+            key: ([item.id for item in value] if isinstance(value, list) else value.id)
+            for key, value in data.items()
+        }
+    finally:
+        session.close()
+
+
+@pytest.fixture()
+def db(session_factory):
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def async_session_factory(async_engine):
+    return async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession)
+
+
+@pytest.fixture()
+def client(session_factory, async_session_factory, seeded):
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    async def override_get_async_db():
+        async with async_session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_session_factory] = lambda: async_session_factory
+    # No replica: read-only endpoints use the primary test database
+    read_router = ReadRouter(primary=session_factory, async_primary=async_session_factory)
+    app.dependency_overrides[get_read_router] = lambda: read_router
+    app.dependency_overrides[get_write_queue] = lambda: None
+    app.state.rate_limiter = RateLimiter(MemoryStorage())  # fresh budgets per test
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.fixture()
+def auth_headers(session_factory):
+    """Build bearer headers for a seeded user id without going through bcrypt login."""
+    def build(user_id: int) -> dict:
+        session = session_factory()
+        try:
+            email = session.get(User, user_id).email
+        finally:
+            session.close()
+        return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+    return build
+
+
+@pytest.fixture()
+def query_counter(engine, async_engine):
+    """Yields ``count_queries`` bound to both test engines."""
+    def counter():
+        return count_queries(engine, async_engine.sync_engine)
+    return counter
@@ -0,0 +1,41 @@
+from contextlib import contextmanager
+from typing import List
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """Collects every SQL statement executed on an engine while active."""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def report(self) -> str:
+        return "\n".join(f"  {idx}. {statement.splitlines()[0][:160]}" for idx, statement in enumerate(self.statements, 1))
+
+
+@contextmanager
+def count_queries(*engines):
+    """Count statements executed on ``engines`` inside the ``with`` block.
+
+    Usage::
+
+        with count_queries(engine) as counter:
+            client.get("/api/v1/attempts/all-attempts")
+        assert counter.count <= 6, counter.report()
+    """
+    counter = QueryCounter()
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", counter._on_execute)
+    try:
+        yield counter
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", counter._on_execute)
@@ -0,0 +1,83 @@
+"""uq_quiz_attempts_active: one incomplete attempt per (quiz, student), and start as insert-or-return."""
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.dialects import mysql
+from sqlalchemy.exc import IntegrityError
+
+from app.api.v1 import attempts
+from app.models.models import QuizAttempt
+
+
+def _incomplete_count(session_factory, quiz_id, student_id):
+    session = session_factory()
+    try:
+        return session.scalar(select(func.count(QuizAttempt.id)).where(
+            QuizAttempt.quiz_id == quiz_id,
+            QuizAttempt.student_id == student_id,
+            QuizAttempt.is_completed == False,  # noqa: E712
+        ))
+    finally:
+        session.close()
+
+
+def test_database_rejects_a_second_incomplete_attempt(seeded, session_factory):
+    student_id = seeded["students"][-10]
+    quiz_id = seeded["quizzes"][3]
+    session = session_factory()
+    try:
+        session.add(QuizAttempt(quiz_id=quiz_id, student_id=student_id, total_marks=10, is_completed=False))
+        session.commit()
+        session.add(QuizAttempt(quiz_id=quiz_id, student_id=student_id, total_marks=10, is_completed=False))
+        with pytest.raises(IntegrityError):
+            session.commit()
+        session.rollback()
+        # Completed attempts are outside the index
+        session.add(QuizAttempt(quiz_id=quiz_id, student_id=student_id, total_marks=10, is_completed=True))
+        session.commit()
+    finally:
+        session.close()
+
+
+def test_losing_insert_of_a_double_start_returns_the_winner(client, seeded, auth_headers, session_factory,
+                                                          async_session_factory):
+    student_id = seeded["students"][-4]
+    quiz_id = seeded["quizzes"][3]
+    headers = auth_headers(student_id)
+    first = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers)
+    assert first.status_code == 200, first.text
+
+    # The second request of a double click got past its lookup before the first insert committed
+    async def race():
+        async with async_session_factory() as session:
+            await session.execute(attempts._insert_active_attempt(session, {
+                "quiz_id": quiz_id, "student_id": student_id, "total_marks": 10,
+                "started_at": datetime.now(), "is_completed": False, "is_graded": False,
+            }))
+            await session.commit()
+
+    asyncio.run(race())
+    assert _incomplete_count(session_factory, quiz_id, student_id) == 1
+    again = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers)
+    assert again.json()["id"] == first.json()["id"]
+
+
+def test_start_query_budget(client, seeded, auth_headers, query_counter):
+    headers = auth_headers(seeded["students"][-9])
+    with query_counter() as counter:
+        response = client.post("/api/v1/attempts/start", json={"quiz_id": seeded["quizzes"][3]}, headers=headers)
+    assert response.status_code == 200, response.text
+    # 3 auth lookups + quiz, attempt lookup, assignment, insert, read back
+    assert counter.count <= 8, counter.report()
+
+
+def test_mysql_start_only_tolerates_the_duplicate_key():
+    db = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=SimpleNamespace(name="mysql")))
+    statement = attempts._insert_active_attempt(db, {"quiz_id": 1, "student_id": 2, "is_completed": False})
+    sql = str(statement.compile(dialect=mysql.dialect()))
+    assert "IGNORE" not in sql  # would also swallow FK and truncation errors
+    assert sql.endswith("ON DUPLICATE KEY UPDATE id = quiz_attempts.id")
@@ -0,0 +1,65 @@
+"""app.core.activity: last_active buffered per request and flushed in one UPDATE ... CASE."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.core.activity import ActivityTracker, activity_tracker
+from app.models.models import User
+
+
+def _age_everyone(session_factory, days=2):
+    session = session_factory()
+    try:
+        session.execute(update(User).values(last_active=datetime.utcnow() - timedelta(days=days)))
+        session.commit()
+    finally:
+        session.close()
+
+
+def test_flush_writes_each_users_latest_time_in_one_statement(seeded, session_factory, async_session_factory,
+                                                                query_counter):
+    tracker = ActivityTracker()
+    base = datetime(2030, 1, 1, 12, 0, 0)
+    students = seeded["students"][:3]
+    for offset, student_id in enumerate(students):
+        tracker.record(student_id, base + timedelta(minutes=offset))
+    tracker.record(students[0], base - timedelta(hours=1))  # older: ignored
+
+    with query_counter() as counter:
+        assert asyncio.run(tracker.flush(async_session_factory)) == 3
+    updates = [statement for statement in counter.statements if statement.lstrip().upper().startswith("UPDATE")]
+    assert len(updates) == 1, counter.report()
+    assert "CASE" in updates[0]
+    assert tracker.pending() == {}
+
+    session = session_factory()
+    try:
+        stored = {user.id: user.last_active for user in session.query(User).filter(User.id.in_(students))}
+    finally:
+        session.close()
+    assert stored == {student_id: base + timedelta(minutes=offset) for offset, student_id in enumerate(students)}
+
+
+def test_authenticated_requests_count_as_active_now(client, seeded, auth_headers, session_factory,
+                                                     async_session_factory):
+    asyncio.run(activity_tracker.flush(async_session_factory))
+    _age_everyone(session_factory)
+    admin_headers = auth_headers(seeded["admin"])
+
+    student_id = seeded["students"][5]
+    assert client.get("/api/v1/attempts/my-attempts", headers=auth_headers(student_id)).status_code == 200
+    assert student_id in activity_tracker.pending()
+
+    stats = client.get("/api/v1/analytics/dashboard", headers=admin_headers).json()
+    assert (stats["online_students"], stats["online_teachers"]) == (1, 0)
+
+    activity = client.get("/api/v1/users/activity/students", headers=admin_headers).json()
+    seen = {row["id"]: row["last_active"] for row in activity}
+    assert datetime.fromisoformat(seen[student_id]) > datetime.utcnow() - timedelta(minutes=1)
+
+    # Same answer once the buffer is in the database
+    asyncio.run(activity_tracker.flush(async_session_factory))
+    stats = client.get("/api/v1/analytics/dashboard", headers=admin_headers).json()
+    assert stats["online_students"] == 1
@@ -0,0 +1,36 @@
+"""answered_count/correct_count/last_answer_at on quiz_attempts, maintained by autosave and grading."""
+
+from app.models.models import QuizAttempt
+
+
+def _start(client, headers, quiz_id):
+    response = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_autosave_and_grading_maintain_answer_counters(client, seeded, auth_headers, session_factory):
+    headers = auth_headers(seeded["students"][-5])
+    quiz_id = seeded["quizzes"][5]
+    attempt_id = _start(client, headers, quiz_id)
+    question_ids = [q["id"] for q in client.get(f"/api/v1/quizzes/{quiz_id}", headers=headers).json()["questions"]]
+
+    for question_id, answer in [(question_ids[0], "A"), (question_ids[1], "B"), (question_ids[0], "C")]:
+        saved = client.post(f"/api/v1/attempts/{attempt_id}/save-answer",
+                            json={"question_id": question_id, "answer_text": answer}, headers=headers)
+        assert saved.status_code == 200, saved.text
+    session = session_factory()
+    try:
+        attempt = session.get(QuizAttempt, attempt_id)
+        assert (attempt.answered_count, attempt.correct_count) == (2, 0)
+        assert attempt.last_answer_at is not None
+    finally:
+        session.close()
+
+    answers = [{"question_id": question_id, "answer_text": "A"} for question_id in question_ids[:3]]
+    submitted = client.post("/api/v1/attempts/submit", params={"attempt_id": attempt_id},
+                            json={"answers": answers}, headers=headers)
+    assert submitted.status_code == 200, submitted.text
+    monitor = client.get("/api/v1/attempts/all-attempts", params={"quiz_id": quiz_id, "student_id": seeded["students"][-5]},
+                         headers=auth_headers(seeded["admin"])).json()
+    assert (monitor[0]["answered_count"], monitor[0]["correct_answers"]) == (3, 3)
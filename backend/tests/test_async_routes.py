@@ -0,0 +1,102 @@
+"""Smoke tests for the routers served from the AsyncSession data layer."""
+
+
+def test_login_json_returns_token(client):
+    response = client.post(
+        "/api/v1/auth/login-json",
+        json={"username": "teacher2@example.com", "password": "password123"},
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["access_token"]
+    assert body["user"]["email"] == "teacher2@example.com"
+
+
+def test_me_and_logout_revoke_token(client):
+    login = client.post(
+        "/api/v1/auth/login-json",
+        json={"username": "student2@example.com", "password": "password123"},
+    )
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+    assert client.post("/api/v1/auth/logout", headers=headers).status_code == 200
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 401
+
+
+def test_quiz_detail_includes_questions(client, seeded, auth_headers):
+    quiz_id = seeded["quizzes"][0]
+    response = client.get(f"/api/v1/quizzes/{quiz_id}", headers=auth_headers(seeded["teacher"]))
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["total_questions"] == len(body["questions"]) > 0
+    assert "correct_answer" in body["questions"][0]
+
+
+def test_quiz_statistics_and_assignments(client, seeded, auth_headers):
+    quiz_id = seeded["quizzes"][0]
+    headers = auth_headers(seeded["teacher"])
+
+    stats = client.get(f"/api/v1/quizzes/{quiz_id}/statistics", headers=headers)
+    assert stats.status_code == 200, stats.text
+    assert stats.json()["total_attempts"] >= stats.json()["completed_attempts"] > 0
+
+    assignments = client.get(f"/api/v1/quizzes/{quiz_id}/assignments", headers=headers)
+    assert assignments.status_code == 200, assignments.text
+    assert assignments.json()["assigned_count"] == len(seeded["students"])
+
+
+def test_student_eligibility_blocks_completed_quiz(client, seeded, auth_headers):
+    response = client.get(
+        f"/api/v1/quizzes/{seeded['quizzes'][0]}/eligibility",
+        headers=auth_headers(seeded["students"][0]),
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["eligible"] is False
+
+
+def test_attempt_detail_and_review(client, seeded, auth_headers):
+    student_headers = auth_headers(seeded["students"][0])
+    attempts = client.get("/api/v1/attempts/my-attempts", headers=student_headers).json()
+    attempt_id = attempts[0]["id"]
+
+    detail = client.get(f"/api/v1/attempts/{attempt_id}", headers=student_headers)
+    assert detail.status_code == 200, detail.text
+    assert detail.json()["total_questions"] > 0
+
+    review = client.get(f"/api/v1/attempts/{attempt_id}/review", headers=student_headers)
+    assert review.status_code == 200, review.text
+    assert len(review.json()["questions"]) == detail.json()["total_questions"]
+
+
+def test_create_update_and_delete_quiz(client, seeded, auth_headers):
+    headers = auth_headers(seeded["teacher"])
+    created = client.post(
+        "/api/v1/quizzes/",
+        json={
+            "title": "Async smoke quiz",
+            "duration_minutes": 10,
+            "questions": [
+                {
+                    "question_text": "2 + 2?",
+                    "question_type": "mcq",
+                    "option_a": "3", "option_b": "4", "option_c": "5", "option_d": "6",
+                    "correct_answer": "B",
+                    "marks": 1,
+                }
+            ],
+        },
+        headers=headers,
+    )
+    assert created.status_code == 200, created.text
+    quiz_id = created.json()["id"]
+    assert created.json()["total_questions"] == 1
+
+    updated = client.put(f"/api/v1/quizzes/{quiz_id}", json={"title": "Renamed"}, headers=headers)
+    assert updated.status_code == 200, updated.text
+    assert updated.json()["title"] == "Renamed"
+    assert updated.json()["total_questions"] == 1
+
+    deleted = client.delete(f"/api/v1/quizzes/{quiz_id}", headers=headers)
+    assert deleted.status_code == 200, deleted.text
+    assert client.get(f"/api/v1/quizzes/{quiz_id}", headers=headers).status_code == 404
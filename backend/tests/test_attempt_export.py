@@ -0,0 +1,82 @@
+"""GET /attempts/export: streamed Student Results in CSV, NDJSON and XLSX."""
+
+import csv
+import io
+import json
+
+import pytest
+from openpyxl import load_workbook
+
+from tests.conftest import COMPLETED_PER_QUIZ, IN_PROGRESS_PER_QUIZ, QUIZZES_PER_TEACHER
+
+EXPORT_BUDGET = 4  # auth (3) + the streamed export query
+
+
+def _csv_rows(response):
+    return list(csv.DictReader(io.StringIO(response.content.decode("utf-8-sig"))))
+
+
+def test_export_csv_is_not_capped(client, seeded, auth_headers):
+    response = client.get(
+        "/api/v1/attempts/export",
+        params={"format": "csv", "completed_only": False},
+        headers=auth_headers(seeded["admin"]),
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+
+    rows = _csv_rows(response)
+    # Every seeded attempt, which is already at the 300-row cap of all-attempts
+    assert len(rows) >= len(seeded["quizzes"]) * (COMPLETED_PER_QUIZ + IN_PROGRESS_PER_QUIZ) >= 300
+    completed = [row for row in rows if row["status"] == "completed"]
+    assert completed and all(int(row["total_questions"]) > 0 for row in completed)
+    assert all(int(row["answered_count"]) >= int(row["correct_answers"]) for row in rows)
+
+
+def test_export_applies_teacher_and_quiz_filters(client, seeded, auth_headers):
+    headers = auth_headers(seeded["teacher"])
+    rows = _csv_rows(client.get("/api/v1/attempts/export", headers=headers))
+    own_quiz_ids = {str(quiz_id) for quiz_id in seeded["quizzes"][:QUIZZES_PER_TEACHER]}
+    assert {row["quiz_id"] for row in rows} <= own_quiz_ids
+    assert all(row["status"] == "completed" for row in rows)
+
+    quiz_id = seeded["quizzes"][0]
+    rows = _csv_rows(client.get("/api/v1/attempts/export", params={"quiz_id": quiz_id}, headers=headers))
+    assert {row["quiz_id"] for row in rows} == {str(quiz_id)}
+
+
+def test_export_ndjson_and_xlsx(client, seeded, auth_headers):
+    headers = auth_headers(seeded["admin"])
+    params = {"quiz_id": seeded["quizzes"][1]}
+
+    ndjson = client.get("/api/v1/attempts/export", params={**params, "format": "ndjson"}, headers=headers)
+    records = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert records and all(record["quiz_id"] == seeded["quizzes"][1] for record in records)
+
+    xlsx = client.get("/api/v1/attempts/export", params={**params, "format": "xlsx"}, headers=headers)
+    assert xlsx.status_code == 200, xlsx.text
+    sheet = load_workbook(io.BytesIO(xlsx.content), read_only=True).active
+    assert len(list(sheet.iter_rows(values_only=True))) == len(records) + 1  # header row
+
+
+def test_export_rejects_unknown_format_and_students(client, seeded, auth_headers):
+    response = client.get(
+        "/api/v1/attempts/export", params={"format": "pdf"}, headers=auth_headers(seeded["admin"])
+    )
+    assert response.status_code == 422
+    response = client.get("/api/v1/attempts/export", headers=auth_headers(seeded["students"][0]))
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize("completed_only", [True, False])
+def test_export_query_budget(client, seeded, auth_headers, query_counter, completed_only):
+    headers = auth_headers(seeded["admin"])
+    with query_counter() as counter:
+        response = client.get(
+            "/api/v1/attempts/export",
+            params={"completed_only": completed_only},
+            headers=headers,
+        )
+    assert response.status_code == 200, response.text
+    assert counter.count <= EXPORT_BUDGET, counter.report()
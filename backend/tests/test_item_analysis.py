@@ -0,0 +1,85 @@
+"""question_stats kept by grading and read by GET /quizzes/{id}/item-analysis."""
+
+from app.db import maintenance
+
+
+def _quiz(client, headers, student_id):
+    questions = [
+        {"question_text": f"Q{n}", "question_type": "mcq", "option_a": "1", "option_b": "2",
+         "option_c": "3", "option_d": "4", "correct_answer": "B", "marks": 2}
+        for n in range(3)
+    ]
+    created = client.post("/api/v1/quizzes/", json={
+        "title": "Item analysis", "duration_minutes": 30, "negative_marking": 0.5, "questions": questions,
+    }, headers=headers)
+    assert created.status_code == 200, created.text
+    quiz_id = created.json()["id"]
+    updated = client.put(f"/api/v1/quizzes/{quiz_id}", json={"is_active": True, "assigned_student_ids": [student_id]},
+                         headers=headers)
+    assert updated.status_code == 200, updated.text
+    return quiz_id
+
+
+def test_grading_updates_item_analysis_incrementally(client, seeded, auth_headers, session_factory):
+    teacher = auth_headers(seeded["teacher"])
+    student = seeded["students"][-12]
+    quiz_id = _quiz(client, teacher, student)
+    headers = auth_headers(student)
+
+    empty = client.get(f"/api/v1/quizzes/{quiz_id}/item-analysis", headers=teacher)
+    assert empty.status_code == 200, empty.text
+    assert [question["answered"] for question in empty.json()["questions"]] == [0, 0, 0]
+
+    attempt_id = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers).json()["id"]
+    question_ids = [q["id"] for q in client.get(f"/api/v1/quizzes/{quiz_id}", headers=headers).json()["questions"]]
+    answers = [{"question_id": question_ids[0], "answer_text": "B"}, {"question_id": question_ids[1], "answer_text": "c"}]
+    submitted = client.post("/api/v1/attempts/submit", params={"attempt_id": attempt_id},
+                            json={"answers": answers}, headers=headers)
+    assert submitted.status_code == 200, submitted.text
+
+    analysis = client.get(f"/api/v1/quizzes/{quiz_id}/item-analysis", headers=teacher).json()
+    assert analysis["completed_attempts"] == 1
+    first, second, third = analysis["questions"]
+    assert (first["answered"], first["correct_count"], first["percent_correct"], first["average_marks"]) == (1, 1, 100.0, 2.0)
+    assert first["option_counts"] == {"A": 0, "B": 1, "C": 0, "D": 0, "other": 0}
+    assert (second["correct_count"], second["average_marks"], second["option_counts"]["C"]) == (0, -0.5, 1)
+    assert (third["answered"], third["skipped"], third["percent_correct"]) == (0, 1, None)
+
+    # The incremental totals match a rebuild from answers
+    session = session_factory()
+    try:
+        question_range = (min(question_ids), max(question_ids) + 1)
+        assert session.execute(maintenance.drifted_question_stats(question_range)).all() == []
+    finally:
+        session.close()
+
+
+def test_item_analysis_is_for_staff(client, seeded, auth_headers):
+    response = client.get(f"/api/v1/quizzes/{seeded['quizzes'][0]}/item-analysis",
+                          headers=auth_headers(seeded["students"][0]))
+    assert response.status_code == 403
+
+
+def test_deleting_a_student_removes_their_answers_from_item_analysis(client, seeded, auth_headers, session_factory):
+    teacher, admin = auth_headers(seeded["teacher"]), auth_headers(seeded["admin"])
+    created = client.post("/api/v1/users/", json={
+        "email": "item.leaver@macquiz.com", "first_name": "Item", "last_name": "Leaver",
+        "role": "student", "password": "password123",
+    }, headers=admin)
+    student = created.json()["id"]
+    quiz_id = _quiz(client, teacher, student)
+    headers = auth_headers(student)
+    attempt_id = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers).json()["id"]
+    question_ids = [q["id"] for q in client.get(f"/api/v1/quizzes/{quiz_id}", headers=headers).json()["questions"]]
+    client.post("/api/v1/attempts/submit", params={"attempt_id": attempt_id},
+                json={"answers": [{"question_id": question_ids[0], "answer_text": "B"}]}, headers=headers)
+
+    assert client.delete(f"/api/v1/users/{student}", headers=admin).status_code == 200
+    analysis = client.get(f"/api/v1/quizzes/{quiz_id}/item-analysis", headers=teacher).json()
+    assert [(question["answered"], question["correct_count"]) for question in analysis["questions"]] == [(0, 0)] * 3
+    session = session_factory()
+    try:
+        question_range = (min(question_ids), max(question_ids) + 1)
+        assert session.execute(maintenance.drifted_question_stats(question_range)).all() == []
+    finally:
+        session.close()
@@ -0,0 +1,126 @@
+"""Opening a live session pre-creates pending attempts that starting then claims."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import false, insert, literal, null, select
+
+from app.core.live_sessions import SessionOpener, insert_active_attempts
+from app.models.models import Question, Quiz, QuizAssignment, QuizAttempt
+
+
+def _live_quiz(session_factory, teacher_id, student_ids, starts_in=timedelta(minutes=-1)):
+    now = datetime.now()
+    session = session_factory()
+    try:
+        quiz = Quiz(
+            title="Live session", creator_id=teacher_id, duration_minutes=30, total_marks=10,
+            is_live_session=True, live_start_time=now + starts_in, live_end_time=now + starts_in + timedelta(minutes=30),
+            is_active=True, created_at=now, updated_at=now,
+        )
+        session.add(quiz)
+        session.flush()
+        session.add(Question(quiz_id=quiz.id, question_text="Q", question_type="mcq", option_a="A", option_b="B",
+                             correct_answer="A", marks=10, order=0))
+        session.execute(insert(QuizAssignment), [
+            {"quiz_id": quiz.id, "student_id": student_id, "assigned_at": now} for student_id in student_ids
+        ])
+        session.commit()
+        return quiz.id
+    finally:
+        session.close()
+
+
+def _attempts(session_factory, quiz_id):
+    session = session_factory()
+    try:
+        return session.scalars(select(QuizAttempt).where(QuizAttempt.quiz_id == quiz_id)).all()
+    finally:
+        session.close()
+
+
+def test_open_session_then_start_claims_pending_row(client, seeded, auth_headers, session_factory, query_counter):
+    students = seeded["students"][:3]
+    quiz_id = _live_quiz(session_factory, seeded["teacher"], students)
+    teacher = auth_headers(seeded["teacher"])
+
+    opened = client.post(f"/api/v1/quizzes/{quiz_id}/open-session", headers=teacher)
+    assert opened.status_code == 200, opened.text
+    assert opened.json()["pending_attempts_created"] == 3
+    again = client.post(f"/api/v1/quizzes/{quiz_id}/open-session", headers=teacher)
+    assert again.json()["pending_attempts_created"] == 0
+    pending = _attempts(session_factory, quiz_id)
+    assert [attempt.started_at for attempt in pending] == [None] * 3
+
+    # Pending rows are not attempts yet
+    assert client.get(f"/api/v1/attempts/quiz/{quiz_id}/attempts", headers=teacher).json() == []
+    my_attempts = client.get("/api/v1/attempts/my-attempts", headers=auth_headers(students[0]),
+                             params={"include_incomplete": True}).json()
+    assert quiz_id not in [attempt["quiz_id"] for attempt in my_attempts]
+
+    headers = auth_headers(students[0])
+    with query_counter() as counter:
+        started = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers)
+    assert started.status_code == 200, started.text
+    assert started.json()["id"] == pending[0].id
+    assert started.json()["started_at"] is not None
+    assert counter.count <= 6, counter.report()
+
+    # Reconnecting returns the claimed attempt through the regular path
+    assert client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers).json()["id"] == pending[0].id
+    assert len(client.get(f"/api/v1/attempts/quiz/{quiz_id}/attempts", headers=teacher).json()) == 1
+
+
+def test_pending_attempts_cannot_be_used_before_start(client, seeded, auth_headers, session_factory):
+    student = seeded["students"][3]
+    quiz_id = _live_quiz(session_factory, seeded["teacher"], [student])
+    client.post(f"/api/v1/quizzes/{quiz_id}/open-session", headers=auth_headers(seeded["teacher"]))
+    attempt_id = _attempts(session_factory, quiz_id)[0].id
+
+    headers = auth_headers(student)
+    saved = client.post(f"/api/v1/attempts/{attempt_id}/save-answer",
+                        json={"question_id": 1, "answer_text": "A"}, headers=headers)
+    assert saved.status_code == 400
+    submitted = client.post("/api/v1/attempts/submit", params={"attempt_id": attempt_id}, json={"answers": []},
+                            headers=headers)
+    assert submitted.status_code == 400
+
+
+def test_session_opener_opens_quizzes_about_to_start(seeded, session_factory, async_session_factory):
+    soon = _live_quiz(session_factory, seeded["teacher"], seeded["students"][4:6], starts_in=timedelta(seconds=60))
+    later = _live_quiz(session_factory, seeded["teacher"], seeded["students"][4:6], starts_in=timedelta(hours=1))
+
+    opener = SessionOpener(lead_seconds=120)
+    assert asyncio.run(opener.open_due(async_session_factory)) >= 1
+    assert len(_attempts(session_factory, soon)) == 2
+    assert _attempts(session_factory, later) == []
+    # Already opened sessions are skipped on the next poll
+    assert soon in opener._opened
+    asyncio.run(opener.open_due(async_session_factory))
+    assert len(_attempts(session_factory, soon)) == 2
+
+
+def test_pending_inserts_skip_attempts_started_concurrently(seeded, session_factory, async_session_factory):
+    students = seeded["students"][3:5]
+    quiz_id = _live_quiz(session_factory, seeded["teacher"], students)
+    session = session_factory()
+    try:
+        # Started between open_session's NOT EXISTS check and its insert
+        session.add(QuizAttempt(quiz_id=quiz_id, student_id=students[0], total_marks=10, started_at=datetime.now(),
+                                is_completed=False, is_graded=False))
+        session.commit()
+    finally:
+        session.close()
+
+    async def insert_pending():
+        async with async_session_factory() as session:
+            result = await session.execute(insert_active_attempts(session, lambda statement: statement.from_select(
+                ["quiz_id", "student_id", "total_marks", "started_at", "is_completed", "is_graded"],
+                select(QuizAssignment.quiz_id, QuizAssignment.student_id, literal(10), null(), false(), false())
+                .where(QuizAssignment.quiz_id == quiz_id),
+            )))
+            await session.commit()
+            return result.rowcount
+
+    assert asyncio.run(insert_pending()) == 1
+    assert sorted(attempt.student_id for attempt in _attempts(session_factory, quiz_id)) == sorted(students)
@@ -0,0 +1,91 @@
+"""Login runs bcrypt in app.core.hashing.password_pool and defers last_active to the activity tracker."""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.core import hashing
+from app.core.activity import activity_tracker
+from app.models.models import User
+
+
+def test_login_defers_last_active_to_flush(client, seeded, session_factory, async_session_factory):
+    session = session_factory()
+    try:
+        teacher = session.get(User, seeded["teacher"])
+        before = teacher.last_active
+    finally:
+        session.close()
+
+    response = client.post("/api/v1/auth/login-json", json={"username": teacher.email, "password": "password123"})
+    assert response.status_code == 200, response.text
+    assert seeded["teacher"] in activity_tracker.pending()
+
+    session = session_factory()
+    try:
+        assert session.get(User, seeded["teacher"]).last_active == before  # no write per login
+    finally:
+        session.close()
+
+    assert asyncio.run(activity_tracker.flush(async_session_factory)) >= 1
+    assert activity_tracker.pending() == {}
+    session = session_factory()
+    try:
+        assert session.get(User, seeded["teacher"]).last_active > before
+    finally:
+        session.close()
+
+
+def test_password_pool_bounds_pending_calls():
+    pool = hashing.PasswordPool(max_workers=1, max_pending=2)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert pool.pending == 2
+        with pytest.raises(hashing.PasswordPoolBusy):
+            await pool.run(release.wait)
+        release.set()
+        await asyncio.gather(*running)
+
+    asyncio.run(scenario())
+    assert pool.status()["rejected"] == 1
+    assert pool.status()["max_pending_seen"] == 2
+    assert pool.pending == 0
+    assert "macquiz_password_pool_wait_seconds_count 2" in pool.render_prometheus()
+
+
+def test_cancelled_callers_keep_their_slot_until_bcrypt_ends():
+    pool = hashing.PasswordPool(max_workers=1, max_pending=2)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.run(release.wait))
+        queued = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        running.cancel()  # the client went away; its bcrypt call still runs
+        queued.cancel()  # not started yet: dropped, and its slot freed
+        await asyncio.sleep(0.05)
+        assert pool.pending == 1
+        waiting = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(hashing.PasswordPoolBusy):  # the running call still counts
+            await pool.run(release.wait)
+        release.set()
+        await waiting
+        await asyncio.sleep(0.05)
+        assert pool.pending == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()  # never leave a bcrypt thread blocked
+
+
+def test_full_password_pool_returns_503(client, seeded, monkeypatch):
+    monkeypatch.setattr(hashing.password_pool, "max_pending", 0)
+    response = client.post("/api/v1/auth/login-json", json={"username": "teacher2@example.com", "password": "x"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
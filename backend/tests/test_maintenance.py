@@ -0,0 +1,155 @@
+"""Set-based repair jobs in app.db.maintenance, run chunk by chunk on a scratch database."""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+
+from app.core.sanity_flags import flag_names
+from app.db import maintenance
+from app.db.database import Base
+from app.models.models import Answer, Question, QuestionStat, Quiz, QuizAttempt, User
+
+
+@pytest.fixture()
+def scratch(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'maintenance.db'}")
+    Base.metadata.create_all(bind=engine)
+    now = datetime.now()
+    with engine.begin() as connection:
+        # Legacy data from before uq_quiz_attempts_active, which is what the repair jobs clean up
+        connection.exec_driver_sql("DROP INDEX uq_quiz_attempts_active")
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"id": 1, "email": "t@example.com", "hashed_password": "x", "first_name": "T", "last_name": "T", "role": "teacher"},
+            {"id": 2, "email": "s1@example.com", "hashed_password": "x", "first_name": "S", "last_name": "1", "role": "student"},
+            {"id": 3, "email": "s2@example.com", "hashed_password": "x", "first_name": "S", "last_name": "2", "role": "student"},
+        ])
+        connection.execute(insert(Quiz), [{
+            "id": 1, "title": "Q", "creator_id": 1, "duration_minutes": 30, "total_marks": 4.0,
+            "marks_per_correct": 1, "negative_marking": 0.5,
+        }])
+        connection.execute(insert(Question), [
+            {"id": n, "quiz_id": 1, "question_text": f"q{n}", "question_type": "mcq",
+             "correct_answer": "A", "marks": 2 if n == 1 else 1, "order": n}
+            for n in (1, 2, 3)
+        ])
+
+        def attempt(attempt_id, student_id, completed, minutes_ago, score=None, time_taken=None):
+            return {
+                "id": attempt_id, "quiz_id": 1, "student_id": student_id, "total_marks": 4.0,
+                "score": score, "is_completed": completed, "time_taken_minutes": time_taken,
+                "started_at": now - timedelta(minutes=minutes_ago),
+            }
+
+        connection.execute(insert(QuizAttempt), [
+            attempt(1, 2, True, 90, score=1.0, time_taken=45.0),  # kept: completed; score should be 2.5
+            attempt(2, 2, False, 10),                               # duplicate, newer but incomplete
+            attempt(3, 2, False, 5),                                # duplicate
+            attempt(4, 3, True, 60, score=7.0, time_taken=12.0),    # no answers: score should be 0
+            attempt(5, 1, False, 1),                                # stale teacher preview
+        ])
+        connection.execute(insert(Answer), [
+            {"attempt_id": 1, "question_id": 1, "answer_text": "A", "is_correct": True, "marks_awarded": 2},
+            {"attempt_id": 1, "question_id": 2, "answer_text": "A", "is_correct": True, "marks_awarded": 1},
+            {"attempt_id": 1, "question_id": 3, "answer_text": "B", "is_correct": False, "marks_awarded": -0.5},
+            {"attempt_id": 2, "question_id": 1, "answer_text": "B", "is_correct": False, "marks_awarded": -0.5},
+        ])
+    yield engine
+    engine.dispose()
+
+
+def _collect(engine, column, query, chunk_size=1):
+    with engine.connect() as connection:
+        return [
+            row.id
+            for id_range in maintenance.id_ranges(connection, column, chunk_size)
+            for row in connection.execute(query(id_range))
+        ]
+
+
+def test_duplicates_keep_completed_attempt(scratch):
+    assert _collect(scratch, QuizAttempt.student_id, maintenance.duplicate_attempts) == [3, 2]
+    assert _collect(scratch, QuizAttempt.id, maintenance.preview_attempts) == [5]
+
+    with scratch.begin() as connection:
+        assert maintenance.delete_attempts(connection, [2, 3, 5]) == 3
+    with scratch.connect() as connection:
+        assert connection.scalars(select(QuizAttempt.id).order_by(QuizAttempt.id)).all() == [1, 4]
+        assert connection.scalars(select(Answer.attempt_id).distinct()).all() == [1]
+
+
+def test_rescore_updates_only_drifted_attempts(scratch):
+    assert _collect(scratch, QuizAttempt.id, maintenance.drifted_scores, chunk_size=2) == [1, 4]
+
+    with scratch.begin() as connection:
+        updated = sum(
+            maintenance.rescore_attempts(connection, id_range)
+            for id_range in maintenance.id_ranges(connection, QuizAttempt.id, 2)
+        )
+    assert updated == 2
+
+    with scratch.connect() as connection:
+        rows = {row.id: row for row in connection.execute(select(QuizAttempt))}
+        assert rows[1].score == pytest.approx(2.5)
+        assert rows[1].percentage == pytest.approx(62.5)
+        assert rows[4].score == 0
+        assert rows[4].percentage == 0
+        assert rows[2].score is None  # incomplete attempts are left alone
+
+    assert _collect(scratch, QuizAttempt.id, maintenance.drifted_scores) == []
+
+
+def test_cap_time_taken_at_quiz_duration(scratch):
+    assert _collect(scratch, QuizAttempt.id, maintenance.overlong_attempts, chunk_size=10) == [1]
+
+    with scratch.begin() as connection:
+        assert maintenance.cap_time_taken(connection, (1, 10)) == 1
+    with scratch.connect() as connection:
+        times = dict(connection.execute(select(QuizAttempt.id, QuizAttempt.time_taken_minutes)).all())
+    assert times[1] == 30
+    assert times[4] == 12.0
+
+
+def test_recount_backfills_answer_counters(scratch):
+    assert _collect(scratch, QuizAttempt.id, maintenance.drifted_answer_counters, chunk_size=2) == [1, 2]
+
+    with scratch.begin() as connection:
+        assert maintenance.recount_answers(connection, (1, 10)) == 2
+    with scratch.connect() as connection:
+        rows = {row.id: row for row in connection.execute(select(QuizAttempt))}
+    assert (rows[1].answered_count, rows[1].correct_count) == (3, 2)
+    assert (rows[2].answered_count, rows[2].correct_count) == (1, 0)
+    assert (rows[4].answered_count, rows[4].correct_count) == (0, 0)
+    assert _collect(scratch, QuizAttempt.id, maintenance.drifted_answer_counters) == []
+
+
+def test_reflag_applies_current_sanity_rules(scratch):
+    assert _collect(scratch, QuizAttempt.id, maintenance.drifted_sanity_flags, chunk_size=2) == [4]
+
+    with scratch.begin() as connection:
+        assert maintenance.reflag_attempts(connection, (1, 10)) == 1
+    with scratch.connect() as connection:
+        flags = dict(connection.execute(select(QuizAttempt.id, QuizAttempt.sanity_flags)).all())
+    assert flag_names(flags[4]) == ["score_exceeds_total"]
+    assert flags[1] == 0
+    assert _collect(scratch, QuizAttempt.id, maintenance.drifted_sanity_flags) == []
+
+
+def test_question_stats_rebuild_and_attempt_deletion(scratch):
+    assert _collect(scratch, Question.id, maintenance.drifted_question_stats, chunk_size=2) == [1, 2, 3]
+
+    with scratch.begin() as connection:
+        assert maintenance.rebuild_question_stats(connection, (1, 10)) == 3
+    with scratch.connect() as connection:
+        stats = {row.question_id: row for row in connection.execute(select(QuestionStat))}
+    assert (stats[1].attempts, stats[1].correct_count, stats[1].option_a_count) == (1, 1, 1)
+    assert (stats[3].correct_count, stats[3].option_b_count, stats[3].marks_total) == (0, 1, -0.5)
+    assert _collect(scratch, Question.id, maintenance.drifted_question_stats) == []
+
+    # Deleting a graded attempt takes its answers back out
+    with scratch.begin() as connection:
+        maintenance.delete_attempts(connection, [1])
+    with scratch.connect() as connection:
+        assert connection.scalars(select(QuestionStat.attempts)).all() == [0, 0, 0]
+    assert _collect(scratch, Question.id, maintenance.drifted_question_stats) == []
@@ -0,0 +1,56 @@
+"""METRICS_ENABLED: Server-Timing headers and /metrics series labelled by route template."""
+
+import re
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1 import quizzes
+from app.core import metrics
+from app.core.config import settings
+from app.main import app
+
+
+def _instrumented_app():
+    """The quizzes router behind the metrics middleware, as main.py wires it when the flag is on."""
+    instrumented = FastAPI()
+    metrics.instrument(instrumented, top_n=3, slow_request_ms=60_000)
+    instrumented.include_router(quizzes.router, prefix="/api/v1/quizzes")
+    instrumented.dependency_overrides = app.dependency_overrides  # the test databases, set by `client`
+    return TestClient(instrumented)
+
+
+def test_metrics_are_off_by_default(client):
+    assert settings.METRICS_ENABLED is False
+    response = client.get("/health")
+    assert "server-timing" not in response.headers
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/metrics/slow-statements").status_code == 404
+
+
+def test_server_timing_and_route_template_labels(client, seeded, auth_headers, monkeypatch):
+    metrics.registry.reset()
+    instrumented = _instrumented_app()
+    headers = auth_headers(seeded["admin"])
+
+    for quiz_id in seeded["quizzes"]:
+        response = instrumented.get(f"/api/v1/quizzes/{quiz_id}", headers=headers)
+        assert response.status_code == 200, response.text
+        timing = re.fullmatch(r'db;dur=[\d.]+;desc="(\d+) queries", app;dur=[\d.]+', response.headers["server-timing"])
+        assert timing and int(timing.group(1)) > 0, response.headers["server-timing"]
+
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    exposition = client.get("/metrics")
+    assert exposition.status_code == 200
+    series = [line for line in exposition.text.splitlines() if line.startswith("macquiz_http_requests_total{")]
+    # One series for all six quizzes: labelled with the template, never the raw path
+    assert series == [
+        'macquiz_http_requests_total{method="GET",route="/api/v1/quizzes/{quiz_id}",status="200"} '
+        f'{len(seeded["quizzes"])}'
+    ]
+    assert not any(f"/api/v1/quizzes/{quiz_id}\"" in exposition.text for quiz_id in seeded["quizzes"])
+    assert 'macquiz_db_statements_total{method="GET",route="/api/v1/quizzes/{quiz_id}"}' in exposition.text
+
+    slow = client.get("/metrics/slow-statements").json()
+    assert 0 < len(slow["GET /api/v1/quizzes/{quiz_id}"]) <= 3
+    metrics.registry.reset()
@@ -0,0 +1,21 @@
+"""migrate_hot_indexes.py: the dry run only inspects; --apply creates what is missing."""
+
+from sqlalchemy import create_engine, inspect
+
+import migrate_hot_indexes
+
+
+def test_dry_run_reports_missing_tables_without_creating_them(tmp_path, monkeypatch, capsys):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    monkeypatch.setattr(migrate_hot_indexes, "engine", engine)
+    try:
+        assert migrate_hot_indexes.run(apply_changes=False, concurrently=False) == 1
+        assert inspect(engine).get_table_names() == []
+        assert "table quiz_attempts: MISSING" in capsys.readouterr().out
+
+        assert migrate_hot_indexes.run(apply_changes=True, concurrently=False) == 0
+        indexes = {index["name"] for index in inspect(engine).get_indexes("quiz_attempts")}
+        assert {"ix_quiz_attempts_student_quiz_completed", "uq_quiz_attempts_active"} <= indexes
+        assert migrate_hot_indexes.run(apply_changes=False, concurrently=False) == 0
+    finally:
+        engine.dispose()
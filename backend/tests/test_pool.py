@@ -0,0 +1,70 @@
+"""Pool instrumentation and SQLite pragmas from app.db.pool."""
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.db import pool
+
+
+@pytest.fixture()
+def small_pool_engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=pool.InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_checkout_wait_and_timeouts_are_recorded(small_pool_engine):
+    with small_pool_engine.connect() as held:
+        held.execute(text("SELECT 1"))
+        status = pool.pool_status(small_pool_engine)
+        assert status["in_use"] == 1
+        assert status["size"] == 1
+
+        with pytest.raises(exc.TimeoutError):
+            small_pool_engine.connect()
+
+    status = pool.pool_status(small_pool_engine)
+    assert status["in_use"] == 0
+    assert status["checkouts"] == 1
+    assert status["checkout_timeouts"] == 1
+    assert status["checkout_wait_seconds_max"] >= 0.05
+
+    small_pool_engine.dispose()  # counters survive the pool being recreated
+    assert pool.pool_status(small_pool_engine)["checkout_timeouts"] == 1
+
+    rendered = pool.render_prometheus({"primary": small_pool_engine})
+    assert 'macquiz_db_pool_in_use{engine="primary"} 0' in rendered
+    assert 'macquiz_db_pool_checkout_timeouts_total{engine="primary"} 1' in rendered
+    assert 'macquiz_db_pool_checkout_wait_seconds_count{engine="primary"} 2' in rendered
+
+
+def test_sqlite_file_connections_use_wal_and_busy_timeout(small_pool_engine):
+    pool.install_sqlite_pragmas(small_pool_engine)
+    with small_pool_engine.connect() as connection:
+        assert connection.scalar(text("PRAGMA journal_mode")) == "wal"
+        assert connection.scalar(text("PRAGMA busy_timeout")) == 5000
+
+
+def test_pool_kwargs_follow_settings(monkeypatch):
+    monkeypatch.setattr(pool.settings, "DB_POOL_SIZE", 20)
+    monkeypatch.setattr(pool.settings, "DB_MAX_OVERFLOW", 0)
+
+    kwargs = pool.pool_kwargs("postgresql+psycopg://u:p@db/macquiz")
+    assert kwargs["poolclass"] is pool.InstrumentedQueuePool
+    assert (kwargs["pool_size"], kwargs["max_overflow"]) == (20, 0)
+    assert pool.pool_kwargs("postgresql+psycopg://u:p@db/macquiz", is_async=True)["poolclass"] \
+        is pool.InstrumentedAsyncQueuePool
+    assert pool.pool_kwargs("postgresql+psycopg://u:p@db/macquiz", serverless=True)["poolclass"].__name__ == "NullPool"
+    assert "poolclass" not in pool.pool_kwargs("sqlite://")
+
+
+def test_health_reports_pools(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert set(response.json()["pool"]) >= {"primary", "primary_async"}
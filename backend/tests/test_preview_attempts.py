@@ -0,0 +1,124 @@
+"""Teacher/admin previews run through the attempt endpoints without writing attempt rows."""
+
+from sqlalchemy import func, select
+
+from app.api.v1 import attempts
+from app.core.previews import DatabasePreviewStore, PreviewStore
+from app.core.rate_limit import storage_engine
+from app.models.models import Answer, QuizAttempt
+
+
+def _row_counts(session_factory):
+    session = session_factory()
+    try:
+        return session.scalar(select(func.count(QuizAttempt.id))), session.scalar(select(func.count(Answer.id)))
+    finally:
+        session.close()
+
+
+def test_teacher_preview_is_graded_but_never_stored(client, seeded, auth_headers, session_factory):
+    headers = auth_headers(seeded["teacher"])
+    quiz_id = seeded["quizzes"][0]
+    questions = client.get(f"/api/v1/quizzes/{quiz_id}", headers=headers).json()["questions"]
+    before = _row_counts(session_factory)
+
+    started = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers)
+    assert started.status_code == 200, started.text
+    attempt_id = started.json()["id"]
+    assert attempt_id < 0
+
+    saved = client.post(f"/api/v1/attempts/{attempt_id}/save-answer",
+                        json={"question_id": questions[0]["id"], "answer_text": "B"}, headers=headers)
+    assert saved.status_code == 200, saved.text
+    restored = client.get(f"/api/v1/attempts/{attempt_id}/answers", headers=headers).json()["answers"]
+    assert restored == [{"question_id": questions[0]["id"], "answer_text": "B"}]
+    assert client.get(f"/api/v1/attempts/{attempt_id}/remaining-time", headers=headers).json()["is_expired"] is False
+
+    answers = [{"question_id": question["id"], "answer_text": "A"} for question in questions[:3]]
+    answers.append({"question_id": questions[3]["id"], "answer_text": "B"})
+    graded = client.post(f"/api/v1/attempts/{attempt_id}/submissions", json={"answers": answers}, headers=headers)
+    assert graded.status_code == 202, graded.text
+    assert graded.json()["status"] == "graded"
+    assert graded.json()["attempt"]["score"] == 2.75  # 3 correct, one wrong at -0.25
+
+    result = client.get(f"/api/v1/attempts/{attempt_id}", headers=headers).json()
+    assert (result["correct_answers"], result["is_completed"]) == (3, True)
+    review = client.get(f"/api/v1/attempts/{attempt_id}/review", headers=headers).json()
+    assert [item["is_correct"] for item in review["questions"][:5]] == [True, True, True, False, False]
+
+    assert _row_counts(session_factory) == before
+    # Another user cannot reach the preview
+    other = client.get(f"/api/v1/attempts/{attempt_id}/answers", headers=auth_headers(seeded["students"][0]))
+    assert other.status_code == 403
+
+
+def test_preview_store_is_bounded_and_expires():
+    now = [0.0]
+    store = PreviewStore(max_entries=2, ttl_seconds=60, clock=lambda: now[0])
+    first = store.start(quiz_id=1, user_id=1, total_marks=10)
+    restarted = store.start(quiz_id=1, user_id=1, total_marks=10)
+    assert store.get(first.id) is None  # a new preview replaces the unfinished one
+    second = store.start(quiz_id=2, user_id=1, total_marks=10)
+    third = store.start(quiz_id=3, user_id=1, total_marks=10)
+    assert len(store) == 2 and store.get(restarted.id) is None  # least recently used evicted
+
+    now[0] = 59
+    assert store.get(second.id) is not None  # use extends the TTL
+    now[0] = 100
+    assert store.get(second.id) is not None
+    assert store.get(third.id) is None
+
+
+def test_database_previews_resolve_on_every_worker(client, seeded, auth_headers, tmp_path, monkeypatch):
+    engine = storage_engine(f"sqlite:///{tmp_path / 'previews.db'}")
+    workers = [DatabasePreviewStore(engine), DatabasePreviewStore(engine)]  # two processes, one table
+    headers = auth_headers(seeded["teacher"])
+    quiz_id = seeded["quizzes"][1]
+    questions = client.get(f"/api/v1/quizzes/{quiz_id}", headers=headers).json()["questions"]
+
+    def on(worker):
+        monkeypatch.setattr(attempts, "preview_store", workers[worker])
+
+    on(0)
+    attempt_id = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers).json()["id"]
+    assert attempt_id < 0
+    on(1)
+    saved = client.post(f"/api/v1/attempts/{attempt_id}/save-answer",
+                        json={"question_id": questions[0]["id"], "answer_text": "B"}, headers=headers)
+    assert saved.status_code == 200, saved.text
+    on(0)
+    restored = client.get(f"/api/v1/attempts/{attempt_id}/answers", headers=headers).json()["answers"]
+    assert restored == [{"question_id": questions[0]["id"], "answer_text": "B"}]
+    on(1)
+    answers = [{"question_id": question["id"], "answer_text": "A"} for question in questions[:2]]
+    graded = client.post(f"/api/v1/attempts/{attempt_id}/submissions", json={"answers": answers}, headers=headers)
+    assert graded.json()["attempt"]["score"] == 2
+    on(0)
+    result = client.get(f"/api/v1/attempts/{attempt_id}", headers=headers).json()
+    assert (result["correct_answers"], result["is_completed"]) == (2, True)
+    review = client.get(f"/api/v1/attempts/{attempt_id}/review", headers=headers).json()
+    assert [item["is_correct"] for item in review["questions"][:3]] == [True, True, False]
+    engine.dispose()
+
+
+def test_database_preview_store_is_bounded_and_expires(tmp_path):
+    now = [1000.0]
+    engine = storage_engine(f"sqlite:///{tmp_path / 'previews.db'}")
+    store = DatabasePreviewStore(engine, max_entries=2, ttl_seconds=60, clock=lambda: now[0])
+    first = store.start(quiz_id=1, user_id=1, total_marks=10)
+    restarted = store.start(quiz_id=1, user_id=1, total_marks=10)
+    assert store.get(first.id) is None  # a new preview replaces the unfinished one
+    preview = store.get(restarted.id)
+    preview.attempt.is_completed = True
+    store.save(preview)
+    assert store.start(quiz_id=1, user_id=1, total_marks=10).id < restarted.id
+    assert store.get(restarted.id).attempt.is_completed  # completed previews stay for review
+
+    second = store.start(quiz_id=2, user_id=1, total_marks=10)
+    store.start(quiz_id=3, user_id=1, total_marks=10)
+    assert len(store) == 2 and store.get(restarted.id) is None  # oldest beyond max_entries deleted
+    now[0] += 59
+    assert store.get(second.id) is not None  # use extends the TTL
+    now[0] += 59
+    assert store.get(second.id) is not None and len(store) == 1
+    engine.dispose()
@@ -0,0 +1,67 @@
+"""Classical test theory metrics in app.core.psychometrics and GET /quizzes/{id}/psychometrics."""
+
+import math
+
+import numpy as np
+import pytest
+
+from app.core.psychometrics import build_matrices, item_analysis
+
+
+def test_item_analysis_on_a_guttman_pattern():
+    correct = np.array([[1, 1, 1], [1, 1, 0], [1, 0, 0], [0, 0, 0]], dtype=np.int8)
+    choices = np.array([[1, 1, 1], [1, 1, 2], [1, 3, 2], [2, 0, 0]], dtype=np.int8)
+    result = item_analysis(correct, choices, ["A", "A", None], [["A", "B", "C", "D"], ["A", "B", "C"], []])
+
+    assert result["attempts"] == 4
+    assert result["mean_score"] == 1.5
+    assert result["kr20"] == pytest.approx(0.75)
+    first, second, third = result["items"]
+    assert [item["difficulty"] for item in result["items"]] == [0.75, 0.5, 0.25]
+    assert first["point_biserial"] == pytest.approx(0.75 / math.sqrt(0.75 * 2.75), abs=1e-4)
+    assert [item["discrimination"] for item in result["items"]] == [1.0, 1.0, 1.0]
+
+    # B was picked by a quarter of the attempts; C and D by nobody
+    assert first["options"]["B"] == {"share": 0.25, "upper_share": 0.0, "lower_share": 1.0}
+    assert first["distractor_efficiency"] == pytest.approx(33.33)
+    assert set(second["options"]) == {"A", "B", "C"}
+    assert second["distractor_efficiency"] == 50.0
+    assert third["distractor_efficiency"] is None  # not a keyed MCQ
+
+
+def test_constant_scores_have_no_correlations():
+    correct = np.ones((3, 2), dtype=np.int8)
+    result = item_analysis(correct, np.ones((3, 2), dtype=np.int8), ["A", "A"], [["A", "B"], ["A", "B"]])
+    assert result["kr20"] is None
+    assert [item["point_biserial"] for item in result["items"]] == [None, None]
+
+
+def test_build_matrices_places_answers_by_question_id():
+    def packed(question_id, correct, choice):
+        return str(question_id << 4 | correct << 3 | choice)
+
+    # attempt 9 has no answers; question 99 is not in the quiz
+    rows = [(7, ",".join([packed(20, 1, 1), packed(10, 0, 3), packed(99, 1, 1)])), (9, packed(0, 0, 5))]
+    correct, choices = build_matrices(rows, [10, 20])
+    assert correct.tolist() == [[0, 1], [0, 0]]
+    assert choices.tolist() == [[3, 1], [0, 0]]
+
+
+def test_psychometrics_endpoint_caches_until_new_attempts(client, seeded, auth_headers, query_counter):
+    headers = auth_headers(seeded["admin"])
+    quiz_id = seeded["quizzes"][0]
+
+    first = client.get(f"/api/v1/quizzes/{quiz_id}/psychometrics", headers=headers)
+    assert first.status_code == 200, first.text
+    analysis = first.json()
+    completed = client.get(f"/api/v1/quizzes/{quiz_id}/statistics", headers=headers).json()["completed_attempts"]
+    assert analysis["attempts"] == completed
+    assert analysis["questions"] == len(analysis["items"]) == 10
+
+    with query_counter() as counter:
+        second = client.get(f"/api/v1/quizzes/{quiz_id}/psychometrics", headers=headers)
+    assert second.json() == analysis
+    assert not any("answers" in statement for statement in counter.statements), counter.report()
+
+    forbidden = client.get(f"/api/v1/quizzes/{quiz_id}/psychometrics", headers=auth_headers(seeded["students"][0]))
+    assert forbidden.status_code == 403
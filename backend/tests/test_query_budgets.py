@@ -0,0 +1,102 @@
+"""Per-endpoint SQL statement budgets.
+
+Budgets include the three statements spent by ``get_current_user`` (user,
+revoked token and token block lookups). A budget that holds for every page
+size means the endpoint has no per-row (N+1) queries.
+"""
+
+import pytest
+
+from tests.query_counter import count_queries
+
+
+ALL_ATTEMPTS_BUDGET = 6
+MY_ATTEMPTS_BUDGET = 6
+QUIZ_LIST_BUDGET = 6
+RECENT_ACTIVITY_BUDGET = 4
+SUBMIT_BUDGET = 12  # includes storing the sanity flags and question stats
+
+
+def _assert_budget(counter, budget, label):
+    assert counter.count <= budget, (
+        f"{label} ran {counter.count} queries (budget {budget}):\n{counter.report()}"
+    )
+
+
+@pytest.mark.parametrize("limit", [5, 50, 300])
+def test_all_attempts_query_budget(client, seeded, auth_headers, query_counter, limit):
+    headers = auth_headers(seeded["admin"])
+    with query_counter() as counter:
+        response = client.get(
+            "/api/v1/attempts/all-attempts",
+            params={"completed_only": False, "limit": limit},
+            headers=headers,
+        )
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == min(limit, 300)
+    _assert_budget(counter, ALL_ATTEMPTS_BUDGET, f"all-attempts?limit={limit}")
+
+
+@pytest.mark.parametrize("limit", [1, 100])
+def test_my_attempts_query_budget(client, seeded, auth_headers, query_counter, limit):
+    headers = auth_headers(seeded["students"][0])
+    with query_counter() as counter:
+        response = client.get("/api/v1/attempts/my-attempts", params={"limit": limit}, headers=headers)
+    assert response.status_code == 200, response.text
+    _assert_budget(counter, MY_ATTEMPTS_BUDGET, f"my-attempts?limit={limit}")
+
+
+@pytest.mark.parametrize("role", ["admin", "teacher"])
+@pytest.mark.parametrize("limit", [1, 100])
+def test_quiz_list_query_budget(client, seeded, auth_headers, query_counter, role, limit):
+    headers = auth_headers(seeded[role])
+    with query_counter() as counter:
+        response = client.get("/api/v1/quizzes/", params={"limit": limit}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert all(quiz["total_questions"] > 0 for quiz in response.json())
+    _assert_budget(counter, QUIZ_LIST_BUDGET, f"quizzes?limit={limit} as {role}")
+
+
+@pytest.mark.parametrize("path", ["/api/v1/analytics/activity/recent", "/api/v1/attempts/stats/activity"])
+@pytest.mark.parametrize("limit", [2, 50])
+def test_recent_activity_query_budget(client, seeded, auth_headers, query_counter, path, limit):
+    headers = auth_headers(seeded["admin"])
+    with query_counter() as counter:
+        response = client.get(path, params={"limit": limit}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == limit
+    _assert_budget(counter, RECENT_ACTIVITY_BUDGET, f"{path}?limit={limit}")
+
+
+@pytest.mark.parametrize("quiz_index, answer_count", [(0, 1), (1, 10)])
+def test_submit_query_budget(client, seeded, auth_headers, query_counter, db, quiz_index, answer_count):
+    from app.models.models import Question
+
+    headers = auth_headers(seeded["fresh_student"])
+    quiz_id = seeded["quizzes"][quiz_index]
+    start = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers)
+    assert start.status_code == 200, start.text
+    attempt_id = start.json()["id"]
+
+    question_ids = [
+        question_id
+        for (question_id,) in db.query(Question.id).filter(Question.quiz_id == quiz_id).order_by(Question.order)
+    ][:answer_count]
+    payload = {"answers": [{"question_id": qid, "answer_text": "A"} for qid in question_ids]}
+
+    with query_counter() as counter:
+        response = client.post(
+            "/api/v1/attempts/submit", params={"attempt_id": attempt_id}, json=payload, headers=headers
+        )
+    assert response.status_code == 200, response.text
+    assert response.json()["score"] == answer_count
+    _assert_budget(counter, SUBMIT_BUDGET, f"submit with {answer_count} answers")
+
+
+@pytest.mark.parametrize("path", ["/api/v1/subjects/", "/api/v1/users/"])
+def test_sync_routers_authenticate_on_their_own_session(client, seeded, auth_headers, async_engine, path):
+    # Auth shares the sync get_db session: no second (async) session per request
+    with count_queries(async_engine.sync_engine) as async_counter:
+        response = client.get(path, headers=auth_headers(seeded["admin"]))
+    assert response.status_code == 200, response.text
+    assert async_counter.count == 0, async_counter.report()
@@ -0,0 +1,123 @@
+"""PATCH /quizzes/{id}/questions: diff-based question edits in bulk statements."""
+
+import asyncio
+
+from app.core.regrade import RegradeRunner
+from app.models.models import QuizAttempt
+
+
+def _quiz(client, headers, questions=4):
+    created = client.post("/api/v1/quizzes/", json={
+        "title": "Question edits", "duration_minutes": 30,
+        "questions": [
+            {"question_text": f"Q{n}", "question_type": "mcq", "option_a": "1", "option_b": "2",
+             "correct_answer": "A", "marks": 1}
+            for n in range(questions)
+        ],
+    }, headers=headers)
+    assert created.status_code == 200, created.text
+    return created.json()["id"]
+
+
+def _questions(client, headers, quiz_id):
+    quiz = client.get(f"/api/v1/quizzes/{quiz_id}", headers=headers).json()
+    return quiz, sorted(quiz["questions"], key=lambda question: question["order"])
+
+
+def test_patch_applies_operations_in_bulk(client, seeded, auth_headers, query_counter):
+    teacher = auth_headers(seeded["teacher"])
+    quiz_id = _quiz(client, teacher)
+    quiz, questions = _questions(client, teacher, quiz_id)
+    ids = [question["id"] for question in questions]
+    assert (quiz["content_version"], quiz["total_marks"]) == (1, 4)
+
+    operations = [
+        {"op": "update", "id": ids[0], "changes": {"marks": 3, "question_text": "Q0 fixed"}},
+        {"op": "update", "id": ids[1], "changes": {"correct_answer": "B"}},
+        {"op": "delete", "id": ids[2]},
+        {"op": "add", "question": {"question_text": "New", "question_type": "true_false", "correct_answer": "True",
+                                   "marks": 2}},
+        {"op": "add", "question": {"question_text": "Newer", "question_type": "short_answer", "correct_answer": "x"}},
+        {"op": "reorder", "question_ids": [ids[3], ids[1], ids[0]]},
+    ]
+    with query_counter() as counter:
+        response = client.patch(f"/api/v1/quizzes/{quiz_id}/questions",
+                                json={"operations": operations, "content_version": 1}, headers=teacher)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["content_version"], body["total_marks"]) == (2, 4 + 2 - 1 + 2 + 1)
+    assert body["deleted"] == [ids[2]] and len(body["added"]) == 2
+    assert sorted(body["updated"]) == sorted([ids[0], ids[1], ids[3]])
+    for table in ("INSERT INTO questions", "DELETE FROM questions"):
+        assert sum(statement.startswith(table) for statement in counter.statements) == 1, counter.report()
+
+    quiz, questions = _questions(client, teacher, quiz_id)
+    assert [question["id"] for question in questions] == [ids[3], ids[1], ids[0], *body["added"]]
+    assert [question["order"] for question in questions] == [0, 1, 2, 3, 4]
+    assert (questions[2]["question_text"], questions[2]["marks"], questions[1]["correct_answer"]) == ("Q0 fixed", 3, "B")
+    assert quiz["total_marks"] == body["total_marks"] and quiz["content_version"] == 2
+
+    item_analysis = client.get(f"/api/v1/quizzes/{quiz_id}/item-analysis", headers=teacher).json()
+    assert len(item_analysis["questions"]) == 5  # stats rows for the new questions
+
+    stale = client.patch(f"/api/v1/quizzes/{quiz_id}/questions",
+                         json={"operations": [{"op": "delete", "id": ids[0]}], "content_version": 1}, headers=teacher)
+    assert stale.status_code == 409
+
+
+def test_patch_rejects_invalid_operations(client, seeded, auth_headers):
+    teacher = auth_headers(seeded["teacher"])
+    quiz_id = _quiz(client, teacher, questions=2)
+    _, questions = _questions(client, teacher, quiz_id)
+    url = f"/api/v1/quizzes/{quiz_id}/questions"
+
+    other = _questions(client, teacher, seeded["quizzes"][0])[1][0]["id"]
+    for operations in (
+        [{"op": "update", "id": other, "changes": {"marks": 2}}],
+        [{"op": "update", "id": questions[0]["id"], "changes": {"correct_answer": None}}],
+        [{"op": "reorder", "question_ids": [questions[0]["id"]]}],
+        [{"op": "add"}],
+    ):
+        assert client.patch(url, json={"operations": operations}, headers=teacher).status_code == 400
+
+    # Answered questions stay: deleting them would orphan graded answers
+    seeded_question = _questions(client, auth_headers(seeded["admin"]), seeded["quizzes"][0])[1][0]["id"]
+    conflict = client.patch(f"/api/v1/quizzes/{seeded['quizzes'][0]}/questions",
+                            json={"operations": [{"op": "delete", "id": seeded_question}]},
+                            headers=auth_headers(seeded["admin"]))
+    assert conflict.status_code == 409
+    assert client.patch(url, json={"operations": []}, headers=auth_headers(seeded["students"][0])).status_code == 403
+
+
+def test_patch_can_queue_a_regrade(client, seeded, auth_headers, session_factory, async_session_factory):
+    teacher = auth_headers(seeded["teacher"])
+    student = seeded["students"][-15]
+    quiz_id = _quiz(client, teacher, questions=2)
+    client.put(f"/api/v1/quizzes/{quiz_id}", json={"is_active": True, "assigned_student_ids": [student]},
+               headers=teacher)
+    _, questions = _questions(client, teacher, quiz_id)
+    headers = auth_headers(student)
+    attempt_id = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers).json()["id"]
+    client.post("/api/v1/attempts/submit", params={"attempt_id": attempt_id},
+                json={"answers": [{"question_id": question["id"], "answer_text": "B"} for question in questions]},
+                headers=headers)
+
+    response = client.patch(f"/api/v1/quizzes/{quiz_id}/questions", json={
+        "operations": [{"op": "update", "id": questions[0]["id"], "changes": {"correct_answer": "B", "marks": 3}}],
+        "regrade": True,
+    }, headers=teacher)
+    assert response.status_code == 200, response.text
+    job = response.json()["regrade_job"]
+    assert (job["status"], job["question_id"]) == ("queued", questions[0]["id"])
+
+    runner = RegradeRunner()
+    runner.session_factory = async_session_factory
+    asyncio.run(runner.run_pending())
+    session = session_factory()
+    try:
+        attempt = session.get(QuizAttempt, attempt_id)
+        # The attempt's total follows the quiz's new total (1 + 1 -> 3 + 1), so it stays within 100%
+        assert (attempt.score, attempt.total_marks, attempt.percentage) == (3, 4, 75)
+        assert attempt.sanity_flags == 0
+    finally:
+        session.close()
@@ -0,0 +1,114 @@
+"""POST /quizzes/bulk-import: validation report and batched writes."""
+
+import csv
+import io
+
+import pytest
+
+COLUMNS = [
+    "quiz_title", "quiz_description", "subject_id", "duration_minutes", "marks_per_correct",
+    "negative_marking", "department", "year", "question_text", "question_type",
+    "option_a", "option_b", "option_c", "option_d", "correct_answer", "question_bank_id",
+]
+
+
+def _csv_file(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({column: row.get(column, "") for column in COLUMNS})
+    return {"file": ("quizzes.csv", buffer.getvalue().encode("utf-8"), "text/csv")}
+
+
+def _question_row(title, n, **extra):
+    return {
+        "quiz_title": title,
+        "duration_minutes": "30",
+        "marks_per_correct": "2",
+        "negative_marking": "0.5",
+        "year": "1st Year",
+        "question_text": f"{title} question {n}",
+        "question_type": "multiple_choice",
+        "option_a": "A", "option_b": "B", "option_c": "C", "option_d": "D",
+        "correct_answer": "A",
+        **extra,
+    }
+
+
+def test_bulk_import_creates_quizzes_and_questions(client, seeded, auth_headers):
+    headers = auth_headers(seeded["teacher"])
+    rows = [_question_row("Import physics", n) for n in range(3)]
+    rows.append(_question_row("Import maths", 0, question_type="true_false", option_a="", option_b="", correct_answer="true"))
+
+    response = client.post("/api/v1/quizzes/bulk-import", files=_csv_file(rows), headers=headers)
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert report["errors"] == []
+    assert {quiz["title"]: quiz["total_questions"] for quiz in report["created"]} == {
+        "Import physics": 3,
+        "Import maths": 1,
+    }
+
+    physics_id = next(quiz["id"] for quiz in report["created"] if quiz["title"] == "Import physics")
+    detail = client.get(f"/api/v1/quizzes/{physics_id}", headers=headers).json()
+    assert detail["total_marks"] == 6
+    assert detail["is_active"] is False
+    assert sorted(question["order"] for question in detail["questions"]) == [0, 1, 2]
+
+
+def test_bulk_import_reports_row_errors_without_writing(client, seeded, auth_headers):
+    headers = auth_headers(seeded["teacher"])
+    rows = [
+        _question_row("Import broken", 0),
+        _question_row("Import broken", 1, question_type="essay"),
+        _question_row("Import broken", 2, question_bank_id="999999"),
+        _question_row("Import fine", 0),
+    ]
+
+    response = client.post("/api/v1/quizzes/bulk-import", files=_csv_file(rows), headers=headers)
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert [error["row"] for error in report["errors"]] == [3, 4]
+    assert report["skipped"] == ["Import broken"]
+    assert report["created"] == []
+
+    response = client.post(
+        "/api/v1/quizzes/bulk-import", params={"skip_invalid": True}, files=_csv_file(rows), headers=headers
+    )
+    assert [quiz["title"] for quiz in response.json()["created"]] == ["Import fine"]
+
+
+def test_bulk_import_dry_run_and_missing_columns(client, seeded, auth_headers):
+    headers = auth_headers(seeded["teacher"])
+    response = client.post(
+        "/api/v1/quizzes/bulk-import",
+        params={"dry_run": True},
+        files=_csv_file([_question_row("Import dry run", 0)]),
+        headers=headers,
+    )
+    assert response.json()["valid_quizzes"] == 1
+    assert response.json()["created"] == []
+
+    response = client.post(
+        "/api/v1/quizzes/bulk-import",
+        files={"file": ("quizzes.csv", b"quiz_title,question_text\nA,B\n", "text/csv")},
+        headers=headers,
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("quiz_count", [2, 20])
+def test_bulk_import_query_count_is_independent_of_size(client, seeded, auth_headers, query_counter, quiz_count):
+    headers = auth_headers(seeded["teacher"])
+    rows = [
+        _question_row(f"Import sized {quiz_count}-{q}", n, question_bank_id="1")
+        for q in range(quiz_count)
+        for n in range(5)
+    ]
+    with query_counter() as counter:
+        response = client.post("/api/v1/quizzes/bulk-import", files=_csv_file(rows), headers=headers)
+    assert response.status_code == 200, response.text
+    assert len(response.json()["created"]) == quiz_count
+    # auth (3) + bank/subject lookups + quiz insert + question executemany + bank usage update
+    assert counter.count <= 10, counter.report()
@@ -0,0 +1,85 @@
+"""GCRA rate limiting: storages from app.core.rate_limit and the middleware in app.main."""
+
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+
+from app.core import rate_limit
+from app.db.sqlite_writer import use_immediate_transactions
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_then_spaced_requests():
+    clock = FakeClock()
+    limiter = rate_limit.RateLimiter(rate_limit.MemoryStorage(), clock=clock)
+
+    assert all(limiter.check("k", limit=3, period=60).allowed for _ in range(3))
+    blocked = limiter.check("k", limit=3, period=60)
+    assert not blocked.allowed
+    assert blocked.retry_after_seconds == 20
+
+    clock.now += 20
+    assert limiter.check("k", limit=3, period=60).allowed
+    assert not limiter.check("k", limit=3, period=60).allowed
+    assert limiter.check("other", limit=3, period=60).allowed
+
+
+def test_memory_storage_is_bounded():
+    clock = FakeClock()
+    storage = rate_limit.MemoryStorage(max_keys=3)
+    limiter = rate_limit.RateLimiter(storage, clock=clock)
+    for n in range(10):
+        limiter.check(f"ip-{n}", limit=5, period=60)
+    assert len(storage) == 3
+
+    clock.now += 60  # every TAT has passed: idle keys go on the next write
+    limiter.check("fresh", limit=5, period=60)
+    assert len(storage) == 1
+
+
+def test_database_storage_is_shared_between_workers(tmp_path):
+    url = f"sqlite:///{tmp_path / 'limits.db'}"
+    engines = [create_engine(url) for _ in range(2)]
+    for engine in engines:
+        use_immediate_transactions(engine)
+    clock = FakeClock()
+    workers = [rate_limit.RateLimiter(rate_limit.DatabaseStorage(engine), clock=clock) for engine in engines]
+
+    results = [workers[n % 2].check("login:1.2.3.4", limit=4, period=60).allowed for n in range(5)]
+    assert results == [True, True, True, True, False]
+
+    clock.now += 61
+    assert workers[0].storage.purge(clock.now) == 1
+    assert workers[1].check("login:1.2.3.4", limit=4, period=60).allowed
+    for engine in engines:
+        engine.dispose()
+
+
+def test_token_rules_key_on_the_bearer_token():
+    rule = next(rule for rule in rate_limit.default_rules() if rule.name == "export")
+    request = lambda token: SimpleNamespace(  # noqa: E731
+        client=SimpleNamespace(host="10.0.0.1"), headers={"authorization": f"Bearer {token}"}
+    )
+    assert rule.key_for(request("a")) != rule.key_for(request("b"))
+    assert rule.key_for(request("a")) == rule.key_for(request("a"))
+    assert rate_limit.parse_rate("10/300") == (10, 300.0)
+
+
+def test_login_is_limited_per_client(client, seeded):
+    for _ in range(10):
+        response = client.post("/api/v1/auth/login-json", json={"username": "nobody@example.com", "password": "x"})
+        assert response.status_code == 401
+    response = client.post("/api/v1/auth/login-json", json={"username": "nobody@example.com", "password": "x"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.json()["detail"] == "Too many login attempts. Please try again later."
+
+    # Other routes are not limited
+    assert client.get("/health").status_code == 200
@@ -0,0 +1,135 @@
+"""Read-replica routing with a stale copy of the test database standing in for the replica."""
+
+import shutil
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.db.database import get_read_router
+from app.db.replica import ReadRouter
+from app.main import app
+from app.models.models import QuizAttempt
+
+
+@pytest.fixture()
+def replica_router(client, seeded, database_path, tmp_path, session_factory, async_session_factory):
+    replica_path = tmp_path / "replica.db"
+    shutil.copyfile(database_path, replica_path)
+    replica_engine = create_engine(f"sqlite:///{replica_path}", poolclass=NullPool)
+    async_replica_engine = create_async_engine(f"sqlite+aiosqlite:///{replica_path}", poolclass=NullPool)
+
+    router = ReadRouter(
+        primary=session_factory,
+        replica=sessionmaker(bind=replica_engine),
+        async_primary=async_session_factory,
+        async_replica=async_sessionmaker(bind=async_replica_engine, expire_on_commit=False, class_=AsyncSession),
+        sticky_seconds=60,
+        max_lag_seconds=5,
+        lag_check_seconds=0,
+    )
+    app.dependency_overrides[get_read_router] = lambda: router
+    yield router
+    replica_engine.dispose()
+    async_replica_engine.sync_engine.dispose()
+
+
+def _monitor_ids(client, headers, quiz_id):
+    response = client.get(
+        "/api/v1/attempts/all-attempts",
+        params={"quiz_id": quiz_id, "completed_only": False, "limit": 300},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return {row["id"] for row in response.json()}
+
+
+def test_reads_use_replica_until_lag_exceeds_limit(client, seeded, auth_headers, session_factory, replica_router):
+    quiz_id = seeded["quizzes"][0]
+    headers = auth_headers(seeded["teacher"])
+
+    # Written to the primary only, so the replica copy has not "replicated" it yet.
+    session = session_factory()
+    try:
+        result = session.execute(insert(QuizAttempt).returning(QuizAttempt.id), [{
+            "quiz_id": quiz_id, "student_id": seeded["students"][-2], "total_marks": 10.0,
+            "started_at": datetime.now(), "is_completed": False,
+        }])
+        new_attempt_id = result.scalar_one()
+        session.commit()
+    finally:
+        session.close()
+
+    assert new_attempt_id not in _monitor_ids(client, headers, quiz_id)
+
+    replica_router.lag_probe = lambda connection: 30.0
+    assert new_attempt_id in _monitor_ids(client, headers, quiz_id)
+
+    replica_router.lag_probe = lambda connection: None  # broken replication
+    assert new_attempt_id in _monitor_ids(client, headers, quiz_id)
+
+
+def test_monitor_finalizes_expired_attempts_on_primary(client, seeded, auth_headers, session_factory,
+                                                        replica_router):
+    quiz_id = seeded["quizzes"][1]
+    row = {
+        "quiz_id": quiz_id, "student_id": seeded["students"][-3], "total_marks": 10.0,
+        "started_at": datetime.now() - timedelta(days=2), "is_completed": False,
+    }
+    ids = []
+    for factory in (session_factory, replica_router.replica):
+        session = factory()
+        try:
+            ids.append(session.execute(insert(QuizAttempt).returning(QuizAttempt.id), [row]).scalar_one())
+            session.commit()
+        finally:
+            session.close()
+    assert ids[0] == ids[1]
+
+    response = client.get(
+        "/api/v1/attempts/all-attempts",
+        params={"quiz_id": quiz_id, "completed_only": False, "limit": 300},
+        headers=auth_headers(seeded["teacher"]),
+    )
+    assert response.status_code == 200, response.text
+    assert {item["id"]: item["is_completed"] for item in response.json()}[ids[0]] is True
+
+    for factory, completed in ((session_factory, True), (replica_router.replica, False)):
+        session = factory()
+        try:
+            assert session.get(QuizAttempt, ids[0]).is_completed is completed
+        finally:
+            session.close()
+
+
+def test_my_attempts_reads_own_writes_after_submit(client, seeded, auth_headers, replica_router):
+    headers = auth_headers(seeded["fresh_student"])
+    quiz_id = seeded["quizzes"][2]
+
+    start = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers)
+    assert start.status_code == 200, start.text
+    attempt_id = start.json()["id"]
+    submit = client.post("/api/v1/attempts/submit", params={"attempt_id": attempt_id},
+                         json={"answers": []}, headers=headers)
+    assert submit.status_code == 200, submit.text
+
+    # The replica copy predates the submit; the sticky window routes to the primary.
+    mine = client.get("/api/v1/attempts/my-attempts", headers=headers)
+    assert mine.status_code == 200, mine.text
+    assert attempt_id in {row["id"] for row in mine.json()}
+
+    review = client.get(f"/api/v1/attempts/{attempt_id}/review", headers=headers)
+    assert review.status_code == 200, review.text
+
+    replica_router.sticky_seconds = 0
+    mine = client.get("/api/v1/attempts/my-attempts", headers=headers)
+    assert attempt_id not in {row["id"] for row in mine.json()}
+
+
+def test_router_without_replica_always_uses_primary(session_factory):
+    router = ReadRouter(primary=session_factory)
+    assert not router.enabled
+    assert router.session_factory() is session_factory
@@ -0,0 +1,175 @@
+"""POST /quizzes/{id}/regrade: dry-run score diff and chunked background regrade jobs."""
+
+import asyncio
+
+from app.core.regrade import RegradeRunner
+from app.db import maintenance
+from app.models.models import Question, Quiz, QuizAttempt
+
+
+def _runner(async_session_factory):
+    runner = RegradeRunner(chunk_size=1)  # one attempt per transaction
+    runner.session_factory = async_session_factory
+    return runner
+
+
+def _graded_quiz(client, seeded, auth_headers):
+    teacher = auth_headers(seeded["teacher"])
+    students = [seeded["students"][-13], seeded["students"][-14]]
+    questions = [
+        {"question_text": f"Q{n}", "question_type": "mcq", "option_a": "1", "option_b": "2",
+         "option_c": "3", "option_d": "4", "correct_answer": "B", "marks": 2}
+        for n in range(3)
+    ]
+    created = client.post("/api/v1/quizzes/", json={
+        "title": "Regrade", "duration_minutes": 30, "negative_marking": 0.5, "questions": questions,
+    }, headers=teacher)
+    assert created.status_code == 200, created.text
+    quiz_id = created.json()["id"]
+    client.put(f"/api/v1/quizzes/{quiz_id}", json={"is_active": True, "assigned_student_ids": students},
+               headers=teacher)
+
+    question_ids = None
+    attempt_ids = []
+    for student, picks in zip(students, (["B", "C"], ["C", "C"])):
+        headers = auth_headers(student)
+        attempt_id = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers).json()["id"]
+        question_ids = [q["id"] for q in client.get(f"/api/v1/quizzes/{quiz_id}", headers=headers).json()["questions"]]
+        answers = [{"question_id": qid, "answer_text": pick} for qid, pick in zip(question_ids, picks)]
+        submitted = client.post("/api/v1/attempts/submit", params={"attempt_id": attempt_id},
+                                json={"answers": answers}, headers=headers)
+        assert submitted.status_code == 200, submitted.text
+        attempt_ids.append(attempt_id)
+    return teacher, quiz_id, question_ids, attempt_ids
+
+
+def _scores(session_factory, attempt_ids):
+    session = session_factory()
+    try:
+        return [(attempt.score, attempt.correct_count)
+                for attempt in (session.get(QuizAttempt, attempt_id) for attempt_id in attempt_ids)]
+    finally:
+        session.close()
+
+
+def test_regrade_after_key_fix(client, seeded, auth_headers, session_factory, async_session_factory):
+    teacher, quiz_id, question_ids, attempt_ids = _graded_quiz(client, seeded, auth_headers)
+    assert _scores(session_factory, attempt_ids) == [(1.5, 1), (0.0, 0)]
+
+    # The key of the second question was wrong: C, not B
+    session = session_factory()
+    try:
+        session.get(Question, question_ids[1]).correct_answer = "C"
+        session.commit()
+    finally:
+        session.close()
+
+    url = f"/api/v1/quizzes/{quiz_id}/regrade"
+    dry_run = client.post(url, json={"question_id": question_ids[1]}, headers=teacher)
+    assert dry_run.status_code == 200, dry_run.text
+    body = dry_run.json()
+    assert body["changed_attempts"] == 2
+    assert [(c["attempt_id"], c["old_score"], c["new_score"]) for c in body["changes"]] == [
+        (attempt_ids[0], 1.5, 4.0), (attempt_ids[1], 0.0, 1.5),
+    ]
+    assert _scores(session_factory, attempt_ids) == [(1.5, 1), (0.0, 0)]  # nothing applied
+
+    queued = client.post(url, json={"question_id": question_ids[1], "dry_run": False}, headers=teacher)
+    assert queued.status_code == 202, queued.text
+    job = queued.json()
+    assert (job["status"], job["total_attempts"], job["processed_attempts"]) == ("queued", 2, 0)
+
+    assert asyncio.run(_runner(async_session_factory).run_pending()) >= 1
+    finished = client.get(job["status_url"], headers=teacher).json()
+    assert (finished["status"], finished["processed_attempts"], finished["changed_attempts"]) == ("done", 2, 2)
+    assert _scores(session_factory, attempt_ids) == [(4.0, 2), (1.5, 1)]
+
+    # question_stats moved with the answers, and a second regrade changes nothing
+    session = session_factory()
+    try:
+        question_range = (min(question_ids), max(question_ids) + 1)
+        assert session.execute(maintenance.drifted_question_stats(question_range)).all() == []
+    finally:
+        session.close()
+    assert client.get(f"/api/v1/quizzes/{quiz_id}/item-analysis", headers=teacher).json()["questions"][1][
+        "correct_count"] == 2
+    assert client.post(url, json={}, headers=teacher).json()["changed_attempts"] == 0
+
+
+def test_regrade_after_marks_change_resets_totals(client, seeded, auth_headers, session_factory,
+                                                  async_session_factory):
+    teacher, quiz_id, question_ids, attempt_ids = _graded_quiz(client, seeded, auth_headers)
+    session = session_factory()
+    try:
+        session.get(Question, question_ids[0]).marks = 5  # the quiz total goes from 6 to 9
+        session.commit()
+    finally:
+        session.close()
+
+    url = f"/api/v1/quizzes/{quiz_id}/regrade"
+    changes = client.post(url, json={"question_id": question_ids[0]}, headers=teacher).json()["changes"]
+    assert [(c["new_score"], c["old_total_marks"], c["new_total_marks"], c["new_percentage"]) for c in changes] == [
+        (4.5, 6.0, 9.0, 50.0), (0.0, 6.0, 9.0, 0.0),
+    ]
+    client.post(url, json={"question_id": question_ids[0], "dry_run": False}, headers=teacher)
+    asyncio.run(_runner(async_session_factory).run_pending())
+
+    session = session_factory()
+    try:
+        regraded = session.get(QuizAttempt, attempt_ids[0])
+        assert (regraded.score, regraded.total_marks, regraded.percentage) == (4.5, 9.0, 50.0)
+        assert regraded.sanity_flags == 0
+        assert session.get(Quiz, quiz_id).total_marks == 9
+    finally:
+        session.close()
+
+
+def test_regrade_normalizes_answers_like_submit(client, seeded, auth_headers, session_factory,
+                                               async_session_factory):
+    teacher = auth_headers(seeded["teacher"])
+    student = seeded["students"][-18]
+    created = client.post("/api/v1/quizzes/", json={
+        "title": "Regrade normalization", "duration_minutes": 30, "negative_marking": 0.5,
+        "questions": [
+            {"question_text": "Pick B", "question_type": "mcq", "option_a": "1", "option_b": "2",
+             "correct_answer": "B", "marks": 2},
+            {"question_text": "City", "question_type": "short_answer", "correct_answer": "Évora", "marks": 2},
+        ],
+    }, headers=teacher)
+    quiz_id = created.json()["id"]
+    client.put(f"/api/v1/quizzes/{quiz_id}", json={"is_active": True, "assigned_student_ids": [student]},
+               headers=teacher)
+    headers = auth_headers(student)
+    attempt_id = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers).json()["id"]
+    question_ids = [q["id"] for q in client.get(f"/api/v1/quizzes/{quiz_id}", headers=headers).json()["questions"]]
+    answers = [{"question_id": question_ids[0], "answer_text": "b\n"},
+               {"question_id": question_ids[1], "answer_text": "\tÉVORA "}]
+    client.post("/api/v1/attempts/submit", params={"attempt_id": attempt_id}, json={"answers": answers},
+                headers=headers)
+    assert _scores(session_factory, [attempt_id]) == [(4.0, 2)]
+
+    # Keys unchanged: the SQL regrade agrees with submit grading on every answer
+    url = f"/api/v1/quizzes/{quiz_id}/regrade"
+    assert client.post(url, json={}, headers=teacher).json()["changed_attempts"] == 0
+    client.post(url, json={"dry_run": False}, headers=teacher)
+    asyncio.run(_runner(async_session_factory).run_pending())
+    assert _scores(session_factory, [attempt_id]) == [(4.0, 2)]
+
+
+def test_negative_marking_change_queues_a_regrade(client, seeded, auth_headers, session_factory,
+                                                  async_session_factory):
+    teacher, quiz_id, question_ids, attempt_ids = _graded_quiz(client, seeded, auth_headers)
+    client.put(f"/api/v1/quizzes/{quiz_id}", json={"negative_marking": 0}, headers=teacher)
+
+    asyncio.run(_runner(async_session_factory).run_pending())
+    assert _scores(session_factory, attempt_ids) == [(2.0, 1), (0.0, 0)]
+
+
+def test_regrade_checks_ownership_and_question(client, seeded, auth_headers):
+    quiz_id = seeded["quizzes"][0]
+    url = f"/api/v1/quizzes/{quiz_id}/regrade"
+    assert client.post(url, json={}, headers=auth_headers(seeded["students"][0])).status_code == 403
+    other_question = client.get(f"/api/v1/quizzes/{seeded['quizzes'][1]}",
+                                headers=auth_headers(seeded["admin"])).json()["questions"][0]["id"]
+    missing = client.post(url, json={"question_id": other_question}, headers=auth_headers(seeded["admin"]))
+    assert missing.status_code == 404
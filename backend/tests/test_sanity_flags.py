@@ -0,0 +1,73 @@
+"""Sanity flags are stored when an attempt is graded and paged through by the review queue."""
+
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql
+
+from app.core.sanity_flags import sanity_flags_expression
+from app.models.models import Question, Quiz, QuizAssignment
+
+
+def _zero_mark_quiz(session_factory, teacher_id, student_id):
+    """Correct answers score nothing, so a perfect attempt is flagged high_correct_zero_score."""
+    now = datetime.now()
+    session = session_factory()
+    try:
+        quiz = Quiz(title="Zero marks", creator_id=teacher_id, duration_minutes=30, total_marks=2,
+                    is_active=True, created_at=now, updated_at=now)
+        session.add(quiz)
+        session.flush()
+        session.add_all([
+            Question(quiz_id=quiz.id, question_text=f"Q{n}", question_type="mcq", option_a="A", option_b="B",
+                     correct_answer="A", marks=0, order=n)
+            for n in range(2)
+        ])
+        session.execute(insert(QuizAssignment), [{"quiz_id": quiz.id, "student_id": student_id, "assigned_at": now}])
+        session.commit()
+        return quiz.id
+    finally:
+        session.close()
+
+
+def test_graded_attempt_lands_in_review_queue_until_marking_changes(client, seeded, auth_headers, session_factory):
+    student = seeded["students"][-11]
+    quiz_id = _zero_mark_quiz(session_factory, seeded["teacher"], student)
+    headers = auth_headers(student)
+    teacher = auth_headers(seeded["teacher"])
+
+    started = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers)
+    assert started.status_code == 200, started.text
+    attempt_id = started.json()["id"]
+    question_ids = [q["id"] for q in client.get(f"/api/v1/quizzes/{quiz_id}", headers=headers).json()["questions"]]
+    submitted = client.post("/api/v1/attempts/submit", params={"attempt_id": attempt_id},
+                            json={"answers": [{"question_id": qid, "answer_text": "A"} for qid in question_ids]},
+                            headers=headers)
+    assert submitted.status_code == 200, submitted.text
+
+    queue = client.get("/api/v1/attempts/review-queue", params={"quiz_id": quiz_id}, headers=teacher)
+    assert queue.status_code == 200, queue.text
+    assert [(row["id"], row["sanity_flags"]) for row in queue.json()] == [(attempt_id, ["high_correct_zero_score"])]
+    by_flag = client.get("/api/v1/attempts/review-queue",
+                         params={"quiz_id": quiz_id, "flag": "negative_score"}, headers=teacher)
+    assert by_flag.json() == []
+    unknown = client.get("/api/v1/attempts/review-queue", params={"flag": "bogus"}, headers=teacher)
+    assert unknown.status_code == 400
+    monitor = client.get("/api/v1/attempts/all-attempts", params={"quiz_id": quiz_id}, headers=teacher).json()
+    assert monitor[0]["needs_review"] is True
+
+    # Heavy negative marking explains a zero score: the quiz's attempts are reflagged
+    updated = client.put(f"/api/v1/quizzes/{quiz_id}", json={"negative_marking": 2.0}, headers=teacher)
+    assert updated.status_code == 200, updated.text
+    assert client.get("/api/v1/attempts/review-queue", params={"quiz_id": quiz_id}, headers=teacher).json() == []
+
+
+def test_review_queue_is_for_staff(client, seeded, auth_headers):
+    response = client.get("/api/v1/attempts/review-queue", headers=auth_headers(seeded["students"][0]))
+    assert response.status_code == 403
+
+
+def test_correct_ratio_never_divides_by_zero():
+    # PostgreSQL may evaluate the ratio before the total_questions > 0 guard
+    sql = str(sanity_flags_expression().compile(dialect=postgresql.dialect()))
+    assert "/ CAST(nullif((SELECT count(questions.id)" in sql
@@ -0,0 +1,156 @@
+"""SQLite production mode: pragmas and the single-writer queue from app.db.sqlite_writer."""
+
+import asyncio
+
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+
+from app.db import pool
+from app.db.database import get_write_queue
+from app.db.sqlite_writer import WriteQueue, use_immediate_transactions
+from app.main import app
+from app.models.models import Answer
+
+ScratchBase = declarative_base()
+
+
+class Note(ScratchBase):
+    __tablename__ = "notes"
+
+    id = Column(Integer, primary_key=True)
+    body = Column(String, unique=True, nullable=False)
+
+
+def _writer_engine(path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}", poolclass=pool.InstrumentedAsyncQueuePool, pool_size=1, max_overflow=0
+    )
+    pool.install_sqlite_pragmas(engine.sync_engine)
+    use_immediate_transactions(engine.sync_engine)
+    return engine
+
+
+def _queue(engine, **kwargs):
+    return WriteQueue(async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession), **kwargs)
+
+
+@pytest.fixture()
+def notes_path(tmp_path):
+    path = tmp_path / "notes.db"
+    engine = create_engine(f"sqlite:///{path}")
+    ScratchBase.metadata.create_all(engine)
+    engine.dispose()
+    return path
+
+
+def _add_note(body):
+    async def work(session):
+        note = Note(body=body)
+        session.add(note)
+        await session.flush()
+        return note.id
+    return work
+
+
+def test_concurrent_writes_share_commits(notes_path):
+    async def scenario():
+        engine = _writer_engine(notes_path)
+        queue = _queue(engine, max_wait_ms=20)
+        try:
+            ids = await asyncio.gather(*(queue.submit(_add_note(f"note-{n}")) for n in range(40)))
+        finally:
+            await queue.stop()
+            await engine.dispose()
+        return ids, queue
+
+    ids, queue = asyncio.run(scenario())
+    assert len(set(ids)) == 40
+    assert queue.items == 40
+    assert queue.batches < 40
+
+    engine = create_engine(f"sqlite:///{notes_path}")
+    with engine.connect() as connection:
+        assert connection.scalar(text("SELECT count(*) FROM notes")) == 40
+    engine.dispose()
+
+
+def test_failing_item_is_rolled_back_alone(notes_path):
+    async def scenario():
+        engine = _writer_engine(notes_path)
+        queue = _queue(engine, max_wait_ms=20)
+        try:
+            return await asyncio.gather(
+                queue.submit(_add_note("first")),
+                queue.submit(_add_note("first")),  # unique violation
+                queue.submit(_add_note("second")),
+                return_exceptions=True,
+            ), queue.batches
+        finally:
+            await queue.stop()
+            await engine.dispose()
+
+    (first, duplicate, second), batches = asyncio.run(scenario())
+    assert isinstance(first, int) and isinstance(second, int)
+    assert "UNIQUE" in str(duplicate)
+    assert batches == 1
+
+    engine = create_engine(f"sqlite:///{notes_path}")
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT body FROM notes ORDER BY id")).scalars().all() == ["first", "second"]
+    engine.dispose()
+
+
+def test_sqlite_pragmas_follow_settings(monkeypatch, notes_path):
+    monkeypatch.setattr(pool.settings, "SQLITE_SYNCHRONOUS", "normal")
+    monkeypatch.setattr(pool.settings, "SQLITE_MMAP_SIZE", 1 << 20)
+    engine = create_engine(f"sqlite:///{notes_path}")
+    pool.install_sqlite_pragmas(engine)
+    with engine.connect() as connection:
+        assert connection.scalar(text("PRAGMA journal_mode")) == "wal"
+        assert connection.scalar(text("PRAGMA synchronous")) == 1  # NORMAL
+        assert connection.scalar(text("PRAGMA mmap_size")) == 1 << 20
+        assert connection.scalar(text("PRAGMA temp_store")) == 2  # MEMORY
+    engine.dispose()
+
+    monkeypatch.setattr(pool.settings, "SQLITE_SYNCHRONOUS", "SOMETIMES")
+    with pytest.raises(ValueError):
+        pool.sqlite_pragmas()
+
+
+def test_attempt_writes_go_through_the_queue(client, seeded, auth_headers, database_path, session_factory):
+    engine = _writer_engine(database_path)
+    queue = _queue(engine)
+    app.dependency_overrides[get_write_queue] = lambda: queue
+    headers = auth_headers(seeded["fresh_student"])
+    quiz_id = seeded["quizzes"][3]
+
+    with client:  # one event loop for the writer task across requests
+        start = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers)
+        assert start.status_code == 200, start.text
+        attempt_id = start.json()["id"]
+
+        quiz = client.get(f"/api/v1/quizzes/{quiz_id}", headers=headers).json()
+        question_id = quiz["questions"][0]["id"]
+        saved = client.post(f"/api/v1/attempts/{attempt_id}/save-answer",
+                            json={"question_id": question_id, "answer_text": "A"}, headers=headers)
+        assert saved.status_code == 200, saved.text
+
+        submit = client.post("/api/v1/attempts/submit", params={"attempt_id": attempt_id},
+                             json={"answers": [{"question_id": question_id, "answer_text": "A"}]},
+                             headers=headers)
+        assert submit.status_code == 200, submit.text
+        assert submit.json()["is_completed"] is True
+        again = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers)
+        assert again.status_code == 400, again.text
+        client.portal.call(queue.stop)
+        client.portal.call(engine.dispose)
+
+    assert queue.items == 4
+    session = session_factory()
+    try:
+        answers = session.execute(select(Answer).where(Answer.attempt_id == attempt_id)).scalars().all()
+        assert [answer.question_id for answer in answers] == [question_id]
+    finally:
+        session.close()
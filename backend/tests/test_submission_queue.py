@@ -0,0 +1,165 @@
+"""Queued submissions: 202 intake, grading workers, intake time as the submission time."""
+
+import asyncio
+import time
+from datetime import timedelta
+
+from app.api.v1 import attempts
+from app.core.submissions import GradingWorkers
+from app.models.models import AttemptSubmission, QuizAttempt
+
+
+def _workers(async_session_factory):
+    workers = GradingWorkers(attempts._grade_submission)
+    workers.session_factory = async_session_factory
+    return workers
+
+
+def _start(client, headers, quiz_id):
+    response = client.post("/api/v1/attempts/start", json={"quiz_id": quiz_id}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_queued_submission_is_graded_with_its_intake_time(client, seeded, auth_headers, session_factory,
+                                                         async_session_factory):
+    headers = auth_headers(seeded["students"][-5])
+    quiz_id = seeded["quizzes"][4]
+    attempt_id = _start(client, headers, quiz_id)
+    question_id = client.get(f"/api/v1/quizzes/{quiz_id}", headers=headers).json()["questions"][0]["id"]
+
+    intake = client.post(f"/api/v1/attempts/{attempt_id}/submissions",
+                         json={"answers": [{"question_id": question_id, "answer_text": "A"}]}, headers=headers)
+    assert intake.status_code == 202, intake.text
+    body = intake.json()
+    assert body["status"] == "queued"
+    assert body["status_url"] == f"/api/v1/attempts/{attempt_id}/submission"
+    again = client.post(f"/api/v1/attempts/{attempt_id}/submissions", json={"answers": []}, headers=headers)
+    assert again.json()["submission_id"] == body["submission_id"]  # retries don't queue twice
+    assert client.get(body["status_url"], headers=headers).json()["status"] == "queued"
+
+    # The 60-minute deadline passes while the submission waits in the queue
+    session = session_factory()
+    try:
+        received_at = session.get(AttemptSubmission, body["submission_id"]).received_at
+        session.get(QuizAttempt, attempt_id).started_at = received_at - timedelta(minutes=60) + timedelta(seconds=0.2)
+        session.commit()
+    finally:
+        session.close()
+    time.sleep(0.3)
+
+    workers = _workers(async_session_factory)
+    assert asyncio.run(workers.run_pending()) >= 1
+    status = client.get(body["status_url"], headers=headers).json()
+    assert status["status"] == "graded", status
+    assert status["attempt"]["is_completed"] is True
+    assert status["attempt"]["score"] == 1.0
+    assert status["attempt"]["submitted_at"] == received_at.isoformat()
+
+
+def test_submission_rejected_at_grading_time(client, seeded, auth_headers, async_session_factory):
+    headers = auth_headers(seeded["students"][-6])
+    attempt_id = _start(client, headers, seeded["quizzes"][4])
+    intake = client.post(f"/api/v1/attempts/{attempt_id}/submissions", json={"answers": []}, headers=headers)
+    assert intake.status_code == 202, intake.text
+
+    # Submitted synchronously before a worker got to it
+    direct = client.post("/api/v1/attempts/submit", params={"attempt_id": attempt_id}, json={"answers": []},
+                         headers=headers)
+    assert direct.status_code == 200, direct.text
+
+    workers = _workers(async_session_factory)
+    asyncio.run(workers.run_pending())
+    status = client.get(f"/api/v1/attempts/{attempt_id}/submission", headers=headers).json()
+    assert (status["status"], status["detail"]) == ("rejected", "Quiz already submitted")
+    assert workers.rejected == 1
+
+
+def test_intake_validates_ownership(client, seeded, auth_headers):
+    attempt_id = _start(client, auth_headers(seeded["students"][-7]), seeded["quizzes"][4])
+    response = client.post(f"/api/v1/attempts/{attempt_id}/submissions", json={"answers": []},
+                           headers=auth_headers(seeded["students"][-8]))
+    assert response.status_code == 403
+
+
+def test_queued_submission_survives_expiry_finalization(client, seeded, auth_headers, session_factory,
+                                                        async_session_factory):
+    teacher = auth_headers(seeded["teacher"])
+    student = seeded["students"][-16]
+    created = client.post("/api/v1/quizzes/", json={
+        "title": "Queued at the deadline", "duration_minutes": 30,
+        "questions": [{"question_text": "Q", "question_type": "mcq", "option_a": "1", "option_b": "2",
+                       "correct_answer": "A"}],
+    }, headers=teacher)
+    quiz_id = created.json()["id"]
+    client.put(f"/api/v1/quizzes/{quiz_id}", json={"is_active": True, "assigned_student_ids": [student]},
+               headers=teacher)
+    headers = auth_headers(student)
+    attempt_id = _start(client, headers, quiz_id)
+    question_id = client.get(f"/api/v1/quizzes/{quiz_id}", headers=headers).json()["questions"][0]["id"]
+    intake = client.post(f"/api/v1/attempts/{attempt_id}/submissions",
+                         json={"answers": [{"question_id": question_id, "answer_text": "A"}]}, headers=headers)
+    assert intake.status_code == 202, intake.text
+
+    # The deadline passes while the submission is queued, and the teacher monitor polls
+    session = session_factory()
+    try:
+        received_at = session.get(AttemptSubmission, intake.json()["submission_id"]).received_at
+        session.get(QuizAttempt, attempt_id).started_at = received_at - timedelta(minutes=30) + timedelta(seconds=0.2)
+        session.commit()
+    finally:
+        session.close()
+    time.sleep(0.3)
+    monitor = client.get("/api/v1/attempts/all-attempts", params={"quiz_id": quiz_id, "completed_only": False},
+                         headers=teacher)
+    assert monitor.status_code == 200, monitor.text
+    assert [attempt["is_completed"] for attempt in monitor.json()] == [False]  # not finalized as blank
+
+    asyncio.run(_workers(async_session_factory).run_pending())
+    status = client.get(f"/api/v1/attempts/{attempt_id}/submission", headers=headers).json()
+    assert status["status"] == "graded", status
+    assert status["attempt"]["score"] == 1.0
+
+
+def _queued_attempt(client, teacher, headers, student_id):
+    created = client.post("/api/v1/quizzes/", json={
+        "title": "Deleted with a queued submission", "duration_minutes": 30,
+        "questions": [{"question_text": "Q", "question_type": "mcq", "option_a": "1", "option_b": "2",
+                       "correct_answer": "A"}],
+    }, headers=teacher)
+    quiz_id = created.json()["id"]
+    client.put(f"/api/v1/quizzes/{quiz_id}", json={"is_active": True, "assigned_student_ids": [student_id]},
+               headers=teacher)
+    attempt_id = _start(client, headers, quiz_id)
+    question_id = client.get(f"/api/v1/quizzes/{quiz_id}", headers=headers).json()["questions"][0]["id"]
+    intake = client.post(f"/api/v1/attempts/{attempt_id}/submissions",
+                         json={"answers": [{"question_id": question_id, "answer_text": "A"}]}, headers=headers)
+    assert intake.json()["status"] == "queued", intake.text
+    return quiz_id, attempt_id
+
+
+def test_deletes_remove_queued_submissions(client, seeded, auth_headers, session_factory):
+    # Explicit deletes: SQLite does not enforce ON DELETE CASCADE, so a reused attempt id
+    # would otherwise find a stale submission
+    teacher, admin = auth_headers(seeded["teacher"]), auth_headers(seeded["admin"])
+    student = seeded["students"][-17]
+    quiz_id, quiz_attempt = _queued_attempt(client, teacher, auth_headers(student), student)
+    assert client.delete(f"/api/v1/quizzes/{quiz_id}", headers=teacher).status_code == 200
+
+    created = client.post("/api/v1/users/", json={
+        "email": "queued.leaver@macquiz.com", "first_name": "Queued", "last_name": "Leaver",
+        "role": "student", "password": "password123",
+    }, headers=admin)
+    assert created.status_code == 200, created.text
+    leaver = created.json()["id"]
+    _, leaver_attempt = _queued_attempt(client, teacher, auth_headers(leaver), leaver)
+    assert client.delete(f"/api/v1/users/{leaver}", headers=admin).status_code == 200
+
+    session = session_factory()
+    try:
+        left = session.query(AttemptSubmission).filter(
+            AttemptSubmission.attempt_id.in_([quiz_attempt, leaver_attempt])
+        ).count()
+        assert left == 0
+    finally:
+        session.close()
@@ -168,118 +168,39 @@ const BulkQuizUploadModal = ({ isOpen, onClose, onSuccess }) => {
         try {
             const token = localStorage.getItem('access_token');
             
-            // Group questions by quiz
-            const quizzes = [];
-            Object.entries(validationResults.quizGroups).forEach(([_quizKey, questions]) => {
-                const firstQ = questions[0];
-                const quiz = {
-                    title: firstQ.quiz_title,
-                    description: firstQ.quiz_description || `Quiz with ${questions.length} questions`,
-                    duration_minutes: parseInt(firstQ.duration_minutes) || 30,
-                    marks_per_correct: parseFloat(firstQ.marks_per_correct) || 1,
-                    negative_marking: parseFloat(firstQ.negative_marking) || 0,
-                    is_active: false,
-                };
-                
-                // Only add optional fields if they have valid values
-                if (firstQ.subject_id && firstQ.subject_id.trim() !== '' && !isNaN(parseInt(firstQ.subject_id))) {
-                    quiz.subject_id = parseInt(firstQ.subject_id);
-                }
-                
-                if (firstQ.department && firstQ.department.trim() !== '') {
-                    quiz.department = firstQ.department.trim();
-                }
-                
-                if (firstQ.year && !isNaN(parseInt(firstQ.year))) {
-                    quiz.class_year = firstQ.year.toString();
-                }
-                
-                quiz.questions = questions.map((q, idx) => {
-                        // Map question_type to backend format
-                        const questionType = q.question_type === 'multiple_choice' ? 'mcq' : q.question_type;
-                        
-                        return {
-                            question_text: q.question_text,
-                            question_type: questionType,
-                            option_a: (questionType === 'mcq') ? q.option_a : null,
-                            option_b: (questionType === 'mcq') ? q.option_b : null,
-                            option_c: (questionType === 'mcq') ? (q.option_c || null) : null,
-                            option_d: (questionType === 'mcq') ? (q.option_d || null) : null,
-                            correct_answer: q.correct_answer,
-                            marks: parseFloat(firstQ.marks_per_correct) || 1,
-                            order: idx
-                        };
-                    });
-                
-                quizzes.push(quiz);
+            // One request: the server validates every row and writes in batches
+            const formData = new FormData();
+            formData.append('file', file);
+            setUploadProgress(30);
+
+            const response = await fetch(`${API_BASE_URL}/api/v1/quizzes/bulk-import`, {
+                method: 'POST',
+                headers: {
+                    'Authorization': `Bearer ${token}`
+                },
+                body: formData
             });
 
-            let successCount = 0;
-            let failCount = 0;
-            const progressStep = 90 / quizzes.length;
-            const failedQuizzes = [];
-
-            // Upload each quiz
-            for (const quiz of quizzes) {
-                try {
-                    console.log('Uploading quiz:', quiz.title, quiz);
-                    
-                    const response = await fetch(`${API_BASE_URL}/api/v1/quizzes/`, {
-                        method: 'POST',
-                        headers: {
-                            'Authorization': `Bearer ${token}`,
-                            'Content-Type': 'application/json'
-                        },
-                        body: JSON.stringify(quiz)
-                    });
-
-                    if (response.ok) {
-                        const createdQuiz = await response.json().catch(() => null);
-                        if (createdQuiz?.id && createdQuiz?.is_active) {
-                            await fetch(`${API_BASE_URL}/api/v1/quizzes/${createdQuiz.id}`, {
-                                method: 'PUT',
-                                headers: {
-                                    'Authorization': `Bearer ${token}`,
-                                    'Content-Type': 'application/json'
-                                },
-                                body: JSON.stringify({ is_active: false })
-                            });
-                        }
-                        successCount++;
-                        console.log(`✅ Successfully uploaded: ${quiz.title}`);
-                    } else {
-                        failCount++;
-                        const errorData = await response.json().catch(() => ({ detail: 'Unknown error' }));
-                        const errorMsg = typeof errorData.detail === 'string' 
-                            ? errorData.detail 
-                            : Array.isArray(errorData.detail)
-                            ? errorData.detail.map(e => e.msg || e).join(', ')
-                            : JSON.stringify(errorData.detail || errorData);
-                        failedQuizzes.push({
-                            title: quiz.title,
-                            error: errorMsg
-                        });
-                        console.error(`❌ Failed to upload "${quiz.title}":`, errorData);
-                    }
-                    setUploadProgress(prev => Math.min(prev + progressStep, 90));
-                } catch (error) {
-                    failCount++;
-                    const errorMsg = error.message === 'Failed to fetch' 
-                        ? 'Unable to connect to server. Please ensure the backend is running.'
-                        : error.message || 'Network error';
-                    failedQuizzes.push({
-                        title: quiz.title,
-                        error: errorMsg
-                    });
-                    console.error(`❌ Network error for "${quiz.title}":`, error);
-                }
+            const report = await response.json().catch(() => ({ detail: 'Unknown error' }));
+            if (!response.ok) {
+                const errorMsg = typeof report.detail === 'string'
+                    ? report.detail
+                    : JSON.stringify(report.detail || report);
+                throw new Error(errorMsg);
             }
 
+            const failedQuizzes = (report.errors || []).map(error => ({
+                title: error.quiz_title || `Row ${error.row}`,
+                error: `Row ${error.row}: ${error.error}`
+            }));
+            const successCount = (report.created || []).length;
+            const failCount = (report.skipped || []).length;
+
             setUploadProgress(100);
 
             setTimeout(() => {
                 onSuccess({
-                    total: quizzes.length,
+                    total: report.quizzes_found,
                     success: successCount,
                     failed: failCount,
                     failedQuizzes
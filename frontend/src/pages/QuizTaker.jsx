@@ -366,6 +366,12 @@ const QuizTaker = () => {
             success(autoSubmit ? 'Time up! Quiz submitted automatically.' : 'Quiz submitted successfully!');
             navigate(`/quiz-result/${attempt.id}`, { state: { result } });
         } catch (err) {
+            if (err.status === 202) {
+                // Received and queued for grading; results appear once graded
+                success(err.message);
+                navigate('/dashboard');
+                return;
+            }
             const errorMessage = err.data?.detail || err.message || 'Failed to submit quiz';
             error(errorMessage);
             console.error('Quiz submission error:', err);
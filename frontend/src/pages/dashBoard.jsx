@@ -3296,42 +3296,30 @@ const StudentResultsView = () => {
         return student ? `${student.first_name} ${student.last_name}` : 'Unknown';
     };
 
-    // Export to CSV
-    const exportToCSV = () => {
+    // Export to CSV (streamed by the server, so large cohorts are not truncated)
+    const exportToCSV = async () => {
         if (latestCompletedAttempts.length === 0) {
             error('No data to export');
             return;
         }
 
-        const headers = ['Student Name', 'Email', 'Quiz', 'Score', 'Total Marks', 'Percentage', 'Grade', 'Correct Answers', 'Total Questions', 'Time Taken', 'Submitted At', 'Status'];
-        const csvData = latestCompletedAttempts.map((attempt) => {
-            const percentage = attempt.percentage || 0;
-            const grade = getGradeFromPercentage(percentage);
-            return [
-                attempt.student_name || getStudentName(attempt.student_id),
-                attempt.student_email || '',
-                attempt.quiz_title || `Quiz ${attempt.quiz_id}`,
-                attempt.score?.toFixed(1) || 0,
-                attempt.quiz_total_marks || attempt.total_marks,
-                percentage.toFixed(1) + '%',
-                grade,
-                attempt.correct_answers || 0,
-                attempt.total_questions || 0,
-                attempt.time_taken || 'N/A',
-                attempt.submitted_at ? new Date(attempt.submitted_at).toLocaleString() : 'Not submitted',
-                `${grade === 'F' || grade === 'N/A' ? 'Failed' : 'Passed'}${attempt?.needs_review ? ' (Review)' : ''}`
-            ];
-        });
-
-        const csv = [headers, ...csvData].map(row => row.join(',')).join('\n');
-        const blob = new Blob([csv], { type: 'text/csv' });
-        const url = window.URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        a.href = url;
-        a.download = `student-results-${new Date().toISOString().split('T')[0]}.csv`;
-        a.click();
-        window.URL.revokeObjectURL(url);
-        success('Report exported successfully');
+        try {
+            const response = await attemptAPI.exportAttempts({
+                quiz_id: filterQuiz !== 'all' ? filterQuiz : undefined,
+                student_id: filterStudent !== 'all' ? filterStudent : undefined,
+                completed_only: true,
+            }, 'csv');
+            const blob = await response.blob();
+            const url = window.URL.createObjectURL(blob);
+            const a = document.createElement('a');
+            a.href = url;
+            a.download = `student-results-${new Date().toISOString().split('T')[0]}.csv`;
+            a.click();
+            window.URL.revokeObjectURL(url);
+            success('Report exported successfully');
+        } catch (err) {
+            error(err?.message || 'Failed to export report');
+        }
     };
 
     return (
@@ -42,6 +42,7 @@ class APIError extends Error {
 }
 
 const GET_CACHE_TTL_MS = 8000;
+const SUBMISSION_POLL_TIMEOUT_MS = 120000;
 const getResponseCache = new Map();
 
 function cloneJsonData(data) {
@@ -319,6 +320,14 @@ export const attemptAPI = {
             : '/api/v1/attempts/all-attempts';
         return fetchAPI(url);
     },
+    exportAttempts: (filters = {}, format = 'csv') => {
+        // Streams every matching row (no limit); resolves to the raw Response
+        const params = [`format=${format}`];
+        if (filters.quiz_id) params.push(`quiz_id=${filters.quiz_id}`);
+        if (filters.student_id) params.push(`student_id=${filters.student_id}`);
+        if (filters.completed_only !== undefined) params.push(`completed_only=${filters.completed_only}`);
+        return fetchAPI(`/api/v1/attempts/export?${params.join('&')}`, { skipCache: true, timeoutMs: 120000 });
+    },
     getAttempt: (id) => fetchAPI(`/api/v1/attempts/${id}`),
     getAttemptReview: async (id) => {
         try {
@@ -335,10 +344,29 @@ export const attemptAPI = {
         method: 'POST',
         body: JSON.stringify({ quiz_id: quizId }),
     }),
-    submitAttempt: (attemptId, answers) => fetchAPI(`/api/v1/attempts/submit?attempt_id=${attemptId}`, {
-        method: 'POST',
-        body: JSON.stringify({ answers }),
-    }),
+    // Queues the submission (202) and polls until a grading worker has graded it.
+    // The server records the time it received the answers, so waiting here never
+    // counts against the deadline.
+    submitAttempt: async (attemptId, answers) => {
+        let submission = await fetchAPI(`/api/v1/attempts/${attemptId}/submissions`, {
+            method: 'POST',
+            body: JSON.stringify({ answers }),
+        });
+        const giveUpAt = Date.now() + SUBMISSION_POLL_TIMEOUT_MS;
+        let delayMs = 500;
+        while (submission.status === 'queued' && Date.now() < giveUpAt) {
+            await new Promise((resolve) => setTimeout(resolve, delayMs));
+            delayMs = Math.min(delayMs * 2, 3000);
+            submission = await fetchAPI(submission.status_url, { skipCache: true });
+        }
+        if (submission.status === 'graded') {
+            return submission.attempt;
+        }
+        if (submission.status === 'queued') {
+            throw new APIError('Your answers were received and are still being graded. Check your results shortly.', 202, submission);
+        }
+        throw new APIError(submission.detail || 'Failed to submit quiz', 400, submission);
+    },
     saveAnswer: (attemptId, answerData) => fetchAPI(`/api/v1/attempts/${attemptId}/save-answer`, {
         method: 'POST',
         body: JSON.stringify(answerData),